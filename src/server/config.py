@@ -19,6 +19,8 @@ CLIENT_TIMEOUT_BUFFER = 30                # 客户端额外缓冲 30 秒
 DEFAULT_CALLBACK_PAGE_CLOSE_DELAY = 3     # 默认 3 秒
 DEFAULT_SOCKET_PATH = '/tmp/claude-permission.sock'
 DEFAULT_HTTP_PORT = '8080'
+DEFAULT_STORAGE_BACKEND = 'json'
+DEFAULT_SESSION_STORE_FLUSH_INTERVAL = 1  # 默认 1 秒
 
 # =============================================================================
 # .env 文件缓存
@@ -210,6 +212,40 @@ def get_session_mode() -> str:
     return 'message'
 
 
+def get_storage_backend() -> str:
+    """获取 runtime 数据存储后端
+
+    配置项: STORAGE_BACKEND
+    - json（默认）: 每个 store 一个 JSON 文件，适合小规模部署
+    - sqlite: runtime/storage.db（WAL），首次启用时自动从 JSON 文件迁移
+    - 无效值回退为 json
+
+    Returns:
+        'json' 或 'sqlite'
+    """
+    backend = get_config('STORAGE_BACKEND', DEFAULT_STORAGE_BACKEND).strip().lower()
+    if backend in ('json', 'sqlite'):
+        return backend
+    return DEFAULT_STORAGE_BACKEND
+
+
+def get_session_store_flush_interval() -> int:
+    """获取 SessionChatStore 的批量写入间隔
+
+    配置项: SESSION_STORE_FLUSH_INTERVAL（秒）
+    - 正整数：变更先写内存，后台按此间隔批量落盘
+    - 0：关闭写缓冲，每次变更同步写入
+    - 无效值使用默认值
+
+    Returns:
+        间隔秒数，0 表示同步写入
+    """
+    value = get_config('SESSION_STORE_FLUSH_INTERVAL', '').strip()
+    if value.isdigit():
+        return int(value)
+    return DEFAULT_SESSION_STORE_FLUSH_INTERVAL
+
+
 def reload_config():
     """重新加载 .env 文件
 
@@ -234,6 +270,9 @@ PERMISSION_REQUEST_TIMEOUT = get_request_timeout()
 # 客户端超时（比服务端大，确保服务端先触发超时）
 CLIENT_TIMEOUT = PERMISSION_REQUEST_TIMEOUT + CLIENT_TIMEOUT_BUFFER
 
+# 权限请求 Unix Socket 的 listen() 等待队列长度（大量 hook 同时发起请求时避免连接被拒）
+PERMISSION_SOCKET_BACKLOG = get_config_positive_int('PERMISSION_SOCKET_BACKLOG', 128)
+
 # 回调页面关闭超时
 CALLBACK_PAGE_CLOSE_DELAY = get_close_page_timeout()
 
@@ -357,3 +396,42 @@ FEISHU_GROUP_DISSOLVE_DAYS = get_config_positive_int('FEISHU_GROUP_DISSOLVE_DAYS
 
 # Session 过期天数（统一，不区分 group/非 group）
 SESSION_EXPIRE_DAYS = get_config_positive_int('SESSION_EXPIRE_DAYS', 30)
+
+# runtime 数据存储后端：json / sqlite
+STORAGE_BACKEND = get_storage_backend()
+
+# SessionChatStore 写缓冲：批量写入间隔（秒，0 = 同步写入）与提前写入的脏条目阈值
+SESSION_STORE_FLUSH_INTERVAL = get_session_store_flush_interval()
+SESSION_STORE_FLUSH_MAX_DIRTY = get_config_positive_int('SESSION_STORE_FLUSH_MAX_DIRTY', 100)
+
+# 群聊活跃时间（GroupSessionStore.touch）批量落盘间隔（秒）
+GROUP_TOUCH_FLUSH_INTERVAL = get_config_positive_int('GROUP_TOUCH_FLUSH_INTERVAL', 60)
+
+# 网关侧 WS 隧道消息处理线程数（所有隧道共享；空闲隧道不占线程）
+WS_TUNNEL_WORKERS = get_config_positive_int('WS_TUNNEL_WORKERS', 16)
+
+# 网关侧每个 owner 的 WS 隧道同时在途请求数上限（超出的请求排队等待）
+WS_REQUEST_WINDOW = get_config_positive_int('WS_REQUEST_WINDOW', 8)
+
+# WS 隧道 permessage-deflate 压缩（网关与 callback 两端均开启且版本支持时生效）
+WS_DEFLATE = get_config('WS_DEFLATE', 'true').lower() in ('true', '1', 'yes')
+# 是否跨消息保留压缩上下文（压缩率更高，但每条隧道常驻数百 KB 压缩状态）
+WS_DEFLATE_CONTEXT_TAKEOVER = get_config('WS_DEFLATE_CONTEXT_TAKEOVER', 'true').lower() in ('true', '1', 'yes')
+# 小于该字节数的消息不压缩
+WS_DEFLATE_MIN_SIZE = get_config_positive_int('WS_DEFLATE_MIN_SIZE', 256)
+
+# WS 隧道 RPC 二进制信封（握手时协商，两端均开启且版本支持时生效，否则为 JSON）
+WS_BINARY_ENVELOPE = get_config('WS_BINARY_ENVELOPE', 'true').lower() in ('true', '1', 'yes')
+
+# 网关侧飞书 API 出站限流（每秒放行请求数，权限卡片优先、按 owner 轮询）
+FEISHU_API_QPS = get_config_positive_int('FEISHU_API_QPS', 20)
+
+# 飞书事件去重：event_id / message_id 保留秒数（应覆盖飞书重推间隔）与内存条目上限
+FEISHU_EVENT_DEDUP_TTL = get_config_positive_int('FEISHU_EVENT_DEDUP_TTL', 12 * 3600)
+FEISHU_EVENT_DEDUP_MAX = get_config_positive_int('FEISHU_EVENT_DEDUP_MAX', 20000)
+# 去重记录是否持久化（重启后仍能识别重启前处理过的事件）
+FEISHU_EVENT_DEDUP_PERSIST = get_config('FEISHU_EVENT_DEDUP_PERSIST', 'false').lower() in ('true', '1', 'yes')
+
+# 飞书消息事件分发：处理线程数（同一会话串行、不同会话并行）与单个会话排队上限
+FEISHU_DISPATCH_WORKERS = get_config_positive_int('FEISHU_DISPATCH_WORKERS', 8)
+FEISHU_DISPATCH_QUEUE_SIZE = get_config_positive_int('FEISHU_DISPATCH_QUEUE_SIZE', 20)
@@ -93,6 +93,55 @@ def handle_status(handler):
     if registry:
         result['ws'] = registry.get_status()
 
+    from services.ws_reactor import WSTunnelReactor
+    reactor = WSTunnelReactor.get_instance()
+    if reactor:
+        result['ws_reactor'] = reactor.get_stats()
+
+    # callback 侧隧道客户端：各级请求的排队等待统计
+    from services.ws_tunnel_client import get_ws_tunnel_client
+    tunnel_client = get_ws_tunnel_client()
+    if tunnel_client:
+        result['ws_client_requests'] = tunnel_client.get_request_stats()
+
+    # WS 隧道 permessage-deflate 累计（网关侧与隧道客户端侧均统计本进程的连接）
+    from services.ws_protocol import get_deflate_stats
+    result['ws_deflate'] = get_deflate_stats()
+
+    # 飞书 API 连接池统计（仅网关 / 单机初始化 FeishuAPIService）
+    from services.feishu_api import FeishuAPIService
+    feishu_service = FeishuAPIService.get_instance()
+    if feishu_service and feishu_service.enabled:
+        result['feishu_http_pool'] = feishu_service.get_http_pool_stats()
+        result['feishu_preflight'] = feishu_service.get_preflight_stats()
+        rate_limiter_stats = feishu_service.get_rate_limiter_stats()
+        if rate_limiter_stats:
+            result['feishu_rate_limiter'] = rate_limiter_stats
+
+    # 添加绑定读缓存统计（仅网关侧初始化 BindingStore）
+    from services.binding_store import BindingStore
+    binding_store = BindingStore.get_instance()
+    if binding_store:
+        result['binding_cache'] = binding_store.get_cache_stats()
+
+    # 飞书事件去重统计（丢弃的重推事件数）
+    from services.feishu_event_dedup import FeishuEventDedup
+    event_dedup = FeishuEventDedup.get_instance()
+    if event_dedup:
+        result['feishu_event_dedup'] = event_dedup.get_stats()
+
+    # 飞书消息事件分发统计（排队数、排队等待、队列满丢弃数）
+    from services.chat_dispatcher import ChatDispatcher
+    dispatcher = ChatDispatcher.get_instance()
+    if dispatcher:
+        result['feishu_dispatch'] = dispatcher.get_stats()
+
+    # 共享后台线程池各池统计（运行中 / 排队 / 丢弃数、运行耗时分位）
+    from services.task_executor import TaskExecutor
+    task_executor = TaskExecutor.get_instance()
+    if task_executor:
+        result['task_pools'] = task_executor.get_stats()
+
     send_json(handler, 200, result)
 
 
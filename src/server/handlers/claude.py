@@ -11,11 +11,13 @@ import shlex
 import subprocess
 import sys
 import threading
+import time
 import uuid
-from typing import Tuple, Dict, List, Any
+from typing import Tuple, Dict, List, Any, Optional
 
 from services.session_chat_store import SessionChatStore
 from handlers.utils import build_shell_cmd, run_in_background as _run_in_background
+from services.task_executor import POOL_CLAUDE
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,7 @@ STARTUP_TIMEOUT_SECONDS = 30  # 后台启动阶段等待时间（秒），兜住
 STARTUP_CHECK_SECONDS = 2  # 启动检查等待时间（秒）
 MAX_LOG_LENGTH = 500  # 日志最大长度
 MAX_NOTIFICATION_LENGTH = 500  # 通知消息最大长度
+REAP_INTERVAL_SECONDS = 5  # 已脱离监控的子进程回收检查间隔（秒）
 
 # MCP 配置
 MCP_TOOL_NAME = "mcp__approver__permission_request"
@@ -342,7 +345,7 @@ def _execute_and_check(session_id: str, project_dir: str, prompt: str, chat_id:
         # 进程仍在运行，正常启动
         logger.info(f"{log_prefix} Command is running in background")
         # 在后台等待完成
-        _run_in_background(_wait_for_completion, (proc, session_id, chat_id))
+        _run_in_background(_wait_for_completion, (proc, session_id, chat_id), pool=POOL_CLAUDE)
         return Response.processing()
 
 
@@ -380,14 +383,42 @@ def _wait_for_completion(proc: subprocess.Popen, session_id: str, chat_id: str =
             proc.stdout.close()
         if proc.stderr:
             proc.stderr.close()
-        # 启动守护线程回收子进程，防止 zombie
-        threading.Thread(target=proc.wait, daemon=True).start()
+        # 交给回收线程定期 poll，防止 zombie
+        _reap_later(proc)
     except Exception as e:
         logger.error(f"[claude] Execution error: {e}, session: {session_id}")
         if chat_id:
             _send_error_notification(chat_id, str(e)[:MAX_NOTIFICATION_LENGTH])
 
 
+# 已脱离监控、等待退出后回收的子进程（单个回收线程定期 poll，不再每个子进程占一个 wait 线程）
+_detached_procs = []  # type: List[subprocess.Popen]
+_reaper_lock = threading.Lock()
+_reaper_thread = None  # type: Optional[threading.Thread]
+
+
+def _reap_later(proc: subprocess.Popen):
+    """登记子进程，退出后由回收线程 poll 回收"""
+    global _reaper_thread
+    with _reaper_lock:
+        _detached_procs.append(proc)
+        if _reaper_thread is None:
+            _reaper_thread = threading.Thread(target=_reaper_loop, name='claude-reaper', daemon=True)
+            _reaper_thread.start()
+
+
+def _reaper_loop():
+    """定期 poll 已脱离的子进程，全部退出后线程结束（有新登记时重新启动）"""
+    global _reaper_thread
+    while True:
+        time.sleep(REAP_INTERVAL_SECONDS)
+        with _reaper_lock:
+            _detached_procs[:] = [p for p in _detached_procs if p.poll() is None]
+            if not _detached_procs:
+                _reaper_thread = None
+                return
+
+
 def _send_error_notification(chat_id: str, error_msg: str):
     """发送错误通知到飞书
 
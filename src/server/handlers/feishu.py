@@ -12,6 +12,7 @@ WebSocket 隧道支持：
     - 适用于 Callback 后端不可公网访问的场景（本地开发、内网部署）
 """
 
+import concurrent.futures
 import copy
 import hmac
 import json
@@ -28,8 +29,10 @@ from typing import Any, Dict, List, Optional, Tuple
 # setup_logging 由 main.py 启动时将 shared/ 加入 sys.path
 from logging_config import setup_logging
 
-from handlers.utils import run_in_background as _run_in_background, post_json as _post_json
+from handlers.utils import run_in_background, post_json as _post_json
+from services.chat_dispatcher import ChatDispatcher
 from services.session_facade import SessionFacade
+from services.task_executor import POOL_NOTIFY, POOL_FORWARD
 
 logger = logging.getLogger(__name__)
 
@@ -70,11 +73,24 @@ def _forward_via_ws_or_http(binding: Dict[str, Any], endpoint: str, payload: Dic
     Returns:
         响应数据，失败返回 None
     """
+    return _forward_via_ws_or_http_async(binding, endpoint, payload, timeout).result()
+
+
+def _forward_via_ws_or_http_async(binding: Dict[str, Any], endpoint: str, payload: Dict[str, Any],
+                                  timeout: Optional[float] = None) -> concurrent.futures.Future:
+    """_forward_via_ws_or_http 的异步版本，用于向多个 owner 并发转发
+
+    WS 隧道模式下请求发出后立即返回；HTTP 模式仍在调用线程同步完成，返回已完成的 Future。
+
+    Returns:
+        Future，结果为响应数据（失败为 None）
+    """
     from services.ws_registry import WebSocketRegistry
 
     owner_id = binding.get('_owner_id', '')
     callback_url = binding.get('callback_url', '')
     auth_token = binding.get('auth_token', '')
+    result = concurrent.futures.Future()
 
     # 根据 callback_url 协议决定转发方式
     is_ws_mode = callback_url.startswith(('ws://', 'wss://'))
@@ -86,27 +102,38 @@ def _forward_via_ws_or_http(binding: Dict[str, Any], endpoint: str, payload: Dic
             # 获取该连接的 auth_token 用于本地 handler 验证
             ws_auth_token = registry.get_auth_token(owner_id)
             headers = {'X-Auth-Token': ws_auth_token} if ws_auth_token else {}
-            response = registry.send_request(owner_id, endpoint, payload, headers, timeout=timeout)
-            if response is not None:
-                # WS 隧道返回格式: {status: HTTP码, body: 业务响应}
-                # 提取 body 作为真正的业务响应
-                return response.get('body', response)
+
+            def _unwrap(future: concurrent.futures.Future) -> None:
+                response = future.result()
+                if response is None:
+                    logger.warning("[feishu] WS tunnel not available for %s", owner_id)
+                    result.set_result(None)
+                else:
+                    # WS 隧道返回格式: {status: HTTP码, body: 业务响应}
+                    # 提取 body 作为真正的业务响应
+                    result.set_result(response.get('body', response))
+
+            registry.send_request_async(owner_id, endpoint, payload, headers,
+                                        timeout=timeout).add_done_callback(_unwrap)
+            return result
         logger.warning("[feishu] WS tunnel not available for %s", owner_id)
-        return None
+        result.set_result(None)
+        return result
 
     # HTTP 模式（ws:// 或 wss:// 是 WS 隧道地址，不能用于 HTTP 请求）
+    response = None
     if callback_url:
         api_url = f"{callback_url.rstrip('/')}{endpoint}"
         http_timeout = int(timeout) if timeout else 10
         logger.debug("[feishu] Using HTTP for %s: %s", owner_id, api_url)
         try:
-            return _post_json(api_url, payload, auth_token=auth_token, timeout=http_timeout)
+            response = _post_json(api_url, payload, auth_token=auth_token, timeout=http_timeout)
         except Exception as e:
             logger.error("[feishu] HTTP request failed: %s", e)
-            return None
-
-    logger.warning("[feishu] No callback_url configured for %s", owner_id)
-    return None
+    else:
+        logger.warning("[feishu] No callback_url configured for %s", owner_id)
+    result.set_result(response)
+    return result
 
 
 def _should_reply_in_thread(binding: Dict[str, Any], project_dir: str) -> bool:
@@ -222,7 +249,11 @@ def handle_feishu_request(data: dict, skip_token_validation: bool = False) -> Tu
     event_type = header.get('event_type', '')
 
     if event_type == 'im.message.receive_v1':
-        _handle_message_event(data)
+        # 飞书重推 / 长连接重放的同一事件在任何处理之前丢弃
+        if _is_duplicate_event(header.get('event_id', ''),
+                               data.get('event', {}).get('message', {}).get('message_id', '')):
+            return True, {'success': True}
+        _dispatch_message_event(data)
         return True, {'success': True}
 
     # 卡片回传交互事件
@@ -235,6 +266,60 @@ def handle_feishu_request(data: dict, skip_token_validation: bool = False) -> Tu
     return False, {}
 
 
+def _is_duplicate_event(event_id: str, message_id: str) -> bool:
+    """按 event_id / message_id 判断事件是否已处理过（未初始化去重服务时视为不重复）"""
+    from services.feishu_event_dedup import FeishuEventDedup
+    dedup = FeishuEventDedup.get_instance()
+    if not dedup:
+        return False
+    matched = dedup.check_and_mark(event_id, message_id)
+    if matched:
+        logger.info(f"[feishu] Duplicate event dropped ({matched}): event_id={event_id}, message_id={message_id}")
+        return True
+    return False
+
+
+def _dispatch_message_event(data: dict) -> None:
+    """把消息事件放入所属会话的串行队列（分发器未初始化时同步处理）
+
+    同一 chat_id 的消息按到达顺序逐条处理，队列满时丢弃并提示用户稍后再发。
+    """
+    dispatcher = ChatDispatcher.get_instance()
+    message = data.get('event', {}).get('message', {})
+    chat_id = message.get('chat_id', '')
+    if not dispatcher or not chat_id:
+        _handle_message_event(data)
+        return
+
+    message_id = message.get('message_id', '')
+    dispatcher.submit(chat_id, _handle_message_event, (data,),
+                      on_reject=lambda: run_in_background(
+                          _send_notice_message,
+                          (chat_id, "⚠️ 消息过多，正在依次处理前面的消息，本条消息未处理，请稍后重新发送", message_id),
+                          pool=POOL_NOTIFY))
+
+
+def _run_in_background(func, args, pool: str):
+    """执行消息处理的后续动作（转发请求、发送提示等）
+
+    在 ChatDispatcher 工作线程中同步执行，保证同一会话的后续动作也按消息顺序完成；
+    其他线程（卡片回调等）中提交到共享线程池。
+
+    Args:
+        func: 要执行的函数
+        args: 位置参数元组
+        pool: 线程池名：提示 / 表情回应 / 状态卡片用 POOL_NOTIFY（过载时可丢弃），
+            转发请求、建群解散等用户操作用 POOL_FORWARD（不丢弃）
+    """
+    if not ChatDispatcher.in_worker():
+        run_in_background(func, args, pool=pool)
+        return
+    try:
+        func(*args)
+    except Exception as e:
+        logger.error(f"[feishu] {getattr(func, '__name__', func)} failed: {e}", exc_info=True)
+
+
 def _verify_token(data: dict) -> bool:
     """验证 Verification Token
 
@@ -417,7 +502,7 @@ def _handle_message_event(data: dict):
                         "```\ncurl -fsSL https://raw.githubusercontent.com/frankie-huang/claude-anywhere/refs/heads/main/setup.sh | bash -s -- --gateway-url=%s --owner-id=%s\n```" \
                         "\n如果网关地址（`--gateway-url`）非公网可达，请联系管理员获取对外可用的网关地址。" \
                         "\n\n注意：执行命令前，请先申请当前应用的使用权限，否则将无法接收到注册绑定卡片。如未申请，请先申请权限后再执行命令。" % (gateway_ws_url, user_id)
-            _run_in_background(_send_notice_message, (chat_id, hint, message_id))
+            _run_in_background(_send_notice_message, (chat_id, hint, message_id), pool=POOL_NOTIFY)
         return
 
     # 群聊 @bot 过滤：at_bot_only=true 时，群聊中非 @bot 的消息静默忽略
@@ -437,7 +522,7 @@ def _handle_message_event(data: dict):
     prompt = text.strip()
     if not prompt:
         hint = "消息内容为空，无法继续会话" if parent_id else "消息内容为空，请发送文字消息与我对话"
-        _run_in_background(_send_notice_message, (chat_id, hint, message_id))
+        _run_in_background(_send_notice_message, (chat_id, hint, message_id), pool=POOL_NOTIFY)
         return
 
     # 路由到已有 session：优先 parent_id，其次 group 模式群聊 chat_id 反查
@@ -451,7 +536,7 @@ def _handle_message_event(data: dict):
         _run_in_background(_send_notice_message,
                            (chat_id,
                             _SESSION_NOT_FOUND_HINT + "请稍后重试或重新发起 /new 指令。",
-                            message_id))
+                            message_id), pool=POOL_NOTIFY)
         return
 
     if SessionFacade.RouteSource.is_resolved(route_source):
@@ -470,12 +555,12 @@ def _handle_message_event(data: dict):
             _run_in_background(_forward_new_request,
                                (binding, route_info['session_id'],
                                 route_info['project_dir'], prompt,
-                                chat_id, message_id, chat_type))
+                                chat_id, message_id, chat_type), pool=POOL_FORWARD)
         else:
             _run_in_background(_forward_continue_request,
                                (binding, route_info['session_id'],
                                 route_info['project_dir'], prompt,
-                                chat_id, message_id))
+                                chat_id, message_id), pool=POOL_FORWARD)
         return
 
     # 未路由到已有 session：走默认聊天目录 / 使用提示
@@ -494,7 +579,7 @@ def _handle_message_event(data: dict):
            "**继续会话：**\n" \
            "回复 Claude 的消息即可继续对话\n\n" \
            "**支持的指令：**\n" + supported
-    _run_in_background(_send_notice_message, (chat_id, hint, message_id))
+    _run_in_background(_send_notice_message, (chat_id, hint, message_id), pool=POOL_NOTIFY)
 
 
 def _get_supported_commands(owner_id: str = '') -> str:
@@ -571,7 +656,7 @@ def _handle_command(data: dict, command: str, args: str):
         # 管理员专属指令需要权限检查
         if admin_only and owner_id != gateway_owner_id:
             if chat_id:
-                _run_in_background(_send_notice_message, (chat_id, "此指令仅限管理员使用", message_id))
+                _run_in_background(_send_notice_message, (chat_id, "此指令仅限管理员使用", message_id), pool=POOL_NOTIFY)
             return
         handler_func(data, args)
     else:
@@ -579,7 +664,7 @@ def _handle_command(data: dict, command: str, args: str):
         # 发送未知指令提示
         if chat_id:
             supported = _get_supported_commands(owner_id)
-            _run_in_background(_send_notice_message, (chat_id, f"未知指令：`/{command}`\n\n支持的指令：\n{supported}", message_id))
+            _run_in_background(_send_notice_message, (chat_id, f"未知指令：`/{command}`\n\n支持的指令：\n{supported}", message_id), pool=POOL_NOTIFY)
 
 
 def _handle_default_chat_message(data: dict, prompt: str, binding: dict) -> None:
@@ -609,14 +694,14 @@ def _handle_default_chat_message(data: dict, prompt: str, binding: dict) -> None
         _run_in_background(_forward_continue_request, (
             binding, session_id, default_chat_dir,
             prompt, chat_id, message_id
-        ))
+        ), pool=POOL_FORWARD)
     else:
         # 创建新的默认会话
         logger.info(f"[default-chat] Creating new session in {default_chat_dir} for {owner_id}, prompt={_sanitize_user_content(prompt)}")
         new_session_id = str(uuid.uuid4())
         _run_in_background(_forward_new_request_for_default_dir, (
             binding, new_session_id, default_chat_dir, prompt, chat_id, message_id
-        ))
+        ), pool=POOL_FORWARD)
 
 
 def _forward_new_request_for_default_dir(binding: Dict[str, Any], session_id: str,
@@ -1288,7 +1373,7 @@ def _handle_new_session_form(card_data: dict, form_values: dict) -> Tuple[bool,
 
     # 在后台线程中异步执行会话创建
     new_session_id = str(uuid.uuid4())
-    _run_in_background(_forward_new_request, (binding, new_session_id, selected_dir, prompt, chat_id, message_id, chat_type, claude_command))
+    _run_in_background(_forward_new_request, (binding, new_session_id, selected_dir, prompt, chat_id, message_id, chat_type, claude_command), pool=POOL_FORWARD)
 
     return True, response
 
@@ -2146,7 +2231,7 @@ def _handle_ask_question_answer(request_id: str, form_value: dict, original_data
                 toast_content += f'（{nums}的自定义内容已覆盖选项）'
             logger.info("[feishu] AskUserQuestion succeeded: decision=%s, elapsed=%.0fms", decision, elapsed)
             # 决策成功后，异步添加 Typing 表情
-            _run_in_background(_add_typing_reaction, (card_message_id,))
+            _run_in_background(_add_typing_reaction, (card_message_id,), pool=POOL_NOTIFY)
 
             # 尝试在回调响应中返回更新后的卡片
             updated_card = _get_updated_card_for_response(request_id, 'answer', form_value=form_value)
@@ -2261,7 +2346,7 @@ def _forward_permission_request(request_id: str, original_data: dict, action_typ
             logger.info(f"[feishu] Decision succeeded: decision={decision}, message={message}, elapsed={elapsed:.0f}ms")
             # 决策成功后，异步添加 Typing 表情（拒绝并中断时不需要，因为预期任务会停止）
             if action_type != 'interrupt':
-                _run_in_background(_add_typing_reaction, (card_message_id,))
+                _run_in_background(_add_typing_reaction, (card_message_id,), pool=POOL_NOTIFY)
 
             # 尝试在回调响应中返回更新后的卡片（移除按钮，更新状态）
             updated_card = _get_updated_card_for_response(request_id, action_type)
@@ -2598,7 +2683,7 @@ def _send_new_session_card(binding: dict, owner_id: str, chat_id: str,
 
     if not binding:
         logger.warning("[feishu] No binding found, cannot fetch recent dirs")
-        _run_in_background(_send_notice_message, (chat_id, "您尚未注册，无法使用此功能", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "您尚未注册，无法使用此功能", message_id), pool=POOL_NOTIFY)
         return
 
     reply_in_thread = _should_reply_in_thread(binding, project_dir)
@@ -2621,9 +2706,11 @@ def _send_new_session_card(binding: dict, owner_id: str, chat_id: str,
     logger.info(f"[feishu] Dir selector card JSON:\n{card_json}")
 
     if message_id:
-        success, sent_message_id = service.reply_card(json.dumps(card, ensure_ascii=False), message_id, reply_in_thread)
+        success, sent_message_id = service.reply_card(json.dumps(card, ensure_ascii=False), message_id, reply_in_thread,
+                                                      owner_id=owner_id)
     else:
-        success, sent_message_id = service.send_card(json.dumps(card, ensure_ascii=False), receive_id=chat_id, receive_id_type='chat_id')
+        success, sent_message_id = service.send_card(json.dumps(card, ensure_ascii=False), receive_id=chat_id,
+                                                     receive_id_type='chat_id', owner_id=owner_id)
 
     if success:
         logger.info(f"[feishu] Sent new session card to {chat_id}, card_msg_id={sent_message_id}")
@@ -2647,12 +2734,12 @@ def _handle_new_command(data: dict, args: str):
     # 解析指令参数（支持 --dir= 和 --cmd=）
     success, project_dir, cmd_arg, prompt = _parse_command_args(args)
     if not success:
-        _run_in_background(_send_notice_message, (chat_id, "参数格式错误，正确格式：`/new --dir=/path/to/project [--cmd=0] prompt`", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "参数格式错误，正确格式：`/new --dir=/path/to/project [--cmd=0] prompt`", message_id), pool=POOL_NOTIFY)
         return
 
     binding = _get_binding_from_event(event)
     if not binding:
-        _run_in_background(_send_notice_message, (chat_id, "您尚未注册，无法使用此功能", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "您尚未注册，无法使用此功能", message_id), pool=POOL_NOTIFY)
         return
     owner_id = binding.get('_owner_id', '')
     msg_chat_type = message.get('chat_type', '')
@@ -2684,7 +2771,7 @@ def _handle_new_command(data: dict, args: str):
         # 有 --cmd 时解析用户指定的命令，否则使用 binding 默认命令
         ok, result = _resolve_claude_command_from_binding(binding, cmd_arg)
         if not ok:
-            _run_in_background(_send_notice_message, (chat_id, result, message_id))
+            _run_in_background(_send_notice_message, (chat_id, result, message_id), pool=POOL_NOTIFY)
             return
         claude_command = result
 
@@ -2701,7 +2788,7 @@ def _handle_new_command(data: dict, args: str):
 
     # 验证参数：如果没有目录或没有提示词，发送卡片让用户完善
     if not project_dir or not prompt:
-        _run_in_background(_send_new_session_card, (binding, owner_id, chat_id, message_id, msg_chat_type, project_dir, prompt, claude_command))
+        _run_in_background(_send_new_session_card, (binding, owner_id, chat_id, message_id, msg_chat_type, project_dir, prompt, claude_command), pool=POOL_FORWARD)
         return
 
     logger.info(f"[feishu] /new command: dir={project_dir}, cmd={claude_command or '(default)'}, prompt={_sanitize_user_content(prompt)}")
@@ -2710,9 +2797,9 @@ def _handle_new_command(data: dict, args: str):
     # 如果使用的是默认聊天目录，同时更新活跃默认会话
     new_session_id = str(uuid.uuid4())
     if default_chat_dir and os.path.realpath(project_dir) == os.path.realpath(default_chat_dir):
-        _run_in_background(_forward_new_request_for_default_dir, (binding, new_session_id, project_dir, prompt, chat_id, message_id, msg_chat_type, claude_command))
+        _run_in_background(_forward_new_request_for_default_dir, (binding, new_session_id, project_dir, prompt, chat_id, message_id, msg_chat_type, claude_command), pool=POOL_FORWARD)
     else:
-        _run_in_background(_forward_new_request, (binding, new_session_id, project_dir, prompt, chat_id, message_id, msg_chat_type, claude_command))
+        _run_in_background(_forward_new_request, (binding, new_session_id, project_dir, prompt, chat_id, message_id, msg_chat_type, claude_command), pool=POOL_FORWARD)
 
 
 def _forward_new_request(binding: dict, session_id: str, project_dir: str, prompt: str,
@@ -2752,7 +2839,7 @@ def _forward_new_request(binding: dict, session_id: str, project_dir: str, promp
         gs_store = GroupSessionStore.get_instance()
         owner_id = binding.get('_owner_id', '')
         if not gs_store or not owner_id:
-            _run_in_background(_send_notice_message, (chat_id, "存储服务未就绪，请稍后重试", message_id))
+            _run_in_background(_send_notice_message, (chat_id, "存储服务未就绪，请稍后重试", message_id), pool=POOL_NOTIFY)
             return ''
         if chat_type != 'group':
             # P2P /new（group 模式）：不预建群，让 callback ensure-chat 统一处理
@@ -2900,7 +2987,7 @@ def batch_dissolve_groups(binding: Dict[str, Any],
 
     调用方:
     - _dissolve_groups(): /groups dissolve 命令
-    - main.py _cleanup_group_chats(): 定时清理空闲群聊
+    - main.py _cleanup_group_chats(): 定时清理空闲群聊（经 batch_dissolve_groups_multi 多 owner 并发）
 
     Args:
         binding: 绑定信息（包含 _owner_id，用于归属校验和 callback 通知）
@@ -2913,80 +3000,101 @@ def batch_dissolve_groups(binding: Dict[str, Any],
             'failed': List[{'chat_id', 'error'}],  # 真正的 API 错误
         }
     """
-    owner_id = binding.get('_owner_id', '')
-    if not owner_id:
-        logger.warning("[batch-dissolve] owner_id is empty, refusing %d chat(s)", len(chat_ids))
-        return {
-            'dissolved_items': [],
-            'skipped_items': [],
-            'failed': [{'chat_id': cid, 'error': 'owner_id not configured'} for cid in chat_ids],
-        }
+    return batch_dissolve_groups_multi([(binding, chat_ids)])[0]
+
+
+def batch_dissolve_groups_multi(jobs: List[Tuple[Dict[str, Any], List[str]]]) -> List[Dict[str, Any]]:
+    """多个 owner 的批量解散：各 owner 的 callback 预通知并发发出，再依次解散
+
+    每个 owner 的处理语义与 batch_dissolve_groups 相同（预通知失败则该 owner 全部中止）。
 
+    Args:
+        jobs: [(binding, chat_ids), ...]
+
+    Returns:
+        与 jobs 顺序一致的结果列表，格式同 batch_dissolve_groups
+    """
     from services.feishu_api import FeishuAPIService
     from services.group_chat_store import GroupChatStore
 
+    results = [None] * len(jobs)  # type: List[Optional[Dict[str, Any]]]
     service = FeishuAPIService.get_instance()
-    if not service or not service.enabled:
-        return {
-            'dissolved_items': [],
-            'skipped_items': [],
-            'failed': [{'chat_id': cid, 'error': 'Feishu API service not available'} for cid in chat_ids],
-        }
-
     group_store = GroupChatStore.get_instance()
-    if not group_store:
-        return {
-            'dissolved_items': [],
-            'skipped_items': [],
-            'failed': [{'chat_id': cid, 'error': 'GroupChatStore not initialized'} for cid in chat_ids],
-        }
-    my_chats = {item['chat_id'] for item in group_store.get_chats_by_owner(owner_id)}
-
-    # 1) 按归属过滤
-    targets = []
-    skipped_items = []
-    for cid in chat_ids:
-        if cid not in my_chats:
-            skipped_items.append(cid)
-        else:
-            targets.append(cid)
 
-    if not targets:
-        return {'dissolved_items': [], 'skipped_items': skipped_items, 'failed': []}
+    # 1) 按归属过滤，并向各 owner 的 callback 发出预通知（WS 隧道下不等待响应）
+    notifies = []  # [(job 下标, owner_id, targets, skipped_items, future)]
+    for index, (binding, chat_ids) in enumerate(jobs):
+        owner_id = binding.get('_owner_id', '')
+        if not owner_id:
+            logger.warning("[batch-dissolve] owner_id is empty, refusing %d chat(s)", len(chat_ids))
+            results[index] = _dissolve_all_failed(chat_ids, 'owner_id not configured')
+            continue
+        if not service or not service.enabled:
+            results[index] = _dissolve_all_failed(chat_ids, 'Feishu API service not available')
+            continue
+        if not group_store:
+            results[index] = _dissolve_all_failed(chat_ids, 'GroupChatStore not initialized')
+            continue
+        my_chats = {item['chat_id'] for item in group_store.get_chats_by_owner(owner_id)}
 
-    # 2) 先通知 callback 标记 dissolved；失败则中止，等下次清理重试
-    try:
-        resp = _forward_via_ws_or_http(binding,
-                                       '/cb/session/invalidate-chats',
-                                       {'chat_ids': targets})
+        targets = []
+        skipped_items = []
+        for cid in chat_ids:
+            if cid not in my_chats:
+                skipped_items.append(cid)
+            else:
+                targets.append(cid)
+
+        if not targets:
+            results[index] = {'dissolved_items': [], 'skipped_items': skipped_items, 'failed': []}
+            continue
+
+        # 2) 先通知 callback 标记 dissolved；失败则中止，等下次清理重试
+        try:
+            future = _forward_via_ws_or_http_async(binding,
+                                                   '/cb/session/invalidate-chats',
+                                                   {'chat_ids': targets})
+        except Exception as e:
+            future = concurrent.futures.Future()
+            future.set_exception(e)
+        notifies.append((index, owner_id, targets, skipped_items, future))
+
+    # 3) 预通知成功的 owner 再调飞书 API 解散 + 清 GroupChatStore
+    for index, owner_id, targets, skipped_items, future in notifies:
+        try:
+            resp = future.result()
+        except Exception as e:
+            logger.error("[dissolve] invalidate-chats pre-notify failed for %s, aborting: %s", owner_id, e)
+            results[index] = _dissolve_all_failed(targets, 'pre-notify failed: %s' % e, skipped_items)
+            continue
         if not resp or not resp.get('ok'):
             err_msg = (resp or {}).get('error', 'unknown error')
-            logger.error("[dissolve] invalidate-chats returned not-ok: %s", err_msg)
-            return {
-                'dissolved_items': [],
-                'skipped_items': skipped_items,
-                'failed': [{'chat_id': cid, 'error': 'pre-notify failed: %s' % err_msg} for cid in targets],
-            }
-    except Exception as e:
-        logger.error("[dissolve] invalidate-chats pre-notify failed, aborting: %s", e)
-        return {
-            'dissolved_items': [],
-            'skipped_items': skipped_items,
-            'failed': [{'chat_id': cid, 'error': 'pre-notify failed: %s' % e} for cid in targets],
-        }
+            logger.error("[dissolve] invalidate-chats returned not-ok for %s: %s", owner_id, err_msg)
+            results[index] = _dissolve_all_failed(targets, 'pre-notify failed: %s' % err_msg, skipped_items)
+            continue
 
-    # 3) 再调飞书 API 解散 + 清 GroupChatStore
-    dissolved_items = []
-    failed = []
-    for cid in targets:
-        ok, err = service.dissolve_group_chat(cid)
-        if ok:
-            group_store.remove(cid)
-            dissolved_items.append(cid)
-        else:
-            failed.append({'chat_id': cid, 'error': err})
+        dissolved_items = []
+        failed = []
+        for cid in targets:
+            ok, err = service.dissolve_group_chat(cid)
+            if ok:
+                group_store.remove(cid)
+                dissolved_items.append(cid)
+            else:
+                failed.append({'chat_id': cid, 'error': err})
+        results[index] = {'dissolved_items': dissolved_items, 'skipped_items': skipped_items, 'failed': failed}
 
-    return {'dissolved_items': dissolved_items, 'skipped_items': skipped_items, 'failed': failed}
+    return results
+
+
+def _dissolve_all_failed(chat_ids: List[str], error: str,
+                         skipped_items: Optional[List[str]] = None) -> Dict[str, Any]:
+    """batch_dissolve_groups 的整批失败结果"""
+    return {
+        'dissolved_items': [],
+        'skipped_items': skipped_items or [],
+        'failed': [{'chat_id': cid, 'error': error} for cid in chat_ids],
+    }
 
 
 def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict]:
@@ -3062,7 +3170,7 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
     # 尝试清除 reply_to 消息上的 Typing 表情（新建/继续会话的 processing 阶段可能添加了该表情）
     # 多数场景下消息上并无此表情，remove_reaction 查询到空列表后会直接返回，无副作用
     if reply_to_message_id:
-        service.remove_reaction(reply_to_message_id, 'Typing')
+        service.remove_reaction(reply_to_message_id, 'Typing', owner_id=owner_id)
 
     success = False
     sent_message_id = ''
@@ -3079,9 +3187,9 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
             card_json = content
 
         if reply_to_message_id:
-            success, sent_message_id = service.reply_card(card_json, reply_to_message_id, reply_in_thread)
+            success, sent_message_id = service.reply_card(card_json, reply_to_message_id, reply_in_thread, owner_id=owner_id)
         else:
-            success, sent_message_id = service.send_card(card_json, receive_id, receive_id_type)
+            success, sent_message_id = service.send_card(card_json, receive_id, receive_id_type, owner_id=owner_id)
 
         # 仅在卡片实际发送成功后缓存，避免降级为文本消息时误缓存卡片
         # Best-effort 预筛选：通过字符串匹配快速跳过不含回调按钮的通知类卡片
@@ -3100,9 +3208,9 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
             logger.warning(f"[feishu] /gw/feishu/send: send_card failed: {error_msg}, fallback to text")
             fallback_text = f"⚠️ 卡片消息发送失败: {error_msg}"
             if reply_to_message_id:
-                success, sent_message_id = service.reply_text(fallback_text, reply_to_message_id, reply_in_thread)
+                success, sent_message_id = service.reply_text(fallback_text, reply_to_message_id, reply_in_thread, owner_id=owner_id)
             else:
-                success, sent_message_id = service.send_text(fallback_text, receive_id, receive_id_type)
+                success, sent_message_id = service.send_text(fallback_text, receive_id, receive_id_type, owner_id=owner_id)
 
     elif msg_type == 'text':
         text = content if isinstance(content, str) else content.get('text', '')
@@ -3111,9 +3219,9 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
             return True, {'success': False, 'error': 'Missing text content'}
 
         if reply_to_message_id:
-            success, sent_message_id = service.reply_text(text, reply_to_message_id, reply_in_thread)
+            success, sent_message_id = service.reply_text(text, reply_to_message_id, reply_in_thread, owner_id=owner_id)
         else:
-            success, sent_message_id = service.send_text(text, receive_id, receive_id_type)
+            success, sent_message_id = service.send_text(text, receive_id, receive_id_type, owner_id=owner_id)
 
     elif msg_type == 'post':
         # 富文本消息：content 应为 {"zh_cn": {"title": "...", "content": [[...]]}}
@@ -3122,9 +3230,9 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
             return True, {'success': False, 'error': 'Missing post content'}
 
         if reply_to_message_id:
-            success, sent_message_id = service.reply_post(content, reply_to_message_id, reply_in_thread)
+            success, sent_message_id = service.reply_post(content, reply_to_message_id, reply_in_thread, owner_id=owner_id)
         else:
-            success, sent_message_id = service.send_post(content, receive_id, receive_id_type)
+            success, sent_message_id = service.send_post(content, receive_id, receive_id_type, owner_id=owner_id)
 
     else:
         logger.warning(f"[feishu] /gw/feishu/send: unsupported msg_type: {msg_type}")
@@ -3139,7 +3247,7 @@ def handle_send_message(binding: Dict[str, Any], data: dict) -> Tuple[bool, dict
 
     # 按需添加 Typing 表情（调用方通过 add_typing=true 指定）
     if add_typing and sent_message_id:
-        service.add_reaction(sent_message_id, 'Typing')
+        service.add_reaction(sent_message_id, 'Typing', owner_id=owner_id)
 
     # 保存到本地 MessageSessionStore（飞书网关维护）
     if sent_message_id and session_id and project_dir:
@@ -3384,21 +3492,21 @@ def _handle_reply_command(data: dict, args: str):
     binding = _get_binding_from_event(event)
     session_mode = binding.get('session_mode', '') if binding else ''
     if not parent_id and not (session_mode == 'group' and chat_type == 'group'):
-        _run_in_background(_send_notice_message, (chat_id, "`/reply` 指令仅支持在回复消息时使用，或在群聊模式的群聊中直接使用", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "`/reply` 指令仅支持在回复消息时使用，或在群聊模式的群聊中直接使用", message_id), pool=POOL_NOTIFY)
         return
 
     # 解析参数
     success, project_dir, cmd_arg, prompt = _parse_command_args(args)
     if not success:
-        _run_in_background(_send_notice_message, (chat_id, "参数格式错误，正确格式：`/reply [--cmd=0] prompt`", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "参数格式错误，正确格式：`/reply [--cmd=0] prompt`", message_id), pool=POOL_NOTIFY)
         return
 
     if project_dir:
-        _run_in_background(_send_notice_message, (chat_id, "`/reply` 不支持 `--dir` 参数，会话目录由原始 session 决定。请去掉 `--dir` 后重试", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "`/reply` 不支持 `--dir` 参数，会话目录由原始 session 决定。请去掉 `--dir` 后重试", message_id), pool=POOL_NOTIFY)
         return
 
     if not prompt:
-        _run_in_background(_send_notice_message, (chat_id, "请提供问题内容，格式：`/reply [--cmd=0] prompt`", message_id))
+        _run_in_background(_send_notice_message, (chat_id, "请提供问题内容，格式：`/reply [--cmd=0] prompt`", message_id), pool=POOL_NOTIFY)
         return
 
     # 解析 --cmd 参数（从 binding 获取命令列表）
@@ -3406,7 +3514,7 @@ def _handle_reply_command(data: dict, args: str):
     if cmd_arg:
         ok, result = _resolve_claude_command_from_binding(binding, cmd_arg)
         if not ok:
-            _run_in_background(_send_notice_message, (chat_id, result, message_id))
+            _run_in_background(_send_notice_message, (chat_id, result, message_id), pool=POOL_NOTIFY)
             return
         claude_command = result
 
@@ -3416,12 +3524,12 @@ def _handle_reply_command(data: dict, args: str):
 
     if SessionFacade.RouteSource.is_parent_not_found(route_source):
         _run_in_background(_send_notice_message,
-                           (chat_id, _SESSION_NOT_FOUND_HINT + "请重新发起 /new 指令。", message_id))
+                           (chat_id, _SESSION_NOT_FOUND_HINT + "请重新发起 /new 指令。", message_id), pool=POOL_NOTIFY)
         return
 
     if not SessionFacade.RouteSource.is_resolved(route_source):
         _run_in_background(_send_notice_message,
-                           (chat_id, "无法找到对应的会话，请重新发起 /new 指令", message_id))
+                           (chat_id, "无法找到对应的会话，请重新发起 /new 指令", message_id), pool=POOL_NOTIFY)
         return
 
     session_id = route_info['session_id']
@@ -3444,9 +3552,9 @@ def _handle_reply_command(data: dict, args: str):
         chat_type = message.get('chat_type', '')
         _run_in_background(_forward_new_request,
                            (binding, session_id, session_project_dir, prompt,
-                            chat_id, message_id, chat_type, claude_command))
+                            chat_id, message_id, chat_type, claude_command), pool=POOL_FORWARD)
     else:
-        _run_in_background(_forward_continue_request, (binding, session_id, session_project_dir, prompt, chat_id, message_id, claude_command))
+        _run_in_background(_forward_continue_request, (binding, session_id, session_project_dir, prompt, chat_id, message_id, claude_command), pool=POOL_FORWARD)
 
 
 def _handle_users_command(data: dict, args: str):
@@ -3474,7 +3582,7 @@ def _handle_users_command(data: dict, args: str):
 
     # 构建并发送卡片
     card = _build_user_status_card(bindings, ws_status, gateway_owner_id)
-    _run_in_background(_send_users_status_card, (chat_id, card, message_id))
+    _run_in_background(_send_users_status_card, (chat_id, card, message_id), pool=POOL_NOTIFY)
 
 
 def _build_user_status_card(bindings: dict, ws_status: dict, admin_id: str) -> dict:
@@ -3622,17 +3730,17 @@ def _handle_groups_command(data: dict, args: str) -> None:
                 seqs = [int(x) for x in dissolve_args.split()]
             except ValueError:
                 _run_in_background(_send_notice_message,
-                                   (chat_id, "格式错误，示例：`/groups dissolve 1 2 3` 或 `/groups dissolve all`", message_id))
+                                   (chat_id, "格式错误，示例：`/groups dissolve 1 2 3` 或 `/groups dissolve all`", message_id), pool=POOL_NOTIFY)
                 return
             payload = {'seqs': seqs}
         else:
             _run_in_background(_send_notice_message,
-                               (chat_id, "请指定要解散的群聊序号，示例：`/groups dissolve 1 2 3` 或 `/groups dissolve all`", message_id))
+                               (chat_id, "请指定要解散的群聊序号，示例：`/groups dissolve 1 2 3` 或 `/groups dissolve all`", message_id), pool=POOL_NOTIFY)
             return
 
-        _run_in_background(_dissolve_groups, (binding, payload, chat_id, message_id))
+        _run_in_background(_dissolve_groups, (binding, payload, chat_id, message_id), pool=POOL_FORWARD)
     else:
-        _run_in_background(_list_groups, (binding, chat_id, message_id))
+        _run_in_background(_list_groups, (binding, chat_id, message_id), pool=POOL_FORWARD)
 
 
 def _list_groups(binding: Dict[str, Any], chat_id: str, message_id: str) -> None:
@@ -3775,18 +3883,18 @@ def _handle_attach_command(data: dict, args: str) -> None:
 
     if chat_type != 'group':
         _run_in_background(_send_notice_message,
-                           (chat_id, "`/attach` 仅支持在群聊中使用", message_id))
+                           (chat_id, "`/attach` 仅支持在群聊中使用", message_id), pool=POOL_NOTIFY)
         return
 
     prefix = args.strip()
     if len(prefix) < MIN_PREFIX_LEN:
         _run_in_background(_send_notice_message,
                            (chat_id, f"用法：`/attach <session_id 前缀>`（至少 {MIN_PREFIX_LEN} 字符）",
-                            message_id))
+                            message_id), pool=POOL_NOTIFY)
         return
 
     binding = _get_binding_from_event(event)
-    _run_in_background(_forward_attach_request, (binding, prefix, chat_id, message_id))
+    _run_in_background(_forward_attach_request, (binding, prefix, chat_id, message_id), pool=POOL_FORWARD)
 
 
 def _forward_attach_request(binding: Dict[str, Any], prefix: str,
@@ -3896,7 +4004,7 @@ def _pick_mute_target(route_info: Dict[str, str], chat_id: str,
     hint = (_SESSION_NOT_FOUND_HINT
             if SessionFacade.RouteSource.is_parent_not_found(source)
             else _SESSION_UNRESOLVED_HINT)
-    _run_in_background(_send_notice_message, (chat_id, hint, message_id))
+    _run_in_background(_send_notice_message, (chat_id, hint, message_id), pool=POOL_NOTIFY)
     return ''
 
 
@@ -3919,13 +4027,13 @@ def _handle_mute_command(data: dict, args: str) -> None:
     changed = SessionFacade.mute(binding, session_id)
     if changed is None:
         _run_in_background(_send_notice_message,
-                           (chat_id, "静音操作失败，请查看日志。", message_id))
+                           (chat_id, "静音操作失败，请查看日志。", message_id), pool=POOL_NOTIFY)
         return
 
     sid_tag = f"session `{session_id[:8]}`"
     text = (f"已静音 {sid_tag}，后续消息将不再推送到此处。发送任意文字消息可自动解除静音。" if changed
             else f"{sid_tag} 已处于静音状态。")
-    _run_in_background(_send_notice_message, (chat_id, text, message_id))
+    _run_in_background(_send_notice_message, (chat_id, text, message_id), pool=POOL_NOTIFY)
 
 
 def _handle_unmute_command(data: dict, args: str) -> None:
@@ -3947,13 +4055,13 @@ def _handle_unmute_command(data: dict, args: str) -> None:
     changed = SessionFacade.unmute(binding, session_id)
     if changed is None:
         _run_in_background(_send_notice_message,
-                           (chat_id, "解除静音失败，请查看日志。", message_id))
+                           (chat_id, "解除静音失败，请查看日志。", message_id), pool=POOL_NOTIFY)
         return
 
     sid_tag = f"session `{session_id[:8]}`"
     text = (f"已解除 {sid_tag} 的静音。" if changed
             else f"{sid_tag} 当前未处于静音状态。")
-    _run_in_background(_send_notice_message, (chat_id, text, message_id))
+    _run_in_background(_send_notice_message, (chat_id, text, message_id), pool=POOL_NOTIFY)
 
 
 def _auto_unmute_if_needed(binding: Dict[str, Any], route_info: Dict[str, str],
@@ -3976,7 +4084,7 @@ def _auto_unmute_if_needed(binding: Dict[str, Any], route_info: Dict[str, str],
         _run_in_background(_send_notice_message,
                            (chat_id,
                             f"已自动解除 session `{session_id[:8]}` 的静音。",
-                            message_id))
+                            message_id), pool=POOL_NOTIFY)
     elif result is None:
         # callback 调用失败：静默跳过用户反馈（被动钩子），但打 warning 留痕便于排障
         logger.warning("[feishu] auto_unmute failed: session_id=%s chat_id=%s",
@@ -3997,19 +4105,19 @@ def _handle_clear_command(data: dict, args: str) -> None:
 
     if chat_type != 'group':
         _run_in_background(_send_notice_message,
-                           (chat_id, "`/clear` 仅支持在群聊中使用", message_id))
+                           (chat_id, "`/clear` 仅支持在群聊中使用", message_id), pool=POOL_NOTIFY)
         return
 
     binding = _get_binding_from_event(event)
     if not binding:
         _run_in_background(_send_notice_message,
-                           (chat_id, "您尚未注册，无法使用此功能", message_id))
+                           (chat_id, "您尚未注册，无法使用此功能", message_id), pool=POOL_NOTIFY)
         return
 
     session_mode = binding.get('session_mode', 'message')
     if session_mode != 'group':
         _run_in_background(_send_notice_message,
-                           (chat_id, "`/clear` 仅在群聊模式下可用", message_id))
+                           (chat_id, "`/clear` 仅在群聊模式下可用", message_id), pool=POOL_NOTIFY)
         return
 
     from services.group_session_store import GroupSessionStore
@@ -4018,20 +4126,20 @@ def _handle_clear_command(data: dict, args: str) -> None:
 
     if not gs_store or not owner_id:
         _run_in_background(_send_notice_message,
-                           (chat_id, "存储服务未就绪，请稍后重试", message_id))
+                           (chat_id, "存储服务未就绪，请稍后重试", message_id), pool=POOL_NOTIFY)
         return
 
     current = gs_store.get(owner_id, chat_id)
     if not current:
         _run_in_background(_send_notice_message,
-                           (chat_id, "当前群聊没有活跃的会话", message_id))
+                           (chat_id, "当前群聊没有活跃的会话", message_id), pool=POOL_NOTIFY)
         return
 
     # 幂等：上次 /clear 后还没发消息，不重复 clone
     if current.get('new_session'):
         _run_in_background(_send_notice_message,
                            (chat_id, "会话上下文已清空，下次发送消息将自动创建新 Claude 会话。",
-                            message_id))
+                            message_id), pool=POOL_NOTIFY)
         return
 
     old_session_id = current.get('session_id', '')
@@ -4047,13 +4155,13 @@ def _handle_clear_command(data: dict, args: str) -> None:
     except Exception as e:
         logger.error("[feishu] /clear clone failed: %s", e)
         _run_in_background(_send_notice_message,
-                           (chat_id, "清空会话失败，请稍后重试", message_id))
+                           (chat_id, "清空会话失败，请稍后重试", message_id), pool=POOL_NOTIFY)
         return
 
     if not resp or not resp.get('ok'):
         logger.error("[feishu] /clear clone returned error: %s", resp)
         _run_in_background(_send_notice_message,
-                           (chat_id, "清空会话失败，请稍后重试", message_id))
+                           (chat_id, "清空会话失败，请稍后重试", message_id), pool=POOL_NOTIFY)
         return
 
     project_dir = resp.get('project_dir', '')
@@ -4066,7 +4174,7 @@ def _handle_clear_command(data: dict, args: str) -> None:
                 owner_id, chat_id, old_session_id[:8], new_session_id[:8])
     _run_in_background(_send_notice_message,
                        (chat_id, "会话上下文已清空，下次发送消息将自动创建新 Claude 会话。",
-                        message_id))
+                        message_id), pool=POOL_NOTIFY)
 
 
 # =============================================================================
@@ -118,7 +118,7 @@ def handle_register_request(data: dict, client_ip: str = '') -> Tuple[bool, dict
 
     logger.info(f"[register] Registration request: owner_id={owner_id}, callback_url={callback_url}, ip={client_ip}, session_mode={session_mode}, claude_commands={claude_commands}, default_chat_dir={default_chat_dir}")
 
-    # 在后台线程中处理注册逻辑（异步）
+    # 在共享后台线程池中处理注册逻辑（异步，default 池）
     _run_in_background(_process_registration, (callback_url, owner_id, client_ip, at_bot_only, session_mode, claude_commands, default_chat_dir, default_chat_follow_thread, group_name_prefix, group_dissolve_days))
 
     # 立即返回成功
@@ -9,6 +9,7 @@ import urllib.request
 from typing import Any, Dict, List, Tuple
 
 from config import CALLBACK_PAGE_CLOSE_DELAY
+from services.task_executor import TaskExecutor, POOL_DEFAULT
 
 logger = logging.getLogger(__name__)
 
@@ -218,15 +219,24 @@ def build_shell_cmd(shell: str, cmd_str: str) -> List[str]:
         return [shell, '-lc', path_prefix + cmd_str]
 
 
-def run_in_background(func, args=()):
-    """在后台线程中执行函数
+def run_in_background(func, args=(), pool=POOL_DEFAULT):
+    """在共享后台线程池中执行函数
 
     Args:
         func: 要执行的函数
         args: 位置参数元组
+        pool: 线程池名（见 services/task_executor.py），决定并发上限与队列满策略
+
+    Returns:
+        任务是否会被执行；所在池队列已满且策略为丢弃时返回 False
     """
+    executor = TaskExecutor.get_instance()
+    if executor:
+        return executor.submit(pool, func, args)
+    # 未初始化（独立脚本调用等）时退回单独线程
     thread = threading.Thread(target=func, args=args, daemon=True)
     thread.start()
+    return True
 
 
 def send_html_response(handler, status, title, message,
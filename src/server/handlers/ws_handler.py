@@ -5,10 +5,11 @@ WebSocket 隧道处理器
 从 http_handler.py 中拆分，专注 WS 隧道逻辑。
 
 线程模型：
-    - 每个 WS 连接占用 ThreadedHTTPServer 的一个工作线程，连接期间不释放
-    - 消息循环在该工作线程中运行（阻塞在 ws_recv）
-    - 对于预期使用场景（每个用户 1-2 个 callback 后端）完全够用
-    - 如需支持大规模多租户（成百上千并发 WS），应考虑 asyncio 重构
+    - ThreadedHTTPServer 工作线程只负责握手，握手后把 socket 从 HTTP handler 上摘下，
+      移交 services/ws_reactor.py 后立即返回
+    - reactor 单线程监听所有隧道的可读事件并切分帧，帧交给有界线程池处理；
+      同一连接的帧按到达顺序串行调用 _on_tunnel_frame，不同连接并行
+    - 空闲隧道不占用线程，线程数与隧道数无关
 
 锁的使用：
     - WebSocketRegistry._connections_lock: 保护已认证连接字典
@@ -23,14 +24,15 @@ WebSocket 隧道处理器
     +-------------+-------------------+--------------------------+------------------------+
     | 状态        | 心跳正常          | 心跳停止                 | 额外清理               |
     +=============+===================+==========================+========================+
-    | pending     | 最多等待 10 分钟  | read timeout 90s 后退出  | cleanup_expired_pending|
+    | pending     | 最多等待 10 分钟  | reactor 90s 读超时关闭   | cleanup_expired_pending|
     | (等待授权)  | 由 cleanup 清理   | 或 cleanup 检测到无活动  | 每 30 秒检查一次       |
     +-------------+-------------------+--------------------------+------------------------+
-    | authenticated| 连接保持         | read timeout 90s 后退出  | 无                     |
-    | (已授权)    |                   | finally 块清理连接       |                        |
+    | authenticated| 连接保持         | reactor 90s 读超时关闭   | 无                     |
+    | (已授权)    |                   | _on_tunnel_close 清理连接|                        |
     +-------------+-------------------+--------------------------+------------------------+
 
     常量说明：
+    - WS_AUTH_TIMEOUT = 30 (秒，握手后等待 register 消息)
     - WS_READ_TIMEOUT = 90 (秒)
     - WS_PENDING_INACTIVE_TIMEOUT = 90 (秒，无活动)
     - WS_PENDING_MAX_WAIT_TIME = 600 (秒，10 分钟)
@@ -48,10 +50,18 @@ logger = logging.getLogger(__name__)
 # 服务端 read timeout（秒）
 WS_READ_TIMEOUT = 90
 
+# 握手后等待 register 消息的超时（秒）
+WS_AUTH_TIMEOUT = 30
+
+# 发送超时（秒）：socket 保持阻塞模式，对端长时间不读时发送方最多阻塞这么久
+WS_SEND_TIMEOUT = 30
+
 
 def handle_ws_tunnel(handler: Any, params: Dict[str, List[str]]) -> None:
     """处理 WebSocket 隧道连接
 
+    握手完成后把连接移交 WSTunnelReactor，当前 HTTP 工作线程随即返回。
+
     认证流程：
     1. 客户端连接时只传递 owner_id
     2. 握手后客户端发送 register 消息
@@ -62,6 +72,7 @@ def handle_ws_tunnel(handler: Any, params: Dict[str, List[str]]) -> None:
     """
     from services.ws_protocol import ws_server_handshake, cleanup_socket_state
     from services.ws_registry import WebSocketRegistry
+    from services.ws_reactor import WSTunnelReactor
 
     owner_id = params.get('owner_id', [None])[0]
 
@@ -77,14 +88,22 @@ def handle_ws_tunnel(handler: Any, params: Dict[str, List[str]]) -> None:
         return
 
     registry = WebSocketRegistry.get_instance()
-    if registry is None:
-        logger.error("[ws/tunnel] WebSocketRegistry not initialized")
+    reactor = WSTunnelReactor.get_instance()
+    if registry is None or reactor is None:
+        logger.error("[ws/tunnel] WebSocketRegistry / WSTunnelReactor not initialized")
         send_json(handler, 500, {'error': 'Server not ready'})
         return
 
-    # 执行握手
+    client_ip = handler.get_client_ip()
+
+    # 隧道 RPC 二进制信封：客户端提议且本端开启时启用，否则为 JSON
+    from config import WS_BINARY_ENVELOPE
+    from services.tunnel_codec import SUBPROTOCOL
+    subprotocols = [SUBPROTOCOL] if WS_BINARY_ENVELOPE else None
+
+    # 执行握手（摘下 socket，HTTP 服务器在本函数返回后不会关闭该连接）
     try:
-        sock = ws_server_handshake(handler)
+        sock = ws_server_handshake(handler, detach=True, subprotocols=subprotocols)
     except ValueError as e:
         # ValueError 在发送 101 之前抛出（头部验证失败），可安全返回 HTTP 错误
         logger.error("[ws/tunnel] Handshake failed: %s", e)
@@ -100,16 +119,15 @@ def handle_ws_tunnel(handler: Any, params: Dict[str, List[str]]) -> None:
             pass
         return
 
-    # 握手成功后，_WS_CLIENT_MODE_MAP 已写入 id(sock)。
-    # _process_tunnel_connection 正常路径会进入 _ws_message_loop（其 finally 负责清理），
-    # 但早期退出路径（超时、协议错误、ws_send_auth_ok 失败等）需要此处 finally
-    # 兜底清理，防止 pending 条目和协议层状态泄漏。
     try:
-        _process_tunnel_connection(sock, handler, owner_id, registry)
-    finally:
-        # cleanup_connection 是幂等的（通过 sock 身份比较，不会误删已被替换的新连接），
-        # 即使 _ws_message_loop 已清理过，此处再调一次也无害
-        registry.cleanup_connection(owner_id, sock)
+        # socket 保持阻塞模式供其他线程同步发送；reactor 只在可读事件后 recv
+        sock.settimeout(WS_SEND_TIMEOUT)
+        logger.info("[ws/tunnel] Connection established: owner_id=%s, ip=%s", owner_id, client_ip)
+        reactor.add_tunnel(sock, owner_id, client_ip, WS_AUTH_TIMEOUT,
+                           _on_tunnel_frame, _on_tunnel_close)
+    except Exception as e:
+        # 移交失败：此时 pending 条目尚未创建，只需清理协议层状态
+        logger.error("[ws/tunnel] Failed to hand off connection for %s: %s", owner_id, e)
         cleanup_socket_state(sock)
         try:
             sock.close()
@@ -117,8 +135,56 @@ def handle_ws_tunnel(handler: Any, params: Dict[str, List[str]]) -> None:
             pass
 
 
-def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str, registry: Any) -> None:
-    """处理握手后的隧道连接：接收 register 消息，分发认证路径，进入消息循环
+def _on_tunnel_frame(conn: Any, opcode: int, payload: bytes) -> bool:
+    """处理隧道连接收到的一帧（reactor 线程池中按连接串行调用）
+
+    Args:
+        conn: ws_reactor.TunnelConnection
+        opcode: 操作码
+        payload: 负载数据
+
+    Returns:
+        False 表示应关闭连接
+    """
+    from services.ws_registry import WebSocketRegistry
+
+    registry = WebSocketRegistry.get_instance()
+    if not conn.registered:
+        return _handle_register_frame(conn, opcode, payload, registry)
+    return _handle_tunnel_frame(conn, opcode, payload, registry)
+
+
+def _on_tunnel_close(conn: Any, reason: str) -> None:
+    """隧道连接关闭回调（reactor 线程中调用，socket 随后由 reactor 关闭）
+
+    Args:
+        conn: ws_reactor.TunnelConnection
+        reason: 关闭原因
+    """
+    from services.ws_protocol import ws_send_close
+    from services.ws_registry import WebSocketRegistry
+
+    if reason == 'timeout':
+        if not conn.registered:
+            logger.warning("[ws/tunnel] Timeout waiting for auth message from %s", conn.owner_id)
+            try:
+                ws_send_close(conn.sock, 1002, 'auth timeout')
+            except Exception:
+                pass
+        else:
+            logger.info("[ws/tunnel] Connection timed out for %s", conn.owner_id)
+    else:
+        logger.info("[ws/tunnel] Connection closed for %s: %s", conn.owner_id, reason)
+
+    # 原子清理连接（从 pending 或 authenticated 中移除）
+    # 传入 sock 防止误删已被替换的新连接
+    registry = WebSocketRegistry.get_instance()
+    if registry:
+        registry.cleanup_connection(conn.owner_id, conn.sock)
+
+
+def _handle_register_frame(conn: Any, opcode: int, payload: bytes, registry: Any) -> bool:
+    """处理握手后的首条消息（register），分发认证路径
 
     认证路径：
     - token 匹配：同一终端重连，直接续期（发 auth_ok，等 auth_ok_ack）
@@ -126,34 +192,26 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
     - 无绑定记录：首次注册，发飞书授权卡片
 
     Args:
-        sock: 已完成握手的 WebSocket socket
-        handler: HTTP handler（用于获取 client_ip）
-        owner_id: 飞书用户 ID
+        conn: ws_reactor.TunnelConnection
+        opcode: 首帧操作码
+        payload: 首帧负载
         registry: WebSocketRegistry 实例
+
+    Returns:
+        False 表示应关闭连接；True 表示已进入 pending 状态，后续帧走 _handle_tunnel_frame
     """
-    from services.ws_protocol import ws_recv, ws_send_close, OPCODE_TEXT
+    from services.ws_protocol import ws_send_close, OPCODE_TEXT
     from config import FEISHU_APP_SECRET
     from services.binding_store import BindingStore
 
-    client_ip = handler.get_client_ip()
-    logger.info("[ws/tunnel] Connection established: owner_id=%s, ip=%s", owner_id, client_ip)
-
-    # 等待首条消息（register），设置较短超时
-    sock.settimeout(30)
-    try:
-        opcode, payload = ws_recv(sock)
-    except socket.timeout:
-        logger.warning("[ws/tunnel] Timeout waiting for auth message from %s", owner_id)
-        ws_send_close(sock, 1002, 'auth timeout')
-        return
-    except Exception as e:
-        logger.warning("[ws/tunnel] Error receiving auth message: %s", e)
-        return
+    sock = conn.sock
+    owner_id = conn.owner_id
+    client_ip = conn.client_ip
 
     if opcode != OPCODE_TEXT:
         logger.warning("[ws/tunnel] Expected text message, got opcode %d", opcode)
         ws_send_close(sock, 1002, 'expected text message')
-        return
+        return False
 
     # 解析首条消息
     try:
@@ -161,7 +219,7 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
     except json.JSONDecodeError as e:
         logger.warning("[ws/tunnel] Invalid JSON in auth message: %s", e)
         ws_send_close(sock, 1002, 'invalid JSON')
-        return
+        return False
 
     msg_type = msg.get('type')
     msg_owner_id = msg.get('owner_id', owner_id)
@@ -170,7 +228,7 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
     if msg_owner_id != owner_id:
         logger.warning("[ws/tunnel] owner_id mismatch: URL=%s, msg=%s", owner_id, msg_owner_id)
         ws_send_close(sock, 1002, 'owner_id mismatch')
-        return
+        return False
 
     # === 处理 register 消息 ===
     if msg_type == 'register':
@@ -209,7 +267,7 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
                 request_id = registry.add_pending(owner_id, sock, client_ip)
                 if not request_id:
                     ws_send_close(sock, 1008, 'too many pending connections')
-                    return
+                    return False
                 registry.set_pending_auth_token(owner_id, request_id, new_token)
                 registry.set_pending_binding_params(owner_id, request_id, {
                     'client_ip': client_ip,
@@ -226,15 +284,14 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
                 from handlers.register import ws_send_auth_ok
                 ws_send_auth_ok(sock, new_token)
 
-                # 进入消息循环（pending 状态，等待 auth_ok_ack）
-                _ws_message_loop(sock, owner_id, registry, is_pending=True, request_id=request_id)
-                return
+                # 进入 pending 状态，等待 auth_ok_ack
+                return _enter_pending(conn, request_id)
             else:
                 # auth_token 不匹配或缺失：新终端，触发换绑授权卡片
                 if not registry.check_card_cooldown(owner_id):
                     logger.warning("[ws/tunnel] Card cooldown for %s, rejecting", owner_id)
                     ws_send_close(sock, 1008, 'too many requests')
-                    return
+                    return False
 
                 old_ip = existing_binding.get('registered_ip', '')
                 logger.info(
@@ -245,7 +302,7 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
                 request_id = registry.add_pending(owner_id, sock, client_ip)
                 if not request_id:
                     ws_send_close(sock, 1008, 'too many pending connections')
-                    return
+                    return False
 
                 from handlers.register import handle_ws_rebind_registration
                 card_sent = handle_ws_rebind_registration(
@@ -261,20 +318,19 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
                 if card_sent:
                     registry.set_card_cooldown(owner_id)
 
-                # 进入消息循环（pending 状态，等待用户授权）
-                _ws_message_loop(sock, owner_id, registry, is_pending=True, request_id=request_id)
-                return
+                # 进入 pending 状态，等待用户授权
+                return _enter_pending(conn, request_id)
 
         # 无现有绑定，添加到 pending 并发送飞书授权卡片
         if not registry.check_card_cooldown(owner_id):
             logger.warning("[ws/tunnel] Card cooldown for %s, rejecting", owner_id)
             ws_send_close(sock, 1008, 'too many requests')
-            return
+            return False
 
         request_id = registry.add_pending(owner_id, sock, client_ip)
         if not request_id:
             ws_send_close(sock, 1008, 'too many pending connections')
-            return
+            return False
 
         # 触发 WS 注册流程（发送飞书授权卡片）
         from handlers.register import handle_ws_registration
@@ -291,95 +347,100 @@ def _process_tunnel_connection(sock: socket.socket, handler: Any, owner_id: str,
         if card_sent:
             registry.set_card_cooldown(owner_id)
 
-        # 进入消息循环（pending 状态）
-        _ws_message_loop(sock, owner_id, registry, is_pending=True, request_id=request_id)
-        return
+        # 进入 pending 状态，等待用户授权
+        return _enter_pending(conn, request_id)
 
     # 未知消息类型
     logger.warning("[ws/tunnel] Unexpected first message type: %s", msg_type)
     ws_send_close(sock, 1002, 'expected register message')
+    return False
 
 
-def _ws_message_loop(sock: socket.socket, owner_id: str, registry: Any, is_pending: bool = False, request_id: str = '') -> None:
-    """WebSocket 消息循环
+def _enter_pending(conn: Any, request_id: str) -> bool:
+    """register 处理完成：连接进入 pending 状态，读超时切换为 WS_READ_TIMEOUT"""
+    conn.registered = True
+    conn.is_pending = True
+    conn.request_id = request_id
+    conn.read_timeout = WS_READ_TIMEOUT
+    logger.debug("[ws/tunnel] Message loop started for %s, timeout=%ds, pending=True, request_id=%s",
+                 conn.owner_id, WS_READ_TIMEOUT, request_id)
+    return True
+
+
+def _handle_tunnel_frame(conn: Any, opcode: int, payload: bytes, registry: Any) -> bool:
+    """处理 register 之后的帧（原消息循环的单次迭代）
 
     Args:
-        sock: WebSocket socket
-        owner_id: 飞书用户 ID
+        conn: ws_reactor.TunnelConnection
+        opcode: 操作码
+        payload: 负载数据
         registry: WebSocketRegistry 实例
-        is_pending: 是否处于 pending 状态
-        request_id: 请求 ID（pending 状态时用于更新活动时间）
-    """
-    from services.ws_protocol import ws_recv, ws_send_pong, ws_send_close, OPCODE_TEXT, OPCODE_PING, OPCODE_CLOSE
 
-    sock.settimeout(WS_READ_TIMEOUT)
-    logger.debug("[ws/tunnel] Message loop started for %s, timeout=%ds, pending=%s, request_id=%s", owner_id, WS_READ_TIMEOUT, is_pending, request_id)
+    Returns:
+        False 表示应关闭连接
+    """
+    from services.ws_protocol import (ws_send_pong, ws_send_close, get_subprotocol,
+                                      OPCODE_TEXT, OPCODE_BINARY, OPCODE_PING, OPCODE_CLOSE)
+    from services import tunnel_codec
+
+    sock = conn.sock
+    owner_id = conn.owner_id
+    request_id = conn.request_id
+
+    # pending 状态处理
+    if conn.is_pending:
+        status = registry.check_connection_status(owner_id, request_id, sock)
+        if status == 'pending':
+            # 仍在 pending 状态，更新活动时间
+            registry.update_pending_activity(owner_id, request_id)
+        elif status == 'authenticated':
+            # 已升级为 authenticated
+            conn.is_pending = False
+        else:
+            # 已被移除（超时/清理），关闭连接
+            logger.info("[ws/tunnel] Pending connection removed for %s, request_id=%s", owner_id, request_id)
+            return False
 
-    try:
-        while True:
-            try:
-                opcode, payload = ws_recv(sock)
-            except socket.timeout:
-                logger.info("[ws/tunnel] Connection timed out for %s", owner_id)
-                break
-            except (ConnectionError, socket.error, OSError) as e:
-                logger.info("[ws/tunnel] Connection closed for %s: %s", owner_id, e)
-                break
-            except ValueError as e:
-                # 协议错误（如帧格式错误、帧过大）
-                logger.warning("[ws/tunnel] Protocol error for %s: %s", owner_id, e)
-                break
-            except Exception as e:
-                # 未预期的错误，记录完整堆栈
-                logger.error("[ws/tunnel] Receive error for %s: %s", owner_id, e, exc_info=True)
-                break
-
-            # pending 状态处理
-            if is_pending:
-                status = registry.check_connection_status(owner_id, request_id, sock)
-                if status == 'pending':
-                    # 仍在 pending 状态，更新活动时间
-                    registry.update_pending_activity(owner_id, request_id)
-                elif status == 'authenticated':
-                    # 已升级为 authenticated，更新局部变量
-                    is_pending = False
-                else:
-                    # 已被移除（超时/清理），退出循环
-                    logger.info("[ws/tunnel] Pending connection removed for %s, request_id=%s", owner_id, request_id)
-                    break
-
-            if opcode == OPCODE_TEXT:
-                # 处理文本消息
-                try:
-                    msg = json.loads(payload.decode('utf-8'))
-                    _handle_ws_message(sock, owner_id, msg, registry, request_id)
-                except json.JSONDecodeError as e:
-                    logger.warning("[ws/tunnel] Invalid JSON from %s: %s", owner_id, e)
-                except Exception as e:
-                    logger.error("[ws/tunnel] Message handling error for %s: %s", owner_id, e)
-
-            elif opcode == OPCODE_PING:
-                # 回复 pong
-                ws_send_pong(sock, payload)
-
-            elif opcode == OPCODE_CLOSE:
-                logger.info("[ws/tunnel] Close frame received from %s", owner_id)
-                try:
-                    ws_send_close(sock)
-                except Exception:
-                    pass
-                break
+    if opcode == OPCODE_TEXT:
+        # 处理文本消息
+        try:
+            msg = json.loads(payload.decode('utf-8'))
+            _handle_ws_message(sock, owner_id, msg, registry, request_id)
+        except json.JSONDecodeError as e:
+            logger.warning("[ws/tunnel] Invalid JSON from %s: %s", owner_id, e)
+        except Exception as e:
+            logger.error("[ws/tunnel] Message handling error for %s: %s", owner_id, e)
+
+    elif opcode == OPCODE_BINARY and get_subprotocol(sock) == tunnel_codec.SUBPROTOCOL:
+        # 二进制信封的 RPC 消息（response / error），解码后与 JSON 消息同样处理
+        try:
+            msg = tunnel_codec.decode(payload)
+            _handle_ws_message(sock, owner_id, msg, registry, request_id)
+        except ValueError as e:
+            logger.warning("[ws/tunnel] Invalid binary envelope from %s: %s", owner_id, e)
+        except Exception as e:
+            logger.error("[ws/tunnel] Message handling error for %s: %s", owner_id, e)
+
+    elif opcode == OPCODE_PING:
+        # 回复 pong
+        try:
+            ws_send_pong(sock, payload)
+        except OSError as e:
+            logger.info("[ws/tunnel] Failed to send pong to %s: %s", owner_id, e)
+            return False
 
-            else:
-                logger.debug("[ws/tunnel] Ignoring opcode %d from %s", opcode, owner_id)
+    elif opcode == OPCODE_CLOSE:
+        logger.info("[ws/tunnel] Close frame received from %s", owner_id)
+        try:
+            ws_send_close(sock)
+        except Exception:
+            pass
+        return False
 
-    finally:
-        # 原子清理连接（从 pending 或 authenticated 中移除）
-        # 传入 sock 防止误删已被替换的新连接
-        registry.cleanup_connection(owner_id, sock)
+    else:
+        logger.debug("[ws/tunnel] Ignoring opcode %d from %s", opcode, owner_id)
 
-        # cleanup_socket_state 和 sock.close 由上层 handle_ws_tunnel 的 finally 统一处理
-        logger.info("[ws/tunnel] Connection closed for %s", owner_id)
+    return True
 
 
 def _handle_ws_message(sock: socket.socket, owner_id: str, msg: Dict[str, Any], registry: Any, request_id: str = '') -> None:
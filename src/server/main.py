@@ -20,12 +20,11 @@ WebSocket 隧道模式：
 通信协议详见: shared/protocol.md
 """
 
-import base64
 import http.server
 import json
 import logging
 import os
-import socket
+import signal
 import socketserver
 import sys
 import threading
@@ -46,9 +45,14 @@ from config import (
     FEISHU_EVENT_MODE, IS_CALLBACK_BACKEND
 )
 from services.request_manager import RequestManager
+from services.permission_socket import PermissionSocketServer
 from services.card_cache import CardCache
 from services.feishu_api import FeishuAPIService
+from services.rate_limiter import FeishuRateLimiter
 from services.message_session_store import MessageSessionStore
+from services.feishu_event_dedup import FeishuEventDedup
+from services.chat_dispatcher import ChatDispatcher
+from services.task_executor import TaskExecutor
 from services.group_session_store import GroupSessionStore
 from services.dir_history_store import DirHistoryStore
 from services.binding_store import BindingStore
@@ -57,6 +61,8 @@ from services.auth_token_store import AuthTokenStore
 from services.session_chat_store import SessionChatStore
 from services.group_chat_store import GroupChatStore
 from services.ws_registry import WebSocketRegistry
+from services.ws_reactor import WSTunnelReactor
+from services.ws_protocol import configure_deflate
 
 # =============================================================================
 # 配置 (优先级: .env > 环境变量 > 默认值)
@@ -65,7 +71,6 @@ from services.ws_registry import WebSocketRegistry
 SOCKET_PATH = get_config('PERMISSION_SOCKET_PATH', DEFAULT_SOCKET_PATH)
 HTTP_PORT = get_config_positive_int('CALLBACK_SERVER_PORT', int(DEFAULT_HTTP_PORT))
 FEISHU_WEBHOOK_URL = get_config('FEISHU_WEBHOOK_URL', '')
-CLEANUP_INTERVAL = 5  # 清理断开连接的检查间隔（秒）
 
 # 项目根目录 (src/server -> src -> project_root)
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -79,167 +84,26 @@ logger.info("Logging to: %s (daily rotating)", logger.handlers[0].baseFilename)
 # Socket 服务器处理
 # =============================================================================
 
-def handle_socket_client(conn: socket.socket, addr):
-    """处理来自 permission-notify.sh 的 Socket 连接
-
-    流程：
-        1. 接收请求数据（JSON 格式）
-        2. 注册请求到 RequestManager（保持连接打开）
-        3. 发送确认响应
-        4. 等待 resolve() 通过此连接返回用户决策
-        5. 连接在 resolve() 中关闭
-    """
-    fileno = conn.fileno()
-    logger.info(f"[socket] New connection, fileno={fileno}")
-
-    try:
-        # 设置接收超时，避免永久阻塞
-        recv_timeout = 5.0
-        conn.settimeout(recv_timeout)
-        logger.debug(f"[socket] Set receive timeout to {recv_timeout}s")
-
-        data = b''
-        start_time = time.time()
-
-        while True:
-            try:
-                chunk = conn.recv(4096)
-            except socket.timeout:
-                logger.warning(f"[socket] Receive timeout after {recv_timeout}s (received {len(data)} bytes so far)")
-                conn.close()
-                return
-            except OSError as e:
-                logger.warning(f"[socket] Receive error: {e} (received {len(data)} bytes so far)")
-                conn.close()
-                return
-
-            elapsed = time.time() - start_time
-            logger.debug(f"[socket] Received {len(chunk) if chunk else 0} bytes (elapsed: {elapsed:.1f}s)")
-
-            if not chunk:
-                logger.warning(f"[socket] Connection closed by client (received {len(data)} bytes total)")
-                conn.close()
-                return
-
-            data += chunk
-
-            # 检查是否收到完整的 JSON
-            try:
-                json.loads(data.decode('utf-8'))
-                logger.debug(f"[socket] Complete JSON received ({len(data)} bytes)")
-                break
-            except json.JSONDecodeError as e:
-                logger.debug(f"[socket] Incomplete JSON, continuing... ({str(e)[:50]})")
-                continue
-
-        # 恢复阻塞模式（后续操作不需要超时）
-        conn.settimeout(None)
-        logger.debug(f"[socket] Removed timeout, connection ready for response")
-
-        logger.info(f"[socket] Received {len(data)} bytes of JSON data")
-
-        request = json.loads(data.decode('utf-8'))
-
-        # 健康检查探测：收到 ping 消息，回复 pong 后关闭
-        if request.get('type') == 'ping':
-            conn.sendall(json.dumps({'type': 'pong'}).encode())
-            conn.close()
-            logger.debug("[socket] Health check ping received, pong sent")
-            return
-
-        request_id = request.get('request_id')
-        hook_pid = request.get('hook_pid')  # 新增：hook 脚本的进程 ID
-
-        if not request_id:
-            conn.sendall(json.dumps({'success': False, 'error': 'missing request_id'}).encode())
-            conn.close()
-            return
-
-        # 保存 hook_pid 到 request 中，供后续使用
-        request['hook_pid'] = hook_pid
-
-        # 解码 raw_input_encoded 提取 session_id、tool_name 和 tool_input
-        # 这些字段用于日志记录和 /always 端点生成正确的权限规则
-        raw_input_encoded = request.get('raw_input_encoded')
-        if raw_input_encoded:
-            try:
-                raw_input = json.loads(base64.b64decode(raw_input_encoded).decode('utf-8'))
-                request['session_id'] = raw_input.get('session_id', 'unknown')
-                request['tool_name'] = raw_input.get('tool_name')
-                request['tool_input'] = raw_input.get('tool_input', {})
-                logger.debug(f"[socket] Decoded session_id: {request['session_id']}, tool_name: {request['tool_name']}")
-            except Exception as e:
-                logger.warning(f"[socket] Failed to decode raw_input_encoded: {e}")
-                request['session_id'] = 'unknown'
-        else:
-            # 兜底：无 raw_input_encoded 的请求（理论上不应到达这里）
-            request['session_id'] = 'unknown'
-
-        session_id = request['session_id']
-        logger.info(f"[socket] Request ID: {request_id}, Session: {session_id}, Hook PID: {hook_pid}")
-
-        # 注册请求（保存 socket 连接供后续 resolve 使用）
-        RequestManager.get_instance().register(request_id, conn, request)
-
-        # 发送确认响应
-        conn.sendall(json.dumps({
-            'success': True,
-            'message': 'Request registered',
-            'session_id': session_id
-        }).encode())
-
-        # 重要：不关闭连接！等待用户响应后由 resolve() 关闭
-        logger.info(f"[socket] Request {request_id} registered (Session: {session_id}), waiting for user response...")
-
-    except Exception as e:
-        logger.error(f"Socket handler error: {e}")
-        try:
-            conn.sendall(json.dumps({'success': False, 'error': str(e)}).encode())
-            conn.close()
-        except Exception:
-            pass
-
-
 def run_socket_server():
     """运行 Unix Domain Socket 服务器
 
     功能：
-        监听 Unix Socket，接受来自 permission-notify.sh 的连接
+        监听 Unix Socket，接受来自 permission-notify.sh 的连接。
+        单线程事件循环接收请求并注册到 RequestManager，详见 services/permission_socket.py
     """
-    # 删除已存在的 socket 文件（避免 TOCTOU 竞态条件）
-    try:
-        os.unlink(SOCKET_PATH)
-    except FileNotFoundError:
-        pass
-
-    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    server.bind(SOCKET_PATH)
-    os.chmod(SOCKET_PATH, 0o600)  # 仅所有者可读写，防止其他用户访问
-    server.listen(10)
-
-    logger.info(f"Socket server listening on {SOCKET_PATH}")
-
-    while True:
-        conn, addr = server.accept()
-        thread = threading.Thread(target=handle_socket_client, args=(conn, addr))
-        thread.daemon = True
-        thread.start()
+    from config import PERMISSION_SOCKET_BACKLOG
+    PermissionSocketServer(SOCKET_PATH, backlog=PERMISSION_SOCKET_BACKLOG).serve_forever()
 
 
 def run_cleanup_thread():
     """运行清理线程 - 使用独立的定时器进行不同频率的清理
 
     清理任务：
-        - 清理断开连接（每 5 秒）
         - 清理 pending 连接（每 30 秒）
         - 清理过期数据（每 1 小时）
-    """
-    # 高频清理：断开连接（5秒间隔）
-    def cleanup_disconnected_loop():
-        while True:
-            time.sleep(CLEANUP_INTERVAL)
-            RequestManager.get_instance().cleanup_disconnected()
 
+    权限请求的断开检测与超时由 RequestManager 的监听线程事件驱动处理，不在此轮询。
+    """
     # 中频清理：pending 连接（30秒间隔）
     def cleanup_pending_loop():
         while True:
@@ -258,8 +122,8 @@ def run_cleanup_thread():
             if not IS_CALLBACK_BACKEND:
                 _cleanup_group_chats()
 
-    # 启动三个独立的清理线程
-    for target in (cleanup_disconnected_loop, cleanup_pending_loop, cleanup_expired_loop):
+    # 启动两个独立的清理线程
+    for target in (cleanup_pending_loop, cleanup_expired_loop):
         thread = threading.Thread(target=target, daemon=True)
         thread.start()
 
@@ -271,16 +135,22 @@ def _cleanup_expired_data():
 
     | Store                | 文件名                  | 过期时间 | Lazy | 定期 | 说明                     |
     |----------------------|-------------------------|----------|------|------|--------------------------|
-    | MessageSessionStore  | message_sessions.json   | 7 天     | ✅   | ✅   | 本函数清理                |
+    | MessageSessionStore  | message_sessions.json   | 7 天     | ✅   | ✅   | 本函数清理，journal 后台压缩 |
     | SessionChatStore     | session_chats.json      | 30 天    | ✅   | ✅   | 本函数清理                |
     | BindingStore         | bindings.json           | 无       | ❌   | ❌   | 需先实现自动续期机制       |
-    | DirHistoryStore      | dir_history.json        | 30 天    | ✅   | ❌   | 写入时清理，死数据无害     |
+    | DirHistoryStore      | dir_history.json        | 30 天    | ✅   | ✅   | 本函数清理，批量落盘       |
+    | FeishuEventDedup     | feishu_event_dedup.json | 12 小时  | ✅   | ✅   | 可选持久化，本函数清理     |
     | AuthTokenStore       | auth_token.json         | 无       | ❌   | ❌   | 单条记录，每次注册覆盖     |
     | WebSocketRegistry    | pending_connections     | 90s/10min| ✅   | ✅   | 中频清理（run_cleanup_thread）|
 
+    文件名为 json 后端（默认）；STORAGE_BACKEND=sqlite 时 AuthTokenStore 以外的 store
+    存于 runtime/storage.db 中的同名表，过期清理走 ts 索引。
+
     本函数清理范围（低频，每 1 小时）：
         - message_sessions.json (7天过期)
         - session_chats.json (7天过期)
+        - dir_history.json (30天过期)
+        - feishu_event_dedup.json (FEISHU_EVENT_DEDUP_TTL 过期)
     """
     # 清理 message_sessions
     store = MessageSessionStore.get_instance()
@@ -296,6 +166,16 @@ def _cleanup_expired_data():
         if expired_count > 0:
             logger.info(f"[cleanup] Cleaned {expired_count} expired chat mappings")
 
+    # 清理 dir_history
+    dir_store = DirHistoryStore.get_instance()
+    if dir_store:
+        dir_store.cleanup_expired()
+
+    # 清理飞书事件去重记录
+    event_dedup = FeishuEventDedup.get_instance()
+    if event_dedup:
+        event_dedup.cleanup_expired()
+
 
 def _cleanup_group_chats():
     """群聊空闲自动解散维护（cleanup_expired_loop 每小时一次）。
@@ -307,7 +187,7 @@ def _cleanup_group_chats():
       - 否则按该值判断空闲
     """
     try:
-        from handlers.feishu import batch_dissolve_groups
+        from handlers.feishu import batch_dissolve_groups_multi
 
         group_store = GroupChatStore.get_instance()
         gs_store = GroupSessionStore.get_instance()
@@ -343,11 +223,15 @@ def _cleanup_group_chats():
         if not idle_by_owner:
             return
 
+        # 各 owner 的 callback 预通知经 WS 隧道并发发出，不再逐个等待往返
+        jobs = []
         for owner_id, chat_ids in idle_by_owner.items():
             binding = binding_store.get(owner_id)
-            if not binding:
-                continue
-            result = batch_dissolve_groups(binding, chat_ids)
+            if binding:
+                jobs.append((owner_id, binding, chat_ids))
+        results = batch_dissolve_groups_multi([(binding, chat_ids) for _, binding, chat_ids in jobs])
+
+        for (owner_id, _, _), result in zip(jobs, results):
             dissolved_items = result.get('dissolved_items', [])
             failed = result.get('failed', [])
             skipped = result.get('skipped_items', [])
@@ -424,7 +308,7 @@ def main():
 
     服务组件：
         1. Unix Socket 服务器 - 接收 permission-notify.sh 的连接
-        2. 清理线程 - 定期清理断开连接和过期 session
+        2. 清理线程 - 定期清理过期 session 和 WS pending 连接
         3. HTTP 服务器 - 接收飞书按钮的回调请求
         4. RequestManager - 管理待处理的权限请求
         5. MessageSessionStore - 维护 message_id 到 session 的映射
@@ -462,6 +346,9 @@ def main():
         except OSError as e:
             logger.warning(f"Failed to create default chat directory '{DEFAULT_CHAT_DIR}': {e}")
 
+    # 初始化共享后台线程池（handlers 的 run_in_background 均提交到这里）
+    TaskExecutor.initialize()
+
     # 初始化 RequestManager（权限请求管理）
     RequestManager.initialize()
 
@@ -474,7 +361,8 @@ def main():
     logger.info(f"MessageSessionStore initialized with runtime_dir={runtime_dir}")
 
     # 初始化 GroupSessionStore（群聊 chat_id → 活跃 session 的本地路由表）
-    GroupSessionStore.initialize(runtime_dir)
+    from config import GROUP_TOUCH_FLUSH_INTERVAL
+    GroupSessionStore.initialize(runtime_dir, touch_flush_interval=GROUP_TOUCH_FLUSH_INTERVAL)
     logger.info(f"GroupSessionStore initialized with runtime_dir={runtime_dir}")
 
     # 初始化 DirHistoryStore（用于记录目录使用历史）
@@ -490,20 +378,46 @@ def main():
     logger.info(f"AuthTokenStore initialized with runtime_dir={runtime_dir}")
 
     # 初始化 SessionChatStore（callback 后端存储 session_id -> chat_id 映射）
-    from config import SESSION_EXPIRE_DAYS
-    SessionChatStore.initialize(runtime_dir, expire_seconds=SESSION_EXPIRE_DAYS * 86400)
+    from config import SESSION_EXPIRE_DAYS, SESSION_STORE_FLUSH_INTERVAL, SESSION_STORE_FLUSH_MAX_DIRTY
+    SessionChatStore.initialize(runtime_dir, expire_seconds=SESSION_EXPIRE_DAYS * 86400,
+                                flush_interval=SESSION_STORE_FLUSH_INTERVAL,
+                                flush_max_dirty=SESSION_STORE_FLUSH_MAX_DIRTY)
     logger.info(f"SessionChatStore initialized with runtime_dir={runtime_dir}, expire={SESSION_EXPIRE_DAYS}d")
 
     GroupChatStore.initialize(runtime_dir)
     logger.info(f"GroupChatStore initialized with runtime_dir={runtime_dir}")
 
+    # 初始化飞书事件去重（网关 / 单机处理飞书事件前按 event_id / message_id 丢弃重推）
+    from config import (FEISHU_EVENT_DEDUP_TTL, FEISHU_EVENT_DEDUP_MAX,
+                        FEISHU_EVENT_DEDUP_PERSIST)
+    FeishuEventDedup.initialize(FEISHU_EVENT_DEDUP_TTL, FEISHU_EVENT_DEDUP_MAX,
+                                data_dir=runtime_dir if FEISHU_EVENT_DEDUP_PERSIST else None)
+
+    # 初始化飞书消息事件分发器（事件立即确认，按 chat_id 串行处理）
+    from config import FEISHU_DISPATCH_WORKERS, FEISHU_DISPATCH_QUEUE_SIZE
+    ChatDispatcher.initialize(max_workers=FEISHU_DISPATCH_WORKERS,
+                              max_queue_per_chat=FEISHU_DISPATCH_QUEUE_SIZE)
+
+    # WS 隧道 permessage-deflate 配置（网关握手与隧道客户端握手共用）
+    from config import WS_DEFLATE, WS_DEFLATE_CONTEXT_TAKEOVER, WS_DEFLATE_MIN_SIZE
+    configure_deflate(enabled=WS_DEFLATE, context_takeover=WS_DEFLATE_CONTEXT_TAKEOVER,
+                      min_size=WS_DEFLATE_MIN_SIZE)
+
     # 初始化 WebSocketRegistry（用于 WS 隧道连接管理）
-    WebSocketRegistry.initialize()
+    from config import WS_REQUEST_WINDOW
+    WebSocketRegistry.initialize(max_inflight_per_owner=WS_REQUEST_WINDOW)
     logger.info("WebSocketRegistry initialized")
 
+    # 初始化 WSTunnelReactor（网关侧：握手后的隧道连接由 reactor 统一收发，不占用 HTTP 工作线程）
+    from config import WS_TUNNEL_WORKERS
+    WSTunnelReactor.initialize(max_workers=WS_TUNNEL_WORKERS)
+
     # 初始化飞书 OpenAPI 服务
     if FEISHU_SEND_MODE == 'openapi':
         if FEISHU_APP_ID and FEISHU_APP_SECRET:
+            # 出站限流调度器先于服务初始化，MessageSender 的请求均经其放行
+            from config import FEISHU_API_QPS
+            FeishuRateLimiter.initialize(qps=FEISHU_API_QPS)
             FeishuAPIService.initialize()
             logger.info(f"Feishu OpenAPI service initialized (mode: {FEISHU_SEND_MODE})")
         elif FEISHU_GATEWAY_URL:
@@ -555,7 +469,8 @@ def main():
             from config import (FEISHU_REPLY_IN_THREAD, FEISHU_AT_BOT_ONLY,
                                 FEISHU_SESSION_MODE,
                                 DEFAULT_CHAT_FOLLOW_THREAD, get_claude_commands,
-                                FEISHU_GROUP_NAME_PREFIX, FEISHU_GROUP_DISSOLVE_DAYS)
+                                FEISHU_GROUP_NAME_PREFIX, FEISHU_GROUP_DISSOLVE_DAYS,
+                                WS_BINARY_ENVELOPE)
             start_ws_tunnel_client(
                 FEISHU_GATEWAY_URL, FEISHU_OWNER_ID,
                 reply_in_thread=FEISHU_REPLY_IN_THREAD,
@@ -565,7 +480,8 @@ def main():
                 default_chat_dir=DEFAULT_CHAT_DIR,
                 default_chat_follow_thread=DEFAULT_CHAT_FOLLOW_THREAD,
                 group_name_prefix=FEISHU_GROUP_NAME_PREFIX,
-                group_dissolve_days=FEISHU_GROUP_DISSOLVE_DAYS
+                group_dissolve_days=FEISHU_GROUP_DISSOLVE_DAYS,
+                binary_envelope=WS_BINARY_ENVELOPE
             )
             logger.info("WebSocket tunnel client started, gateway: %s", FEISHU_GATEWAY_URL)
         elif CALLBACK_SERVER_URL:
@@ -599,6 +515,8 @@ def main():
     else:
         logger.info("Telemetry service disabled")
 
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
@@ -609,6 +527,26 @@ def main():
 
         server.shutdown()
 
+        # 落盘各 store 的内存状态
+        _close_stores()
+
+
+def _close_stores():
+    """服务退出前落盘各 store 的内存状态"""
+    for store_cls in (MessageSessionStore, SessionChatStore, GroupSessionStore, DirHistoryStore,
+                      FeishuEventDedup):
+        store = store_cls.get_instance()
+        if store:
+            try:
+                store.close()
+            except Exception as e:
+                logger.warning("[shutdown] Failed to close %s: %s", store_cls.__name__, e)
+
+
+def _handle_sigterm(signum, frame):
+    """SIGTERM（start-server.sh stop）按 Ctrl+C 同一路径优雅退出，保证 store 落盘"""
+    raise KeyboardInterrupt
+
 
 def _shutdown_ws_connections():
     """优雅关闭 WebSocket 连接"""
@@ -5,19 +5,31 @@
 
 维护飞书用户 ID 到 Callback 后端 URL 的映射关系，用于网关注册和双向认证。
 Callback 后端的路由和逻辑不应直接调用此 Store。
+
+读缓存：
+    get() 在每个飞书消息事件、卡片回调、/gw/feishu/send 鉴权中都会被调用，
+    因此全部绑定常驻内存，只在存储后端的 change_token 变化（json 文件的
+    inode / mtime / size，sqlite 的 data_version）时整表重载；
+    upsert / update_field / delete 写穿到后端并同步更新内存副本。
+    命中率与节省的磁盘读取耗时见 get_cache_stats()（/status 接口输出）。
 """
 
-import json
 import os
-import tempfile
 import threading
 import time
 import logging
 from typing import Optional, Dict, Any, List
 
+from services.storage_backend import open_backend
+
 logger = logging.getLogger(__name__)
 
 
+def _copy_binding(binding: Dict[str, Any]) -> Dict[str, Any]:
+    """复制一条绑定供调用方修改（值只有标量和 claude_commands 列表，比 deepcopy 快一个量级）"""
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in binding.items()}
+
+
 class BindingStore:
     """管理 owner_id -> callback_url + auth_token 的绑定
 
@@ -53,10 +65,16 @@ class BindingStore:
             data_dir: 数据存储目录
         """
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'bindings.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
-        logger.info(f"[binding-store] Initialized with data_dir={data_dir}")
+        self._backend = open_backend(data_dir, 'bindings', log_tag='binding-store')
+
+        # 读缓存（受 _file_lock 保护）：None 表示尚未加载
+        self._cache = None  # type: Optional[Dict[str, Any]]
+        self._cache_token = None  # type: Any
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_reload_seconds = 0.0
+        logger.info(f"[binding-store] Initialized with data_dir={data_dir}, backend={self._backend.kind}")
 
     @classmethod
     def initialize(cls, data_dir: str) -> 'BindingStore':
@@ -93,10 +111,9 @@ class BindingStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                binding = data.get(owner_id)
+                binding = self._cached_data().get(owner_id)
                 if binding:
-                    result = dict(binding)
+                    result = _copy_binding(binding)
                     result['_owner_id'] = owner_id
                     return result
                 return None
@@ -138,17 +155,19 @@ class BindingStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                existing = data.get(owner_id)
                 # 清除其他用户对同一 callback_url 的旧绑定
                 # WS 隧道模式下 callback_url 是共享占位符（ws://tunnel），不能清理
                 is_ws = callback_url.startswith(('ws://', 'wss://'))
-                stale_owners = [
-                    oid for oid, info in data.items()
-                    if oid != owner_id and info.get('callback_url') == callback_url
-                ] if not is_ws else []
+                data = self._cached_data()
+                existing = data.get(owner_id)
+                if is_ws:
+                    stale_owners = []
+                else:
+                    stale_owners = [
+                        oid for oid, info in data.items()
+                        if oid != owner_id and info.get('callback_url') == callback_url
+                    ]
                 for oid in stale_owners:
-                    del data[oid]
                     logger.info(
                         f"[binding-store] Removed stale binding: {oid} -> {callback_url}"
                     )
@@ -208,9 +227,10 @@ class BindingStore:
                             and existing and 'default_chat_session_id' in existing
                             and callback_unchanged):
                         binding_data['default_chat_session_id'] = existing['default_chat_session_id']
-                data[owner_id] = binding_data
-                result = self._save(data)
+                result = self._backend.write_batch(puts={owner_id: binding_data},
+                                                   deletes=stale_owners)
                 if result:
+                    self._update_cache(puts={owner_id: binding_data}, deletes=stale_owners)
                     if existing:
                         logger.info(
                             f"[binding-store] Updated binding: {owner_id} -> {callback_url}"
@@ -239,12 +259,16 @@ class BindingStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                if owner_id not in data:
+                binding = self._cached_data().get(owner_id)
+                if binding is None:
                     logger.warning(f"[binding-store] Cannot update field '{field}': binding not found for {owner_id}")
                     return False
-                data[owner_id][field] = value
-                return self._save(data)
+                binding = dict(binding)
+                binding[field] = value
+                result = self._backend.put(owner_id, binding)
+                if result:
+                    self._update_cache(puts={owner_id: binding})
+                return result
             except Exception as e:
                 logger.error(f"[binding-store] Failed to update field '{field}': {e}")
                 return False
@@ -260,12 +284,11 @@ class BindingStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                if owner_id not in data:
+                if owner_id not in self._cached_data():
                     return True
-                del data[owner_id]
-                result = self._save(data)
+                result = self._backend.delete(owner_id)
                 if result:
+                    self._update_cache(deletes=[owner_id])
                     logger.info(f"[binding-store] Deleted binding: {owner_id}")
                 return result
             except Exception as e:
@@ -280,44 +303,62 @@ class BindingStore:
         """
         with self._file_lock:
             try:
-                return dict(self._load())
+                return {oid: _copy_binding(b) for oid, b in self._cached_data().items()}
             except Exception as e:
                 logger.error(f"[binding-store] Failed to get all bindings: {e}")
                 return {}
 
-    def _load(self) -> Dict[str, Any]:
-        """加载绑定数据
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """读缓存统计
 
         Returns:
-            绑定数据字典
+            hits / misses（重载次数）、命中率、重载累计耗时，
+            以及按平均重载耗时估算的、命中所节省的磁盘读取耗时
+            （json 后端无缓存时每次 get 都整文件读取；sqlite 后端为主键点查，实际节省更少）
         """
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning(f"[binding-store] Invalid JSON in {self._file_path}, starting fresh")
-            return {}
-        except IOError as e:
-            logger.error(f"[binding-store] Failed to load: {e}")
-            return {}
-
-    def _save(self, data: Dict[str, Any]) -> bool:
-        """保存绑定数据（原子写入）
-
-        Args:
-            data: 绑定数据字典
-
-        Returns:
-            是否保存成功
+        with self._file_lock:
+            total = self._cache_hits + self._cache_misses
+            avg_reload_ms = (self._cache_reload_seconds * 1000 / self._cache_misses
+                             if self._cache_misses else 0.0)
+            return {
+                'hits': self._cache_hits,
+                'misses': self._cache_misses,
+                'hit_rate': round(self._cache_hits / total, 4) if total else 0.0,
+                'reload_ms_total': round(self._cache_reload_seconds * 1000, 3),
+                'avg_reload_ms': round(avg_reload_ms, 3),
+                'saved_ms_estimate': round(avg_reload_ms * self._cache_hits, 3),
+            }
+
+    def _cached_data(self) -> Dict[str, Any]:
+        """返回内存中的全部绑定，底层数据变化时先重载（调用方需持有 _file_lock）
+
+        返回值为缓存本身，调用方不得修改。
         """
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error(f"[binding-store] Failed to save: {e}")
-            return False
+        token = self._backend.change_token()
+        if token is not None and self._cache is not None and token == self._cache_token:
+            self._cache_hits += 1
+            return self._cache
+
+        # 先取 token 再读数据：两者之间若有外部写入，下次比较 token 时会再次重载
+        start = time.perf_counter()
+        data = self._backend.load_all()
+        self._cache_reload_seconds += time.perf_counter() - start
+        self._cache_misses += 1
+        if token is None:
+            # 后端无法判断变化，不缓存
+            self._cache = None
+        else:
+            self._cache = data
+            self._cache_token = token
+            logger.debug(f"[binding-store] Cache reloaded: {len(data)} bindings")
+        return data
+
+    def _update_cache(self, puts: Optional[Dict[str, Any]] = None,
+                      deletes: Optional[List[str]] = None) -> None:
+        """写穿：后端写入成功后同步内存副本，并记录写入后的 change_token"""
+        if self._cache is None:
+            return
+        for oid in deletes or ():
+            self._cache.pop(oid, None)
+        self._cache.update(puts or {})
+        self._cache_token = self._backend.change_token()
@@ -0,0 +1,193 @@
+"""飞书消息事件按会话串行分发
+
+归属端: 飞书网关（单机部署时即本进程）
+使用方: handlers/feishu.py handle_feishu_request()
+
+消息事件不再在 HTTP 工作线程 / 长连接 SDK 线程上同步处理：
+    - 收到事件后立即返回（飞书回调 / 长连接 ACK 不等待处理）
+    - 事件按 chat_id 进入各自的 FIFO，由有界线程池处理；
+      同一会话严格按到达顺序串行，不同会话之间并行
+    - 处理函数中的后续动作（转发 continue / new、发送提示）在同一工作线程内同步执行
+      （见 in_worker()），同一会话连续两条消息不会并发解析路由、并发启动 Claude
+    - 单个会话排队的事件数有上限，超出时丢弃并回调 on_reject（每次积压只回调一次）
+
+结构与 ws_reactor 的连接收件箱一致：每个会话一个 deque + scheduled 标记，
+有待处理事件且未被调度时向线程池提交一次 _process。
+"""
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 排队等待超过该秒数时记录日志
+SLOW_WAIT_LOG_SECONDS = 5.0
+
+_worker_state = threading.local()
+
+
+class _ChatQueue:
+    """单个会话的待处理事件"""
+
+    __slots__ = ('inbox', 'scheduled', 'rejected')
+
+    def __init__(self):
+        self.inbox = collections.deque()
+        self.scheduled = False
+        # 本轮积压是否已回调过 on_reject（队列清空后重置）
+        self.rejected = False
+
+
+class ChatDispatcher:
+    """按会话串行、会话间并行的事件分发器（单例）"""
+
+    _instance = None  # type: Optional[ChatDispatcher]
+    _lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 8, max_queue_per_chat: int = 20):
+        """初始化分发器
+
+        Args:
+            max_workers: 处理线程数
+            max_queue_per_chat: 单个会话排队（不含正在处理的）事件数上限
+        """
+        self._max_workers = max_workers
+        self._max_queue = max_queue_per_chat
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='feishu-dispatch')
+        self._queues = {}  # type: Dict[str, _ChatQueue]
+        self._queues_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'running': 0,
+            'max_wait_ms': 0.0,
+            'total_wait_ms': 0.0,
+        }
+
+    @classmethod
+    def initialize(cls, max_workers: int = 8, max_queue_per_chat: int = 20) -> 'ChatDispatcher':
+        """初始化单例实例
+
+        Args:
+            max_workers: 处理线程数
+            max_queue_per_chat: 单个会话排队事件数上限
+
+        Returns:
+            ChatDispatcher 实例
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(max_workers, max_queue_per_chat)
+                logger.info("[chat-dispatcher] Initialized (workers=%d, max_queue_per_chat=%d)",
+                            max_workers, max_queue_per_chat)
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional['ChatDispatcher']:
+        """获取单例实例，未初始化返回 None"""
+        return cls._instance
+
+    @staticmethod
+    def in_worker() -> bool:
+        """当前线程是否正在处理分发的事件（调用方据此把后续动作改为同步执行）"""
+        return getattr(_worker_state, 'active', False)
+
+    def submit(self, chat_id: str, func: Callable, args: tuple = (),
+               on_reject: Optional[Callable[[], None]] = None) -> bool:
+        """把事件放入会话队列
+
+        Args:
+            chat_id: 会话 ID（串行化的 key）
+            func: 处理函数
+            args: 位置参数元组
+            on_reject: 队列已满时的回调（在调用方线程执行，每次积压只调用一次）
+
+        Returns:
+            是否已入队
+        """
+        notify = False
+        with self._queues_lock:
+            queue = self._queues.get(chat_id)
+            if queue is None:
+                queue = self._queues[chat_id] = _ChatQueue()
+            if len(queue.inbox) >= self._max_queue:
+                self._stats['rejected'] += 1
+                notify = not queue.rejected
+                queue.rejected = True
+            else:
+                queue.inbox.append((func, args, time.time()))
+                self._stats['submitted'] += 1
+                if not queue.scheduled:
+                    queue.scheduled = True
+                    self._executor.submit(self._process, chat_id, queue)
+                return True
+
+        logger.warning("[chat-dispatcher] Queue full for chat %s (max=%d), event dropped",
+                       chat_id, self._max_queue)
+        if notify and on_reject:
+            try:
+                on_reject()
+            except Exception as e:
+                logger.error("[chat-dispatcher] on_reject error for chat %s: %s", chat_id, e)
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分发统计（用于 /status 端点）"""
+        with self._queues_lock:
+            stats = dict(self._stats)
+            queued = sum(len(q.inbox) for q in self._queues.values())
+            deepest = max((len(q.inbox) for q in self._queues.values()), default=0)
+            chats = len(self._queues)
+        started = stats['completed'] + stats['failed'] + stats['running']
+        stats['avg_wait_ms'] = round(stats.pop('total_wait_ms') / started, 1) if started else 0.0
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 1)
+        stats['queued'] = queued
+        stats['max_queue_depth'] = deepest
+        stats['active_chats'] = chats
+        stats['max_workers'] = self._max_workers
+        stats['max_queue_per_chat'] = self._max_queue
+        return stats
+
+    def _process(self, chat_id: str, queue: _ChatQueue) -> None:
+        """串行处理一个会话已排队的事件（线程池中运行）"""
+        _worker_state.active = True
+        try:
+            while True:
+                with self._queues_lock:
+                    if not queue.inbox:
+                        queue.scheduled = False
+                        # 空闲会话不保留队列对象，会话数不随历史增长
+                        if self._queues.get(chat_id) is queue:
+                            del self._queues[chat_id]
+                        return
+                    func, args, enqueued_at = queue.inbox.popleft()
+                    if not queue.inbox:
+                        queue.rejected = False
+                    wait_ms = (time.time() - enqueued_at) * 1000
+                    self._stats['running'] += 1
+                    self._stats['total_wait_ms'] += wait_ms
+                    if wait_ms > self._stats['max_wait_ms']:
+                        self._stats['max_wait_ms'] = wait_ms
+                if wait_ms > SLOW_WAIT_LOG_SECONDS * 1000:
+                    logger.info("[chat-dispatcher] Event for chat %s waited %.1fs in queue",
+                                chat_id, wait_ms / 1000)
+
+                failed = False
+                try:
+                    func(*args)
+                except Exception as e:
+                    failed = True
+                    logger.error("[chat-dispatcher] Event handling error for chat %s: %s",
+                                 chat_id, e, exc_info=True)
+                with self._queues_lock:
+                    self._stats['running'] -= 1
+                    self._stats['failed' if failed else 'completed'] += 1
+        finally:
+            _worker_state.active = False
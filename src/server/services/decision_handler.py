@@ -62,6 +62,8 @@ def handle_decision(
     req_status = request_manager.get_request_status(request_id)
     if req_status == request_manager.STATUS_RESOLVED:
         return False, None, '请求已被处理，请勿重复操作'
+    if req_status == request_manager.STATUS_SENDING:
+        return False, None, '请求正在处理中，请勿重复操作'
     if req_status == request_manager.STATUS_DISCONNECTED:
         return False, None, '连接已断开，Claude 可能已继续执行其他操作'
 
@@ -78,8 +80,8 @@ def handle_decision(
     # - 用户在终端点 "no"（拒绝）时，Claude Code 会立即 kill hook 进程
     # - 用户在终端点 "yes"（批准）时，hook 进程可能不会立即被 kill
     #   （可能是因为 Claude Code 需要先启动工具执行）
-    # - 服务端的 cleanup_disconnected 线程每 5 秒检测一次连接状态
-    #   如果检测到连接断开会标记为 STATUS_DISCONNECTED
+    # - 服务端的 RequestManager 监听线程在 hook 连接关闭时立即收到事件，
+    #   标记为 STATUS_DISCONNECTED
     #
     # 因此：
     # - 如果用户已在终端处理，hook 进程可能已退出（点 no）或还活着（点 yes）
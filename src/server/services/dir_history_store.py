@@ -5,20 +5,33 @@
 
 维护用户的工作目录使用历史，用于在创建新会话时提供常用目录推荐。
 飞书网关不应直接调用此 Store，应通过 Callback 后端的 HTTP 接口间接访问。
+
+内存模型：
+    - 全部记录常驻内存，另维护按 (count, last_used) 降序的有序排名数组，
+      record_usage 用二分增量调整，get_recent_dirs 从头取前 K 个即可，不再全量排序
+    - 目录存在性检查结果缓存 DIR_EXISTS_CACHE_TTL 秒，/new 卡片构建不再每次
+      stat 全部历史路径（NFS 家目录下 stat 很慢）
+    - 持久化走 write-behind（每 DIR_FLUSH_INTERVAL 秒合并写入），过期清理由
+      main.py 的定期清理调用 cleanup_expired()
 """
 
-import json
+import bisect
 import os
-import tempfile
 import threading
 import time
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+
+from services.storage_backend import open_backend
+from utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # 目录历史配置
 DIR_EXPIRE_SECONDS = 30 * 24 * 3600  # 30天过期
+DIR_EXISTS_CACHE_TTL = 30  # 目录存在性检查缓存（秒）
+DIR_EXISTS_CACHE_MAX_SIZE = 1024
+DIR_FLUSH_INTERVAL = 5  # 批量写入间隔（秒）
 
 
 class DirHistoryStore:
@@ -43,10 +56,23 @@ class DirHistoryStore:
             data_dir: 数据存储目录
         """
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'dir_history.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
-        logger.info(f"[dir-history-store] Initialized with data_dir={data_dir}")
+        self._backend = open_backend(data_dir, 'dir_history', ts_field='last_used',
+                                     log_tag='dir-history-store',
+                                     flush_interval=DIR_FLUSH_INTERVAL)
+
+        # 内存数据与排名（受 _file_lock 保护）
+        # 排名元素为 (-count, -last_used, path)，升序即"次数降序、时间降序"
+        self._dirs = {}  # type: Dict[str, Dict[str, int]]
+        self._ranking = []  # type: List[Tuple[int, int, str]]
+        self._exists_cache = TTLCache(ttl=DIR_EXISTS_CACHE_TTL, max_size=DIR_EXISTS_CACHE_MAX_SIZE,
+                                      name='dir-exists-cache')
+        for path, info in self._backend.load_all().items():
+            self._dirs[path] = {'count': info.get('count', 0), 'last_used': info.get('last_used', 0)}
+        self._ranking = sorted(self._rank_key(path) for path in self._dirs)
+
+        logger.info(f"[dir-history-store] Initialized with data_dir={data_dir}, backend={self._backend.kind}, "
+                    f"dirs={len(self._dirs)}")
 
     @classmethod
     def initialize(cls, data_dir: str) -> 'DirHistoryStore':
@@ -75,34 +101,34 @@ class DirHistoryStore:
     def record_usage(self, project_dir: str) -> bool:
         """记录目录使用
 
+        只更新内存与排名，持久化由后台批量写入。
+
         Args:
             project_dir: 项目工作目录
 
         Returns:
-            是否保存成功
+            是否记录成功
         """
         if not project_dir:
             return False
 
         with self._file_lock:
             try:
-                data = self._load()
                 now = int(time.time())
 
                 # 更新目录使用记录
-                if project_dir in data:
-                    data[project_dir]['count'] += 1
-                    data[project_dir]['last_used'] = now
+                item = self._dirs.get(project_dir)
+                if item:
+                    self._remove_rank(project_dir)
+                    item = {'count': item['count'] + 1, 'last_used': now}
                 else:
-                    data[project_dir] = {
-                        'count': 1,
-                        'last_used': now
-                    }
+                    item = {'count': 1, 'last_used': now}
+                self._dirs[project_dir] = item
+                bisect.insort(self._ranking, self._rank_key(project_dir))
+                # 目录可能被删除后重建，丢弃旧的存在性缓存
+                self._exists_cache.pop(project_dir)
 
-                # 清理过期数据
-                data = self._cleanup(data)
-
-                result = self._save(data)
+                result = self._backend.put(project_dir, dict(item))
                 if result:
                     logger.info(f"[dir-history-store] Recorded usage: {project_dir}")
                 return result
@@ -122,99 +148,77 @@ class DirHistoryStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-
-                # 内存中过滤过期数据（不持久化，实际清理在 record_usage 写入时执行）
-                data = self._cleanup(data)
-
-                # 过滤掉不存在的目录
-                valid_dirs = {
-                    path: info for path, info in data.items()
-                    if os.path.isdir(path)
-                }
-
-                # 如果检测到已删除的目录，立即持久化清理
-                removed_count = len(data) - len(valid_dirs)
-                if removed_count > 0:
-                    removed_paths = [p for p in data if p not in valid_dirs]
-                    logger.info(f"[dir-history-store] Cleaning up {removed_count} non-existent dirs: {removed_paths}")
-                    self._save(valid_dirs)
-
-                # 过滤掉使用次数少于阈值的目录
-                valid_dirs = {
-                    path: info for path, info in valid_dirs.items()
-                    if info.get('count', 0) >= min_count
-                }
-
-                # 排序：优先按使用次数降序，次数相同按最近使用时间降序
-                sorted_dirs = sorted(
-                    valid_dirs.items(),
-                    key=lambda x: (x[1]['count'], x[1]['last_used']),
-                    reverse=True
-                )
-
-                # 返回前 N 个目录路径
-                return [dir_path for dir_path, _ in sorted_dirs[:limit]]
+                expire_before = time.time() - DIR_EXPIRE_SECONDS
+                result = []
+                removed_paths = []
+                # 排名按次数降序：遇到低于阈值的即可停止
+                for neg_count, neg_last_used, path in self._ranking:
+                    if len(result) >= limit or -neg_count < min_count:
+                        break
+                    # 过期目录跳过（不在此处删除，实际清理由 cleanup_expired 执行）
+                    if -neg_last_used < expire_before:
+                        continue
+                    if self._dir_exists(path):
+                        result.append(path)
+                    else:
+                        removed_paths.append(path)
+
+                # 检测到已删除的目录，立即清理
+                if removed_paths:
+                    logger.info(f"[dir-history-store] Cleaning up {len(removed_paths)} non-existent dirs: "
+                                f"{removed_paths}")
+                    self._remove_dirs(removed_paths)
+
+                return result
             except Exception as e:
                 logger.error(f"[dir-history-store] Failed to get recent dirs: {e}")
                 return []
 
-    def _load(self) -> Dict[str, Any]:
-        """加载目录历史数据
-
-        Returns:
-            目录历史数据字典
-        """
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning(f"[dir-history-store] Invalid JSON in {self._file_path}, starting fresh")
-            return {}
-        except IOError as e:
-            logger.error(f"[dir-history-store] Failed to load: {e}")
-            return {}
-
-    def _save(self, data: Dict[str, Any]) -> bool:
-        """保存目录历史数据（原子写入）
-
-        Args:
-            data: 目录历史数据字典
-
-        Returns:
-            是否保存成功
-        """
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error(f"[dir-history-store] Failed to save: {e}")
-            return False
-
-    def _cleanup(self, dirs: Dict[str, Any]) -> Dict[str, Any]:
-        """清理目录历史数据
-
-        清理规则：删除超过 30 天未使用的目录
-
-        Args:
-            dirs: 目录历史字典
+    def cleanup_expired(self) -> int:
+        """清理超过 30 天未使用的目录
 
         Returns:
-            清理后的目录历史字典
+            清理的条目数量
         """
-        now = time.time()
-
-        # 删除过期目录
-        expired = [
-            path for path, info in dirs.items()
-            if now - info.get('last_used', 0) > DIR_EXPIRE_SECONDS
-        ]
-        for path in expired:
-            del dirs[path]
-
-        return dirs
+        with self._file_lock:
+            try:
+                expire_before = time.time() - DIR_EXPIRE_SECONDS
+                expired = [path for path, info in self._dirs.items()
+                           if info.get('last_used', 0) < expire_before]
+                if expired:
+                    self._remove_dirs(expired)
+                    logger.info(f"[dir-history-store] Cleaned {len(expired)} expired dirs")
+                return len(expired)
+            except Exception as e:
+                logger.error(f"[dir-history-store] Failed to cleanup: {e}")
+                return 0
+
+    def close(self) -> None:
+        """落盘未写入的变更（服务退出时调用）"""
+        self._backend.close()
+
+    def _rank_key(self, path: str) -> Tuple[int, int, str]:
+        info = self._dirs[path]
+        return (-info.get('count', 0), -info.get('last_used', 0), path)
+
+    def _remove_rank(self, path: str) -> None:
+        """从排名中移除 path（需在 _dirs 更新前调用）"""
+        key = self._rank_key(path)
+        i = bisect.bisect_left(self._ranking, key)
+        if i < len(self._ranking) and self._ranking[i] == key:
+            del self._ranking[i]
+
+    def _remove_dirs(self, paths: List[str]) -> None:
+        for path in paths:
+            self._remove_rank(path)
+            del self._dirs[path]
+            self._exists_cache.pop(path)
+        self._backend.delete_many(paths)
+
+    def _dir_exists(self, path: str) -> bool:
+        """带 TTL 缓存的 os.path.isdir"""
+        exists = self._exists_cache.get(path)
+        if exists is None:
+            exists = os.path.isdir(path)
+            self._exists_cache.put(path, exists)
+        return exists
@@ -2,26 +2,33 @@
 Feishu OpenAPI Service - 飞书开放平台 API 服务
 
 功能:
-    - TokenManager: access_token 获取与缓存（2小时有效期，提前5分钟刷新）
-    - MessageSender: 消息发送（支持卡片和文本）
+    - _http_request(): 经 services/http_pool.py 连接池复用 keep-alive 连接发送请求
+    - TokenManager: access_token 获取与缓存（2小时有效期，提前5分钟后台刷新，并发刷新合并）
+    - MessageSender: 消息发送（支持卡片和文本），请求经 services/rate_limiter.py 按优先级限流放行
     - FeishuAPIService: 服务入口（单例模式）
     - detect_receive_id_type(): 根据 ID 前缀自动检测类型
 """
 
+import collections
+import http.client
 import json
 import logging
 import re
 import threading
 import time
-from typing import Optional, Tuple, Dict, List, Any, Pattern
-
-from urllib.request import Request, build_opener, ProxyHandler
-from urllib.error import URLError, HTTPError
+from typing import Optional, Tuple, Dict, List, Any, Pattern, FrozenSet
 
 from config import (
     FEISHU_APP_ID,
     FEISHU_APP_SECRET,
 )
+from services.http_pool import HTTPConnectionPool
+from services.rate_limiter import (
+    FeishuRateLimiter,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_MESSAGE,
+    PRIORITY_BACKGROUND,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +45,28 @@ TOKEN_EXPIRE_SECONDS = 7200
 # 提前刷新时间（秒），避免临界点过期
 TOKEN_REFRESH_BUFFER = 300  # 5 分钟
 
+# token 剩余有效期低于此值时不再直接返回，同步等待刷新（避免请求途中过期）
+TOKEN_MIN_VALIDITY = 30
+
+# 后台刷新失败、旧 token 仍可用时的重试间隔（秒）
+TOKEN_RETRY_INTERVAL = 30
+
+# 飞书 token 失效错误码（请求方已拿到 token 但被服务端拒绝，如 token 被重置）
+# 99991661: 缺少 access_token
+# 99991663: access_token 无效或已过期
+INVALID_TOKEN_CODES = frozenset({99991661, 99991663})
+
 # HTTP 请求超时（秒）
 HTTP_TIMEOUT = 10
 
+# 连接池：每个 host 最多保留的空闲连接数、空闲连接保留时间（秒）、DNS 缓存时间（秒）
+HTTP_POOL_MAX_SIZE = 10
+HTTP_POOL_IDLE_TIMEOUT = 50
+HTTP_POOL_DNS_TTL = 300
+
+_http_pool = None  # type: Optional[HTTPConnectionPool]
+_http_pool_lock = threading.Lock()
+
 # 飞书敏感信息拦截错误码
 # 230022: 消息内容包含敏感信息
 # 230028: 消息DLP审查未通过（明文电话号码、邮箱等）
@@ -51,42 +77,67 @@ SENSITIVE_CONTENT_CODES = frozenset({230022, 230028})
 CARD_CREATE_ERROR_CODE = 230099
 CARD_TABLE_OVER_LIMIT_KEYWORD = 'card table number over limit'
 
+# 单张卡片允许的表格数（table 组件 + markdown 表格），超出时发送前即转为代码块
+CARD_TABLE_LIMIT = 5
+
+# 记住需要脱敏规则的接收方数量上限（按最近使用淘汰）
+SANITIZE_MEMORY_MAX_SIZE = 1024
+
+# 飞书频率限制错误码
+# 99991400: 应用请求频率超限
+# 230020: 消息发送触发频率限制
+# 429: HTTP 429（响应体非 JSON 时 _http_request 以 HTTP 状态码作为 code）
+RATE_LIMIT_CODES = frozenset({99991400, 230020, 429})
+
+# 被限流的请求在退避后最多重试次数
+RATE_LIMIT_MAX_RETRIES = 2
+
+# add_reaction 返回的 reaction_id 缓存：最多条目数、保留时间（秒）
+# remove_reaction 命中缓存时直接 DELETE，省去查询表情列表的请求
+REACTION_CACHE_MAX_SIZE = 2048
+REACTION_CACHE_TTL = 6 * 3600
+
 
 # =============================================================================
 # 敏感数据脱敏
 # =============================================================================
 
-# 预编译脱敏正则（模块加载时编译一次）
+# 预编译脱敏正则（模块加载时编译一次），每条规则带名称，便于按接收方记住命中的规则
 # 注意：身份证必须在手机号之前匹配，避免18位数字串被11位规则局部命中
-_SANITIZE_PATTERNS: List[Tuple[Pattern[str], str]] = [
+_SANITIZE_PATTERNS: List[Tuple[str, Pattern[str], str]] = [
     # 身份证号：18位（6位地区码 + 8位出生日期 + 3位顺序码 + 1位校验码）
     # 保留前6位和后4位，中间8位用*替代
     # 使用非捕获组 (?:...) 包裹日期部分，只捕获前6位和后4位
-    (re.compile(r'(?<!\d)(\d{6})(?:(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01]))(\d{3}[\dXx])(?!\d)'),
+    ('id_card', re.compile(r'(?<!\d)(\d{6})(?:(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01]))(\d{3}[\dXx])(?!\d)'),
      r'\1********\2'),
     # 手机号：1[3-9]开头的11位数字，保留前3后4
-    (re.compile(r'(?<!\d)(1[3-9]\d)\d{4}(\d{4})(?!\d)'),
+    ('mobile', re.compile(r'(?<!\d)(1[3-9]\d)\d{4}(\d{4})(?!\d)'),
      r'\1****\2'),
     # 座机号：区号-号码（010-12345678, 0755-1234567），保留区号和后4位
-    (re.compile(r'(?<!\d)(0\d{2,3})-\d{3,4}(\d{4})(?!\d)'),
+    ('landline', re.compile(r'(?<!\d)(0\d{2,3})-\d{3,4}(\d{4})(?!\d)'),
      r'\1-****\2'),
     # 邮箱地址：@ 替换为 [at]，避免被飞书识别为敏感信息
-    (re.compile(r'([a-zA-Z0-9._%+\-]+)@([a-zA-Z0-9.\-]+\.[a-zA-Z]{2,})'),
+    ('email', re.compile(r'([a-zA-Z0-9._%+\-]+)@([a-zA-Z0-9.\-]+\.[a-zA-Z]{2,})'),
      r'\1[at]\2'),
 ]
 
 
-def _sanitize_text(text: str) -> str:
+def _sanitize_text(text: str, rules: Optional[FrozenSet[str]] = None) -> str:
     """对纯文本中的敏感信息进行脱敏处理
 
     处理规则（按优先级顺序）:
-        - 身份证号（18位，含日期校验）: 110101********1234
-        - 手机号（11位，1[3-9]开头）: 138****5678
-        - 座机号（区号-号码）: 010-****5678
-        - 邮箱地址: user[at]example.com
+        - id_card 身份证号（18位，含日期校验）: 110101********1234
+        - mobile 手机号（11位，1[3-9]开头）: 138****5678
+        - landline 座机号（区号-号码）: 010-****5678
+        - email 邮箱地址: user[at]example.com
+
+    Args:
+        text: 原始文本
+        rules: 只应用这些规则，None 表示全部
     """
-    for pattern, replacement in _SANITIZE_PATTERNS:
-        text = pattern.sub(replacement, text)
+    for name, pattern, replacement in _SANITIZE_PATTERNS:
+        if rules is None or name in rules:
+            text = pattern.sub(replacement, text)
     return text
 
 
@@ -103,7 +154,7 @@ _CARD_SKIP_KEYS = frozenset({
 })
 
 
-def _sanitize_obj(obj: Any) -> Any:
+def _sanitize_obj(obj: Any, rules: Optional[FrozenSet[str]] = None) -> Any:
     """递归脱敏 JSON 对象中的文本字段
 
     策略：白名单脱敏 + 黑名单跳过 + 其余只递归不脱敏
@@ -116,55 +167,112 @@ def _sanitize_obj(obj: Any) -> Any:
                 result[k] = v
             elif k in _CARD_TEXT_KEYS and isinstance(v, str):
                 # 用户可见文本字段，脱敏
-                result[k] = _sanitize_text(v)
+                result[k] = _sanitize_text(v, rules)
             else:
                 # 其余字段：递归子结构（但不脱敏字符串值本身）
-                result[k] = _sanitize_obj(v)
+                result[k] = _sanitize_obj(v, rules)
         return result
     elif isinstance(obj, list):
-        return [_sanitize_obj(item) for item in obj]
+        return [_sanitize_obj(item, rules) for item in obj]
     return obj
 
 
-def _sanitize_content(content: Any) -> Any:
-    """统一脱敏入口，自动处理 dict/str/list"""
+def _sanitize_content(content: Any, rules: Optional[FrozenSet[str]] = None) -> Any:
+    """统一脱敏入口，自动处理 dict/str/list
+
+    Args:
+        content: 消息内容
+        rules: 只应用这些规则，None 表示全部
+    """
     if isinstance(content, dict):
-        return _sanitize_obj(content)
+        return _sanitize_obj(content, rules)
     elif isinstance(content, list):
-        return [_sanitize_obj(item) for item in content]
+        return [_sanitize_obj(item, rules) for item in content]
     elif isinstance(content, str):
         # 字符串可能是 JSON 或纯文本
         try:
             data = json.loads(content)
-            return _sanitize_obj(data)
+            return _sanitize_obj(data, rules)
         except (json.JSONDecodeError, ValueError):
-            return _sanitize_text(content)
+            return _sanitize_text(content, rules)
     return content
 
 
+def _matched_sanitize_rules(content: Any) -> FrozenSet[str]:
+    """返回内容中实际命中的脱敏规则名（仅在脱敏重试路径上调用）"""
+    return frozenset(
+        name for name, _, _ in _SANITIZE_PATTERNS
+        if _sanitize_content(content, frozenset((name,))) != content
+    )
+
+
 # =============================================================================
 # 卡片表格降级（markdown table → code block）
 # =============================================================================
 
-# 匹配 markdown 表格：至少包含表头行 + 分隔行（|---|）
-_MD_TABLE_RE = re.compile(
-    r'(?:^|\n)'                   # 表格前的换行或字符串开头
-    r'('                          # 捕获整个表格
-    r'\|[^\n]+\|\s*\n'            # 表头行：| ... |
-    r'\|[\s:|\-]+\|\s*\n'         # 分隔行：|---|---|
-    r'(?:\|[^\n]+\|\s*(?:\n|$))*' # 数据行（0 或多行）
-    r')'
-)
+# markdown 表格按行识别（单遍扫描，线性时间）：
+#   表格行：行首为 |、去掉行尾空白后以 | 结尾，两个 | 之间至少一个字符
+#   分隔行：表格行且内部只含 - : | 和空白（|---|:--:|）
+#   表格  ：表头行 + 分隔行 + 0 或多个数据行，行间允许空白行
+# 与早期的 _MD_TABLE_RE 正则（\|[^\n]+\|\s*\n 表头 + 分隔行 + 数据行）识别结果一致，
+# 但不再对每个匹配线性扫描所有代码块范围。
+
+
+def _is_md_table_row(line: str) -> bool:
+    stripped = line.rstrip()
+    return len(stripped) >= 3 and stripped[0] == '|' and stripped[-1] == '|'
+
+
+def _is_md_table_separator(line: str) -> bool:
+    """调用方需先确认 line 是表格行"""
+    return all(c in ':|-' or c.isspace() for c in line.rstrip()[1:-1])
+
 
+def _scan_md_table(lines: List[str], start: int) -> Optional[Tuple[int, int]]:
+    """从 lines[start]（已确认是表格行）开始识别一个表格
 
-def _table_to_codeblock(match: Any) -> str:
+    Returns:
+        (最后一个表格行的下标, 表格之后第一个未被吸收的行下标)；不构成表格返回 None
+        表格后的空白行会被吸收（转换后丢弃）；表格以数据行结尾且其后只有空白时吸收到文本末尾
+    """
+    n = len(lines)
+    # 表头行与分隔行之间允许空白行；分隔行之后必须还有换行
+    sep = start + 1
+    while sep < n and not lines[sep].strip():
+        sep += 1
+    if sep >= n - 1 or not _is_md_table_row(lines[sep]) or not _is_md_table_separator(lines[sep]):
+        return None
+
+    last = sep
+    only_separators = True  # 分隔行之后的行是否全是分隔行形式（如 | - |）
+    i = sep + 1
+    while True:
+        nxt = i
+        while nxt < n and not lines[nxt].strip():
+            nxt += 1
+        if nxt < n and _is_md_table_row(lines[nxt]):
+            if only_separators and not _is_md_table_separator(lines[nxt]):
+                only_separators = False
+            last = nxt
+            i = nxt + 1
+            continue
+        break
+
+    if nxt < n:
+        return last, nxt
+    # 其后只有空白：通常吸收到文本末尾；表格只由分隔行形式的行构成时保留最后一行
+    # （末尾不带换行的空白，与早期正则的分隔行模式 \|[\s:|\-]+\|\s*\n 行为一致）
+    if only_separators and last < n - 1:
+        return last, n - 1
+    return last, n
+
+
+def _table_to_codeblock(table_text: str) -> str:
     """将单个 markdown 表格原样包裹在代码块中"""
-    table_text = match.group(1).strip()
-    prefix = '\n' if match.group(0).startswith('\n') else ''
-    return prefix + '```\n' + table_text + '\n```\n'
+    return '```\n' + table_text.strip() + '\n```'
 
 
-def _table_to_codeblock_aligned(match: Any) -> str:
+def _table_to_codeblock_aligned(table_text: str) -> str:
     """将单个 markdown 表格转换为对齐的纯文本代码块（备选方案，勿删）
 
     去掉 | 边框和分隔行，按列宽用空格对齐。
@@ -172,7 +280,6 @@ def _table_to_codeblock_aligned(match: Any) -> str:
 
     当前未使用，可在 _convert_tables_to_codeblocks 中切换启用。
     """
-    table_text = match.group(1)
     lines = table_text.strip().split('\n')
 
     # 解析每行的单元格内容
@@ -190,7 +297,7 @@ def _table_to_codeblock_aligned(match: Any) -> str:
             rows = rows[:1] + rows[2:]
 
     if not rows:
-        return match.group(0)
+        return _table_to_codeblock(table_text)
 
     # 计算每列最大宽度
     col_count = max(len(r) for r in rows)
@@ -209,8 +316,7 @@ def _table_to_codeblock_aligned(match: Any) -> str:
             parts.append(cell.ljust(col_widths[i]))
         formatted_lines.append('  '.join(parts).rstrip())
 
-    prefix = '\n' if match.group(0).startswith('\n') else ''
-    return prefix + '```\n' + '\n'.join(formatted_lines) + '\n```\n'
+    return '```\n' + '\n'.join(formatted_lines) + '\n```'
 
 
 def _convert_tables_to_codeblocks(text: str) -> str:
@@ -225,24 +331,44 @@ def _convert_tables_to_codeblocks(text: str) -> str:
       显示更简洁，但 len() 按字符数计算，中文列对齐会偏移。
 
     默认使用原样包裹方式，因为更简单且无中文对齐问题。
-    """
-    # 先找到所有代码块的范围，避免误转换
-    code_block_ranges: List[Tuple[int, int]] = []
-    for m in re.finditer(r'```[\s\S]*?```', text):
-        code_block_ranges.append((m.start(), m.end()))
-
-    def _in_code_block(pos: int) -> bool:
-        for start, end in code_block_ranges:
-            if start <= pos < end:
-                return True
-        return False
 
-    def _safe_replace(match: Any) -> str:
-        if _in_code_block(match.start()):
-            return match.group(0)
-        return _table_to_codeblock(match)
+    按行单遍扫描：代码块状态随行更新，表格整段识别后直接转换，总耗时与文本长度成线性。
+    代码块与早期实现一致按成对的 ``` 划分（末尾落单的 ``` 不构成代码块）。
+    """
+    if '|' not in text:
+        return text
+
+    lines = text.split('\n')
+    n = len(lines)
+    fence_total = text.count('```')
+    fence_paired = fence_total - fence_total % 2
+    fences_seen = 0
+
+    out: List[str] = []
+    i = 0
+    while i < n:
+        line = lines[i]
+        table = _scan_md_table(lines, i) if _is_md_table_row(line) else None
+        if table is None:
+            out.append(line)
+            fences_seen += line.count('```')
+            i += 1
+            continue
+
+        last, nxt = table
+        in_code_block = min(fences_seen, fence_paired) % 2 == 1
+        for j in range(i, nxt):
+            fences_seen += lines[j].count('```')
+
+        if in_code_block:
+            out.extend(lines[i:nxt])
+        else:
+            out.extend(_table_to_codeblock('\n'.join(lines[i:last + 1])).split('\n'))
+            if nxt == n:
+                out.append('')
+        i = nxt
 
-    return _MD_TABLE_RE.sub(_safe_replace, text)
+    return '\n'.join(out)
 
 
 def _simplify_card_tables(obj: Any) -> Any:
@@ -274,6 +400,54 @@ def _simplify_card_tables(obj: Any) -> Any:
     return obj
 
 
+def _count_md_tables(text: str) -> int:
+    """统计 markdown 文本中代码块之外的表格数
+
+    每个「表格行 + 分隔行」计为一个表格（_convert_tables_to_codeblocks 会把空白行分隔的
+    相邻表格合并为一段转换，但飞书按单个表格计数）。
+    """
+    if '|' not in text:
+        return 0
+    fence_total = text.count('```')
+    fence_paired = fence_total - fence_total % 2
+    fences_seen = 0
+    count = 0
+    prev_is_row = False
+    for line in text.split('\n'):
+        is_row = _is_md_table_row(line)
+        if is_row and prev_is_row and _is_md_table_separator(line) and \
+                min(fences_seen, fence_paired) % 2 == 0:
+            count += 1
+        fences_seen += line.count('```')
+        prev_is_row = is_row
+    return count
+
+
+def _count_card_tables(obj: Any) -> int:
+    """统计卡片 JSON 中的表格数（发送前预检，与飞书表格数量限制比较）
+
+    统计范围：
+    1. tag=table 组件
+    2. tag=markdown 元素 content 中的 markdown 表格
+    3. 模板卡片 data.template_variable 字符串值中的 markdown 表格
+    """
+    if isinstance(obj, dict):
+        tag = obj.get('tag')
+        if tag == 'markdown' and isinstance(obj.get('content'), str):
+            return _count_md_tables(obj['content'])
+        count = 1 if tag == 'table' else 0
+        for k, v in obj.items():
+            if k == 'template_variable' and isinstance(v, dict):
+                count += sum(_count_md_tables(x) if isinstance(x, str) else _count_card_tables(x)
+                             for x in v.values())
+            else:
+                count += _count_card_tables(v)
+        return count
+    elif isinstance(obj, list):
+        return sum(_count_card_tables(item) for item in obj)
+    return 0
+
+
 # =============================================================================
 # 工具函数
 # =============================================================================
@@ -310,6 +484,20 @@ def detect_receive_id_type(receive_id: str) -> str:
     return 'user_id'
 
 
+def _get_http_pool() -> HTTPConnectionPool:
+    """获取进程内共享的飞书 API 连接池（TokenManager / MessageSender / FeishuAPIService 共用）"""
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                _http_pool = HTTPConnectionPool(
+                    max_size=HTTP_POOL_MAX_SIZE,
+                    idle_timeout=HTTP_POOL_IDLE_TIMEOUT,
+                    dns_ttl=HTTP_POOL_DNS_TTL
+                )
+    return _http_pool
+
+
 def _http_request(
     url: str,
     method: str = 'GET',
@@ -317,7 +505,7 @@ def _http_request(
     data: Optional[bytes] = None,
     timeout: int = HTTP_TIMEOUT
 ) -> Tuple[bool, Dict[str, Any]]:
-    """发送 HTTP 请求
+    """发送 HTTP 请求（复用连接池中的 keep-alive 连接，飞书 API 直连不走代理）
 
     Args:
         url: 请求 URL
@@ -329,28 +517,27 @@ def _http_request(
     Returns:
         (success, response_dict)
     """
-    if headers is None:
-        headers = {}
-
     try:
-        req = Request(url, data=data, headers=headers, method=method)
-        # 创建无代理的 opener（飞书 API 直连）
-        no_proxy_handler = ProxyHandler({})
-        opener = build_opener(no_proxy_handler)
-        with opener.open(req, timeout=timeout) as resp:
-            body = resp.read().decode('utf-8')
-            return True, json.loads(body)
-    except HTTPError as e:
+        status, reason, body = _get_http_pool().request(
+            method, url, body=data, headers=headers, timeout=timeout
+        )
+    except (OSError, http.client.HTTPException) as e:
+        logger.error(f"[feishu-api] Connection error: {e}")
+        return False, {'error': str(e) or type(e).__name__}
+    except Exception as e:
+        logger.error(f"[feishu-api] Request error: {e}")
+        return False, {'error': str(e)}
+
+    if status >= 400:
         try:
-            body = e.read().decode('utf-8')
-            error_data = json.loads(body)
+            error_data = json.loads(body.decode('utf-8'))
         except Exception:
-            error_data = {'error': str(e), 'code': e.code}
-        logger.error(f"[feishu-api] HTTP error {e.code}: {error_data}")
+            error_data = {'error': f'HTTP Error {status}: {reason}', 'code': status}
+        logger.error(f"[feishu-api] HTTP error {status}: {error_data}")
         return False, error_data
-    except URLError as e:
-        logger.error(f"[feishu-api] URL error: {e.reason}")
-        return False, {'error': str(e.reason)}
+
+    try:
+        return True, json.loads(body.decode('utf-8'))
     except Exception as e:
         logger.error(f"[feishu-api] Request error: {e}")
         return False, {'error': str(e)}
@@ -364,8 +551,10 @@ class TokenManager:
     """飞书 access_token 管理器
 
     功能:
-        - 获取 tenant_access_token
-        - 自动缓存，2小时有效期，提前5分钟刷新
+        - 获取 tenant_access_token，缓存 2 小时有效期
+        - 到期前 5 分钟由后台定时器主动刷新；刷新窗口内仍返回未过期的旧 token
+          （stale-while-revalidate），发送线程不等待网络调用
+        - 并发刷新合并为一次请求（single-flight），网络调用期间不持有锁
         - 线程安全
     """
 
@@ -375,30 +564,88 @@ class TokenManager:
         self._token = ''
         self._expire_time = 0
         self._lock = threading.Lock()
+        self._refresh_done = threading.Condition(self._lock)
+        self._refreshing = False
+        self._timer = None  # type: Optional[threading.Timer]
 
     def get_token(self) -> str:
         """获取有效的 access_token
 
+        只有在没有可用 token（首次获取、已过期或被作废）时才同步等待刷新，
+        多个线程同时等待时只发出一次请求。
+
         Returns:
             access_token，失败返回空字符串
         """
         with self._lock:
-            # 检查是否需要刷新
             now = time.time()
             if self._token and now < self._expire_time - TOKEN_REFRESH_BUFFER:
                 return self._token
 
-            # 需要刷新
-            logger.info("[feishu-api] Refreshing access token...")
+            if self._token and now < self._expire_time - TOKEN_MIN_VALIDITY:
+                # 已进入刷新窗口但仍有效（定时器未能按时刷新）：返回旧 token，后台刷新
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name='feishu-token-refresh', daemon=True).start()
+                return self._token
+
+            if self._refreshing:
+                # 已有刷新在进行：等待其结果，不重复请求
+                self._refresh_done.wait_for(lambda: not self._refreshing, timeout=HTTP_TIMEOUT * 2)
+                if self._token and time.time() < self._expire_time - TOKEN_MIN_VALIDITY:
+                    return self._token
+                return ''
+
+            self._refreshing = True
+        return self._refresh()
+
+    def _refresh(self) -> str:
+        """请求新 token 并更新缓存（调用前已由调用方置 _refreshing）
+
+        Returns:
+            刷新后的 token；失败时若旧 token 仍可用则返回旧 token，否则返回空字符串
+        """
+        logger.info("[feishu-api] Refreshing access token...")
+        try:
             success, token, expire_in = self._fetch_token()
+        except Exception as e:
+            logger.error(f"[feishu-api] Token refresh error: {e}")
+            success, token, expire_in = False, '', 0
+
+        with self._lock:
+            self._refreshing = False
+            self._refresh_done.notify_all()
+
             if success:
                 self._token = token
-                self._expire_time = now + expire_in
+                self._expire_time = time.time() + expire_in
+                self._schedule_refresh(max(expire_in - TOKEN_REFRESH_BUFFER, TOKEN_RETRY_INTERVAL))
                 logger.info(f"[feishu-api] Token refreshed, expires in {expire_in}s")
+                return token
+
+            if self._token and time.time() < self._expire_time - TOKEN_MIN_VALIDITY:
+                self._schedule_refresh(TOKEN_RETRY_INTERVAL)
+                logger.warning(f"[feishu-api] Failed to refresh token, keeping current token "
+                               f"and retrying in {TOKEN_RETRY_INTERVAL}s")
                 return self._token
-            else:
-                logger.error("[feishu-api] Failed to refresh token")
-                return ''
+
+            logger.error("[feishu-api] Failed to refresh token")
+            return ''
+
+    def _schedule_refresh(self, delay: float):
+        """安排后台主动刷新（持有 _lock 时调用）"""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_refresh_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_refresh_timer(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._refresh()
 
     def _fetch_token(self) -> Tuple[bool, str, int]:
         """从飞书 API 获取 token
@@ -426,9 +673,15 @@ class TokenManager:
         expire = resp.get('expire', TOKEN_EXPIRE_SECONDS)
         return True, token, expire
 
-    def invalidate(self):
-        """使当前 token 失效，强制下次刷新"""
+    def invalidate(self, token: str = ''):
+        """使当前 token 失效，强制下次刷新
+
+        Args:
+            token: 被飞书拒绝的 token；非空且已不是当前 token 时（其他线程已刷新）不作废
+        """
         with self._lock:
+            if token and token != self._token:
+                return
             self._token = ''
             self._expire_time = 0
 
@@ -450,6 +703,149 @@ class MessageSender:
 
     def __init__(self, token_manager: TokenManager):
         self._token_manager = token_manager
+        # (message_id, emoji_type) -> (reaction_id 列表, expire_at)，按写入顺序淘汰
+        self._reaction_cache = collections.OrderedDict()
+        self._reaction_cache_lock = threading.Lock()
+        # 接收方 -> 曾被飞书拦截时命中的脱敏规则，按最近使用淘汰
+        self._sanitize_memory = collections.OrderedDict()
+        self._preflight_lock = threading.Lock()
+        self._preflight_stats = {
+            'sanitize_preapplied': 0,   # 按记忆预先脱敏（省去一次被拒往返）
+            'tables_preconverted': 0,   # 表格数超限预先转换（省去一次被拒往返）
+            'sanitize_retries': 0,      # 仍被飞书拦截后的脱敏重试
+            'table_retries': 0,         # 仍被飞书判定表格超限后的重试
+        }
+
+    def _cache_reaction(self, message_id: str, emoji_type: str, reaction_id: str):
+        """记录 add_reaction 返回的 reaction_id，供 remove_reaction 直接删除"""
+        key = (message_id, emoji_type)
+        with self._reaction_cache_lock:
+            entry = self._reaction_cache.pop(key, None)
+            reaction_ids = entry[0] if entry else []
+            if reaction_id not in reaction_ids:
+                reaction_ids.append(reaction_id)
+            self._reaction_cache[key] = (reaction_ids, time.time() + REACTION_CACHE_TTL)
+            while len(self._reaction_cache) > REACTION_CACHE_MAX_SIZE:
+                self._reaction_cache.popitem(last=False)
+
+    def _pop_cached_reactions(self, message_id: str, emoji_type: str) -> List[str]:
+        """取出并移除缓存的 reaction_id 列表，未命中或已过期返回空列表"""
+        with self._reaction_cache_lock:
+            entry = self._reaction_cache.pop((message_id, emoji_type), None)
+        if not entry or entry[1] <= time.time():
+            return []
+        return entry[0]
+
+    def _request(
+        self,
+        url: str,
+        method: str,
+        headers: Dict[str, str],
+        data: Optional[bytes] = None,
+        owner: str = '',
+        priority: int = PRIORITY_MESSAGE
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """经限流调度器放行后发送请求
+
+        - 飞书返回频率限制时退避重试（未初始化 FeishuRateLimiter 时直接发送、不重试）
+        - 飞书返回 token 失效时作废该 token，刷新后重试一次
+
+        Args:
+            url / method / headers / data: 同 _http_request
+            owner: 公平调度分组键（飞书用户 ID，未知时为接收者 / 消息 ID）
+            priority: 限流优先级
+
+        Returns:
+            (success, response_dict)
+        """
+        limiter = FeishuRateLimiter.get_instance()
+        rate_limit_retries = 0
+        token_retried = False
+
+        while True:
+            if limiter is not None and not limiter.acquire(owner, priority):
+                return False, {'error': 'Rate limiter queue timeout'}
+            success, resp = _http_request(url, method=method, headers=headers, data=data)
+            code = resp.get('code')
+
+            if limiter is not None:
+                if code in RATE_LIMIT_CODES:
+                    backoff = limiter.report_rate_limited()
+                    if rate_limit_retries >= RATE_LIMIT_MAX_RETRIES:
+                        return success, resp
+                    rate_limit_retries += 1
+                    logger.info(f"[feishu-api] Rate limited (code={code}), "
+                                f"retrying after {backoff:.1f}s backoff...")
+                    continue
+                limiter.report_success()
+
+            if code in INVALID_TOKEN_CODES and not token_retried:
+                token_retried = True
+                rejected = headers.get('Authorization', '')[len('Bearer '):]
+                self._token_manager.invalidate(rejected)
+                token = self._token_manager.get_token()
+                if token:
+                    logger.info(f"[feishu-api] Access token rejected (code={code}), retrying with refreshed token")
+                    headers = dict(headers, Authorization=f'Bearer {token}')
+                    continue
+
+            return success, resp
+
+    def _preflight(self, msg_type: str, content: Any, sanitize_key: str) -> Any:
+        """发送前预检：按该接收方的拦截记录预先脱敏、卡片表格数超限时预先转为代码块
+
+        Returns:
+            处理后的内容（无需处理时原样返回）
+        """
+        rules = None
+        if sanitize_key:
+            with self._preflight_lock:
+                rules = self._sanitize_memory.get(sanitize_key)
+                if rules:
+                    self._sanitize_memory.move_to_end(sanitize_key)
+        if rules:
+            sanitized = _sanitize_content(content, rules)
+            if sanitized != content:
+                logger.debug(f"[feishu-api] Pre-sanitizing for {sanitize_key} (rules={sorted(rules)})")
+                content = sanitized
+                self._count_preflight('sanitize_preapplied')
+
+        if msg_type == 'interactive':
+            table_count = _count_card_tables(content)
+            if table_count > CARD_TABLE_LIMIT:
+                simplified = _simplify_card_tables(content)
+                if simplified != content:
+                    logger.info(f"[feishu-api] Card has {table_count} tables (limit {CARD_TABLE_LIMIT}), "
+                                f"converting tables to code blocks before sending")
+                    content = simplified
+                    self._count_preflight('tables_preconverted')
+        return content
+
+    def _remember_sanitize_rules(self, sanitize_key: str, rules: FrozenSet[str]):
+        """记录接收方被拦截时命中的脱敏规则，之后发往该接收方的内容预先脱敏"""
+        if not sanitize_key or not rules:
+            return
+        with self._preflight_lock:
+            self._sanitize_memory[sanitize_key] = self._sanitize_memory.get(sanitize_key, frozenset()) | rules
+            self._sanitize_memory.move_to_end(sanitize_key)
+            while len(self._sanitize_memory) > SANITIZE_MEMORY_MAX_SIZE:
+                self._sanitize_memory.popitem(last=False)
+
+    def _count_preflight(self, name: str):
+        with self._preflight_lock:
+            self._preflight_stats[name] += 1
+
+    def get_preflight_stats(self) -> Dict[str, Any]:
+        """获取发送预检统计（用于 /status 端点）"""
+        with self._preflight_lock:
+            stats = dict(self._preflight_stats)
+            stats['remembered_recipients'] = len(self._sanitize_memory)
+        return stats
+
+    @staticmethod
+    def _card_priority(card_json: str) -> int:
+        """卡片限流优先级：带 request_id 回调的卡片（权限确认 / 提问）用户正在等待，优先放行"""
+        return PRIORITY_INTERACTIVE if '"request_id"' in card_json else PRIORITY_MESSAGE
 
     def _send_with_retry(
         self,
@@ -457,16 +853,23 @@ class MessageSender:
         msg_type: str,
         content: Any,
         payload_extra: Optional[Dict[str, Any]] = None,
-        log_prefix: str = "Message"
+        log_prefix: str = "Message",
+        owner: str = '',
+        priority: int = PRIORITY_MESSAGE
     ) -> Tuple[bool, str]:
         """通用发送方法，支持敏感内容自动脱敏重试 + 卡片表格超限降级
 
+        发送前先经 _preflight() 预检：已知会被拒的内容（表格数超限、该接收方曾被拦截的敏感信息）
+        在第一次发送前就处理掉，重试只作为兜底。
+
         Args:
             url: 请求 URL
             msg_type: 消息类型 (interactive / text)
             content: 消息内容 (dict)
             payload_extra: 额外的 payload 字段
             log_prefix: 日志前缀 (Message / Text)
+            owner: 限流公平调度分组键
+            priority: 限流优先级
 
         Returns:
             (success, message_id or error)
@@ -480,17 +883,21 @@ class MessageSender:
             'Authorization': f'Bearer {token}'
         }
 
-        # 第一次尝试：使用原始内容
+        # 第一次尝试：使用预检后的内容
+        sanitize_key = (payload_extra or {}).get('receive_id') or owner
+        content = self._preflight(msg_type, content, sanitize_key)
         content_str = json.dumps(content, ensure_ascii=False)
         payload = {'msg_type': msg_type, 'content': content_str}
         if payload_extra:
             payload.update(payload_extra)
 
-        success, resp = _http_request(
+        success, resp = self._request(
             url,
             method='POST',
             headers=headers,
-            data=json.dumps(payload).encode('utf-8')
+            data=json.dumps(payload).encode('utf-8'),
+            owner=owner,
+            priority=priority
         )
         code = resp.get('code', -1)
 
@@ -503,6 +910,8 @@ class MessageSender:
         # 如果是敏感信息拦截错误，脱敏后重试一次
         if code in SENSITIVE_CONTENT_CODES:
             logger.info(f"[feishu-api] Sensitive content detected (code={code}, {msg_type}), sanitizing and retrying...")
+            self._count_preflight('sanitize_retries')
+            self._remember_sanitize_rules(sanitize_key, _matched_sanitize_rules(content))
             sanitized = _sanitize_content(content)
             content_str = json.dumps(sanitized, ensure_ascii=False)
             if content != sanitized:
@@ -510,11 +919,13 @@ class MessageSender:
                 logger.debug("[sanitize] after =%s", content_str)
             payload['content'] = content_str
 
-            success, resp = _http_request(
+            success, resp = self._request(
                 url,
                 method='POST',
                 headers=headers,
-                data=json.dumps(payload).encode('utf-8')
+                data=json.dumps(payload).encode('utf-8'),
+                owner=owner,
+                priority=priority
             )
             code = resp.get('code', -1)
 
@@ -538,12 +949,15 @@ class MessageSender:
                 current_content = content
             simplified = _simplify_card_tables(current_content)
             if simplified != current_content:
+                self._count_preflight('table_retries')
                 payload['content'] = json.dumps(simplified, ensure_ascii=False)
-                success, resp = _http_request(
+                success, resp = self._request(
                     url,
                     method='POST',
                     headers=headers,
-                    data=json.dumps(payload).encode('utf-8')
+                    data=json.dumps(payload).encode('utf-8'),
+                    owner=owner,
+                    priority=priority
                 )
                 code = resp.get('code', -1)
             else:
@@ -566,7 +980,8 @@ class MessageSender:
         self,
         card_json: str,
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送卡片消息（新消息）
 
@@ -574,6 +989,7 @@ class MessageSender:
             card_json: 卡片 JSON 字符串
             receive_id: 接收者 ID（必需）
             receive_id_type: 接收者类型，默认自动检测
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, message_id or error)
@@ -595,14 +1011,17 @@ class MessageSender:
             msg_type='interactive',
             content=card_data,
             payload_extra={'receive_id': receive_id},
-            log_prefix='Card'
+            log_prefix='Card',
+            owner=owner_id or receive_id,
+            priority=self._card_priority(card_json)
         )
 
     def reply_card(
         self,
         card_json: str,
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复卡片消息
 
@@ -612,6 +1031,7 @@ class MessageSender:
             card_json: 卡片 JSON 字符串
             message_id: 要回复的消息 ID（必需）
             reply_in_thread: 是否收进话题详情（True 时消息仅出现在话题中，不刷群聊主界面）
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, new_message_id or error)
@@ -631,10 +1051,12 @@ class MessageSender:
             msg_type='interactive',
             content=card_data,
             payload_extra=payload_extra,
-            log_prefix='Card reply'
+            log_prefix='Card reply',
+            owner=owner_id or message_id,
+            priority=self._card_priority(card_json)
         )
 
-    def patch_card(self, message_id: str, card_json: str) -> Tuple[bool, str]:
+    def patch_card(self, message_id: str, card_json: str, owner_id: str = '') -> Tuple[bool, str]:
         """更新已发送的卡片消息内容
 
         使用飞书 PATCH API: PATCH /open-apis/im/v1/messages/:message_id
@@ -643,6 +1065,7 @@ class MessageSender:
         Args:
             message_id: 要更新的消息 ID
             card_json: 新的卡片 JSON 字符串
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, error_message)
@@ -665,7 +1088,8 @@ class MessageSender:
             'content': card_json
         }).encode('utf-8')
 
-        success, resp = _http_request(url, method='PATCH', headers=headers, data=payload)
+        success, resp = self._request(url, method='PATCH', headers=headers, data=payload,
+                                      owner=owner_id or message_id, priority=PRIORITY_INTERACTIVE)
         if not success:
             return False, resp.get('msg', 'Request failed')
 
@@ -680,7 +1104,8 @@ class MessageSender:
         self,
         text: str,
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送文本消息（新消息）
 
@@ -688,6 +1113,7 @@ class MessageSender:
             text: 文本内容
             receive_id: 接收者 ID（必需）
             receive_id_type: 接收者类型，默认自动检测
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, message_id or error)
@@ -704,14 +1130,16 @@ class MessageSender:
             msg_type='text',
             content={'text': text},
             payload_extra={'receive_id': receive_id},
-            log_prefix='Text'
+            log_prefix='Text',
+            owner=owner_id or receive_id
         )
 
     def reply_text(
         self,
         text: str,
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复文本消息
 
@@ -721,6 +1149,7 @@ class MessageSender:
             text: 文本内容
             message_id: 要回复的消息 ID（必需）
             reply_in_thread: 是否收进话题详情（True 时消息仅出现在话题中，不刷群聊主界面）
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, new_message_id or error)
@@ -735,14 +1164,16 @@ class MessageSender:
             msg_type='text',
             content={'text': text},
             payload_extra=payload_extra,
-            log_prefix='Text reply'
+            log_prefix='Text reply',
+            owner=owner_id or message_id
         )
 
     def send_post(
         self,
         content: Dict[str, Any],
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送富文本消息（新消息）
 
@@ -750,6 +1181,7 @@ class MessageSender:
             content: 富文本内容（如 {"zh_cn": {"title": "...", "content": [[...]]}}）
             receive_id: 接收者 ID（必需）
             receive_id_type: 接收者类型，默认自动检测
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, message_id or error)
@@ -766,14 +1198,16 @@ class MessageSender:
             msg_type='post',
             content=content,
             payload_extra={'receive_id': receive_id},
-            log_prefix='Post'
+            log_prefix='Post',
+            owner=owner_id or receive_id
         )
 
     def reply_post(
         self,
         content: Dict[str, Any],
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复富文本消息
 
@@ -781,6 +1215,7 @@ class MessageSender:
             content: 富文本内容（如 {"zh_cn": {"title": "...", "content": [[...]]}}）
             message_id: 要回复的消息 ID（必需）
             reply_in_thread: 是否收进话题详情
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按接收者分组）
 
         Returns:
             (success, new_message_id or error)
@@ -795,13 +1230,15 @@ class MessageSender:
             msg_type='post',
             content=content,
             payload_extra=payload_extra,
-            log_prefix='Post reply'
+            log_prefix='Post reply',
+            owner=owner_id or message_id
         )
 
     def add_reaction(
         self,
         message_id: str,
-        emoji_type: str
+        emoji_type: str,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """给消息添加表情回应
 
@@ -812,6 +1249,7 @@ class MessageSender:
             message_id: 消息 ID
             emoji_type: 表情类型，如 "OK"、"THUMBSUP" 等
                         完整列表见 https://open.feishu.cn/document/server-docs/im-v1/message-reaction/emojis-introduce
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, reaction_id or error)
@@ -835,11 +1273,13 @@ class MessageSender:
             }
         }
 
-        success, resp = _http_request(
+        success, resp = self._request(
             url,
             method='POST',
             headers=headers,
-            data=json.dumps(payload).encode('utf-8')
+            data=json.dumps(payload).encode('utf-8'),
+            owner=owner_id or message_id,
+            priority=PRIORITY_BACKGROUND
         )
 
         if not success:
@@ -852,13 +1292,16 @@ class MessageSender:
             return False, f"API error: {error_msg}"
 
         reaction_id = resp.get('data', {}).get('reaction_id', '')
+        if reaction_id:
+            self._cache_reaction(message_id, emoji_type, reaction_id)
         logger.info(f"[feishu-api] Reaction added: {reaction_id}, message_id={message_id}, emoji={emoji_type}")
         return True, reaction_id
 
     def get_reactions(
         self,
         message_id: str,
-        emoji_type: str = ''
+        emoji_type: str = '',
+        owner_id: str = ''
     ) -> Tuple[bool, List[Dict[str, Any]]]:
         """查询消息的表情回应列表
 
@@ -868,6 +1311,7 @@ class MessageSender:
         Args:
             message_id: 消息 ID
             emoji_type: 表情类型过滤，为空则返回所有表情
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, reactions_list)，失败时返回空列表
@@ -888,7 +1332,8 @@ class MessageSender:
             'Authorization': f'Bearer {token}'
         }
 
-        success, resp = _http_request(url, method='GET', headers=headers)
+        success, resp = self._request(url, method='GET', headers=headers,
+                                      owner=owner_id or message_id, priority=PRIORITY_BACKGROUND)
 
         if not success:
             return False, []
@@ -905,7 +1350,8 @@ class MessageSender:
     def delete_reaction(
         self,
         message_id: str,
-        reaction_id: str
+        reaction_id: str,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """删除消息的表情回应
 
@@ -915,6 +1361,7 @@ class MessageSender:
         Args:
             message_id: 消息 ID
             reaction_id: 表情回应 ID
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, error_msg)
@@ -931,7 +1378,8 @@ class MessageSender:
             'Authorization': f'Bearer {token}'
         }
 
-        success, resp = _http_request(url, method='DELETE', headers=headers)
+        success, resp = self._request(url, method='DELETE', headers=headers,
+                                      owner=owner_id or message_id, priority=PRIORITY_BACKGROUND)
 
         if not success:
             return False, str(resp.get('error', 'Unknown error'))
@@ -948,16 +1396,19 @@ class MessageSender:
     def remove_reaction(
         self,
         message_id: str,
-        emoji_type: str
+        emoji_type: str,
+        owner_id: str = ''
     ) -> Tuple[bool, int]:
         """查询并删除消息上指定类型的表情回应（便捷方法）
 
-        先查询消息上的表情列表，过滤出指定类型，再逐个删除。
+        本进程 add_reaction 记录过 reaction_id 时直接删除（一次请求）；
+        缓存未命中（如重启后）或直接删除失败时，查询消息上的表情列表，过滤出指定类型，再逐个删除。
         只能删除机器人自己添加的表情（飞书 API 限制）。
 
         Args:
             message_id: 消息 ID
             emoji_type: 要删除的表情类型，如 "Typing"
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, deleted_count)
@@ -965,15 +1416,26 @@ class MessageSender:
         if not message_id:
             return False, 0
 
-        ok, items = self.get_reactions(message_id, emoji_type)
+        deleted = 0
+        cached_ids = self._pop_cached_reactions(message_id, emoji_type)
+        if cached_ids:
+            for rid in cached_ids:
+                success, _ = self.delete_reaction(message_id, rid, owner_id)
+                if success:
+                    deleted += 1
+            if deleted == len(cached_ids):
+                return True, deleted
+            logger.info("[feishu-api] Cached reaction delete failed, falling back to listing: message_id=%s",
+                        message_id)
+
+        ok, items = self.get_reactions(message_id, emoji_type, owner_id)
         if not ok or not items:
-            return False, 0
+            return deleted > 0, deleted
 
-        deleted = 0
         for item in items:
             rid = item.get('reaction_id', '')
             if rid:
-                success, _ = self.delete_reaction(message_id, rid)
+                success, _ = self.delete_reaction(message_id, rid, owner_id)
                 if success:
                     deleted += 1
 
@@ -1009,7 +1471,8 @@ class MessageSender:
             'chat_type': 'private',
         }).encode('utf-8')
 
-        success, resp = _http_request(url, method='POST', headers=headers, data=body)
+        success, resp = self._request(url, method='POST', headers=headers, data=body,
+                                      owner=owner_id or name)
         if not success:
             return False, resp.get('msg', 'Request failed')
 
@@ -1061,7 +1524,7 @@ class MessageSender:
         }
         body = json.dumps({'id_list': id_list}).encode('utf-8')
 
-        success, resp = _http_request(url, method='POST', headers=headers, data=body)
+        success, resp = self._request(url, method='POST', headers=headers, data=body, owner=chat_id)
         if not success:
             return False, resp.get('msg', 'Request failed')
 
@@ -1096,7 +1559,7 @@ class MessageSender:
             'Authorization': f'Bearer {token}'
         }
 
-        success, resp = _http_request(url, method='DELETE', headers=headers)
+        success, resp = self._request(url, method='DELETE', headers=headers, owner=chat_id)
         code = resp.get('code', -1)
 
         # 232009 = already dissolved，视为成功（HTTP 非 200 但业务上可接受）
@@ -1183,6 +1646,19 @@ class FeishuAPIService:
         """服务是否启用"""
         return self._enabled
 
+    def get_http_pool_stats(self) -> Dict[str, Any]:
+        """获取飞书 API 连接池统计（用于 /status 端点）"""
+        return _get_http_pool().get_stats()
+
+    def get_preflight_stats(self) -> Dict[str, Any]:
+        """获取发送预检统计（用于 /status 端点）"""
+        return self._message_sender.get_preflight_stats()
+
+    def get_rate_limiter_stats(self) -> Optional[Dict[str, Any]]:
+        """获取出站限流调度器统计（用于 /status 端点），未启用返回 None"""
+        limiter = FeishuRateLimiter.get_instance()
+        return limiter.get_stats() if limiter else None
+
     def get_bot_info(self) -> Tuple[bool, Dict[str, Any]]:
         """获取机器人自身信息
 
@@ -1244,7 +1720,8 @@ class FeishuAPIService:
         self,
         card_json: str,
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送卡片消息（新消息）
 
@@ -1252,6 +1729,7 @@ class FeishuAPIService:
             card_json: 卡片 JSON 字符串
             receive_id: 接收者 ID
             receive_id_type: 接收者类型
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, message_id or error)
@@ -1259,13 +1737,14 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.send_card(card_json, receive_id, receive_id_type)
+        return self._message_sender.send_card(card_json, receive_id, receive_id_type, owner_id)
 
     def reply_card(
         self,
         card_json: str,
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复卡片消息
 
@@ -1275,6 +1754,7 @@ class FeishuAPIService:
             card_json: 卡片 JSON 字符串
             message_id: 要回复的消息 ID
             reply_in_thread: 是否收进话题详情
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, new_message_id or error)
@@ -1282,19 +1762,20 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.reply_card(card_json, message_id, reply_in_thread)
+        return self._message_sender.reply_card(card_json, message_id, reply_in_thread, owner_id)
 
-    def patch_card(self, message_id: str, card_json: str) -> Tuple[bool, str]:
+    def patch_card(self, message_id: str, card_json: str, owner_id: str = '') -> Tuple[bool, str]:
         """更新卡片消息"""
         if not self._enabled:
             return False, "Feishu API service not enabled"
-        return self._message_sender.patch_card(message_id, card_json)
+        return self._message_sender.patch_card(message_id, card_json, owner_id)
 
     def send_text(
         self,
         text: str,
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送文本消息（新消息）
 
@@ -1302,6 +1783,7 @@ class FeishuAPIService:
             text: 文本内容
             receive_id: 接收者 ID
             receive_id_type: 接收者类型
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, message_id or error)
@@ -1309,13 +1791,14 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.send_text(text, receive_id, receive_id_type)
+        return self._message_sender.send_text(text, receive_id, receive_id_type, owner_id)
 
     def reply_text(
         self,
         text: str,
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复文本消息
 
@@ -1325,6 +1808,7 @@ class FeishuAPIService:
             text: 文本内容
             message_id: 要回复的消息 ID
             reply_in_thread: 是否收进话题详情
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, new_message_id or error)
@@ -1332,13 +1816,14 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.reply_text(text, message_id, reply_in_thread)
+        return self._message_sender.reply_text(text, message_id, reply_in_thread, owner_id)
 
     def send_post(
         self,
         content: Dict[str, Any],
         receive_id: Optional[str] = None,
-        receive_id_type: Optional[str] = None
+        receive_id_type: Optional[str] = None,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """发送富文本消息
 
@@ -1346,6 +1831,7 @@ class FeishuAPIService:
             content: 富文本内容（如 {"zh_cn": {"title": "...", "content": [[...]]}}）
             receive_id: 接收者 ID（必需）
             receive_id_type: 接收者类型，默认自动检测
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, message_id or error)
@@ -1353,13 +1839,14 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.send_post(content, receive_id, receive_id_type)
+        return self._message_sender.send_post(content, receive_id, receive_id_type, owner_id)
 
     def reply_post(
         self,
         content: Dict[str, Any],
         message_id: str,
-        reply_in_thread: bool = False
+        reply_in_thread: bool = False,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """回复富文本消息
 
@@ -1367,6 +1854,7 @@ class FeishuAPIService:
             content: 富文本内容
             message_id: 要回复的消息 ID
             reply_in_thread: 是否收进话题详情
+            owner_id: 飞书用户 ID（限流公平调度，可选）
 
         Returns:
             (success, new_message_id or error)
@@ -1374,12 +1862,13 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.reply_post(content, message_id, reply_in_thread)
+        return self._message_sender.reply_post(content, message_id, reply_in_thread, owner_id)
 
     def add_reaction(
         self,
         message_id: str,
-        emoji_type: str
+        emoji_type: str,
+        owner_id: str = ''
     ) -> Tuple[bool, str]:
         """给消息添加表情回应
 
@@ -1390,6 +1879,7 @@ class FeishuAPIService:
             message_id: 消息 ID
             emoji_type: 表情类型，如 "OK"、"THUMBSUP" 等
                         完整列表见 https://open.feishu.cn/document/server-docs/im-v1/message-reaction/emojis-introduce
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, reaction_id or error)
@@ -1397,18 +1887,20 @@ class FeishuAPIService:
         if not self._enabled:
             return False, "Feishu API service not enabled"
 
-        return self._message_sender.add_reaction(message_id, emoji_type)
+        return self._message_sender.add_reaction(message_id, emoji_type, owner_id)
 
     def remove_reaction(
         self,
         message_id: str,
-        emoji_type: str
+        emoji_type: str,
+        owner_id: str = ''
     ) -> Tuple[bool, int]:
         """查询并删除消息上指定类型的表情回应
 
         Args:
             message_id: 消息 ID
             emoji_type: 要删除的表情类型，如 "Typing"
+            owner_id: 飞书用户 ID（限流公平调度，可选，默认按消息分组）
 
         Returns:
             (success, deleted_count)
@@ -1416,7 +1908,7 @@ class FeishuAPIService:
         if not self._enabled:
             return False, 0
 
-        return self._message_sender.remove_reaction(message_id, emoji_type)
+        return self._message_sender.remove_reaction(message_id, emoji_type, owner_id)
 
     # =========================================================================
     # 群聊管理 API
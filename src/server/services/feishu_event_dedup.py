@@ -0,0 +1,202 @@
+"""飞书事件去重
+
+归属端: 飞书网关（单机部署时即本进程）
+使用方: handlers/feishu.py handle_feishu_request()
+
+飞书在 HTTP 回调响应慢时会重推同一事件（event_id 不变），长连接断线重连也可能重放；
+同一条消息偶尔以新的 event_id 再次投递（message_id 不变）。重复处理会再启动一个
+claude 进程、再建一个群聊或再发一遍卡片，因此在做任何处理之前按 event_id / message_id 去重。
+
+存储模型：
+    - 内存 OrderedDict（key → 首次见到的时间），按插入顺序即时间顺序，
+      查询时从头部惰性淘汰超过 TTL 的条目，超过容量时淘汰最旧的条目
+    - 可选持久化（open_backend journal 模式 / sqlite 表 feishu_event_dedup），
+      重启后加载 TTL 内的条目，覆盖"网关重启期间飞书重推"的场景；
+      过期条目由 cleanup_expired() 定期从后端删除
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# key 前缀：event_id 与 message_id 共用一张表
+_EVENT_PREFIX = 'e:'
+_MESSAGE_PREFIX = 'm:'
+
+
+class FeishuEventDedup:
+    """最近处理过的飞书 event_id / message_id 集合（有界 + TTL）"""
+
+    _instance = None  # type: Optional[FeishuEventDedup]
+    _lock = threading.Lock()
+
+    def __init__(self, ttl: int, max_entries: int, data_dir: Optional[str] = None):
+        """初始化
+
+        Args:
+            ttl: 条目保留秒数（应覆盖飞书的重推间隔）
+            max_entries: 内存条目上限，超出时淘汰最旧的
+            data_dir: 持久化目录；None 表示仅内存
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._seen = collections.OrderedDict()  # type: collections.OrderedDict
+        self._seen_lock = threading.Lock()
+        self._stats = {
+            'checked': 0,
+            'duplicate_event_id': 0,
+            'duplicate_message_id': 0,
+            'evicted': 0,
+        }
+
+        self._backend = None
+        if data_dir:
+            from services.storage_backend import open_backend
+            self._backend = open_backend(data_dir, 'feishu_event_dedup', ts_field='seen_at',
+                                         journal=True, log_tag='feishu-event-dedup')
+            self._load()
+
+        logger.info("[feishu-event-dedup] Initialized (ttl=%ss, max_entries=%d, persist=%s, loaded=%d)",
+                    ttl, max_entries, self._backend.kind if self._backend is not None else 'off', len(self._seen))
+
+    @classmethod
+    def initialize(cls, ttl: int, max_entries: int,
+                   data_dir: Optional[str] = None) -> 'FeishuEventDedup':
+        """初始化单例实例
+
+        Args:
+            ttl: 条目保留秒数
+            max_entries: 内存条目上限
+            data_dir: 持久化目录；None 表示仅内存
+
+        Returns:
+            FeishuEventDedup 实例
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(ttl, max_entries, data_dir)
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional['FeishuEventDedup']:
+        """获取单例实例，未初始化返回 None"""
+        return cls._instance
+
+    def _load(self) -> None:
+        """从后端加载 TTL 内的条目（按时间排序后放入 OrderedDict）"""
+        cutoff = time.time() - self._ttl
+        try:
+            items = self._backend.load_all()
+        except Exception as e:
+            logger.error("[feishu-event-dedup] Failed to load: %s", e)
+            return
+        entries = []
+        for key, value in items.items():
+            seen_at = value.get('seen_at', 0) if isinstance(value, dict) else 0
+            if seen_at >= cutoff:
+                entries.append((seen_at, key))
+        entries.sort()
+        for seen_at, key in entries[-self._max_entries:]:
+            self._seen[key] = seen_at
+
+    def _expire_locked(self, now: float) -> None:
+        """从头部淘汰过期条目（需持 _seen_lock）"""
+        cutoff = now - self._ttl
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+
+    def check_and_mark(self, event_id: str, message_id: str = '') -> Optional[str]:
+        """检查事件是否已处理过，未处理过则记录
+
+        检查与记录在同一把锁内完成，并发到达的同一事件只有一个会返回 None。
+
+        Args:
+            event_id: 飞书事件 ID（header.event_id）
+            message_id: 消息 ID（消息事件的 event.message.message_id），可为空
+
+        Returns:
+            None 表示首次出现、应当处理；
+            'event_id' / 'message_id' 表示重复（命中的 key 类型），调用方应直接丢弃
+        """
+        keys = []
+        if event_id:
+            keys.append(_EVENT_PREFIX + event_id)
+        if message_id:
+            keys.append(_MESSAGE_PREFIX + message_id)
+        if not keys:
+            return None
+
+        now = time.time()
+        with self._seen_lock:
+            self._stats['checked'] += 1
+            self._expire_locked(now)
+
+            if event_id and (_EVENT_PREFIX + event_id) in self._seen:
+                self._stats['duplicate_event_id'] += 1
+                return 'event_id'
+            if message_id and (_MESSAGE_PREFIX + message_id) in self._seen:
+                # 同一消息换了 event_id 重新投递：记下新 event_id，后续同 event_id 的重推按 event_id 命中
+                if event_id:
+                    self._seen[_EVENT_PREFIX + event_id] = now
+                self._stats['duplicate_message_id'] += 1
+                return 'message_id'
+
+            for key in keys:
+                self._seen[key] = now
+            while len(self._seen) > self._max_entries:
+                self._seen.popitem(last=False)
+                self._stats['evicted'] += 1
+
+        # 持久化在锁外进行（journal 追加 / sqlite 单行写入），失败只影响重启后的去重
+        if self._backend is not None:
+            try:
+                self._backend.put_many({key: {'seen_at': int(now)} for key in keys})
+            except Exception as e:
+                logger.warning("[feishu-event-dedup] Failed to persist: %s", e)
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取去重统计（用于 /status 端点）"""
+        with self._seen_lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._seen)
+        stats['duplicates'] = stats['duplicate_event_id'] + stats['duplicate_message_id']
+        stats['ttl'] = self._ttl
+        stats['max_entries'] = self._max_entries
+        stats['persist'] = self._backend.kind if self._backend is not None else 'off'
+        return stats
+
+    def cleanup_expired(self) -> int:
+        """清理过期条目（内存与持久化后端）
+
+        Returns:
+            从后端删除的条目数量
+        """
+        now = time.time()
+        with self._seen_lock:
+            self._expire_locked(now)
+        if self._backend is None:
+            return 0
+        try:
+            expired = self._backend.expired_keys(now - self._ttl)
+            if expired and self._backend.delete_many(expired):
+                logger.info("[feishu-event-dedup] Cleaned %d expired entries", len(expired))
+        except Exception as e:
+            logger.error("[feishu-event-dedup] Failed to cleanup: %s", e)
+            return 0
+        # 批量删除后 journal 可能远大于有效数据，顺带压缩
+        if expired and hasattr(self._backend, 'compact'):
+            self._backend.compact()
+        return len(expired)
+
+    def close(self) -> None:
+        """落盘并释放后端资源（服务退出时调用）"""
+        if self._backend is not None:
+            self._backend.close()
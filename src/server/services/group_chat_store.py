@@ -7,14 +7,13 @@
 用户自建群聊不在此 store 中。
 """
 
-import json
 import logging
-import os
-import tempfile
 import threading
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
+from services.storage_backend import open_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,10 +53,10 @@ class GroupChatStore:
     - `_max_seq`: owner_id → 当前最大 seq，加速 allocate
 
     并发模型：
-    - 写路径（allocate / remove）持 _file_lock，先写磁盘、_save() 成功后再更新索引
+    - 写路径（allocate / remove）持 _file_lock，先持久化、写入成功后再更新索引
     - 读路径（get_owner / is_service_created / get_seq）走内存索引，
       依赖 CPython GIL 对 dict 单次操作的原子性
-    - get_chat_by_seq / get_chats_by_owner / get_all 需要遍历 data，走 _file_lock 保护
+    - get_chat_by_seq / get_chats_by_owner 读该 owner 一行、get_all 读全量，走 _file_lock 保护
     """
 
     _instance: Optional['GroupChatStore'] = None
@@ -65,9 +64,9 @@ class GroupChatStore:
 
     def __init__(self, data_dir: str):
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'group_chats.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
+        # 顶层 key 为 owner_id：per-owner 读写只涉及该 owner 一行
+        self._backend = open_backend(data_dir, 'group_chats', log_tag='group-chat-store')
 
         # 内存索引：chat_id → (owner_id, seq)
         self._chat_index: Dict[str, Tuple[str, int]] = {}
@@ -115,19 +114,18 @@ class GroupChatStore:
             return 0
         with self._file_lock:
             try:
-                data = self._load()
                 # 幂等：chat_id 已存在则返回原 seq
                 existing = self._chat_index.get(chat_id)
                 if existing:
                     return existing[1]
 
-                owner_bucket = data.setdefault(owner_id, {})
+                owner_bucket = self._backend.get(owner_id) or {}
                 allocated = self._max_seq.get(owner_id, 0) + 1
                 owner_bucket[str(allocated)] = {
                     'chat_id': chat_id,
                     'created_at': int(time.time()),
                 }
-                if not self._save(data):
+                if not self._backend.put(owner_id, owner_bucket):
                     return 0
                 # 更新索引
                 self._chat_index[chat_id] = (owner_id, allocated)
@@ -148,19 +146,20 @@ class GroupChatStore:
             return False
         with self._file_lock:
             try:
-                data = self._load()
                 entry = self._chat_index.get(chat_id)
                 if not entry:
                     # 磁盘也可能一致 无记录
                     return True
                 owner_id, seq = entry
                 seq_key = str(seq)
-                owner_bucket = data.get(owner_id)
+                owner_bucket = self._backend.get(owner_id)
                 if owner_bucket and seq_key in owner_bucket:
                     del owner_bucket[seq_key]
-                    if not owner_bucket:
-                        del data[owner_id]
-                    if not self._save(data):
+                    if owner_bucket:
+                        saved = self._backend.put(owner_id, owner_bucket)
+                    else:
+                        saved = self._backend.delete(owner_id)
+                    if not saved:
                         return False
                 # 索引同步
                 self._chat_index.pop(chat_id, None)
@@ -191,15 +190,15 @@ class GroupChatStore:
         return chat_id in self._chat_index
 
     # =========================================================================
-    # 读接口 — 磁盘 _load()，持 _file_lock
+    # 读接口 — 存储后端（按 owner_id 读一行），持 _file_lock
     # =========================================================================
 
     def get_chat_by_seq(self, owner_id: str, seq: int) -> Optional[str]:
         """按 owner + seq 反查 chat_id。"""
         with self._file_lock:
             try:
-                data = self._load()
-                return data.get(owner_id, {}).get(str(seq), {}).get('chat_id')
+                owner_bucket = self._backend.get(owner_id) or {}
+                return owner_bucket.get(str(seq), {}).get('chat_id')
             except Exception as e:
                 logger.error("[group-chat-store] get_chat_by_seq error: %s", e)
                 return None
@@ -212,8 +211,7 @@ class GroupChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                owner_bucket = data.get(owner_id, {})
+                owner_bucket = self._backend.get(owner_id) or {}
                 result = []
                 for seq_key, item in owner_bucket.items():
                     try:
@@ -239,7 +237,7 @@ class GroupChatStore:
         """
         with self._file_lock:
             try:
-                return self._load()
+                return self._backend.load_all()
             except Exception as e:
                 logger.error("[group-chat-store] Failed to get_all: %s", e)
                 return {}
@@ -252,7 +250,7 @@ class GroupChatStore:
         """从持久化数据重建内存索引。仅 __init__ 阶段调用。"""
         with self._file_lock:
             try:
-                data = self._load()
+                data = self._backend.load_all()
                 self._chat_index = {}
                 self._max_seq = {}
                 for owner_id, owner_bucket in data.items():
@@ -272,31 +270,3 @@ class GroupChatStore:
                                 len(self._max_seq), len(self._chat_index))
             except Exception as e:
                 logger.error("[group-chat-store] Failed to rebuild index: %s", e)
-
-    # =========================================================================
-    # 底层 I/O（内部）
-    # =========================================================================
-
-    def _load(self) -> Dict[str, Any]:
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("[group-chat-store] Invalid JSON, starting fresh")
-            return {}
-        except IOError as e:
-            logger.error("[group-chat-store] Failed to load: %s", e)
-            return {}
-
-    def _save(self, data: Dict[str, Any]) -> bool:
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error("[group-chat-store] Failed to save: %s", e)
-            return False
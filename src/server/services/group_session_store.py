@@ -22,14 +22,13 @@ owner 下可能有不同活跃 session（用户共享群 + /attach 场景），
 不直接访问此 Store。
 """
 
-import json
 import logging
-import os
-import tempfile
 import threading
 import time
 from typing import Any, Dict, Optional, Tuple
 
+from services.storage_backend import open_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,35 +62,64 @@ class GroupSessionStore:
         这个低频场景通过其他路径回源 callback 拿权威值
 
     内存反向索引: (owner_id, session_id) → chat_id
-      - find_by_session 走 O(1) 内存查询，避免每次 _load + 全表遍历
+      - find_by_session 走 O(1) 内存查询，避免每次全表读取 + 遍历
       - 复合 key 含 owner_id：避免不同 owner 下 session_id 极小概率撞车时
         反向索引被静默覆盖
       - 并发模型沿用 group_chat_store._chat_index：写路径在 _file_lock 内、
-        _save() 成功后再更新索引；读路径直接查内存，依赖 CPython GIL
+        持久化成功后再更新索引；读路径直接查内存，依赖 CPython GIL
         对 dict 单次操作的原子性
+
+    touch 去抖批量落盘：
+      - touch 只记录到内存 _pending_touches[(owner_id, chat_id)] = ts，不读写磁盘
+        （条目是否存在由正向索引 (owner_id, chat_id) → session_id 判断）
+      - 后台线程每 flush_interval 秒把所有待写的 last_active_at 合并为一次后端写入；
+        服务退出时 close() 再落盘一次
+      - get / get_by_owner 读取时叠加内存中的 last_active_at，读到的总是最新值
+      - save 自带 last_active_at=now，会顺带丢弃该条目的待写 touch；remove 同理
+      - 进程崩溃最多丢失 flush_interval 内的活跃时间，自动解散按天判断，影响可忽略
     """
 
     _instance: Optional['GroupSessionStore'] = None
     _lock = threading.Lock()
 
-    def __init__(self, data_dir: str):
+    # touch 批量落盘默认间隔（秒）
+    DEFAULT_TOUCH_FLUSH_INTERVAL = 60
+
+    def __init__(self, data_dir: str, touch_flush_interval: int = DEFAULT_TOUCH_FLUSH_INTERVAL):
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'group_sessions.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
+        # 顶层 key 为 owner_id：get / get_by_owner / save 只读写该 owner 一行
+        self._backend = open_backend(data_dir, 'group_sessions', log_tag='group-session-store')
 
         # 反向索引：(owner_id, session_id) → chat_id（启动时重建，写路径同步更新）
         self._owner_session_to_chat: Dict[Tuple[str, str], str] = {}
+        # 正向索引：(owner_id, chat_id) → session_id（touch 据此判断条目存在，不读后端）
+        self._chat_to_session: Dict[Tuple[str, str], str] = {}
         self._rebuild_index()
 
-        logger.info("[group-session-store] Initialized with data_dir=%s", data_dir)
+        # 待落盘的 last_active_at：(owner_id, chat_id) → ts（受 _file_lock 保护）
+        self._pending_touches: Dict[Tuple[str, str], int] = {}
+        self._touch_flush_interval = touch_flush_interval
+        self._stop_event = threading.Event()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name='group-session-touch-flush', daemon=True)
+        self._flush_thread.start()
+
+        logger.info("[group-session-store] Initialized with data_dir=%s, touch_flush_interval=%ss",
+                    data_dir, touch_flush_interval)
 
     @classmethod
-    def initialize(cls, data_dir: str) -> 'GroupSessionStore':
-        """初始化单例实例"""
+    def initialize(cls, data_dir: str,
+                   touch_flush_interval: int = DEFAULT_TOUCH_FLUSH_INTERVAL) -> 'GroupSessionStore':
+        """初始化单例实例
+
+        Args:
+            data_dir: 数据存储目录
+            touch_flush_interval: touch 刷新的 last_active_at 批量落盘间隔（秒）
+        """
         with cls._lock:
             if cls._instance is None:
-                cls._instance = cls(data_dir)
+                cls._instance = cls(data_dir, touch_flush_interval)
             return cls._instance
 
     @classmethod
@@ -114,14 +142,16 @@ class GroupSessionStore:
             return None
         with self._file_lock:
             try:
-                data = self._load()
-                return data.get(owner_id, {}).get(chat_id)
+                item = (self._backend.get(owner_id) or {}).get(chat_id)
+                if item:
+                    self._apply_pending_touch(owner_id, chat_id, item)
+                return item
             except Exception as e:
                 logger.error("[group-session-store] Failed to get: %s", e)
                 return None
 
     def get_by_owner(self, owner_id: str) -> Dict[str, Dict[str, Any]]:
-        """获取指定 owner 下所有 chat_id → session 信息的映射（一次磁盘读）
+        """获取指定 owner 下所有 chat_id → session 信息的映射（一次后端读）
 
         Returns:
             {chat_id: {'session_id', 'project_dir', 'last_active_at', 'created_at'}, ...}
@@ -131,8 +161,11 @@ class GroupSessionStore:
             return {}
         with self._file_lock:
             try:
-                data = self._load()
-                return dict(data.get(owner_id, {}))
+                owner_bucket = self._backend.get(owner_id) or {}
+                if self._pending_touches:
+                    for chat_id, item in owner_bucket.items():
+                        self._apply_pending_touch(owner_id, chat_id, item)
+                return owner_bucket
             except Exception as e:
                 logger.error("[group-session-store] Failed to get_by_owner: %s", e)
                 return {}
@@ -168,20 +201,21 @@ class GroupSessionStore:
             return False
         with self._file_lock:
             try:
-                data = self._load()
                 now = int(time.time())
-                owner_bucket = data.setdefault(owner_id, {})
+                owner_bucket = self._backend.get(owner_id) or {}
                 existed = owner_bucket.get(chat_id)
                 created_at = existed.get('created_at', now) if existed else now
                 # 旧 session_id（若 (owner_id, chat_id) 之前绑过其他 session），
                 # 用于持久化成功后清理反向索引中的过期条目
                 prev_session_id = existed.get('session_id', '') if existed else ''
                 # 清理本 session 的旧 chat 行（仅当该行仍指向本 session，未被其他 session 接管）
+                reclaimed_chat_id = ''
                 stale_chat_id = self._owner_session_to_chat.get((owner_id, session_id))
                 if stale_chat_id and stale_chat_id != chat_id:
                     stale_entry = owner_bucket.get(stale_chat_id)
                     if stale_entry and stale_entry.get('session_id') == session_id:
                         del owner_bucket[stale_chat_id]
+                        reclaimed_chat_id = stale_chat_id
                         logger.info("[group-session-store] Reclaimed stale chat row: "
                                     "owner=%s session=%s old_chat=%s -> new_chat=%s",
                                     owner_id, session_id, stale_chat_id, chat_id)
@@ -194,14 +228,19 @@ class GroupSessionStore:
                 if new_session:
                     entry['new_session'] = True
                 owner_bucket[chat_id] = entry
-                if not self._save(data):
+                if not self._backend.put(owner_id, owner_bucket):
                     return False
-                # 反向索引同步：清旧 + 写新
+                # 索引同步：清旧 + 写新；新记录自带 last_active_at=now，待写 touch 作废
                 if prev_session_id and prev_session_id != session_id:
                     prev_key = (owner_id, prev_session_id)
                     if self._owner_session_to_chat.get(prev_key) == chat_id:
                         self._owner_session_to_chat.pop(prev_key, None)
+                if reclaimed_chat_id:
+                    self._chat_to_session.pop((owner_id, reclaimed_chat_id), None)
+                    self._pending_touches.pop((owner_id, reclaimed_chat_id), None)
                 self._owner_session_to_chat[(owner_id, session_id)] = chat_id
+                self._chat_to_session[(owner_id, chat_id)] = session_id
+                self._pending_touches.pop((owner_id, chat_id), None)
                 logger.info("[group-session-store] Saved: owner=%s chat=%s -> session=%s",
                             owner_id, chat_id, session_id)
                 return True
@@ -212,52 +251,81 @@ class GroupSessionStore:
     def touch(self, owner_id: str, chat_id: str) -> bool:
         """刷新 (owner_id, chat_id) 的 last_active_at 为当前时间。
 
+        只更新内存，由后台线程按 touch_flush_interval 批量落盘。
         条目不存在时返回 False，不报错。
         """
         if not owner_id or not chat_id:
             return False
+        key = (owner_id, chat_id)
+        with self._file_lock:
+            if key not in self._chat_to_session:
+                return False
+            self._pending_touches[key] = int(time.time())
+            return True
+
+    def flush(self) -> bool:
+        """把内存中待写的 last_active_at 合并为一次后端写入
+
+        Returns:
+            是否成功（无待写数据返回 True）；失败时待写数据保留，下次重试
+        """
         with self._file_lock:
+            if not self._pending_touches:
+                return True
+            pending = self._pending_touches
+            self._pending_touches = {}
             try:
-                data = self._load()
-                owner_bucket = data.get(owner_id)
-                if not owner_bucket:
-                    return False
-                item = owner_bucket.get(chat_id)
-                if not item:
-                    return False
-                # 同秒去抖：用户连发消息时同秒多次 touch 没必要重复落盘。
-                # 自动解散按天判断，秒级精度本就过剩
-                now = int(time.time())
-                if item.get('last_active_at', 0) >= now:
-                    return True
-                # item 是 owner_bucket[chat_id] 的引用，原地修改即可
-                item['last_active_at'] = now
-                return self._save(data)
+                owners = {owner_id for owner_id, _ in pending}
+                buckets = self._backend.get_many(owners)
+                changed = {}
+                for (owner_id, chat_id), ts in pending.items():
+                    item = buckets.get(owner_id, {}).get(chat_id)
+                    if item and item.get('last_active_at', 0) < ts:
+                        item['last_active_at'] = ts
+                        changed[owner_id] = buckets[owner_id]
+                if changed and not self._backend.put_many(changed):
+                    raise IOError('backend write failed')
+                logger.debug("[group-session-store] Flushed %d touches (%d owners)",
+                             len(pending), len(changed))
+                return True
             except Exception as e:
-                logger.error("[group-session-store] Failed to touch: %s", e)
+                logger.error("[group-session-store] Failed to flush touches: %s", e)
+                # 保留待写数据；期间新的 touch 更新，以较新的时间为准
+                for key, ts in pending.items():
+                    if self._pending_touches.get(key, 0) < ts:
+                        self._pending_touches[key] = ts
                 return False
 
+    def close(self) -> None:
+        """停止后台落盘线程并落盘待写的 touch（服务退出时调用）"""
+        self._stop_event.set()
+        self._flush_thread.join(timeout=5)
+        self.flush()
+
     def remove(self, owner_id: str, chat_id: str) -> bool:
         """删除 (owner_id, chat_id) 的映射条目（不存在返回 False）"""
         if not owner_id or not chat_id:
             return False
         with self._file_lock:
             try:
-                data = self._load()
-                owner_bucket = data.get(owner_id)
+                owner_bucket = self._backend.get(owner_id)
                 if not owner_bucket or chat_id not in owner_bucket:
                     return False
                 # 记录 session_id 用于持久化成功后清理反向索引
                 removed_session_id = owner_bucket[chat_id].get('session_id', '')
                 del owner_bucket[chat_id]
-                if not owner_bucket:
-                    del data[owner_id]
-                if not self._save(data):
+                if owner_bucket:
+                    saved = self._backend.put(owner_id, owner_bucket)
+                else:
+                    saved = self._backend.delete(owner_id)
+                if not saved:
                     return False
                 if removed_session_id:
                     key = (owner_id, removed_session_id)
                     if self._owner_session_to_chat.get(key) == chat_id:
                         self._owner_session_to_chat.pop(key, None)
+                self._chat_to_session.pop((owner_id, chat_id), None)
+                self._pending_touches.pop((owner_id, chat_id), None)
                 logger.info("[group-session-store] Removed: owner=%s chat=%s",
                             owner_id, chat_id)
                 return True
@@ -269,47 +337,34 @@ class GroupSessionStore:
     # 内部
     # =========================================================================
 
+    def _apply_pending_touch(self, owner_id: str, chat_id: str, item: Dict[str, Any]) -> None:
+        """把内存中较新的 last_active_at 叠加到读出的条目上（调用方需持有 _file_lock）"""
+        ts = self._pending_touches.get((owner_id, chat_id))
+        if ts and item.get('last_active_at', 0) < ts:
+            item['last_active_at'] = ts
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self._touch_flush_interval):
+            self.flush()
+
     def _rebuild_index(self) -> None:
-        """从持久化数据重建 (owner_id, session_id) → chat_id 反向索引。
+        """从持久化数据重建 (owner_id, session_id) ↔ chat_id 正反向索引。
 
         仅 __init__ 阶段调用。
         """
         with self._file_lock:
             try:
-                data = self._load()
+                data = self._backend.load_all()
                 self._owner_session_to_chat = {}
+                self._chat_to_session = {}
                 for owner_id, owner_bucket in data.items():
                     for chat_id, item in owner_bucket.items():
                         sid = item.get('session_id', '')
                         if sid:
                             self._owner_session_to_chat[(owner_id, sid)] = chat_id
+                            self._chat_to_session[(owner_id, chat_id)] = sid
                 if self._owner_session_to_chat:
                     logger.info("[group-session-store] Rebuilt index: %d sessions",
                                 len(self._owner_session_to_chat))
             except Exception as e:
                 logger.error("[group-session-store] Failed to rebuild index: %s", e)
-
-    def _load(self) -> Dict[str, Any]:
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("[group-session-store] Invalid JSON in %s, starting fresh",
-                           self._file_path)
-            return {}
-        except IOError as e:
-            logger.error("[group-session-store] Failed to load: %s", e)
-            return {}
-
-    def _save(self, data: Dict[str, Any]) -> bool:
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error("[group-session-store] Failed to save: %s", e)
-            return False
@@ -0,0 +1,273 @@
+"""HTTP(S) 持久连接池
+
+归属端: 飞书网关
+使用方: services/feishu_api.py（TokenManager / MessageSender / FeishuAPIService 共用）
+
+为同一 host 复用 keep-alive 连接，省去每次调用的 TCP + TLS 握手：
+    - 按 (scheme, host, port) 分组保存空闲连接，取用时 LIFO（最近归还的连接最可能仍存活）
+    - 空闲超过 idle_timeout 的连接丢弃；每组最多保留 max_size 个空闲连接，超出直接关闭
+    - 复用前检查 socket 是否已被对端关闭（可读即视为失效）；复用连接请求失败时
+      （对端在空闲期间断开）换新连接重试一次，新建连接失败不重试
+    - DNS 解析结果缓存 dns_ttl 秒，连接失败时作废该 host 的缓存
+
+连接在被取出期间只由一个线程使用，池本身线程安全。
+"""
+
+import collections
+import http.client
+import logging
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 复用连接上可安全重试的"对端已断开"类错误
+# RemoteDisconnected 同时是 ConnectionResetError 和 BadStatusLine 的子类
+_STALE_ERRORS = (ConnectionError, http.client.BadStatusLine,
+                 ssl.SSLEOFError, ssl.SSLZeroReturnError)
+
+
+def _open_socket(addrs: List[Tuple], timeout: Optional[float]) -> socket.socket:
+    """依次尝试已解析的地址建立 TCP 连接（同 socket.create_connection，但跳过 DNS）"""
+    last_error = None
+    for family, type_, proto, _, sockaddr in addrs:
+        sock = None
+        try:
+            sock = socket.socket(family, type_, proto)
+            sock.settimeout(timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            last_error = e
+            if sock is not None:
+                sock.close()
+    raise last_error or OSError('getaddrinfo returned no addresses')
+
+
+class _PooledHTTPConnection(http.client.HTTPConnection):
+    """使用连接池 DNS 缓存建立连接的 HTTPConnection"""
+
+    def __init__(self, host: str, port: int, timeout: float, pool: 'HTTPConnectionPool'):
+        super().__init__(host, port, timeout=timeout)
+        self._pool = pool
+
+    def connect(self):
+        self.sock = self._pool._connect(self.host, self.port, self.timeout)
+
+
+class _PooledHTTPSConnection(http.client.HTTPSConnection):
+    """使用连接池 DNS 缓存建立连接的 HTTPSConnection（证书校验与 SNI 仍使用原始 host）"""
+
+    def __init__(self, host: str, port: int, timeout: float, pool: 'HTTPConnectionPool',
+                 context: ssl.SSLContext):
+        super().__init__(host, port, timeout=timeout, context=context)
+        self._pool = pool
+
+    def connect(self):
+        sock = self._pool._connect(self.host, self.port, self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+class HTTPConnectionPool:
+    """线程安全的 HTTP(S) keep-alive 连接池"""
+
+    def __init__(self, max_size: int = 10, idle_timeout: float = 50, dns_ttl: float = 300,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        """初始化连接池
+
+        Args:
+            max_size: 每个 host 最多保留的空闲连接数
+            idle_timeout: 空闲连接的最长保留时间（秒），应小于服务端 keep-alive 超时
+            dns_ttl: DNS 解析结果缓存时间（秒）
+            ssl_context: HTTPS 使用的 SSLContext，默认 ssl.create_default_context()
+        """
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._dns_ttl = dns_ttl
+        self._ssl_context = ssl_context or ssl.create_default_context()
+
+        self._lock = threading.Lock()
+        # (scheme, host, port) -> deque[(conn, last_used)]
+        self._idle = {}  # type: Dict[Tuple[str, str, int], collections.deque]
+        # (host, port) -> (expire_at, addrinfo 列表)
+        self._dns_cache = {}  # type: Dict[Tuple[str, int], Tuple[float, List[Tuple]]]
+
+        self._stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'stale_retries': 0,
+            'dns_lookups': 0,
+        }
+
+    # =========================================================================
+    # 对外接口
+    # =========================================================================
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None) -> Tuple[int, str, bytes]:
+        """发送请求并读取完整响应
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL（http:// 或 https://）
+            body: 请求体
+            headers: 请求头
+            timeout: 连接 / 读写超时（秒）
+
+        Returns:
+            (status, reason, body)
+
+        Raises:
+            OSError / http.client.HTTPException: 网络或协议错误
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        key = (scheme, host, port)
+
+        with self._lock:
+            self._stats['requests'] += 1
+
+        for attempt in (0, 1):
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except _STALE_ERRORS as e:
+                conn.close()
+                if reused and attempt == 0:
+                    # 空闲期间被对端关闭的连接，换新连接重试一次
+                    logger.debug("[http-pool] Stale connection to %s:%s (%s), retrying", host, port, e)
+                    with self._lock:
+                        self._stats['stale_retries'] += 1
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, resp.reason, data
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计（用于 /status 端点）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_connections'] = sum(len(q) for q in self._idle.values())
+        return stats
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for queue in idle.values():
+            for conn, _ in queue:
+                conn.close()
+
+    # =========================================================================
+    # 连接管理
+    # =========================================================================
+
+    def _acquire(self, key: Tuple[str, str, int], timeout: Optional[float]):
+        """取一个空闲连接，没有则新建。返回 (conn, 是否复用)"""
+        now = time.time()
+        discarded = []
+        conn = None
+        with self._lock:
+            queue = self._idle.get(key)
+            while queue:
+                candidate, last_used = queue.pop()
+                if now - last_used > self._idle_timeout:
+                    discarded.append(candidate)
+                    continue
+                conn = candidate
+                break
+            if conn is not None:
+                self._stats['connections_reused'] += 1
+            else:
+                self._stats['connections_created'] += 1
+
+        for old in discarded:
+            old.close()
+
+        if conn is not None and self._is_dropped(conn):
+            # 对端已关闭（FIN / TLS close_notify 已到达），不复用
+            conn.close()
+            conn = None
+            with self._lock:
+                self._stats['connections_reused'] -= 1
+                self._stats['connections_created'] += 1
+
+        if conn is not None:
+            conn.timeout = timeout
+            conn.sock.settimeout(timeout)
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = _PooledHTTPSConnection(host, port, timeout, self, self._ssl_context)
+        else:
+            conn = _PooledHTTPConnection(host, port, timeout, self)
+        return conn, False
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            queue = self._idle.setdefault(key, collections.deque())
+            if len(queue) < self._max_size:
+                queue.append((conn, time.time()))
+                return
+        conn.close()
+
+    @staticmethod
+    def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+        sock = conn.sock
+        if sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        # 空闲连接上不应有待读数据：可读意味着 EOF 或异常数据
+        return bool(readable)
+
+    # =========================================================================
+    # DNS 缓存
+    # =========================================================================
+
+    def _connect(self, host: str, port: int, timeout: Optional[float]) -> socket.socket:
+        addrs = self._resolve(host, port)
+        try:
+            return _open_socket(addrs, timeout)
+        except OSError:
+            # 地址可能已变更，作废缓存，下次重新解析
+            with self._lock:
+                self._dns_cache.pop((host, port), None)
+            raise
+
+    def _resolve(self, host: str, port: int) -> List[Tuple]:
+        now = time.time()
+        with self._lock:
+            cached = self._dns_cache.get((host, port))
+            if cached and cached[0] > now:
+                return cached[1]
+            self._stats['dns_lookups'] += 1
+        addrs = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self._dns_cache[(host, port)] = (now + self._dns_ttl, addrs)
+        return addrs
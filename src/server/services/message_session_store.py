@@ -5,16 +5,21 @@
 
 维护 message_id → session 信息的映射，用于将用户回复消息路由到正确的 Callback 后端。
 Callback 后端的路由和逻辑不应直接调用此 Store。
+
+存储模型（见 services/storage_backend.py）：
+    - json 后端使用 journal 模式：内存 dict 为读源，save / get 为 O(1)；
+      变更追加到 message_sessions.journal，后台定期压缩为 message_sessions.json 快照
+    - sqlite 后端：message_sessions 表，save / get 为主键操作，
+      cleanup_expired 走 created_at 索引
 """
 
-import json
-import os
-import tempfile
 import threading
 import time
 import logging
 from typing import Optional, Dict, Any
 
+from services.storage_backend import open_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,10 +49,11 @@ class MessageSessionStore:
             data_dir: 数据存储目录
         """
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'message_sessions.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
-        logger.info(f"[message-session-store] Initialized with data_dir={data_dir}")
+        self._backend = open_backend(data_dir, 'message_sessions', ts_field='created_at',
+                                     journal=True, log_tag='message-session-store')
+        logger.info(f"[message-session-store] Initialized with data_dir={data_dir}, "
+                    f"backend={self._backend.kind}")
 
     @classmethod
     def initialize(cls, data_dir: str) -> 'MessageSessionStore':
@@ -86,13 +92,11 @@ class MessageSessionStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                data[message_id] = {
+                result = self._backend.put(message_id, {
                     'session_id': session_id,
                     'project_dir': project_dir,
                     'created_at': int(time.time())
-                }
-                result = self._save(data)
+                })
                 if result:
                     logger.info(f"[message-session-store] Saved mapping: {message_id} -> {session_id}")
                 return result
@@ -111,19 +115,17 @@ class MessageSessionStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(message_id)
+                item = self._backend.get(message_id)
                 if not item:
                     return None
 
                 # 检查过期
                 if time.time() - item.get('created_at', 0) > self.EXPIRE_SECONDS:
                     logger.info(f"[message-session-store] Mapping expired: {message_id}")
-                    del data[message_id]
-                    self._save(data)
+                    self._backend.delete(message_id)
                     return None
 
-                return item
+                return dict(item)
             except Exception as e:
                 logger.error(f"[message-session-store] Failed to get mapping: {e}")
                 return None
@@ -136,55 +138,17 @@ class MessageSessionStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                now = time.time()
-                expired = [
-                    k for k, v in data.items()
-                    if now - v.get('created_at', 0) > self.EXPIRE_SECONDS
-                ]
-                for k in expired:
-                    del data[k]
-                if expired:
-                    self._save(data)
+                expired = self._backend.expired_keys(time.time() - self.EXPIRE_SECONDS)
+                if expired and self._backend.delete_many(expired):
                     logger.info(f"[message-session-store] Cleaned {len(expired)} expired mappings")
-                return len(expired)
             except Exception as e:
                 logger.error(f"[message-session-store] Failed to cleanup: {e}")
                 return 0
-
-    def _load(self) -> Dict[str, Any]:
-        """加载映射数据
-
-        Returns:
-            映射数据字典
-        """
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning(f"[message-session-store] Invalid JSON in {self._file_path}, starting fresh")
-            return {}
-        except IOError as e:
-            logger.error(f"[message-session-store] Failed to load: {e}")
-            return {}
-
-    def _save(self, data: Dict[str, Any]) -> bool:
-        """保存映射数据（原子写入）
-
-        Args:
-            data: 映射数据字典
-
-        Returns:
-            是否保存成功
-        """
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error(f"[message-session-store] Failed to save: {e}")
-            return False
+        # 批量删除后 journal 可能远大于有效数据，顺带压缩
+        if expired and hasattr(self._backend, 'compact'):
+            self._backend.compact()
+        return len(expired)
+
+    def close(self) -> None:
+        """落盘并释放后端资源（服务退出时调用）"""
+        self._backend.close()
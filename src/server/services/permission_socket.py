@@ -0,0 +1,311 @@
+"""权限请求 Unix Socket 服务器
+
+归属端: Callback 后端
+使用方: main.py（启动），hooks/permission-notify.sh 经 socket_client.py / socat 连接
+
+单线程 selectors 事件循环（Linux 下为 epoll）：accept 与请求接收都在同一线程完成，
+请求完整后注册到 RequestManager，之后连接由 RequestManager 的监听线程负责。
+不再为每个连接创建线程，慢速 / 半截发送的客户端只占用一个 fd 和一段缓冲。
+
+请求分帧（详见 shared/protocol.md）：
+    - 长度前缀帧：4 字节大端序长度 + JSON（socket_client.py 使用），确认响应同样带长度前缀
+    - 原始 JSON（旧版客户端 / socat）：首字节为 '{' 或空白，按 JSON 完整性判断结束，
+      确认响应不带长度前缀
+    两种格式靠首字节区分：合法长度前缀的首字节为 0x00（请求上限 16MB），不会与 '{' 冲突。
+"""
+
+import base64
+import heapq
+import json
+import logging
+import os
+import selectors
+import socket
+import time
+from typing import Dict, Optional
+
+from services.request_manager import RequestManager
+
+logger = logging.getLogger(__name__)
+
+# 原始 JSON 请求的首字节（'{' 与 JSON 允许的前导空白）
+_LEGACY_LEADING_BYTES = b'{ \t\r\n'
+
+
+class _PendingClient:
+    """接收中的连接状态"""
+
+    __slots__ = ('conn', 'buf', 'framed', 'length', 'deadline')
+
+    def __init__(self, conn: socket.socket, deadline: float):
+        self.conn = conn
+        self.buf = bytearray()
+        self.framed = None  # type: Optional[bool]
+        self.length = -1    # 长度前缀帧的负载长度，-1 表示尚未读到
+        self.deadline = deadline
+
+
+class PermissionSocketServer:
+    """单线程事件循环的权限请求 Socket 服务器"""
+
+    # 接收完整请求的超时（秒）
+    RECV_TIMEOUT = 5.0
+    # 单个请求的最大字节数（Write/Edit 的大文件内容经 base64 后仍远小于此值）
+    MAX_REQUEST_SIZE = 16 * 1024 * 1024
+    # 每次 recv 的缓冲大小
+    RECV_CHUNK = 65536
+
+    def __init__(self, socket_path: str, backlog: int = 128):
+        """初始化服务器
+
+        Args:
+            socket_path: Unix Socket 路径
+            backlog: listen() 的等待队列长度
+        """
+        self._socket_path = socket_path
+        self._backlog = backlog
+        self._selector = selectors.DefaultSelector()
+        self._clients = {}  # type: Dict[int, _PendingClient]
+        self._deadlines = []  # 最小堆: (deadline, seq, client)
+        self._seq = 0
+        self._server = None
+
+    def serve_forever(self):
+        """绑定 Socket 并运行事件循环（阻塞）"""
+        # 删除已存在的 socket 文件（避免 TOCTOU 竞态条件）
+        try:
+            os.unlink(self._socket_path)
+        except FileNotFoundError:
+            pass
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self._socket_path)
+        os.chmod(self._socket_path, 0o600)  # 仅所有者可读写，防止其他用户访问
+        server.listen(self._backlog)
+        server.setblocking(False)
+        self._server = server
+        self._selector.register(server, selectors.EVENT_READ, None)
+
+        logger.info(f"[socket] Listening on {self._socket_path} (backlog={self._backlog})")
+
+        while True:
+            timeout = None
+            if self._deadlines:
+                timeout = max(0.0, self._deadlines[0][0] - time.time())
+            try:
+                events = self._selector.select(timeout)
+            except InterruptedError:
+                continue
+            for key, _ in events:
+                if key.data is None:
+                    self._accept()
+                else:
+                    self._on_readable(key.data)
+            self._expire(time.time())
+
+    # ------------------------------------------------------------------
+    # 事件处理
+    # ------------------------------------------------------------------
+
+    def _accept(self):
+        # 一次取空 accept 队列，突发连接不必每个都走一轮 select
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # EMFILE 等：记录后等待下一轮，连接留在内核队列中
+                logger.error(f"[socket] Accept failed: {e}")
+                return
+            conn.setblocking(False)
+            client = _PendingClient(conn, time.time() + self.RECV_TIMEOUT)
+            self._clients[conn.fileno()] = client
+            self._seq += 1
+            heapq.heappush(self._deadlines, (client.deadline, self._seq, client))
+            self._selector.register(conn, selectors.EVENT_READ, client)
+            logger.debug(f"[socket] New connection, fileno={conn.fileno()}")
+
+    def _on_readable(self, client: _PendingClient):
+        try:
+            chunk = client.conn.recv(self.RECV_CHUNK)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.warning(f"[socket] Receive error: {e} (received {len(client.buf)} bytes so far)")
+            self._drop(client)
+            return
+
+        if not chunk:
+            logger.warning(f"[socket] Connection closed by client (received {len(client.buf)} bytes total)")
+            self._drop(client)
+            return
+
+        client.buf += chunk
+        if client.framed is None:
+            client.framed = client.buf[:1] not in _LEGACY_LEADING_BYTES
+
+        request = self._try_parse(client)
+        if not request:
+            return  # 数据不完整，或请求非法（已回复并关闭）
+
+        # 请求完整：交给 RequestManager 前先移出事件循环并恢复阻塞模式
+        self._detach(client)
+        client.conn.setblocking(True)
+        self._handle_request(client.conn, request, client.framed)
+
+    def _try_parse(self, client: _PendingClient):
+        """尝试从缓冲解析完整请求
+
+        Returns:
+            请求 dict；None 表示数据不完整；False 表示请求非法（已回复错误并关闭连接）
+        """
+        buf = client.buf
+        if client.framed:
+            if client.length < 0:
+                if len(buf) < 4:
+                    return None
+                client.length = int.from_bytes(buf[:4], 'big')
+                if client.length > self.MAX_REQUEST_SIZE:
+                    return self._reject(client, f'request too large ({client.length} bytes)')
+            if len(buf) - 4 < client.length:
+                return None
+            payload = bytes(buf[4:4 + client.length])
+        else:
+            if len(buf) > self.MAX_REQUEST_SIZE:
+                return self._reject(client, f'request too large (> {self.MAX_REQUEST_SIZE} bytes)')
+            # 旧版客户端一次性发送完整 JSON：只在缓冲以 '}' 结尾时尝试解析，
+            # 避免每个分片都对整个缓冲重新 json.loads
+            if buf.rstrip()[-1:] != b'}':
+                return None
+            payload = bytes(buf)
+
+        try:
+            request = json.loads(payload.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            if not client.framed:
+                logger.debug(f"[socket] Incomplete JSON, continuing... ({str(e)[:50]})")
+                return None
+            return self._reject(client, f'invalid request: {e}')
+        if not isinstance(request, dict):
+            return self._reject(client, 'invalid request: not an object')
+        logger.info(f"[socket] Received {len(payload)} bytes of JSON data (framed={client.framed})")
+        return request
+
+    def _reject(self, client: _PendingClient, error: str):
+        logger.warning(f"[socket] Rejecting request: {error}")
+        self._detach(client)
+        client.conn.setblocking(True)
+        client.conn.settimeout(self.RECV_TIMEOUT)
+        self._reply(client.conn, {'success': False, 'error': error}, client.framed)
+        self._close(client.conn)
+        return False
+
+    def _expire(self, now: float):
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, client = heapq.heappop(self._deadlines)
+            if self._clients.get(client.conn.fileno()) is not client:
+                continue  # 已完成或已关闭
+            logger.warning(f"[socket] Receive timeout after {self.RECV_TIMEOUT}s "
+                           f"(received {len(client.buf)} bytes so far)")
+            self._drop(client)
+
+    def _detach(self, client: _PendingClient):
+        self._clients.pop(client.conn.fileno(), None)
+        try:
+            self._selector.unregister(client.conn)
+        except (KeyError, ValueError):
+            pass
+
+    def _drop(self, client: _PendingClient):
+        self._detach(client)
+        self._close(client.conn)
+
+    # ------------------------------------------------------------------
+    # 请求处理
+    # ------------------------------------------------------------------
+
+    def _handle_request(self, conn: socket.socket, request: dict, framed: bool):
+        """处理一个完整的请求
+
+        流程：
+            1. 健康检查 ping 直接回复 pong
+            2. 注册请求到 RequestManager（保持连接打开）
+            3. 发送确认响应，之后等待 resolve() 通过此连接返回用户决策
+        """
+        try:
+            # 健康检查探测：收到 ping 消息，回复 pong 后关闭
+            if request.get('type') == 'ping':
+                self._reply(conn, {'type': 'pong'}, framed)
+                self._close(conn)
+                logger.debug("[socket] Health check ping received, pong sent")
+                return
+
+            request_id = request.get('request_id')
+            hook_pid = request.get('hook_pid')
+
+            if not request_id:
+                self._reply(conn, {'success': False, 'error': 'missing request_id'}, framed)
+                self._close(conn)
+                return
+
+            # 保存 hook_pid 到 request 中，供后续使用
+            request['hook_pid'] = hook_pid
+
+            # 解码 raw_input_encoded 提取 session_id、tool_name 和 tool_input
+            # 这些字段用于日志记录和 /always 端点生成正确的权限规则
+            raw_input_encoded = request.get('raw_input_encoded')
+            if raw_input_encoded:
+                try:
+                    raw_input = json.loads(base64.b64decode(raw_input_encoded).decode('utf-8'))
+                    request['session_id'] = raw_input.get('session_id', 'unknown')
+                    request['tool_name'] = raw_input.get('tool_name')
+                    request['tool_input'] = raw_input.get('tool_input', {})
+                    logger.debug(f"[socket] Decoded session_id: {request['session_id']}, tool_name: {request['tool_name']}")
+                except Exception as e:
+                    logger.warning(f"[socket] Failed to decode raw_input_encoded: {e}")
+                    request['session_id'] = 'unknown'
+            else:
+                # 兜底：无 raw_input_encoded 的请求（理论上不应到达这里）
+                request['session_id'] = 'unknown'
+
+            session_id = request['session_id']
+            logger.info(f"[socket] Request ID: {request_id}, Session: {session_id}, Hook PID: {hook_pid}")
+
+            # 注册请求（保存 socket 连接供后续 resolve 使用）
+            RequestManager.get_instance().register(request_id, conn, request)
+
+            # 发送确认响应（刚建立的连接发送缓冲为空，小数据不会阻塞）
+            self._reply(conn, {
+                'success': True,
+                'message': 'Request registered',
+                'session_id': session_id
+            }, framed)
+
+            # 重要：不关闭连接！等待用户响应后由 resolve() 发送决策
+            logger.info(f"[socket] Request {request_id} registered (Session: {session_id}), waiting for user response...")
+
+        except Exception as e:
+            logger.error(f"[socket] Handler error: {e}")
+            try:
+                self._reply(conn, {'success': False, 'error': str(e)}, framed)
+                self._close(conn)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _reply(conn: socket.socket, obj: dict, framed: bool):
+        data = json.dumps(obj).encode('utf-8')
+        if framed:
+            data = len(data).to_bytes(4, 'big') + data
+        try:
+            conn.sendall(data)
+        except OSError as e:
+            logger.warning(f"[socket] Reply failed: {e}")
+
+    @staticmethod
+    def _close(conn: socket.socket):
+        try:
+            conn.close()
+        except OSError:
+            pass
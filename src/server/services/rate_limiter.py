@@ -0,0 +1,282 @@
+"""飞书 API 出站限流调度器
+
+归属端: 飞书网关
+使用方: services/feishu_api.py（MessageSender 发出的每个请求先经本模块放行）
+
+令牌桶 + 优先级 + owner 公平调度：
+    - 令牌桶：按 qps 匀速补充令牌，桶容量 = qps（允许 1 秒的突发）
+    - 优先级：交互类（权限 / 提问卡片、卡片更新）> 普通消息 > 后台类（表情回应），
+      高优先级队列非空时低优先级不放行
+    - 同一优先级内按 owner 加权轮询（默认权重 1），一个 owner 的突发通知
+      不会让其他 owner 的请求排在其后面
+    - 飞书返回频率限制错误码时由调用方 report_rate_limited()，暂停放行并指数退避
+      （1s 起，上限 30s），下一次成功请求后退避时长复位
+
+调用方线程在 acquire() 中阻塞等待放行，请求本身仍在调用方线程同步发出，
+调度线程只负责决定放行顺序。
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 优先级（数值越小越优先）
+PRIORITY_INTERACTIVE = 0  # 权限 / 提问卡片、卡片更新：用户正在等待
+PRIORITY_MESSAGE = 1      # 普通消息（Stop 通知、回复等）、群聊管理
+PRIORITY_BACKGROUND = 2   # 表情回应等可延后的操作
+
+PRIORITY_NAMES = ('interactive', 'message', 'background')
+
+# 排队等待放行的最长时间（秒），超时的请求直接失败
+ACQUIRE_TIMEOUT = 30.0
+
+# 频率限制退避：初始 / 上限（秒）
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 30.0
+
+
+class _Ticket:
+    """一个等待放行的请求"""
+
+    __slots__ = ('owner', 'priority', 'enqueued_at', 'event', 'granted')
+
+    def __init__(self, owner: str, priority: int):
+        self.owner = owner
+        self.priority = priority
+        self.enqueued_at = time.time()
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _Lane:
+    """单个优先级的队列：owner -> 请求队列，按 owner 加权轮询"""
+
+    def __init__(self):
+        self.owners = collections.deque()  # 轮询顺序
+        self.queues = {}  # type: Dict[str, collections.deque]
+        self.served = 0   # 队首 owner 本轮已放行数
+        self.depth = 0
+
+        # 统计
+        self.granted = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class FeishuRateLimiter:
+    """飞书 API 出站限流调度器（单例）"""
+
+    _instance = None  # type: Optional[FeishuRateLimiter]
+    _lock = threading.Lock()
+
+    def __init__(self, qps: int = 20):
+        """初始化调度器
+
+        Args:
+            qps: 每秒放行的请求数（令牌补充速率，同时作为桶容量）
+        """
+        self._rate = float(qps)
+        self._capacity = float(qps)
+        self._tokens = float(qps)
+        self._last_refill = time.time()
+
+        self._cond = threading.Condition(threading.Lock())
+        self._lanes = [_Lane() for _ in PRIORITY_NAMES]
+        self._weights = {}  # type: Dict[str, int]
+
+        self._backoff = 0.0
+        self._backoff_until = 0.0
+        self._rate_limited = 0
+
+        self._thread = threading.Thread(target=self._loop, name='feishu-rate-limiter', daemon=True)
+        self._thread.start()
+        logger.info("[rate-limiter] Started with qps=%d", qps)
+
+    @classmethod
+    def initialize(cls, qps: int = 20) -> 'FeishuRateLimiter':
+        """初始化单例"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(qps)
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional['FeishuRateLimiter']:
+        return cls._instance
+
+    # =========================================================================
+    # 对外接口
+    # =========================================================================
+
+    def acquire(self, owner: str, priority: int = PRIORITY_MESSAGE,
+                timeout: float = ACQUIRE_TIMEOUT) -> bool:
+        """排队等待放行（阻塞）
+
+        Args:
+            owner: 公平调度的分组键（飞书用户 ID，未知时可用接收者 ID）
+            priority: PRIORITY_INTERACTIVE / PRIORITY_MESSAGE / PRIORITY_BACKGROUND
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            True 表示已放行；False 表示等待超时（请求不应再发出）
+        """
+        ticket = _Ticket(owner, priority)
+        lane = self._lanes[priority]
+        with self._cond:
+            queue = lane.queues.get(owner)
+            if queue is None:
+                queue = lane.queues[owner] = collections.deque()
+                lane.owners.append(owner)
+            queue.append(ticket)
+            lane.depth += 1
+            self._cond.notify()
+
+        if ticket.event.wait(timeout):
+            return True
+
+        with self._cond:
+            if ticket.granted:
+                return True
+            # 超时撤销：放行前仍在队列中
+            queue = lane.queues.get(owner)
+            if queue is not None:
+                try:
+                    queue.remove(ticket)
+                    lane.depth -= 1
+                except ValueError:
+                    pass
+            lane.timeouts += 1
+        logger.warning("[rate-limiter] Acquire timeout after %.0fs: owner=%s, priority=%s",
+                       timeout, owner, PRIORITY_NAMES[priority])
+        return False
+
+    def report_rate_limited(self) -> float:
+        """飞书返回频率限制：暂停放行并加倍退避
+
+        Returns:
+            本次退避时长（秒），调用方据此决定是否重试
+        """
+        with self._cond:
+            now = time.time()
+            if now < self._backoff_until:
+                # 退避期间已放行的在途请求也可能被限流，不重复加倍
+                return self._backoff_until - now
+            self._backoff = min(max(self._backoff * 2, BACKOFF_INITIAL), BACKOFF_MAX)
+            self._backoff_until = now + self._backoff
+            # 桶清空，且从退避结束时刻起才开始补充：退避期间 elapsed 为负不加令牌，
+            # 结束后按 rate 匀速放行，不会一次补满 capacity 在刚被限流时突发
+            self._tokens = 0.0
+            self._last_refill = self._backoff_until
+            self._rate_limited += 1
+            backoff = self._backoff
+        logger.warning("[rate-limiter] Feishu rate limit hit, backing off %.1fs", backoff)
+        return backoff
+
+    def report_success(self) -> None:
+        """请求未被限流：复位退避时长"""
+        if self._backoff:
+            with self._cond:
+                if time.time() >= self._backoff_until:
+                    self._backoff = 0.0
+
+    def set_owner_weight(self, owner: str, weight: int) -> None:
+        """设置 owner 的轮询权重（每轮可连续放行的请求数，默认 1）"""
+        with self._cond:
+            if weight > 1:
+                self._weights[owner] = weight
+            else:
+                self._weights.pop(owner, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度器状态（用于 /status 端点）"""
+        with self._cond:
+            self._refill(time.time())
+            lanes = {}
+            for name, lane in zip(PRIORITY_NAMES, self._lanes):
+                lanes[name] = {
+                    'queue_depth': lane.depth,
+                    'queued_owners': len(lane.owners),
+                    'granted': lane.granted,
+                    'timeouts': lane.timeouts,
+                    'avg_wait_ms': round(lane.wait_total * 1000 / lane.granted, 1) if lane.granted else 0,
+                    'max_wait_ms': round(lane.wait_max * 1000, 1),
+                }
+            return {
+                'qps': self._rate,
+                'tokens': round(self._tokens, 1),
+                'rate_limited': self._rate_limited,
+                'backoff_remaining': round(max(0.0, self._backoff_until - time.time()), 1),
+                'lanes': lanes,
+            }
+
+    # =========================================================================
+    # 调度线程
+    # =========================================================================
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def _loop(self) -> None:
+        with self._cond:
+            while True:
+                if not any(lane.depth for lane in self._lanes):
+                    self._cond.wait()
+                    continue
+
+                now = time.time()
+                if now < self._backoff_until:
+                    self._cond.wait(self._backoff_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens < 1:
+                    self._cond.wait((1 - self._tokens) / self._rate)
+                    continue
+
+                ticket = self._pick()
+                if ticket is None:
+                    continue
+                self._tokens -= 1
+                ticket.granted = True
+
+                lane = self._lanes[ticket.priority]
+                waited = now - ticket.enqueued_at
+                lane.granted += 1
+                lane.wait_total += waited
+                if waited > lane.wait_max:
+                    lane.wait_max = waited
+                ticket.event.set()
+
+    def _pick(self) -> Optional[_Ticket]:
+        """按优先级取下一个放行的请求（持有 _cond 时调用）"""
+        for lane in self._lanes:
+            while lane.owners:
+                owner = lane.owners[0]
+                queue = lane.queues[owner]
+                if not queue:
+                    # 该 owner 的请求已全部超时撤销
+                    lane.owners.popleft()
+                    del lane.queues[owner]
+                    lane.served = 0
+                    continue
+
+                ticket = queue.popleft()
+                lane.depth -= 1
+                lane.served += 1
+                if not queue:
+                    lane.owners.popleft()
+                    del lane.queues[owner]
+                    lane.served = 0
+                elif lane.served >= self._weights.get(owner, 1):
+                    lane.owners.rotate(-1)
+                    lane.served = 0
+                return ticket
+        return None
@@ -6,14 +6,24 @@ Request Manager Service - 请求管理服务
     - 保存每个请求的 Socket 连接
     - 处理用户决策并通过 Socket 返回
     - 清理断开连接和超时的请求
+
+断开检测与超时（事件驱动，无周期性全量扫描）：
+    - 每个请求的 Socket 注册到 selectors（Linux 为 epoll）监听线程，
+      hook 进程退出 / 关闭连接时立即收到可读事件并标记 disconnected
+    - 超时、已结束请求的保留期由最小堆驱动，监听线程只在堆顶到期时醒来
+    - 清理开销与发生的事件数成正比，与 pending 请求总数无关
+    - selector 只由监听线程操作；其他线程通过命令队列 + 自唤醒 socketpair 通知
 """
 
+import heapq
 import json
 import logging
+import selectors
 import socket
 import threading
 import time
 import traceback
+from collections import deque
 from typing import Tuple, Optional
 
 from config import PERMISSION_REQUEST_TIMEOUT
@@ -30,6 +40,7 @@ class RequestManager:
 
     # 请求状态常量
     STATUS_PENDING = 'pending'          # 等待用户响应
+    STATUS_SENDING = 'sending'          # 正在发送决策（锁外 I/O 中）
     STATUS_RESOLVED = 'resolved'        # 已处理（用户已决策）
     STATUS_DISCONNECTED = 'disconnected' # 连接已断开
 
@@ -39,12 +50,24 @@ class RequestManager:
     ERR_DISCONNECTED = 'disconnected'   # 连接已断开
     ERR_UNKNOWN = 'unknown'             # 未知错误
 
+    # 已结束请求在内存中的保留时间（秒，供调试 / 重复点击提示）
+    FINISHED_RETENTION = 60
+    # 超时回退响应的发送超时（秒）
+    FALLBACK_SEND_TIMEOUT = 5
+    # 决策响应的发送超时（秒）：hook 进程缓冲区满 / 卡住时不无限等待
+    RESOLVE_SEND_TIMEOUT = 10
+
+    # 定时器类型
+    _TIMER_TIMEOUT = 'timeout'
+    _TIMER_PURGE = 'purge'
+
     @classmethod
     def initialize(cls):
-        """初始化单例实例"""
+        """初始化单例实例（同时启动连接监听线程）"""
         with cls._singleton_lock:
             if cls._instance is None:
                 cls._instance = cls()
+                cls._instance._start_watcher()
                 logger.info("RequestManager initialized")
             return cls._instance
 
@@ -53,9 +76,21 @@ class RequestManager:
         """获取单例实例"""
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, request_timeout: int = PERMISSION_REQUEST_TIMEOUT):
         self._requests = {}  # request_id -> {conn, data, timestamp, status, resolved_decision}
         self._lock = threading.Lock()
+        self._request_timeout = request_timeout
+
+        # 监听线程状态：selector / 定时器堆只在监听线程内访问
+        self._selector = selectors.DefaultSelector()
+        self._timers = []  # [(deadline, seq, kind, request_id)]
+        self._timer_seq = 0
+        # 其他线程 → 监听线程的命令队列（deque 的 append / popleft 线程安全）
+        self._commands = deque()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._watcher_thread = None  # type: Optional[threading.Thread]
 
     def register(self, request_id: str, conn: socket.socket, data: dict):
         """注册新的权限请求
@@ -66,6 +101,7 @@ class RequestManager:
             data: 请求数据（包含 session_id, tool_name, tool_input, project_dir 等）
         """
         with self._lock:
+            old = self._requests.get(request_id)
             self._requests[request_id] = {
                 'conn': conn,
                 'data': data,
@@ -75,6 +111,10 @@ class RequestManager:
             }
             session_id = data.get('session_id', 'unknown')
             logger.info(f"Registered request: {request_id}, Session: {session_id}")
+        if old and old['conn'] is not conn:
+            # 同一 request_id 重复注册（hook 重试）：旧连接不再可达
+            self._post('close', request_id, old['conn'])
+        self._post('watch', request_id, conn)
 
     def _close_connection(self, conn: socket.socket):
         """安全关闭 socket 连接"""
@@ -95,9 +135,11 @@ class RequestManager:
             错误码: '' / ERR_NOT_FOUND / ERR_ALREADY_RESOLVED / ERR_DISCONNECTED
 
         处理流程：
-            1. 检查请求是否存在且状态有效
-            2. 通过 Socket 连接发送决策给 permission-notify.sh
-            3. 标记请求为已解决并关闭连接
+            1. 全局锁内检查状态并原子切换 pending → sending（即本请求的独占标记，
+               并发的重复点击 / 超时 / 断开处理看到 sending 都不会再动这个连接）
+            2. 锁外通过 Socket 发送决策给 permission-notify.sh（发送超时 RESOLVE_SEND_TIMEOUT），
+               慢速 / 缓冲区满的 hook 进程只阻塞自己这一次 resolve
+            3. 锁内切换 sending → resolved / disconnected（连接由客户端关闭，监听线程随后回收）
         """
         from models.decision import Decision
 
@@ -117,18 +159,15 @@ class RequestManager:
                 logger.info(f"[resolve] Already resolved: {resolved_type}")
                 return False, self.ERR_ALREADY_RESOLVED, f"请求已被{resolved_type}，请勿重复操作"
 
+            if req['status'] == self.STATUS_SENDING:
+                logger.info(f"[resolve] Already sending")
+                return False, self.ERR_ALREADY_RESOLVED, "请求正在处理中，请勿重复操作"
+
             if req['status'] == self.STATUS_DISCONNECTED:
                 logger.info(f"[resolve] Already disconnected")
                 return False, self.ERR_DISCONNECTED, "连接已断开，Claude 可能已继续执行其他操作"
 
-            # 发送决策给等待的进程
             try:
-                conn = req['conn']
-                logger.debug(f"[resolve] Checking socket connection (fileno={conn.fileno()})")
-
-                # 确保连接处于阻塞模式
-                conn.settimeout(None)
-
                 response = json.dumps({
                     'success': True,
                     'decision': decision,
@@ -137,36 +176,53 @@ class RequestManager:
                     'tool_input': req['data'].get('tool_input'),
                     'project_dir': req['data'].get('project_dir')
                 })
-                response_bytes = response.encode('utf-8')
-                logger.info(f"[resolve] Sending {len(response_bytes)} bytes to socket (fileno={conn.fileno()})...")
+            except Exception as e:
+                logger.error(f"[resolve] Failed to encode decision: {type(e).__name__}: {e}")
+                return False, self.ERR_UNKNOWN, f"发送决策失败: {str(e)}"
+
+            req['status'] = self.STATUS_SENDING
+            conn = req['conn']
+
+        # 发送决策给等待的进程（锁外）
+        error = None
+        try:
+            response_bytes = response.encode('utf-8')
+            logger.info(f"[resolve] Sending {len(response_bytes)} bytes to socket (fileno={conn.fileno()})...")
 
-                # 使用长度前缀协议：4 字节长度 + 数据
-                length_prefix = len(response_bytes).to_bytes(4, 'big')
-                total_data = length_prefix + response_bytes
-                logger.debug(f"[resolve] Total data size: {len(total_data)} bytes (4 header + {len(response_bytes)} payload)")
+            # 使用长度前缀协议：4 字节长度 + 数据
+            length_prefix = len(response_bytes).to_bytes(4, 'big')
+            total_data = length_prefix + response_bytes
+            logger.debug(f"[resolve] Total data size: {len(total_data)} bytes (4 header + {len(response_bytes)} payload)")
 
-                conn.sendall(total_data)
-                logger.info(f"[resolve] Data sent successfully")
+            # 有界发送：超时视为对端异常（socket.timeout 属于 OSError）
+            conn.settimeout(self.RESOLVE_SEND_TIMEOUT)
+            conn.sendall(total_data)
+            logger.info(f"[resolve] Data sent successfully")
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            error = e
+        except Exception as e:
+            # 可能已写出部分数据，客户端无法再解析，按断开处理
+            logger.error(f"[resolve] Traceback:\n{traceback.format_exc()}")
+            error = e
 
+        with self._lock:
+            req['finished_at'] = time.time()
+            self._post('finished', request_id, conn)
+            if error is None:
                 # 成功：标记为已解决（不关闭连接，让客户端关闭）
                 behavior = decision.get(Decision.FIELD_BEHAVIOR, 'unknown')
                 req['status'] = self.STATUS_RESOLVED
                 req['resolved_decision'] = '批准' if behavior == Decision.ALLOW else '拒绝'
-                session_id = req['data'].get('session_id', 'unknown')
+                if req.get('peer_closed'):
+                    self._post('close', request_id, conn)
                 logger.info(f"[resolve] Request {request_id} (Session: {session_id}) resolved: {behavior}")
                 return True, '', ''
 
-            except (BrokenPipeError, ConnectionResetError, OSError) as e:
-                error_type = type(e).__name__
-                logger.error(f"[resolve] {error_type} for {request_id}: {e}")
-                req['status'] = self.STATUS_DISCONNECTED
-                self._close_connection(req['conn'])
-                return False, self.ERR_DISCONNECTED, f"连接已断开（{error_type}），Claude 可能已超时或取消"
-
-            except Exception as e:
-                logger.error(f"[resolve] Unexpected error: {type(e).__name__}: {e}")
-                logger.error(f"[resolve] Traceback:\n{traceback.format_exc()}")
-                return False, self.ERR_UNKNOWN, f"发送决策失败: {str(e)}"
+            error_type = type(error).__name__
+            logger.error(f"[resolve] {error_type} for {request_id}: {error}")
+            req['status'] = self.STATUS_DISCONNECTED
+            self._post('close', request_id, conn)
+            return False, self.ERR_DISCONNECTED, f"连接已断开（{error_type}），Claude 可能已超时或取消"
 
     def get_request_data(self, request_id: str) -> Optional[dict]:
         """获取请求数据（用于始终允许时写入规则）"""
@@ -179,7 +235,7 @@ class RequestManager:
         """获取请求状态
 
         Returns:
-            请求状态 (STATUS_PENDING/STATUS_RESOLVED/STATUS_DISCONNECTED)，
+            请求状态 (STATUS_PENDING/STATUS_SENDING/STATUS_RESOLVED/STATUS_DISCONNECTED)，
             如果请求不存在返回 None
         """
         with self._lock:
@@ -188,7 +244,10 @@ class RequestManager:
             return None
 
     def _send_fallback_response(self, request_id: str, req: dict, conn, age: float):
-        """发送"回退终端"响应，让 Claude 回退到终端交互模式"""
+        """发送"回退终端"响应，让 Claude 回退到终端交互模式
+
+        调用方已在锁内把状态切到 disconnected；此处在锁外发送，连接由调用方关闭。
+        """
         session_id = req['data'].get('session_id', 'unknown')
         try:
             response = json.dumps({
@@ -202,78 +261,164 @@ class RequestManager:
             length_prefix = len(response_bytes).to_bytes(4, 'big')
             total_data = length_prefix + response_bytes
 
-            conn.settimeout(5)  # 设置发送超时
+            conn.settimeout(self.FALLBACK_SEND_TIMEOUT)  # 设置发送超时
             conn.sendall(total_data)
             logger.info(f"Sent fallback response to {request_id} (Session: {session_id}, age={age:.0f}s)")
         except Exception as e:
             logger.warning(f"Failed to send fallback response to {request_id}: {e}")
-        finally:
-            req['status'] = self.STATUS_DISCONNECTED
-            self._close_connection(conn)
 
-    def _is_connection_alive(self, conn) -> bool:
-        """检测 socket 连接是否仍然存活"""
+    # =========================================================================
+    # 连接监听线程（selectors + 定时器最小堆）
+    # =========================================================================
+
+    def _start_watcher(self):
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self._watcher_thread = threading.Thread(
+            target=self._watch_loop, name='request-watcher', daemon=True)
+        self._watcher_thread.start()
+
+    def _post(self, *command):
+        """向监听线程投递命令并唤醒它"""
+        self._commands.append(command)
         try:
-            # 检查 socket 是否有效
-            if conn.fileno() == -1:
-                return False
-            # 使用非阻塞 peek 检测连接状态
-            conn.setblocking(False)
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass  # 缓冲区已满说明已有未处理的唤醒
+        except OSError as e:
+            logger.warning(f"[watcher] Failed to wake up watcher: {e}")
+
+    def _push_timer(self, deadline: float, kind: str, request_id: str):
+        self._timer_seq += 1
+        heapq.heappush(self._timers, (deadline, self._timer_seq, kind, request_id))
+
+    def _watch_loop(self):
+        while True:
             try:
-                # MSG_PEEK 不会消费数据，只是查看
-                data = conn.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
-                # 如果返回空，说明对方已关闭连接
-                if data == b'':
-                    return False
-            except BlockingIOError:
-                # 没有数据可读，但连接仍然存活
-                pass
-            except (ConnectionResetError, BrokenPipeError, OSError):
-                return False
-            finally:
-                conn.setblocking(True)
-            return True
-        except Exception:
-            return False
+                timeout = None
+                if self._timers:
+                    timeout = max(0.0, self._timers[0][0] - time.time())
+                events = self._selector.select(timeout)
+                for key, _ in events:
+                    if key.fileobj is self._wakeup_r:
+                        self._drain_wakeup()
+                        self._run_commands()
+                    else:
+                        self._on_readable(key.data, key.fileobj)
+                self._run_timers()
+            except Exception as e:
+                logger.error(f"[watcher] Loop error: {type(e).__name__}: {e}")
+                logger.error(f"[watcher] Traceback:\n{traceback.format_exc()}")
+                time.sleep(0.1)
 
-    def cleanup_disconnected(self, max_age: int = None):
-        """清理长时间未处理的请求和断开的连接
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
 
-        功能：
-            - 检测并清理已断开的 Socket 连接
-            - 超时请求发送"回退终端"响应
+    def _run_commands(self):
+        while self._commands:
+            op, request_id, conn = self._commands.popleft()
+            if op == 'watch':
+                try:
+                    self._selector.register(conn, selectors.EVENT_READ, request_id)
+                except (KeyError, ValueError, OSError) as e:
+                    # 已关闭（fileno=-1）或重复注册：按断开处理
+                    logger.debug(f"[watcher] Cannot watch {request_id}: {e}")
+                    self._on_peer_closed(request_id, conn)
+                    continue
+                self._push_timer(time.time() + self._request_timeout, self._TIMER_TIMEOUT, request_id)
+            elif op == 'finished':
+                self._push_timer(time.time() + self.FINISHED_RETENTION, self._TIMER_PURGE, request_id)
+            elif op == 'close':
+                self._release(conn)
+
+    def _release(self, conn):
+        """停止监听并关闭连接（仅监听线程调用）"""
+        try:
+            self._selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        self._close_connection(conn)
 
-        Args:
-            max_age: 超时秒数（正整数），None 表示使用 PERMISSION_REQUEST_TIMEOUT 配置
-        """
-        if not max_age or max_age <= 0:
-            max_age = PERMISSION_REQUEST_TIMEOUT
+    def _on_readable(self, request_id: str, conn):
+        """pending / resolved 连接可读：对端关闭或发来了多余数据"""
+        try:
+            data = conn.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if data:
+            # 协议上 hook 注册后不再发送数据；丢弃，避免持续可读导致空转
+            try:
+                conn.recv(4096, socket.MSG_DONTWAIT)
+            except OSError:
+                pass
+            return
+        self._on_peer_closed(request_id, conn)
 
+    def _on_peer_closed(self, request_id: str, conn):
         with self._lock:
-            now = time.time()
-            for rid, req in list(self._requests.items()):
-                if req['status'] == self.STATUS_PENDING:
-                    age = now - req['timestamp']
-                    conn = req['conn']
-
-                    # 检查连接是否已断开
-                    if not self._is_connection_alive(conn):
-                        session_id = req['data'].get('session_id', 'unknown')
-                        req['status'] = self.STATUS_DISCONNECTED
-                        self._close_connection(conn)
-                        logger.info(f"Cleaned up dead connection: {rid} (Session: {session_id}, age={age:.0f}s)")
-                        continue
-
-                    # 检查是否超时
-                    if age > max_age:
-                        # 发送"回退终端"响应，而不是直接关闭连接
-                        self._send_fallback_response(rid, req, conn, age)
-
-                # 已处理或已断开的请求，从内存中移除
-                elif req['status'] in (self.STATUS_RESOLVED, self.STATUS_DISCONNECTED):
-                    if now - req['timestamp'] > 60:  # 保留 60 秒供调试
-                        del self._requests[rid]
-                        logger.debug(f"Removed old request: {rid}")
+            req = self._requests.get(request_id)
+            if req and req['conn'] is conn and req['status'] == self.STATUS_SENDING:
+                # resolve 正在锁外使用该连接：只停止监听，关闭交给 resolve 收尾
+                req['peer_closed'] = True
+                try:
+                    self._selector.unregister(conn)
+                except (KeyError, ValueError):
+                    pass
+                return
+            if req and req['conn'] is conn and req['status'] == self.STATUS_PENDING:
+                req['status'] = self.STATUS_DISCONNECTED
+                req['finished_at'] = time.time()
+                age = req['finished_at'] - req['timestamp']
+                session_id = req['data'].get('session_id', 'unknown')
+                logger.info(f"Cleaned up dead connection: {request_id} (Session: {session_id}, age={age:.0f}s)")
+                self._push_timer(req['finished_at'] + self.FINISHED_RETENTION,
+                                 self._TIMER_PURGE, request_id)
+            self._release(conn)
+
+    def _run_timers(self):
+        now = time.time()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, kind, request_id = heapq.heappop(self._timers)
+            if kind == self._TIMER_TIMEOUT:
+                self._on_timeout(request_id, now)
+            else:
+                self._on_purge(request_id, now)
+
+    def _on_timeout(self, request_id: str, now: float):
+        with self._lock:
+            req = self._requests.get(request_id)
+            if not req or req['status'] != self.STATUS_PENDING:
+                return
+            age = now - req['timestamp']
+            if age < self._request_timeout:
+                return  # 同 id 重新注册，旧定时器作废（新定时器已入堆）
+            # 先切状态再在锁外发送：此后 resolve 会直接返回 disconnected
+            req['status'] = self.STATUS_DISCONNECTED
+            req['finished_at'] = now
+            conn = req['conn']
+        self._send_fallback_response(request_id, req, conn, age)
+        self._release(conn)
+        self._push_timer(now + self.FINISHED_RETENTION, self._TIMER_PURGE, request_id)
+
+    def _on_purge(self, request_id: str, now: float):
+        conn = None
+        with self._lock:
+            req = self._requests.get(request_id)
+            if not req or req['status'] in (self.STATUS_PENDING, self.STATUS_SENDING):
+                return
+            if now - req.get('finished_at', req['timestamp']) < self.FINISHED_RETENTION:
+                return
+            del self._requests[request_id]
+            if req['status'] == self.STATUS_RESOLVED:
+                conn = req['conn']  # 客户端一直未关闭的已决策连接
+            logger.debug(f"Removed old request: {request_id}")
+        if conn is not None:
+            self._release(conn)
 
     def get_stats(self) -> dict:
         """获取当前请求统计信息"""
@@ -281,6 +426,7 @@ class RequestManager:
             now = time.time()
             stats = {
                 'pending': 0,
+                'sending': 0,
                 'resolved': 0,
                 'disconnected': 0,
                 'requests': {}
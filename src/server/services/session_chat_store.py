@@ -24,15 +24,27 @@ dissolved 标记：与 muted 同构的独立布尔字段，默认不存在。
 过期策略：统一 SESSION_EXPIRE_DAYS（默认 30 天），不区分 group/非 group。
 gateway 转发 /cb/claude/continue 时 callback 校验 session 是否存在，
 已过期则返回错误，gateway 告知用户 /new。
+
+内存索引（启动时从存储构建，之后随各写操作增量维护；本 store 是唯一写入方）：
+    - chat_id → {session_id}：mark_dissolved 只读取引用该群的 session
+    - 有序 session_id 数组：find_by_prefix 二分定位前缀区间
+    两者均为 O(log N + k)，不随 30 天累积的 session 数增长而全量扫描。
+
+写缓冲（SESSION_STORE_FLUSH_INTERVAL > 0，默认 1 秒）：
+    一轮对话会依次触发 set_skip_next_user_prompt / check_and_clear_skip_user_prompt /
+    set_last_message_id / save 等多次小写入。变更先写内存立即生效，由后台线程
+    按间隔或脏条目数阈值合并为一次落盘（见 storage_backend.WriteBehindBackend）。
+    需要持久化保证的调用方使用 flush()；服务退出时 close() 做最后一次落盘。
+    进程崩溃时磁盘上为最近一次批量写入的完整状态，最多丢失一个间隔内的变更。
 """
 
-import json
+import bisect
 import logging
-import os
-import tempfile
 import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
+
+from services.storage_backend import open_backend
 
 logger = logging.getLogger(__name__)
 
@@ -63,18 +75,35 @@ class SessionChatStore:
     # 默认过期时间（秒），由 config.SESSION_EXPIRE_DAYS 覆盖
     _expire_seconds: int = 30 * 24 * 3600
 
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, flush_interval: int = 0, flush_max_dirty: int = 100):
         self._data_dir = data_dir
-        self._file_path = os.path.join(data_dir, 'session_chats.json')
         self._file_lock = threading.Lock()
-        os.makedirs(data_dir, exist_ok=True)
-        logger.info("[session-chat-store] Initialized with data_dir=%s", data_dir)
+        self._backend = open_backend(data_dir, 'session_chats', ts_field='updated_at',
+                                     log_tag='session-chat-store',
+                                     flush_interval=flush_interval, max_dirty=flush_max_dirty)
+
+        # 内存索引（受 _file_lock 保护）
+        self._chat_index: Dict[str, Set[str]] = {}
+        self._sorted_ids: List[str] = []
+        self._rebuild_index()
+        logger.info("[session-chat-store] Initialized with data_dir=%s, backend=%s, sessions=%d, "
+                    "flush_interval=%ss", data_dir, self._backend.kind, len(self._sorted_ids),
+                    flush_interval)
 
     @classmethod
-    def initialize(cls, data_dir: str, expire_seconds: Optional[int] = None) -> 'SessionChatStore':
+    def initialize(cls, data_dir: str, expire_seconds: Optional[int] = None,
+                   flush_interval: int = 0, flush_max_dirty: int = 100) -> 'SessionChatStore':
+        """初始化单例实例
+
+        Args:
+            data_dir: 数据存储目录
+            expire_seconds: session 过期秒数（覆盖默认 30 天）
+            flush_interval: 写缓冲批量落盘间隔（秒），0 表示每次变更同步写入
+            flush_max_dirty: 写缓冲脏条目达到该数量时提前落盘
+        """
         with cls._lock:
             if cls._instance is None:
-                cls._instance = cls(data_dir)
+                cls._instance = cls(data_dir, flush_interval, flush_max_dirty)
             if expire_seconds is not None:
                 cls._instance._expire_seconds = expire_seconds
             return cls._instance
@@ -102,10 +131,9 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                old = data.get(session_id, {})
-                old_chat_id = old.get('chat_id', '')
-                entry = dict(old)
+                old = self._backend.get(session_id)
+                old_chat_id = old.get('chat_id', '') if old else ''
+                entry = dict(old or {})
 
                 if chat_id:
                     entry['chat_id'] = chat_id
@@ -120,9 +148,10 @@ class SessionChatStore:
                 if chat_id and old_chat_id and old_chat_id != chat_id:
                     entry.pop('last_message_id', None)
 
-                data[session_id] = entry
-                result = self._save(data)
+                result = self._backend.put(session_id, entry)
                 if result:
+                    self._index_put(session_id, None if old is None else old_chat_id,
+                                    entry.get('chat_id', ''))
                     logger.info("[session-chat-store] Saved mapping: %s -> %s",
                                 session_id, chat_id or '(unchanged)')
                 return result
@@ -137,17 +166,16 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
 
                 if not item:
                     item = {
                         'last_message_id': message_id,
                         'updated_at': int(time.time())
                     }
-                    data[session_id] = item
-                    result = self._save(data)
+                    result = self._backend.put(session_id, item)
                     if result:
+                        self._index_put(session_id, None, '')
                         logger.info("[session-chat-store] Created session with last_message_id: %s -> %s",
                                     session_id, message_id)
                     return result
@@ -159,8 +187,7 @@ class SessionChatStore:
 
                 item['last_message_id'] = message_id
                 item['updated_at'] = int(time.time())
-                data[session_id] = item
-                result = self._save(data)
+                result = self._backend.put(session_id, item)
                 if result:
                     logger.info("[session-chat-store] Updated last_message_id: %s -> %s",
                                 session_id, message_id)
@@ -177,9 +204,9 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
-                if not item:
+                item = self._backend.get(session_id)
+                created = not item
+                if created:
                     item = {
                         'skip_next_user_prompt': True,
                         'updated_at': int(time.time())
@@ -187,9 +214,10 @@ class SessionChatStore:
                 else:
                     item['skip_next_user_prompt'] = True
                     item['updated_at'] = int(time.time())
-                data[session_id] = item
-                result = self._save(data)
+                result = self._backend.put(session_id, item)
                 if result:
+                    if created:
+                        self._index_put(session_id, None, '')
                     logger.info("[session-chat-store] Set skip_next_user_prompt: %s", session_id)
                 return result
             except Exception as e:
@@ -204,16 +232,14 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
                 if not item:
                     return False
                 skip = item.get('skip_next_user_prompt', False)
                 if skip:
                     del item['skip_next_user_prompt']
                     item['updated_at'] = int(time.time())
-                    data[session_id] = item
-                    self._save(data)
+                    self._backend.put(session_id, item)
                     logger.info("[session-chat-store] Cleared skip_next_user_prompt: %s", session_id)
                 return skip
             except Exception as e:
@@ -242,16 +268,19 @@ class SessionChatStore:
             return []
         with self._file_lock:
             try:
-                data = self._load()
-                marked = []
-                for sid, entry in data.items():
+                candidates = self._chat_index.get(chat_id)
+                if not candidates:
+                    return []
+                changed = {}
+                for sid, entry in self._backend.get_many(candidates).items():
                     if entry.get('chat_id') == chat_id and not entry.get('dissolved'):
                         entry['dissolved'] = True
-                        marked.append(sid)
-                if not marked:
+                        changed[sid] = entry
+                if not changed:
                     return []
-                if not self._save(data):
+                if not self._backend.put_many(changed):
                     return []
+                marked = list(changed)
                 logger.info("[session-chat-store] Marked %d sessions dissolved for chat=%s: %s",
                             len(marked), chat_id, marked)
                 return marked
@@ -272,12 +301,12 @@ class SessionChatStore:
             return False
         with self._file_lock:
             try:
-                data = self._load()
-                if session_id not in data:
+                item = self._backend.get(session_id)
+                if item is None:
                     return False
-                del data[session_id]
-                if not self._save(data):
+                if not self._backend.delete(session_id):
                     return False
+                self._index_remove(session_id, item.get('chat_id', ''))
                 logger.info("[session-chat-store] Deleted: %s", session_id)
                 return True
             except Exception as e:
@@ -301,16 +330,14 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
                 if not item:
                     logger.warning("[session-chat-store] mute_session: session not found: %s", session_id)
                     return None
                 if item.get('muted'):
                     return False
                 item['muted'] = True
-                data[session_id] = item
-                if not self._save(data):
+                if not self._backend.put(session_id, item):
                     return None
                 logger.info("[session-chat-store] Muted: %s", session_id)
                 return True
@@ -329,16 +356,14 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
                 if not item:
                     logger.warning("[session-chat-store] unmute_session: session not found: %s", session_id)
                     return None
                 if not item.get('muted'):
                     return False
                 del item['muted']
-                data[session_id] = item
-                if not self._save(data):
+                if not self._backend.put(session_id, item):
                     return None
                 logger.info("[session-chat-store] Unmuted: %s", session_id)
                 return True
@@ -357,8 +382,7 @@ class SessionChatStore:
             return False
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
                 if not item:
                     return False
                 return bool(item.get('muted'))
@@ -379,16 +403,15 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                item = data.get(session_id)
+                item = self._backend.get(session_id)
                 if not item:
                     return None
                 if not include_dissolved and item.get('dissolved'):
                     return None
                 if time.time() - item.get('updated_at', 0) > self._expire_seconds:
                     logger.info("[session-chat-store] Mapping expired: %s", session_id)
-                    del data[session_id]
-                    self._save(data)
+                    if self._backend.delete(session_id):
+                        self._index_remove(session_id, item.get('chat_id', ''))
                     return None
                 return dict(item)
             except Exception as e:
@@ -415,23 +438,26 @@ class SessionChatStore:
     def get_all(self) -> Dict[str, Dict[str, Any]]:
         """返回所有 session 的浅拷贝（不做过滤）"""
         with self._file_lock:
-            data = self._load()
-        return {sid: dict(item) for sid, item in data.items()}
+            return self._backend.load_all()
 
     def find_by_prefix(self, prefix: str) -> Dict[str, Dict[str, Any]]:
         """按 session_id 前缀查找（含 dissolved 用于 attach 复活）
 
+        在有序 session_id 数组上二分定位 [prefix, prefix + U+10FFFF) 区间。
         不过滤过期——调用方按需处理。
         """
         if not prefix:
             return {}
         try:
             with self._file_lock:
-                data = self._load()
+                lo = bisect.bisect_left(self._sorted_ids, prefix)
+                hi = bisect.bisect_left(self._sorted_ids, prefix + '\U0010ffff', lo)
+                if lo == hi:
+                    return {}
+                return self._backend.get_many(self._sorted_ids[lo:hi])
         except Exception as e:
             logger.error("[session-chat-store] Failed to load in find_by_prefix: %s", e)
             return {}
-        return {sid: dict(item) for sid, item in data.items() if sid.startswith(prefix)}
 
     # =========================================================================
     # 维护
@@ -447,47 +473,80 @@ class SessionChatStore:
         """
         with self._file_lock:
             try:
-                data = self._load()
-                now = time.time()
-                expired = [
-                    sid for sid, item in data.items()
-                    if now - item.get('updated_at', 0) > self._expire_seconds
-                ]
+                expired = self._backend.expired_keys(time.time() - self._expire_seconds)
                 if expired:
-                    for sid in expired:
-                        del data[sid]
-                    if self._save(data):
+                    expired_chat_ids = {sid: entry.get('chat_id', '')
+                                        for sid, entry in self._backend.get_many(expired).items()}
+                    if self._backend.delete_many(expired):
+                        for sid, chat_id in expired_chat_ids.items():
+                            self._index_remove(sid, chat_id)
                         logger.info("[session-chat-store] Cleaned %d expired mappings", len(expired))
                 return len(expired)
             except Exception as e:
                 logger.error("[session-chat-store] Failed to cleanup: %s", e)
                 return 0
 
+    def flush(self, sync: bool = True) -> bool:
+        """持久化屏障：把写缓冲中的变更立即落盘
+
+        Args:
+            sync: 是否 fsync（默认 True，返回时数据已落到磁盘）
+
+        Returns:
+            是否成功；未启用写缓冲时只做 fsync
+        """
+        if hasattr(self._backend, 'flush'):
+            return self._backend.flush(sync=sync)
+        return self._backend.sync() if sync else True
+
+    def close(self) -> None:
+        """停止后台落盘线程并做最后一次落盘（服务退出时调用）"""
+        self._backend.close()
+
     # =========================================================================
-    # 底层 I/O
+    # 内存索引（调用方需持有 _file_lock）
     # =========================================================================
 
-    def _load(self) -> Dict[str, Any]:
-        if not os.path.exists(self._file_path):
-            return {}
-        try:
-            with open(self._file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("[session-chat-store] Invalid JSON in %s, starting fresh",
-                           self._file_path)
-            return {}
-        except IOError as e:
-            logger.error("[session-chat-store] Failed to load: %s", e)
-            return {}
+    def _rebuild_index(self) -> None:
+        """从存储全量构建 chat_id 反向索引与有序 session_id 数组"""
+        chat_index: Dict[str, Set[str]] = {}
+        data = self._backend.load_all()
+        for sid, entry in data.items():
+            chat_id = entry.get('chat_id', '')
+            if chat_id:
+                chat_index.setdefault(chat_id, set()).add(sid)
+        self._chat_index = chat_index
+        self._sorted_ids = sorted(data)
 
-    def _save(self, data: Dict[str, Any]) -> bool:
-        try:
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self._file_path)
-            return True
-        except (IOError, OSError) as e:
-            logger.error("[session-chat-store] Failed to save: %s", e)
-            return False
+    def _index_put(self, session_id: str, old_chat_id: Optional[str], new_chat_id: str) -> None:
+        """写入后同步索引
+
+        Args:
+            session_id: 会话 ID
+            old_chat_id: 写入前的 chat_id；None 表示此前不存在该 session
+            new_chat_id: 写入后的 chat_id
+        """
+        if old_chat_id is None:
+            i = bisect.bisect_left(self._sorted_ids, session_id)
+            if i == len(self._sorted_ids) or self._sorted_ids[i] != session_id:
+                self._sorted_ids.insert(i, session_id)
+        elif old_chat_id != new_chat_id:
+            self._discard_chat_ref(old_chat_id, session_id)
+        if new_chat_id:
+            self._chat_index.setdefault(new_chat_id, set()).add(session_id)
+
+    def _index_remove(self, session_id: str, chat_id: str) -> None:
+        """删除后同步索引"""
+        i = bisect.bisect_left(self._sorted_ids, session_id)
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == session_id:
+            del self._sorted_ids[i]
+        self._discard_chat_ref(chat_id, session_id)
+
+    def _discard_chat_ref(self, chat_id: str, session_id: str) -> None:
+        if not chat_id:
+            return
+        sids = self._chat_index.get(chat_id)
+        if sids is not None:
+            sids.discard(session_id)
+            if not sids:
+                del self._chat_index[chat_id]
@@ -0,0 +1,851 @@
+"""Runtime 持久化存储后端
+
+归属端: 飞书网关 / Callback 后端（各 store 共用）
+使用方: SessionChatStore, BindingStore, GroupChatStore, GroupSessionStore,
+        DirHistoryStore, MessageSessionStore, TelemetryStore
+
+统一各 store 原先各自复制的 _load() / _save()。数据模型为"顶层 key → JSON 值"
+的文档表，store 只按 key 读写，不关心落盘格式。
+
+后端选择（配置项 STORAGE_BACKEND）：
+    - json（默认）: runtime/<name>.json，每次写入整文件原子重写
+      （mkstemp + os.replace），适合小规模部署，文件可直接查看/手改
+    - sqlite: runtime/storage.db（WAL 模式），每个 store 一张表
+      (k TEXT PRIMARY KEY, v TEXT, ts INTEGER)，ts 列带索引。
+      点查、per-owner 读写（owner_id 为顶层 key 的 store）、前缀查询、
+      过期清理均为索引查询，不再整文件解析
+
+迁移：
+    sqlite 后端首次打开某张空表时，若存在对应的 JSON 文件（及 journal），
+    一次性导入，成功后重命名为 <file>.migrated 保留备份；之后不再读取。
+
+journal 模式（仅 json 后端，open_backend(journal=True)）：
+    内存 dict 为读源，变更追加到 <name>.journal（JSONL），后台定期压缩为
+    <name>.json 快照。用于写入频繁、条目多的 store（MessageSessionStore）。
+
+write-behind 模式（open_backend(flush_interval>0)，任意后端）：
+    内存 dict 为读源，变更由后台线程按间隔 / 脏 key 数批量写入底层后端，
+    flush(sync=True) 为持久化屏障。用于一次对话触发多次小写入的 store（SessionChatStore）。
+"""
+
+import copy
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import sqlite3
+except ImportError:  # 极少数精简构建的 Python 不带 _sqlite3
+    sqlite3 = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_JSON = 'json'
+BACKEND_SQLITE = 'sqlite'
+
+# sqlite 后端的数据库文件名（位于 data_dir 下，所有 store 共用）
+SQLITE_FILE_NAME = 'storage.db'
+
+# 表名即 store 名，仅允许小写字母、数字、下划线（拼进 SQL）
+_TABLE_NAME_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+def _read_json_file(path: str, log_tag: str) -> Dict[str, Any]:
+    """读取整份 JSON 文件；不存在 / 损坏返回空 dict"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data
+        logger.warning("[%s] Invalid data format in %s, starting fresh", log_tag, path)
+        return {}
+    except json.JSONDecodeError:
+        logger.warning("[%s] Invalid JSON in %s, starting fresh", log_tag, path)
+        return {}
+    except (IOError, OSError) as e:
+        logger.error("[%s] Failed to load: %s", log_tag, e)
+        return {}
+
+
+def _write_json_file(path: str, data: Dict[str, Any], log_tag: str,
+                     indent: Optional[int] = 2) -> bool:
+    """原子写入整份 JSON 文件"""
+    tmp_path = None
+    try:
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            if indent is None:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+        return True
+    except (IOError, OSError) as e:
+        logger.error("[%s] Failed to save: %s", log_tag, e)
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        return False
+
+
+def _fsync_path(path: str, log_tag: str) -> bool:
+    """fsync 文件及其所在目录（保证 os.replace 后的目录项也已落盘）；文件不存在视为成功"""
+    try:
+        if os.path.exists(path):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return True
+    except OSError as e:
+        logger.error("[%s] Failed to fsync %s: %s", log_tag, path, e)
+        return False
+
+
+def _replay_journal_file(path: str, data: Dict[str, Any], log_tag: str) -> int:
+    """按顺序把 journal 重放到 data
+
+    末行不完整（写到一半时崩溃）会补换行并跳过，避免后续追加与残行拼接。
+
+    Returns:
+        有效行数
+    """
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    with open(path, 'ab') as fix:
+                        fix.write(b'\n')
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    logger.warning("[%s] Skipped corrupt journal line", log_tag)
+                    continue
+                key = record.get('k')
+                if record.get('op') == 'put' and key:
+                    data[key] = record.get('v')
+                elif record.get('op') == 'del' and key:
+                    data.pop(key, None)
+                count += 1
+    except (IOError, OSError) as e:
+        logger.error("[%s] Failed to replay journal: %s", log_tag, e)
+    return count
+
+
+class StorageBackend(object):
+    """存储后端接口：顶层 key → JSON 值
+
+    ts_field: value 中用于过期判断的时间戳字段（如 updated_at），
+    由 expired_keys 使用；None 表示该 store 不按 key 过期。
+
+    所有写接口返回 bool 表示是否持久化成功；读接口失败时返回空结果并记录日志，
+    与原先各 store 的 _load() 语义一致。
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, ts_field: Optional[str] = None,
+                 log_tag: Optional[str] = None):
+        self.name = name
+        self._ts_field = ts_field
+        self._log_tag = log_tag or name
+
+    def _ts_of(self, value: Any) -> Optional[int]:
+        if not self._ts_field or not isinstance(value, dict):
+            return None
+        try:
+            return int(value.get(self._ts_field) or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def load_all(self) -> Dict[str, Any]:
+        """返回全部数据（调用方可自由修改返回值）"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Any]:
+        """按 key 读取；不存在返回 None"""
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """批量按 key 读取，只返回存在的 key"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        data = self.load_all()
+        return {k: data[k] for k in keys if k in data}
+
+    def write_batch(self, puts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[Iterable[str]] = None) -> bool:
+        """在一次持久化中写入 puts 并删除 deletes（同一批次原子，不存在的 key 忽略）"""
+        raise NotImplementedError
+
+    def put(self, key: str, value: Any) -> bool:
+        return self.write_batch(puts={key: value})
+
+    def put_many(self, items: Dict[str, Any]) -> bool:
+        return self.write_batch(puts=items)
+
+    def delete(self, key: str) -> bool:
+        return self.write_batch(deletes=[key])
+
+    def delete_many(self, keys: Iterable[str]) -> bool:
+        return self.write_batch(deletes=keys)
+
+    def replace_all(self, data: Dict[str, Any]) -> bool:
+        """用 data 整体替换全部内容"""
+        raise NotImplementedError
+
+    def scan_prefix(self, prefix: str) -> Dict[str, Any]:
+        """返回 key 以 prefix 开头的全部条目"""
+        return {k: v for k, v in self.load_all().items() if k.startswith(prefix)}
+
+    def expired_keys(self, before: float) -> List[str]:
+        """返回 ts_field < before 的 key（缺失时间戳按 0 处理）"""
+        return [k for k, v in self.load_all().items()
+                if (self._ts_of(v) or 0) < before]
+
+    def change_token(self) -> Optional[Any]:
+        """廉价的"数据是否被改动"标记，用于调用方的内存缓存失效判断
+
+        两次返回值相等表示期间底层数据未被（本进程以外）修改；
+        None 表示无法判断，调用方不应缓存。
+        """
+        return None
+
+    def sync(self) -> bool:
+        """把已写入的数据 fsync 到磁盘（持久化屏障，写入路径默认不 fsync）"""
+        return True
+
+    def close(self) -> None:
+        """释放资源（服务退出时调用）"""
+
+
+class JsonFileBackend(StorageBackend):
+    """整文件 JSON 后端：每次写入 load → 修改 → 原子重写
+
+    与重构前各 store 的行为完全一致（indent=2，可直接查看/手改）。
+    """
+
+    kind = BACKEND_JSON
+
+    def __init__(self, data_dir: str, name: str, ts_field: Optional[str] = None,
+                 log_tag: Optional[str] = None):
+        super().__init__(name, ts_field, log_tag)
+        self._file_path = os.path.join(data_dir, name + '.json')
+        self._lock = threading.Lock()
+
+    def load_all(self) -> Dict[str, Any]:
+        with self._lock:
+            return _read_json_file(self._file_path, self._log_tag)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.load_all().get(key)
+
+    def write_batch(self, puts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[Iterable[str]] = None) -> bool:
+        deletes = list(deletes or ())
+        if not puts and not deletes:
+            return True
+        with self._lock:
+            data = _read_json_file(self._file_path, self._log_tag)
+            removed = [k for k in deletes if data.pop(k, None) is not None]
+            if not puts and not removed:
+                return True
+            data.update(puts or {})
+            return _write_json_file(self._file_path, data, self._log_tag)
+
+    def replace_all(self, data: Dict[str, Any]) -> bool:
+        with self._lock:
+            return _write_json_file(self._file_path, data, self._log_tag)
+
+    def sync(self) -> bool:
+        with self._lock:
+            return _fsync_path(self._file_path, self._log_tag)
+
+    def change_token(self) -> Optional[Any]:
+        # 原子替换会换 inode，手工编辑会改 mtime / size
+        try:
+            st = os.stat(self._file_path)
+        except FileNotFoundError:
+            return ()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class JsonJournalBackend(StorageBackend):
+    """内存 + 追加日志 + 快照的 JSON 后端
+
+    - 内存 dict 为唯一读源，get / put 为 O(1)
+    - 每次变更追加一行到 <name>.journal：{"op":"put","k":..,"v":..} / {"op":"del","k":..}
+    - 后台线程在 journal 行数达到 max(COMPACT_MIN_ENTRIES, 当前条目数) 时
+      压缩为 <name>.json 快照并截断 journal，保证压缩摊还成本为 O(1)/次写入
+    - put / del 均幂等，压缩过程中崩溃（快照已替换、journal 未截断）重放结果不变
+    """
+
+    kind = BACKEND_JSON
+
+    # 后台压缩检查间隔（秒）
+    COMPACT_INTERVAL = 300
+    COMPACT_MIN_ENTRIES = 1000
+
+    def __init__(self, data_dir: str, name: str, ts_field: Optional[str] = None,
+                 log_tag: Optional[str] = None):
+        super().__init__(name, ts_field, log_tag)
+        self._data_dir = data_dir
+        self._file_path = os.path.join(data_dir, name + '.json')
+        self._journal_path = os.path.join(data_dir, name + '.journal')
+        self._lock = threading.Lock()
+        # 串行化 compact（后台线程与调用方的 compact 可能同时触发）
+        self._compact_lock = threading.Lock()
+
+        self._data = _read_json_file(self._file_path, self._log_tag)
+        self._journal_entries = _replay_journal_file(self._journal_path, self._data, self._log_tag)
+        self._journal_fp = open(self._journal_path, 'ab')
+
+        self._stop_event = threading.Event()
+        self._compact_thread = threading.Thread(
+            target=self._compact_loop, name=name + '-compact', daemon=True)
+        self._compact_thread.start()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def journal_entries(self) -> int:
+        return self._journal_entries
+
+    def change_token(self) -> Optional[Any]:
+        # 内存为唯一读源，运行期间不接受外部修改
+        return 0
+
+    def sync(self) -> bool:
+        with self._lock:
+            try:
+                self._journal_fp.flush()
+                os.fsync(self._journal_fp.fileno())
+                return True
+            except (IOError, OSError, ValueError) as e:
+                logger.error("[%s] Failed to fsync journal: %s", self._log_tag, e)
+                return False
+
+    def load_all(self) -> Dict[str, Any]:
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        # 返回副本：与其他后端一致，调用方可原地修改后再 put
+        return copy.deepcopy(self._data.get(key))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        with self._lock:
+            return {k: copy.deepcopy(self._data[k]) for k in keys if k in self._data}
+
+    def write_batch(self, puts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[Iterable[str]] = None) -> bool:
+        puts = puts or {}
+        with self._lock:
+            removed = [k for k in (deletes or ()) if k in self._data]
+            records = [{'op': 'del', 'k': k} for k in removed]
+            records.extend({'op': 'put', 'k': k, 'v': v} for k, v in puts.items())
+            if not records:
+                return True
+            if not self._append(records):
+                return False
+            for k in removed:
+                del self._data[k]
+            self._data.update(puts)
+            return True
+
+    def replace_all(self, data: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._data = dict(data)
+            self._journal_entries += 1  # 强制下次 compact 写快照
+        return self.compact()
+
+    def expired_keys(self, before: float) -> List[str]:
+        with self._lock:
+            return [k for k, v in self._data.items()
+                    if (self._ts_of(v) or 0) < before]
+
+    def compact(self) -> bool:
+        """把内存全量写为快照并截断 journal
+
+        持锁时间只覆盖浅拷贝和最后的 journal 截断；快照序列化在锁外进行。
+        序列化期间新追加的 journal 行（offset 之后）会保留到新 journal 中。
+        """
+        with self._compact_lock:
+            with self._lock:
+                if self._journal_entries == 0:
+                    return True
+                snapshot = dict(self._data)
+                self._journal_fp.flush()
+                offset = self._journal_fp.tell()
+                entries_at_copy = self._journal_entries
+
+            # 快照仅由 compact 写入，不使用 indent（数万条时体积和序列化时间减半）
+            if not _write_json_file(self._file_path, snapshot, self._log_tag, indent=None):
+                return False
+
+            with self._lock:
+                try:
+                    self._journal_fp.flush()
+                    with open(self._journal_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read()
+                    self._journal_fp.close()
+                    tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
+                    with os.fdopen(tmp_fd, 'wb') as f:
+                        f.write(tail)
+                    os.replace(tmp_path, self._journal_path)
+                    self._journal_entries -= entries_at_copy
+                except (IOError, OSError) as e:
+                    # 快照已包含 offset 之前的全部变更，journal 未截断只会多重放一遍
+                    logger.error("[%s] Failed to truncate journal: %s", self._log_tag, e)
+                finally:
+                    if self._journal_fp.closed:
+                        self._journal_fp = open(self._journal_path, 'ab')
+            logger.info("[%s] Compacted: entries=%d", self._log_tag, len(snapshot))
+            return True
+
+    def close(self) -> None:
+        """停止后台压缩线程并做最后一次压缩"""
+        self._stop_event.set()
+        self._compact_thread.join(timeout=5)
+        self.compact()
+        with self._lock:
+            try:
+                self._journal_fp.close()
+            except Exception:
+                pass
+
+    def _compact_loop(self) -> None:
+        while not self._stop_event.wait(self.COMPACT_INTERVAL):
+            if self._journal_entries >= max(self.COMPACT_MIN_ENTRIES, len(self._data)):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error("[%s] Compact error: %s", self._log_tag, e)
+
+    def _append(self, records: List[Dict[str, Any]]) -> bool:
+        """追加 journal 行（需持有 _lock）"""
+        try:
+            lines = ''.join(
+                json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for r in records)
+            self._journal_fp.write(lines.encode('utf-8'))
+            self._journal_fp.flush()
+            self._journal_entries += len(records)
+            return True
+        except (IOError, OSError, ValueError) as e:
+            logger.error("[%s] Failed to append journal: %s", self._log_tag, e)
+            return False
+
+
+class _SqliteDatabase(object):
+    """同一 db 文件的共享连接（所有 store 的表共用一个连接 + 锁）
+
+    sqlite3 连接本身不是线程安全的，这里以 check_same_thread=False + 外部锁
+    串行化访问。单条语句都是毫秒以下的索引操作，串行化不构成瓶颈，
+    也避免了多连接写竞争时的 "database is locked"。
+    """
+
+    _instances = {}  # type: Dict[str, _SqliteDatabase]
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+
+    @classmethod
+    def open(cls, path: str) -> '_SqliteDatabase':
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            db = cls._instances.get(path)
+            if db is None:
+                db = cls(path)
+                cls._instances[path] = db
+            return db
+
+
+class SqliteBackend(StorageBackend):
+    """SQLite（WAL）后端：每个 store 一张表，按 key 的读写为索引操作"""
+
+    kind = BACKEND_SQLITE
+
+    def __init__(self, db_path: str, name: str, ts_field: Optional[str] = None,
+                 log_tag: Optional[str] = None):
+        super().__init__(name, ts_field, log_tag)
+        if not _TABLE_NAME_PATTERN.match(name):
+            raise ValueError('invalid store name: %r' % name)
+        self._db = _SqliteDatabase.open(db_path)
+        self._table = name
+        with self._db.lock:
+            self._db.conn.execute(
+                'CREATE TABLE IF NOT EXISTS %s '
+                '(k TEXT PRIMARY KEY, v TEXT NOT NULL, ts INTEGER)' % name)
+            self._db.conn.execute(
+                'CREATE INDEX IF NOT EXISTS %s_ts ON %s (ts)' % (name, name))
+
+    def _execute(self, sql: str, params=()) -> List[Any]:
+        with self._db.lock:
+            return self._db.conn.execute(sql, params).fetchall()
+
+    def _write(self, statements: List[Any]) -> bool:
+        """在单个事务中执行 [(sql, [params...]), ...]"""
+        with self._db.lock:
+            conn = self._db.conn
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                for sql, rows in statements:
+                    conn.executemany(sql, rows)
+                conn.execute('COMMIT')
+                return True
+            except sqlite3.Error as e:
+                try:
+                    conn.execute('ROLLBACK')
+                except sqlite3.Error:
+                    pass
+                logger.error("[%s] Failed to save: %s", self._log_tag, e)
+                return False
+
+    def _rows(self, items: Dict[str, Any]) -> List[Any]:
+        return [(k, json.dumps(v, ensure_ascii=False), self._ts_of(v))
+                for k, v in items.items()]
+
+    def sync(self) -> bool:
+        # synchronous=NORMAL 下 WAL 提交不逐次 fsync；FULL checkpoint 会 fsync WAL 与主库
+        try:
+            self._execute('PRAGMA wal_checkpoint(FULL)')
+            return True
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to checkpoint: %s", self._log_tag, e)
+            return False
+
+    def change_token(self) -> Optional[Any]:
+        # data_version 仅在其他连接（如其他进程、sqlite3 命令行）提交后变化
+        try:
+            return self._execute('PRAGMA data_version')[0][0]
+        except sqlite3.Error:
+            return None
+
+    def count(self) -> int:
+        try:
+            return self._execute('SELECT COUNT(*) FROM %s' % self._table)[0][0]
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to count: %s", self._log_tag, e)
+            return 0
+
+    def load_all(self) -> Dict[str, Any]:
+        try:
+            rows = self._execute('SELECT k, v FROM %s' % self._table)
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to load: %s", self._log_tag, e)
+            return {}
+        return {k: json.loads(v) for k, v in rows}
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            rows = self._execute('SELECT v FROM %s WHERE k = ?' % self._table, (key,))
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to get: %s", self._log_tag, e)
+            return None
+        return json.loads(rows[0][0]) if rows else None
+
+    # 单条 SQL 的参数上限（SQLITE_MAX_VARIABLE_NUMBER 老版本默认 999）
+    _IN_CHUNK = 500
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        result = {}
+        try:
+            for i in range(0, len(keys), self._IN_CHUNK):
+                chunk = keys[i:i + self._IN_CHUNK]
+                rows = self._execute(
+                    'SELECT k, v FROM %s WHERE k IN (%s)' % (self._table, ','.join('?' * len(chunk))),
+                    chunk)
+                result.update((k, json.loads(v)) for k, v in rows)
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to get many: %s", self._log_tag, e)
+            return {}
+        return result
+
+    def write_batch(self, puts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[Iterable[str]] = None) -> bool:
+        statements = []
+        delete_rows = [(k,) for k in (deletes or ())]
+        if delete_rows:
+            statements.append(('DELETE FROM %s WHERE k = ?' % self._table, delete_rows))
+        if puts:
+            statements.append(('INSERT OR REPLACE INTO %s (k, v, ts) VALUES (?, ?, ?)' % self._table,
+                               self._rows(puts)))
+        if not statements:
+            return True
+        return self._write(statements)
+
+    def replace_all(self, data: Dict[str, Any]) -> bool:
+        return self._write([
+            ('DELETE FROM %s' % self._table, [()]),
+            ('INSERT INTO %s (k, v, ts) VALUES (?, ?, ?)' % self._table, self._rows(data)),
+        ])
+
+    def scan_prefix(self, prefix: str) -> Dict[str, Any]:
+        # 主键 BINARY 排序下的区间查询；U+10FFFF 的 UTF-8 编码大于任何合法字符
+        try:
+            rows = self._execute(
+                'SELECT k, v FROM %s WHERE k >= ? AND k < ?' % self._table,
+                (prefix, prefix + '\U0010ffff'))
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to scan prefix: %s", self._log_tag, e)
+            return {}
+        return {k: json.loads(v) for k, v in rows}
+
+    def expired_keys(self, before: float) -> List[str]:
+        # 与 json 后端一致：缺失时间戳（ts 为 NULL）按 0 处理，视为已过期
+        try:
+            rows = self._execute(
+                'SELECT k FROM %s WHERE ts IS NULL OR ts < ?' % self._table, (int(before),))
+        except sqlite3.Error as e:
+            logger.error("[%s] Failed to query expired keys: %s", self._log_tag, e)
+            return []
+        return [r[0] for r in rows]
+
+    def migrate_from_json(self, data_dir: str) -> int:
+        """表为空时，从 <name>.json（+ <name>.journal）一次性导入
+
+        导入成功后原文件重命名为 *.migrated。
+
+        Returns:
+            导入条目数（无需导入返回 0）
+        """
+        json_path = os.path.join(data_dir, self.name + '.json')
+        journal_path = os.path.join(data_dir, self.name + '.journal')
+        if not os.path.exists(json_path) and not os.path.exists(journal_path):
+            return 0
+        if self.count() > 0:
+            logger.warning("[%s] Table already populated, skip migrating %s",
+                           self._log_tag, json_path)
+            return 0
+        data = _read_json_file(json_path, self._log_tag)
+        _replay_journal_file(journal_path, data, self._log_tag)
+        if data and not self.put_many(data):
+            logger.error("[%s] Migration from %s failed, JSON file kept", self._log_tag, json_path)
+            return 0
+        for path in (json_path, journal_path):
+            if os.path.exists(path):
+                try:
+                    os.replace(path, path + '.migrated')
+                except OSError as e:
+                    logger.warning("[%s] Failed to rename %s: %s", self._log_tag, path, e)
+        logger.info("[%s] Migrated %d entries from %s to sqlite", self._log_tag, len(data), json_path)
+        return len(data)
+
+
+class WriteBehindBackend(StorageBackend):
+    """写缓冲包装：内存为读源，变更由后台线程批量写入内层后端（group commit）
+
+    - write_batch 只更新内存并记录脏 key，立即返回
+    - 后台线程每 flush_interval 秒，或脏 key 数达到 max_dirty 时提前，
+      把脏数据合并为一次 inner.write_batch（json 为一次整文件重写，sqlite 为一个事务）
+    - flush(sync=True) 为持久化屏障：返回时之前的全部变更已写入并 fsync
+    - close() 停止后台线程并做最后一次 flush(sync=True)
+
+    崩溃语义：内层后端的每次批量写入都是原子的（json 原子替换 / sqlite 事务），
+    崩溃后重启读到的是最近一次成功 flush 的完整状态，最多丢失 flush_interval 内的变更。
+    写入失败的脏 key 会保留，下一轮重试。
+    """
+
+    def __init__(self, inner: StorageBackend, flush_interval: float, max_dirty: int):
+        super().__init__(inner.name, inner._ts_field, inner._log_tag)
+        self.kind = inner.kind
+        self._inner = inner
+        self._flush_interval = flush_interval
+        self._max_dirty = max_dirty
+        # _lock 保护内存数据与脏集合；_flush_lock 串行化 flush（后台线程与屏障调用）
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._data = inner.load_all()
+        self._dirty = set()  # type: set
+        self._deleted = set()  # type: set
+        self.flush_count = 0
+        self.flushed_keys = 0
+
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name=inner.name + '-flush', daemon=True)
+        self._flush_thread.start()
+
+    @property
+    def pending(self) -> int:
+        """尚未写入内层后端的 key 数"""
+        with self._lock:
+            return len(self._dirty) + len(self._deleted)
+
+    def load_all(self) -> Dict[str, Any]:
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return copy.deepcopy(self._data.get(key))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        with self._lock:
+            return {k: copy.deepcopy(self._data[k]) for k in keys if k in self._data}
+
+    def scan_prefix(self, prefix: str) -> Dict[str, Any]:
+        with self._lock:
+            return {k: copy.deepcopy(v) for k, v in self._data.items() if k.startswith(prefix)}
+
+    def expired_keys(self, before: float) -> List[str]:
+        with self._lock:
+            return [k for k, v in self._data.items() if (self._ts_of(v) or 0) < before]
+
+    def write_batch(self, puts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[Iterable[str]] = None) -> bool:
+        with self._lock:
+            for k in deletes or ():
+                if self._data.pop(k, None) is not None:
+                    self._dirty.discard(k)
+                    self._deleted.add(k)
+            for k, v in (puts or {}).items():
+                self._data[k] = v
+                self._deleted.discard(k)
+                self._dirty.add(k)
+            if len(self._dirty) + len(self._deleted) >= self._max_dirty:
+                self._wakeup.set()
+        return True
+
+    def replace_all(self, data: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._deleted.update(k for k in self._data if k not in data)
+            self._data = dict(data)
+            self._dirty = set(data)
+            self._deleted.difference_update(self._dirty)
+        return self.flush()
+
+    def flush(self, sync: bool = False) -> bool:
+        """把当前脏数据写入内层后端
+
+        Args:
+            sync: True 时额外 fsync（持久化屏障）
+
+        Returns:
+            是否全部写入成功
+        """
+        with self._flush_lock:
+            with self._lock:
+                # 值对象在写入后不会被原地修改（写路径总是整体替换），锁外序列化安全
+                puts = {k: self._data[k] for k in self._dirty}
+                deletes = list(self._deleted)
+                self._dirty = set()
+                self._deleted = set()
+            if puts or deletes:
+                if not self._inner.write_batch(puts=puts, deletes=deletes):
+                    with self._lock:
+                        # 失败回滚脏标记；期间被新写入覆盖的 key 以新状态为准
+                        for k in puts:
+                            if k not in self._deleted:
+                                self._dirty.add(k)
+                        for k in deletes:
+                            if k not in self._dirty:
+                                self._deleted.add(k)
+                    return False
+                self.flush_count += 1
+                self.flushed_keys += len(puts) + len(deletes)
+            return self._inner.sync() if sync else True
+
+    def change_token(self) -> Optional[Any]:
+        # 内存为唯一读源，运行期间不接受外部修改
+        return 0
+
+    def sync(self) -> bool:
+        return self.flush(sync=True)
+
+    def close(self) -> None:
+        """停止后台线程，最后一次 flush 并 fsync，再关闭内层后端"""
+        self._stop_event.set()
+        self._wakeup.set()
+        self._flush_thread.join(timeout=5)
+        if not self.flush(sync=True):
+            logger.error("[%s] Final flush failed, %d keys not persisted",
+                         self._log_tag, self.pending)
+        self._inner.close()
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("[%s] Flush error: %s", self._log_tag, e)
+
+
+def open_backend(data_dir: str, name: str, ts_field: Optional[str] = None,
+                 journal: bool = False, log_tag: Optional[str] = None,
+                 backend: Optional[str] = None, flush_interval: float = 0,
+                 max_dirty: int = 100) -> StorageBackend:
+    """按配置打开 store 的存储后端
+
+    Args:
+        data_dir: 数据目录（通常为 runtime/）
+        name: store 名，决定 JSON 文件名 <name>.json 与 sqlite 表名
+        ts_field: value 中用于过期判断的时间戳字段
+        journal: json 后端是否使用"内存 + 追加日志"模式
+        log_tag: 日志标签，默认与 store 原有标签保持一致
+        backend: 显式指定后端类型；None 则读取配置 STORAGE_BACKEND
+        flush_interval: >0 时包装为 WriteBehindBackend，按该间隔（秒）批量写入
+        max_dirty: write-behind 模式下脏 key 数达到该值时提前写入
+
+    Returns:
+        StorageBackend 实例
+    """
+    if backend is None:
+        from config import STORAGE_BACKEND
+        backend = STORAGE_BACKEND
+    os.makedirs(data_dir, exist_ok=True)
+
+    store = None  # type: Optional[StorageBackend]
+    if backend == BACKEND_SQLITE:
+        if sqlite3 is None:
+            logger.warning("[%s] sqlite3 module unavailable, falling back to json backend",
+                           log_tag or name)
+        else:
+            store = SqliteBackend(os.path.join(data_dir, SQLITE_FILE_NAME), name,
+                                  ts_field, log_tag)
+            store.migrate_from_json(data_dir)
+
+    if store is None:
+        if journal:
+            store = JsonJournalBackend(data_dir, name, ts_field, log_tag)
+        else:
+            store = JsonFileBackend(data_dir, name, ts_field, log_tag)
+
+    if flush_interval > 0:
+        return WriteBehindBackend(store, flush_interval, max_dirty)
+    return store
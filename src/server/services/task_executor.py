@@ -0,0 +1,186 @@
+"""进程内共享的后台任务线程池
+
+归属端: 飞书网关 / Callback 后端（各 handler 共用）
+使用方: handlers/utils.run_in_background()（feishu.py、register.py、claude.py 的后台任务）
+
+原先每个后台任务（发提示、表情回应、建群、转发请求、启动监控等）各起一个 daemon 线程，
+突发流量下线程数不受限且无从观察。现按用途划分为几个命名线程池：
+    - notify:  发送提示 / 表情回应 / 状态卡片，短小且可丢弃，队列满时丢弃（reject）
+    - forward: 转发 new / continue / attach、建群解散等用户操作，队列满时在调用方线程执行（caller_runs）
+    - claude:  Claude 子进程启动阶段的监控（最长 STARTUP_TIMEOUT_SECONDS），不可丢弃（caller_runs）
+    - default: 其他任务（注册流程等）
+
+每个池的并发数与排队上限固定，/status 的 task_pools 展示运行中 / 排队 / 完成 / 丢弃数与运行耗时分位。
+"""
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_NOTIFY = 'notify'
+POOL_FORWARD = 'forward'
+POOL_CLAUDE = 'claude'
+POOL_DEFAULT = 'default'
+
+# 队列满时的处理策略
+REJECT = 'reject'            # 丢弃任务并记录日志
+CALLER_RUNS = 'caller_runs'  # 在提交方线程同步执行（反压，任务不丢失）
+
+# 池名 → (并发数, 排队上限, 队列满策略)
+DEFAULT_POOLS = {
+    POOL_NOTIFY: (8, 500, REJECT),
+    POOL_FORWARD: (16, 200, CALLER_RUNS),
+    POOL_CLAUDE: (32, 100, CALLER_RUNS),
+    POOL_DEFAULT: (8, 200, CALLER_RUNS),
+}
+
+# 运行耗时分位的统计窗口（最近 N 个任务）
+RUNTIME_WINDOW = 1024
+
+
+class _TaskPool:
+    """单个命名线程池：有界并发 + 有界排队 + 运行统计"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, policy: str):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='task-%s' % name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'caller_runs': 0,
+        }
+        self._runtimes = collections.deque(maxlen=RUNTIME_WINDOW)
+
+    def submit(self, func: Callable, args: tuple) -> bool:
+        """提交任务
+
+        Returns:
+            任务是否会被执行（已入队或已在调用方线程执行）；被丢弃返回 False
+        """
+        with self._lock:
+            # 排队数按"已提交未开始"计算，空闲线程足够时不会触发上限
+            full = self._queued >= self.max_queue
+            if not full:
+                self._queued += 1
+            elif self.policy == REJECT:
+                self._stats['rejected'] += 1
+            else:
+                self._stats['caller_runs'] += 1
+
+        if not full:
+            self._executor.submit(self._run, func, args, True)
+            return True
+        if self.policy == REJECT:
+            logger.warning("[task_executor] Pool %s queue full (%d), dropped %s",
+                           self.name, self.max_queue, getattr(func, '__name__', func))
+            return False
+        logger.info("[task_executor] Pool %s queue full (%d), running %s in caller thread",
+                    self.name, self.max_queue, getattr(func, '__name__', func))
+        self._run(func, args, False)
+        return True
+
+    def _run(self, func: Callable, args: tuple, queued: bool) -> None:
+        with self._lock:
+            if queued:
+                self._queued -= 1
+            self._active += 1
+        start = time.time()
+        failed = False
+        try:
+            func(*args)
+        except Exception as e:
+            # 与原先裸线程一致：异常只记录，不影响其他任务
+            failed = True
+            logger.error("[task_executor] Task %s in pool %s failed: %s",
+                         getattr(func, '__name__', func), self.name, e, exc_info=True)
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self._active -= 1
+                self._stats['failed' if failed else 'completed'] += 1
+                self._runtimes.append(elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active'] = self._active
+            stats['queued'] = self._queued
+            runtimes = sorted(self._runtimes)
+        stats['max_workers'] = self.max_workers
+        stats['max_queue'] = self.max_queue
+        stats['policy'] = self.policy
+        if runtimes:
+            stats['runtime_p50_ms'] = round(runtimes[len(runtimes) // 2] * 1000, 1)
+            stats['runtime_p99_ms'] = round(runtimes[min(len(runtimes) - 1, int(len(runtimes) * 0.99))] * 1000, 1)
+            stats['runtime_max_ms'] = round(runtimes[-1] * 1000, 1)
+        return stats
+
+
+class TaskExecutor:
+    """命名线程池集合（单例）"""
+
+    _instance = None  # type: Optional[TaskExecutor]
+    _lock = threading.Lock()
+
+    def __init__(self, pools: Optional[Dict[str, tuple]] = None):
+        """初始化
+
+        Args:
+            pools: 池名 → (并发数, 排队上限, 队列满策略)，默认 DEFAULT_POOLS
+        """
+        self._pools = {}  # type: Dict[str, _TaskPool]
+        for name, (max_workers, max_queue, policy) in (pools or DEFAULT_POOLS).items():
+            self._pools[name] = _TaskPool(name, max_workers, max_queue, policy)
+        if POOL_DEFAULT not in self._pools:
+            max_workers, max_queue, policy = DEFAULT_POOLS[POOL_DEFAULT]
+            self._pools[POOL_DEFAULT] = _TaskPool(POOL_DEFAULT, max_workers, max_queue, policy)
+
+    @classmethod
+    def initialize(cls, pools: Optional[Dict[str, tuple]] = None) -> 'TaskExecutor':
+        """初始化单例实例
+
+        Args:
+            pools: 池名 → (并发数, 排队上限, 队列满策略)，默认 DEFAULT_POOLS
+
+        Returns:
+            TaskExecutor 实例
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(pools)
+                logger.info("[task_executor] Initialized pools: %s", ', '.join(
+                    '%s(%d/%d)' % (p.name, p.max_workers, p.max_queue) for p in cls._instance._pools.values()))
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional['TaskExecutor']:
+        """获取单例实例，未初始化返回 None"""
+        return cls._instance
+
+    def submit(self, pool: str, func: Callable, args: tuple = ()) -> bool:
+        """向命名池提交任务（未知池名归入 default）
+
+        Returns:
+            任务是否会被执行；队列满且策略为 reject 时返回 False
+        """
+        target = self._pools.get(pool)
+        if target is None:
+            target = self._pools[POOL_DEFAULT]
+        return target.submit(func, args)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各池统计（用于 /status 端点）"""
+        return {name: pool.get_stats() for name, pool in self._pools.items()}
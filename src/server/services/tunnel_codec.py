@@ -0,0 +1,190 @@
+"""WS 隧道 RPC 二进制信封
+
+归属端: 网关与 Callback 后端共用
+使用方: services/ws_registry.py（网关发请求），services/ws_tunnel_client.py（callback 回响应），
+        handlers/ws_handler.py（网关收响应）
+
+握手时通过 Sec-WebSocket-Protocol 协商（SUBPROTOCOL），双方都支持时 request / response / error
+三类 RPC 消息改用 binary frame 发送，其余控制消息（register、auth_ok、shutdown 等）仍为 JSON text frame；
+任一端不支持时全部使用 JSON（原格式）。
+
+帧格式（整数均为大端序）：
+    request:  0x01 | id u32 | path | header 数 u8 | header... | body
+    response: 0x02 | id u32 | status u16 | body
+    error:    0x03 | id u32 | code 长度 u8 | code | message（UTF-8，直到帧尾）
+
+    path:   编码 u8（PATH_CODES 下标）；0xFF 表示不在表中，后跟 u16 长度 + UTF-8 路径
+    header: 名称编码 u8（HEADER_CODES 下标，0xFF 后跟 u8 长度 + 名称）+ u16 长度 + 值
+    body:   UTF-8 JSON，直到帧尾（帧长度即 body 长度，不再嵌套在外层 JSON 字符串里转义）
+
+PATH_CODES / HEADER_CODES 只能在末尾追加，已有编码不可调整（新旧版本混用时编码须一致）。
+"""
+
+import json
+import struct
+from typing import Any, Dict, Optional
+
+SUBPROTOCOL = 'claude-notify.tunnel.bin1'
+
+KIND_REQUEST = 0x01
+KIND_RESPONSE = 0x02
+KIND_ERROR = 0x03
+
+_LITERAL = 0xFF
+
+PATH_CODES = (
+    '/cb/register',
+    '/cb/check-owner',
+    '/cb/decision',
+    '/cb/session/get-chat-id',
+    '/cb/session/get-last-message-id',
+    '/cb/session/set-last-message-id',
+    '/cb/session/check-skip-user-prompt',
+    '/cb/session/ensure-chat',
+    '/cb/session/get-info',
+    '/cb/session/attach',
+    '/cb/session/mute',
+    '/cb/session/clone',
+    '/cb/session/invalidate-chats',
+    '/cb/claude/new',
+    '/cb/claude/continue',
+    '/cb/claude/record-dir-usage',
+    '/cb/claude/recent-dirs',
+    '/cb/claude/browse-dirs',
+)
+HEADER_CODES = (
+    'X-Auth-Token',
+)
+
+_PATH_INDEX = {path: i for i, path in enumerate(PATH_CODES)}
+_HEADER_INDEX = {name: i for i, name in enumerate(HEADER_CODES)}
+
+_ID_STATUS = struct.Struct('!BIH')
+_ID = struct.Struct('!BI')
+_U16 = struct.Struct('!H')
+
+
+def _dump_body(body: Any) -> bytes:
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode(msg: Dict[str, Any]) -> Optional[bytes]:
+    """把 RPC 消息编码为二进制帧负载
+
+    Args:
+        msg: 与 JSON 格式相同的消息字典（type 为 request / response / error，id 为整数）
+
+    Returns:
+        帧负载；不适用二进制格式的消息（其他 type、非整数 id）返回 None，调用方改用 JSON
+    """
+    msg_type = msg.get('type')
+    request_id = msg.get('id')
+    if not isinstance(request_id, int) or not 0 < request_id <= 0xFFFFFFFF:
+        return None
+
+    if msg_type == 'request':
+        parts = [_ID.pack(KIND_REQUEST, request_id)]
+        path = msg.get('path', '')
+        code = _PATH_INDEX.get(path)
+        if code is None:
+            raw = path.encode('utf-8')
+            parts.append(bytes([_LITERAL]) + _U16.pack(len(raw)) + raw)
+        else:
+            parts.append(bytes([code]))
+        headers = msg.get('headers') or {}
+        if len(headers) > 255:
+            return None
+        parts.append(bytes([len(headers)]))
+        for name, value in headers.items():
+            code = _HEADER_INDEX.get(name)
+            if code is None:
+                raw = name.encode('utf-8')
+                if len(raw) > 255:
+                    return None
+                parts.append(bytes([_LITERAL, len(raw)]) + raw)
+            else:
+                parts.append(bytes([code]))
+            raw = str(value).encode('utf-8')
+            parts.append(_U16.pack(len(raw)) + raw)
+        parts.append(_dump_body(msg.get('body', {})))
+        return b''.join(parts)
+
+    if msg_type == 'response':
+        status = msg.get('status', 200)
+        if not isinstance(status, int) or not 0 <= status <= 0xFFFF:
+            return None
+        return _ID_STATUS.pack(KIND_RESPONSE, request_id, status) + _dump_body(msg.get('body'))
+
+    if msg_type == 'error':
+        code = str(msg.get('code', '')).encode('utf-8')[:255]
+        message = str(msg.get('message', '')).encode('utf-8')
+        return _ID.pack(KIND_ERROR, request_id) + bytes([len(code)]) + code + message
+
+    return None
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """解码二进制帧负载为与 JSON 格式相同的消息字典
+
+    Raises:
+        ValueError: 格式错误
+    """
+    try:
+        kind, request_id = _ID.unpack_from(data, 0)
+        pos = _ID.size
+
+        if kind == KIND_REQUEST:
+            code = data[pos]
+            pos += 1
+            if code == _LITERAL:
+                length = _U16.unpack_from(data, pos)[0]
+                pos += 2
+                path = bytes(data[pos:pos + length]).decode('utf-8')
+                pos += length
+            else:
+                path = PATH_CODES[code]
+            count = data[pos]
+            pos += 1
+            headers = {}
+            for _ in range(count):
+                code = data[pos]
+                pos += 1
+                if code == _LITERAL:
+                    length = data[pos]
+                    name = bytes(data[pos + 1:pos + 1 + length]).decode('utf-8')
+                    pos += 1 + length
+                else:
+                    name = HEADER_CODES[code]
+                length = _U16.unpack_from(data, pos)[0]
+                pos += 2
+                headers[name] = bytes(data[pos:pos + length]).decode('utf-8')
+                pos += length
+            return {
+                'type': 'request',
+                'id': request_id,
+                'method': 'POST',
+                'path': path,
+                'headers': headers,
+                'body': json.loads(bytes(data[pos:]).decode('utf-8')),
+            }
+
+        if kind == KIND_RESPONSE:
+            status = _U16.unpack_from(data, pos)[0]
+            return {
+                'type': 'response',
+                'id': request_id,
+                'status': status,
+                'body': json.loads(bytes(data[pos + 2:]).decode('utf-8')),
+            }
+
+        if kind == KIND_ERROR:
+            length = data[pos]
+            return {
+                'type': 'error',
+                'id': request_id,
+                'code': bytes(data[pos + 1:pos + 1 + length]).decode('utf-8'),
+                'message': bytes(data[pos + 1 + length:]).decode('utf-8'),
+            }
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed tunnel envelope: {e}")
+    raise ValueError(f"Unknown tunnel envelope kind: {kind}")
@@ -1,7 +1,9 @@
 """WebSocket 协议最小实现
 
 基于 Python 标准库实现的最小 WebSocket 协议（RFC 6455）。
-仅支持：text frame、ping/pong、close frame。不支持 binary frame、分片、扩展。
+仅支持：text / binary frame、ping/pong、close frame。不支持分片。
+扩展仅支持 permessage-deflate（RFC 7692），握手时协商，对端不支持则不压缩。
+子协议（Sec-WebSocket-Protocol）由调用方提供候选列表，协商结果经 get_subprotocol() 查询。
 
 使用方式：
     # 服务端
@@ -29,7 +31,8 @@ import socket
 import ssl
 import struct
 import threading
-from typing import Dict, Optional, Tuple, Any
+import zlib
+from typing import Dict, List, Optional, Tuple, Any
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +54,19 @@ CLOSE_INTERNAL_ERROR = 1011
 # 最大帧大小（防止内存耗尽攻击）
 MAX_FRAME_SIZE = 10 * 1024 * 1024  # 10MB
 
+# permessage-deflate：每条压缩消息末尾省略的 SYNC_FLUSH 空块
+_DEFLATE_TAIL = b'\x00\x00\xff\xff'
+_DEFLATE_LEVEL = 6
+# zlib 的 raw deflate 不支持 8 位窗口，对端要求更小窗口时不协商
+_DEFLATE_MIN_WINDOW_BITS = 9
+
+# permessage-deflate 配置（configure_deflate() 设置，握手时读取）
+_DEFLATE_OPTIONS = {
+    'enabled': True,
+    'context_takeover': True,
+    'min_size': 256,
+}
+
 # socket ID → 是否为客户端模式的映射（客户端发送帧需要 mask，服务端不需要）
 # 使用 id(sock) 作为 key，避免 OS 文件描述符复用导致状态错乱
 _WS_CLIENT_MODE_MAP: Dict[int, bool] = {}
@@ -61,6 +77,16 @@ _WS_CLIENT_MODE_LOCK = threading.Lock()
 _WS_SEND_LOCK_MAP: Dict[int, threading.Lock] = {}
 _WS_SEND_LOCK_MAP_LOCK = threading.Lock()
 
+# socket ID → permessage-deflate 状态（仅协商成功的连接），
+# 以及已关闭连接的压缩统计累计（保证 /status 的累计值不因断线重连而归零）
+_WS_DEFLATE_MAP = {}  # type: Dict[int, _DeflateState]
+_WS_DEFLATE_CLOSED = {}  # type: Dict[str, int]
+_WS_DEFLATE_LOCK = threading.Lock()
+
+# socket ID → 协商成功的子协议（未协商的连接不在表中）
+_WS_SUBPROTOCOL_MAP = {}  # type: Dict[int, str]
+_WS_SUBPROTOCOL_LOCK = threading.Lock()
+
 
 def _compute_accept_key(key: str) -> str:
     """计算 Sec-WebSocket-Accept 值
@@ -75,20 +101,299 @@ def _compute_accept_key(key: str) -> str:
 def _mask_data(data: bytes, mask_key: bytes) -> bytes:
     """使用 mask key 对数据进行 XOR 掩码
 
-    注：逐字节 XOR 对本隧道场景足够（payload 均为 KB 级 JSON），
-    无需 batch XOR 优化（int.from_bytes 按 4 字节块处理）。
+    整段 payload 作为一个大整数与重复到等长的 mask key 一次 XOR（C 层按机器字处理），
+    1MB payload 约为逐字节循环的 1/100 耗时。data 可以是 bytes / bytearray / memoryview。
+    """
+    length = len(data)
+    if not length:
+        return b''
+    mask = (mask_key * ((length + 3) // 4))[:length]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(mask, 'little')).to_bytes(length, 'little')
+
+
+# =============================================================================
+# permessage-deflate（RFC 7692）
+# =============================================================================
+
+def configure_deflate(enabled: bool = True, context_takeover: bool = True, min_size: int = 256) -> None:
+    """配置 permessage-deflate（影响之后的握手，已建立的连接不变）
+
+    Args:
+        enabled: 是否在握手时提议 / 接受压缩
+        context_takeover: 是否跨消息保留压缩上下文。保留时压缩率更高，但每条连接常驻
+            数百 KB 压缩状态；关闭时双方每条消息独立压缩，不保留压缩器
+        min_size: 小于该字节数的消息不压缩
+    """
+    _DEFLATE_OPTIONS['enabled'] = enabled
+    _DEFLATE_OPTIONS['context_takeover'] = context_takeover
+    _DEFLATE_OPTIONS['min_size'] = min_size
+
+
+class _DeflateState:
+    """单条连接的 permessage-deflate 压缩 / 解压状态与统计
+
+    压缩在发送锁内进行（保留上下文时压缩顺序必须与帧的发送顺序一致），
+    解压只在接收线程（ws_recv 调用方或 ws_reactor 线程）中进行。
+    """
+
+    _STAT_KEYS = ('compressed_messages', 'uncompressed_messages',
+                  'sent_payload_bytes', 'sent_wire_bytes',
+                  'recv_payload_bytes', 'recv_wire_bytes')
+
+    def __init__(self, takeover: bool, window_bits: int, min_size: int):
+        """
+        Args:
+            takeover: 本端压缩是否跨消息保留上下文
+            window_bits: 本端压缩窗口（对端通过 *_max_window_bits 限定）
+            min_size: 小于该字节数的消息不压缩
+        """
+        self.takeover = takeover
+        self.window_bits = window_bits
+        self.min_size = min_size
+        self._compressor = self._new_compressor() if takeover else None
+        # 对端不保留上下文时其消息不引用历史，沿用同一个解压器同样正确
+        self._decompressor = zlib.decompressobj(-15)
+        self.stats = dict.fromkeys(self._STAT_KEYS, 0)
+
+    def _new_compressor(self):
+        return zlib.compressobj(_DEFLATE_LEVEL, zlib.DEFLATED, -self.window_bits)
+
+    def compress(self, payload: bytes) -> Optional[bytes]:
+        """压缩一条消息
+
+        Returns:
+            压缩后的 payload；None 表示按原样发送（低于阈值，或不保留上下文时压缩后反而更大）
+        """
+        stats = self.stats
+        length = len(payload)
+        stats['sent_payload_bytes'] += length
+        if length < self.min_size:
+            stats['uncompressed_messages'] += 1
+            stats['sent_wire_bytes'] += length
+            return None
+
+        compressor = self._compressor or self._new_compressor()
+        data = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data.endswith(_DEFLATE_TAIL):
+            data = data[:-4]
+        # 保留上下文时压缩器已吸收本条消息，必须压缩发送，否则对端解压窗口与本端不一致
+        if not self.takeover and len(data) >= length:
+            stats['uncompressed_messages'] += 1
+            stats['sent_wire_bytes'] += length
+            return None
+        stats['compressed_messages'] += 1
+        stats['sent_wire_bytes'] += len(data)
+        return data
+
+    def decompress(self, payload: bytes) -> bytes:
+        """解压一条 RSV1 置位的消息
+
+        Raises:
+            ValueError: 数据损坏或解压后超过 MAX_FRAME_SIZE
+        """
+        try:
+            data = self._decompressor.decompress(bytes(payload) + _DEFLATE_TAIL, MAX_FRAME_SIZE + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid compressed frame: {e}")
+        if len(data) > MAX_FRAME_SIZE or self._decompressor.unconsumed_tail:
+            raise ValueError(f"Decompressed frame too large (max {MAX_FRAME_SIZE})")
+        self.stats['recv_wire_bytes'] += len(payload)
+        self.stats['recv_payload_bytes'] += len(data)
+        return data
+
+    def count_plain_recv(self, length: int) -> None:
+        self.stats['recv_wire_bytes'] += length
+        self.stats['recv_payload_bytes'] += length
+
+
+def _parse_extensions(header: str) -> list:
+    """解析 Sec-WebSocket-Extensions 头
+
+    Returns:
+        [(扩展名, {参数名: 值或 None}), ...]，按出现顺序
+    """
+    result = []
+    for item in header.split(','):
+        parts = [p.strip() for p in item.split(';')]
+        if not parts[0]:
+            continue
+        params = {}
+        for part in parts[1:]:
+            if not part:
+                continue
+            if '=' in part:
+                key, value = part.split('=', 1)
+                params[key.strip().lower()] = value.strip().strip('"')
+            else:
+                params[part.lower()] = None
+        result.append((parts[0].lower(), params))
+    return result
+
+
+def _parse_window_bits(value: Optional[str]) -> Optional[int]:
+    """解析 *_max_window_bits 取值（8-15），非法返回 None"""
+    if value is None or not value.isdigit():
+        return None
+    bits = int(value)
+    return bits if 8 <= bits <= 15 else None
+
+
+def _accept_deflate_offer(header: str) -> Optional[Tuple[str, _DeflateState]]:
+    """服务端：从客户端提议中选择第一个可接受的 permessage-deflate 参数组合
+
+    Returns:
+        (响应头取值, 压缩状态)；没有可接受的提议时返回 None（不压缩）
+    """
+    takeover = _DEFLATE_OPTIONS['context_takeover']
+    for name, params in _parse_extensions(header):
+        if name != 'permessage-deflate':
+            continue
+        server_takeover = takeover
+        window_bits = 15
+        response = ['permessage-deflate']
+        acceptable = True
+        for key, value in params.items():
+            if key == 'server_no_context_takeover' and value is None:
+                server_takeover = False
+            elif key == 'client_no_context_takeover' and value is None:
+                pass  # 对端自行不保留上下文，本端解压器无需区别对待
+            elif key == 'server_max_window_bits':
+                bits = _parse_window_bits(value)
+                if bits is None or bits < _DEFLATE_MIN_WINDOW_BITS:
+                    acceptable = False
+                    break
+                window_bits = bits
+                response.append(f'server_max_window_bits={bits}')
+            elif key == 'client_max_window_bits':
+                if value is not None and _parse_window_bits(value) is None:
+                    acceptable = False
+                    break
+            else:
+                acceptable = False  # 未知参数：RFC 7692 要求拒绝该提议
+                break
+        if not acceptable:
+            continue
+        if not server_takeover:
+            response.append('server_no_context_takeover')
+        if not takeover:
+            response.append('client_no_context_takeover')
+        state = _DeflateState(server_takeover, window_bits, _DEFLATE_OPTIONS['min_size'])
+        return '; '.join(response), state
+    return None
+
+
+def _deflate_offer() -> str:
+    """客户端：握手请求中的 permessage-deflate 提议"""
+    offer = ['permessage-deflate', 'client_max_window_bits']
+    if not _DEFLATE_OPTIONS['context_takeover']:
+        offer += ['client_no_context_takeover', 'server_no_context_takeover']
+    return '; '.join(offer)
+
+
+def _accept_deflate_response(header: str) -> Optional[_DeflateState]:
+    """客户端：校验服务端接受的 permessage-deflate 参数
+
+    Returns:
+        压缩状态；服务端未接受压缩时返回 None
+
+    Raises:
+        ValueError: 服务端响应了未提议的扩展或非法参数（按 RFC 7692 须断开）
+    """
+    extensions = _parse_extensions(header)
+    if not extensions:
+        return None
+    if len(extensions) > 1 or extensions[0][0] != 'permessage-deflate':
+        raise ValueError(f"Unexpected Sec-WebSocket-Extensions: {header}")
+
+    client_takeover = _DEFLATE_OPTIONS['context_takeover']
+    window_bits = 15
+    for key, value in extensions[0][1].items():
+        if key == 'client_no_context_takeover' and value is None:
+            client_takeover = False
+        elif key == 'server_no_context_takeover' and value is None:
+            pass
+        elif key == 'server_max_window_bits' and _parse_window_bits(value) is not None:
+            pass  # 解压器按 15 位窗口可解任意更小窗口的数据
+        elif key == 'client_max_window_bits' and _parse_window_bits(value) is not None:
+            window_bits = int(value)
+            if window_bits < _DEFLATE_MIN_WINDOW_BITS:
+                raise ValueError(f"Unsupported client_max_window_bits: {value}")
+        else:
+            raise ValueError(f"Invalid permessage-deflate parameter: {key}")
+    return _DeflateState(client_takeover, window_bits, _DEFLATE_OPTIONS['min_size'])
+
+
+def _set_deflate_state(sock: socket.socket, state: Optional[_DeflateState]) -> None:
+    with _WS_DEFLATE_LOCK:
+        if state is None:
+            _WS_DEFLATE_MAP.pop(id(sock), None)
+        else:
+            _WS_DEFLATE_MAP[id(sock)] = state
+
+
+def _get_deflate_state(sock: socket.socket) -> Optional[_DeflateState]:
+    with _WS_DEFLATE_LOCK:
+        return _WS_DEFLATE_MAP.get(id(sock))
+
+
+def _summarize_deflate(stats: Dict[str, int]) -> Dict[str, Any]:
+    payload = stats['sent_payload_bytes'] + stats['recv_payload_bytes']
+    wire = stats['sent_wire_bytes'] + stats['recv_wire_bytes']
+    result = dict(stats)
+    result['saved_bytes'] = payload - wire
+    result['ratio'] = round(payload / wire, 2) if wire else 0
+    return result
+
+
+def get_deflate_stats(sock: Optional[socket.socket] = None) -> Optional[Dict[str, Any]]:
+    """获取 permessage-deflate 统计（用于 /status 端点）
+
+    只统计数据帧的 payload：*_payload_bytes 为压缩前大小，*_wire_bytes 为线上大小。
+
+    Args:
+        sock: 指定连接；None 表示本进程所有连接的累计（含已关闭连接）
+
+    Returns:
+        统计字典；指定的连接未协商压缩时返回 None
     """
-    result = bytearray(len(data))
-    for i in range(len(data)):
-        result[i] = data[i] ^ mask_key[i % 4]
-    return bytes(result)
+    with _WS_DEFLATE_LOCK:
+        if sock is not None:
+            state = _WS_DEFLATE_MAP.get(id(sock))
+            return _summarize_deflate(state.stats) if state else None
+        totals = dict.fromkeys(_DeflateState._STAT_KEYS, 0)
+        totals.update(_WS_DEFLATE_CLOSED)
+        for state in _WS_DEFLATE_MAP.values():
+            for key, value in state.stats.items():
+                totals[key] += value
+        active = len(_WS_DEFLATE_MAP)
+    result = _summarize_deflate(totals)
+    result['enabled'] = _DEFLATE_OPTIONS['enabled']
+    result['context_takeover'] = _DEFLATE_OPTIONS['context_takeover']
+    result['min_size'] = _DEFLATE_OPTIONS['min_size']
+    result['active_connections'] = active
+    return result
+
+
+def _set_subprotocol(sock: socket.socket, subprotocol: Optional[str]) -> None:
+    with _WS_SUBPROTOCOL_LOCK:
+        if subprotocol:
+            _WS_SUBPROTOCOL_MAP[id(sock)] = subprotocol
+        else:
+            _WS_SUBPROTOCOL_MAP.pop(id(sock), None)
+
+
+def get_subprotocol(sock: socket.socket) -> Optional[str]:
+    """获取连接握手时协商的子协议，未协商返回 None"""
+    with _WS_SUBPROTOCOL_LOCK:
+        return _WS_SUBPROTOCOL_MAP.get(id(sock))
 
 
 # =============================================================================
 # 服务端握手
 # =============================================================================
 
-def ws_server_handshake(handler: Any) -> socket.socket:
+def ws_server_handshake(handler: Any, detach: bool = False,
+                        subprotocols: Optional[List[str]] = None) -> socket.socket:
     """服务端 WebSocket 握手
 
     在 BaseHTTPRequestHandler.do_GET 中调用。
@@ -96,6 +401,10 @@ def ws_server_handshake(handler: Any) -> socket.socket:
 
     Args:
         handler: BaseHTTPRequestHandler 实例
+        detach: 是否把连接从 HTTP handler 上摘下。为 True 时返回持有同一 fd 的新 socket 对象，
+            原 socket 对象失效，HTTP 服务器在 do_GET 返回后的 shutdown/close 不再影响该连接，
+            工作线程可以立即释放（连接交给 ws_reactor 处理）
+        subprotocols: 本端支持的子协议，选择客户端提议中第一个受支持的（结果经 get_subprotocol() 查询）
 
     Returns:
         socket.socket: 已完成握手的原始 socket
@@ -124,11 +433,26 @@ def ws_server_handshake(handler: Any) -> socket.socket:
     # 计算接受密钥
     accept_key = _compute_accept_key(ws_key)
 
+    # 协商 permessage-deflate（客户端未提议或参数不可接受时不压缩）
+    deflate = None
+    if _DEFLATE_OPTIONS['enabled']:
+        deflate = _accept_deflate_offer(headers.get('Sec-WebSocket-Extensions', ''))
+
+    # 选择子协议（客户端未提议或均不支持时不返回该头）
+    subprotocol = None
+    if subprotocols:
+        offered = [p.strip() for p in headers.get('Sec-WebSocket-Protocol', '').split(',')]
+        subprotocol = next((p for p in offered if p in subprotocols), None)
+
     # 发送 101 响应
     handler.send_response(101)
     handler.send_header('Upgrade', 'websocket')
     handler.send_header('Connection', 'Upgrade')
     handler.send_header('Sec-WebSocket-Accept', accept_key)
+    if deflate is not None:
+        handler.send_header('Sec-WebSocket-Extensions', deflate[0])
+    if subprotocol:
+        handler.send_header('Sec-WebSocket-Protocol', subprotocol)
     handler.end_headers()
 
     # 获取底层 socket
@@ -140,11 +464,20 @@ def ws_server_handshake(handler: Any) -> socket.socket:
     else:
         raise ValueError("Cannot get underlying socket")
 
+    if detach:
+        family, type_, proto = sock.family, sock.type, sock.proto
+        sock = socket.socket(family, type_, proto, fileno=sock.detach())
+        # 本连接已升级，HTTP handler 不再读取后续请求
+        handler.close_connection = True
+
     # 标记为服务端模式（发送帧不需要 mask）
     with _WS_CLIENT_MODE_LOCK:
         _WS_CLIENT_MODE_MAP[id(sock)] = False
+    _set_deflate_state(sock, deflate[1] if deflate else None)
+    _set_subprotocol(sock, subprotocol)
 
-    logger.info("[ws] Server handshake completed")
+    logger.info("[ws] Server handshake completed (deflate=%s, subprotocol=%s)",
+                deflate[0] if deflate else 'off', subprotocol or '-')
     return sock
 
 
@@ -152,7 +485,8 @@ def ws_server_handshake(handler: Any) -> socket.socket:
 # 客户端握手
 # =============================================================================
 
-def ws_client_connect(url: str, extra_headers: Optional[Dict[str, str]] = None) -> socket.socket:
+def ws_client_connect(url: str, extra_headers: Optional[Dict[str, str]] = None,
+                      subprotocols: Optional[List[str]] = None) -> socket.socket:
     """客户端 WebSocket 握手
 
     发送 HTTP Upgrade 请求，验证响应，返回连接 socket。
@@ -160,6 +494,7 @@ def ws_client_connect(url: str, extra_headers: Optional[Dict[str, str]] = None)
     Args:
         url: WebSocket URL，格式 ws://host:port/path?query
         extra_headers: 额外的 HTTP 请求头
+        subprotocols: 按优先级提议的子协议，服务端选中的经 get_subprotocol() 查询
 
     Returns:
         socket.socket: 已完成握手的 socket
@@ -212,6 +547,10 @@ def ws_client_connect(url: str, extra_headers: Optional[Dict[str, str]] = None)
         "Sec-WebSocket-Version: 13",
         "User-Agent: Claude-Hooks-WS-Tunnel/1.0",
     ]
+    if _DEFLATE_OPTIONS['enabled']:
+        request_lines.append(f"Sec-WebSocket-Extensions: {_deflate_offer()}")
+    if subprotocols:
+        request_lines.append(f"Sec-WebSocket-Protocol: {', '.join(subprotocols)}")
 
     # 添加额外头
     if extra_headers:
@@ -283,11 +622,31 @@ def ws_client_connect(url: str, extra_headers: Optional[Dict[str, str]] = None)
         sock.close()
         raise ValueError(f"Invalid Sec-WebSocket-Accept: {actual_accept}")
 
+    # 服务端未返回扩展头（旧版网关）时不压缩
+    extensions = headers_lower.get('sec-websocket-extensions', '')
+    if extensions and not _DEFLATE_OPTIONS['enabled']:
+        sock.close()
+        raise ValueError(f"Unexpected Sec-WebSocket-Extensions: {extensions}")
+    try:
+        deflate = _accept_deflate_response(extensions)
+    except ValueError:
+        sock.close()
+        raise
+
+    # 服务端未返回子协议头（旧版网关）时按无子协议处理
+    subprotocol = headers_lower.get('sec-websocket-protocol', '') or None
+    if subprotocol and subprotocol not in (subprotocols or []):
+        sock.close()
+        raise ValueError(f"Unexpected Sec-WebSocket-Protocol: {subprotocol}")
+
     # 标记为客户端模式（发送帧需要 mask）
     with _WS_CLIENT_MODE_LOCK:
         _WS_CLIENT_MODE_MAP[id(sock)] = True
+    _set_deflate_state(sock, deflate)
+    _set_subprotocol(sock, subprotocol)
 
-    logger.info("[ws] Client handshake completed: %s:%s", host, port)
+    logger.info("[ws] Client handshake completed: %s:%s (deflate=%s, subprotocol=%s)",
+                host, port, extensions or 'off', subprotocol or '-')
     return sock
 
 
@@ -303,6 +662,14 @@ def ws_send_text(sock: socket.socket, data: str) -> None:
     _send_frame(sock, OPCODE_TEXT, data.encode('utf-8'))
 
 
+def ws_send_binary(sock: socket.socket, data: bytes) -> None:
+    """发送 binary frame
+
+    客户端模式下会自动 mask。
+    """
+    _send_frame(sock, OPCODE_BINARY, data)
+
+
 def ws_send_ping(sock: socket.socket, data: bytes = b'') -> None:
     """发送 ping frame"""
     _send_frame(sock, OPCODE_PING, data)
@@ -349,38 +716,65 @@ def _send_frame(sock: socket.socket, opcode: int, payload: bytes) -> None:
     # 从字典获取是否为客户端模式（未知 socket 默认当客户端处理，加 mask 更安全）
     with _WS_CLIENT_MODE_LOCK:
         is_client = _WS_CLIENT_MODE_MAP.get(id(sock), True)
+    # 控制帧不压缩
+    deflate = _get_deflate_state(sock) if opcode in (OPCODE_TEXT, OPCODE_BINARY) else None
 
-    fin = 0x80  # FIN=1, 单帧消息
-    rsv = 0x00  # 无扩展
+    with _get_send_lock(sock):
+        fin = 0x80  # FIN=1, 单帧消息
+        rsv = 0x00
+        if deflate is not None:
+            compressed = deflate.compress(payload)
+            if compressed is not None:
+                payload = compressed
+                rsv = 0x40  # RSV1：permessage-deflate 压缩消息
+
+        first_byte = fin | rsv | opcode
+        payload_len = len(payload)
+
+        # 构造帧头
+        if payload_len <= 125:
+            header = bytes([first_byte, payload_len])
+        elif payload_len <= 65535:
+            header = bytes([first_byte, 126]) + struct.pack('!H', payload_len)
+        else:
+            header = bytes([first_byte, 127]) + struct.pack('!Q', payload_len)
 
-    first_byte = fin | rsv | opcode
-    payload_len = len(payload)
+        # 客户端需要 mask
+        if is_client:
+            mask_key = os.urandom(4)
+            payload = _mask_data(payload, mask_key)
+            # 设置 MASK 位（second byte 的最高位）
+            # 注意：MASK 位与 payload length indicator 不冲突：
+            #   - length <= 125: header[1] = length, | 0x80 后高位为 MASK 标志
+            #   - length 126: header[1] = 126, | 0x80 = 254, 接收方 254 & 0x7F = 126（正确）
+            #   - length 127: header[1] = 127, | 0x80 = 255, 接收方 255 & 0x7F = 127（正确）
+            # 扩展长度字节 header[2:] 不受影响
+            header = bytes([header[0], header[1] | 0x80]) + header[2:] + mask_key
 
-    # 构造帧头
-    if payload_len <= 125:
-        header = bytes([first_byte, payload_len])
-    elif payload_len <= 65535:
-        header = bytes([first_byte, 126]) + struct.pack('!H', payload_len)
-    else:
-        header = bytes([first_byte, 127]) + struct.pack('!Q', payload_len)
-
-    # 客户端需要 mask
-    if is_client:
-        mask_key = os.urandom(4)
-        masked_payload = _mask_data(payload, mask_key)
-        # 设置 MASK 位（second byte 的最高位）
-        # 注意：MASK 位与 payload length indicator 不冲突：
-        #   - length <= 125: header[1] = length, | 0x80 后高位为 MASK 标志
-        #   - length 126: header[1] = 126, | 0x80 = 254, 接收方 254 & 0x7F = 126（正确）
-        #   - length 127: header[1] = 127, | 0x80 = 255, 接收方 255 & 0x7F = 127（正确）
-        # 扩展长度字节 header[2:] 不受影响
-        header = bytes([header[0], header[1] | 0x80]) + header[2:]
-        frame = header + mask_key + masked_payload
-    else:
-        frame = header + payload
+        _send_buffers(sock, header, payload)
 
-    with _get_send_lock(sock):
-        sock.sendall(frame)
+
+def _send_buffers(sock: socket.socket, header: bytes, payload: bytes) -> None:
+    """发送帧头和 payload
+
+    普通 socket 用 sendmsg 分散写（帧头与 payload 不拼接，大帧省一次整帧拷贝），
+    部分发送时用 memoryview 前移继续发送；SSL socket 不支持 sendmsg，拼接后 sendall。
+    """
+    if not payload:
+        sock.sendall(header)
+        return
+    if isinstance(sock, ssl.SSLSocket) or not hasattr(sock, 'sendmsg'):
+        sock.sendall(header + payload)
+        return
+
+    buffers = [memoryview(header), memoryview(payload)]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if buffers and sent:
+            buffers[0] = buffers[0][sent:]
 
 
 # =============================================================================
@@ -416,7 +810,7 @@ def ws_recv(sock: socket.socket, timeout: Optional[float] = None) -> Tuple[int,
 
         opcode = first_byte & 0x0F
         # fin = (first_byte & 0x80) >> 7  # 暂不使用
-        # rsv = (first_byte & 0x70) >> 4  # 暂不处理扩展
+        deflate = _check_rsv(sock, first_byte)
 
         masked = (second_byte & 0x80) >> 7
         payload_len = second_byte & 0x7F
@@ -445,25 +839,116 @@ def ws_recv(sock: socket.socket, timeout: Optional[float] = None) -> Tuple[int,
         if masked:
             payload = _mask_data(payload, mask_key)
 
-        return opcode, payload
+        return opcode, _inflate(deflate, first_byte, opcode, payload)
 
     finally:
         if timeout is not None:
             sock.settimeout(old_timeout)
 
 
-def _recv_exact(sock: socket.socket, length: int) -> bytes:
+def ws_parse_frame(buf: bytearray, sock: Optional[socket.socket] = None) -> Optional[Tuple[int, bytes, int]]:
+    """从接收缓冲中解析一帧（非阻塞场景使用，如 ws_reactor 事件循环）
+
+    Args:
+        buf: 已接收但尚未消费的数据
+        sock: 数据所属的 socket，用于查找协商的 permessage-deflate 状态；
+            同一连接的帧必须按到达顺序解析（解压上下文跨消息保留）
+
+    Returns:
+        (opcode, payload, consumed): 操作码、负载数据、该帧占用的字节数；
+        数据不足一帧时返回 None
+
+    Raises:
+        ValueError: 协议错误（帧过大、未协商扩展却置位 RSV、解压失败）
+    """
+    buf_len = len(buf)
+    if buf_len < 2:
+        return None
+
+    first_byte = buf[0]
+    opcode = first_byte & 0x0F
+    deflate = _check_rsv(sock, first_byte)
+    masked = buf[1] & 0x80
+    payload_len = buf[1] & 0x7F
+    pos = 2
+
+    # 读取扩展长度
+    if payload_len == 126:
+        if buf_len < 4:
+            return None
+        payload_len = struct.unpack_from('!H', buf, 2)[0]
+        pos = 4
+    elif payload_len == 127:
+        if buf_len < 10:
+            return None
+        payload_len = struct.unpack_from('!Q', buf, 2)[0]
+        pos = 10
+
+    # 检查帧大小限制（头部到齐即可判断，不必等 payload）
+    if payload_len > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame too large: {payload_len} bytes (max {MAX_FRAME_SIZE})")
+
+    mask_key = b''
+    if masked:
+        if buf_len < pos + 4:
+            return None
+        mask_key = bytes(buf[pos:pos + 4])
+        pos += 4
+
+    end = pos + payload_len
+    if buf_len < end:
+        return None
+
+    # 通过 memoryview 切片避免先复制再解 mask；返回前释放视图，
+    # 调用方随后 del buf[:consumed] 不会因仍有导出的缓冲而报 BufferError
+    with memoryview(buf) as view:
+        if masked:
+            payload = _mask_data(view[pos:end], mask_key)
+        else:
+            payload = bytes(view[pos:end])
+    return opcode, _inflate(deflate, first_byte, opcode, payload), end
+
+
+def _check_rsv(sock: Optional[socket.socket], first_byte: int) -> Optional[_DeflateState]:
+    """校验 RSV 位，返回该连接的 permessage-deflate 状态
+
+    Raises:
+        ValueError: RSV2/RSV3 置位，或未协商 permessage-deflate 却置位 RSV1
+    """
+    if first_byte & 0x30:
+        raise ValueError("Reserved bits RSV2/RSV3 set")
+    deflate = _get_deflate_state(sock) if sock is not None else None
+    if first_byte & 0x40 and deflate is None:
+        raise ValueError("RSV1 set without negotiated permessage-deflate")
+    return deflate
+
+
+def _inflate(deflate: Optional[_DeflateState], first_byte: int, opcode: int, payload: bytes) -> bytes:
+    """解压 RSV1 置位的数据帧，并记录压缩统计"""
+    if deflate is None or opcode not in (OPCODE_TEXT, OPCODE_BINARY):
+        if first_byte & 0x40:
+            raise ValueError(f"RSV1 set on opcode {opcode}")
+        return payload
+    if first_byte & 0x40:
+        return deflate.decompress(payload)
+    deflate.count_plain_recv(len(payload))
+    return payload
+
+
+def _recv_exact(sock: socket.socket, length: int) -> bytearray:
     """精确接收指定字节数
 
-    注：bytes 拼接对本隧道场景足够（payload 均为 KB 级 JSON，通常 1-2 次 recv），
-    无需 bytearray + memoryview 优化。
+    预分配 bytearray 并 recv_into 直接写入，大帧多次 recv 时不产生中间 bytes 和拼接拷贝。
     """
-    data = b''
-    while len(data) < length:
-        chunk = sock.recv(length - len(data))
-        if not chunk:
-            raise ConnectionError(f"Connection closed, received {len(data)}/{length} bytes")
-        data += chunk
+    data = bytearray(length)
+    view = memoryview(data)
+    pos = 0
+    while pos < length:
+        received = sock.recv_into(view[pos:], length - pos)
+        if not received:
+            raise ConnectionError(f"Connection closed, received {pos}/{length} bytes")
+        pos += received
+    view.release()
     return data
 
 
@@ -544,7 +1029,7 @@ def ws_close(sock: socket.socket, code: int = CLOSE_NORMAL, reason: str = '') ->
 
 
 def cleanup_socket_state(sock: socket.socket) -> None:
-    """清理 socket 的协议层状态（client mode 映射和发送锁）"""
+    """清理 socket 的协议层状态（client mode 映射、发送锁、压缩状态和子协议）"""
     sid = id(sock)
     try:
         with _WS_CLIENT_MODE_LOCK:
@@ -556,3 +1041,17 @@ def cleanup_socket_state(sock: socket.socket) -> None:
             _WS_SEND_LOCK_MAP.pop(sid, None)
     except Exception:
         pass
+    try:
+        with _WS_SUBPROTOCOL_LOCK:
+            _WS_SUBPROTOCOL_MAP.pop(sid, None)
+    except Exception:
+        pass
+    try:
+        with _WS_DEFLATE_LOCK:
+            state = _WS_DEFLATE_MAP.pop(sid, None)
+            if state is not None:
+                # 统计并入已关闭连接的累计
+                for key, value in state.stats.items():
+                    _WS_DEFLATE_CLOSED[key] = _WS_DEFLATE_CLOSED.get(key, 0) + value
+    except Exception:
+        pass
@@ -0,0 +1,324 @@
+"""WebSocket 隧道事件循环（网关侧）
+
+归属端: 飞书网关
+使用方: handlers/ws_handler.py（握手后移交连接），services/ws_registry.py（关闭连接）
+
+握手完成后，隧道 socket 从 HTTP 工作线程上摘下交给本模块：
+    - 单个 reactor 线程用 selectors（Linux 下为 epoll）监听所有隧道的可读事件，
+      接收数据、按帧切分、检查读超时
+    - 完整的帧交给有界线程池处理（ws_handler 的认证 / 消息逻辑），
+      同一连接的帧严格按到达顺序串行处理，不同连接之间并行
+    - 连接只由 reactor 线程关闭（先从 selector 注销再 close），
+      其他线程通过 close_tunnel() 请求关闭，避免 fd 复用导致 selector 状态错乱
+
+发送仍在调用方线程同步完成（ws_protocol 内置 per-socket 发送锁），
+socket 保持阻塞模式；reactor 只在可读事件后 recv，不会阻塞在接收上。
+
+空闲隧道不再各占一个工作线程：500 条空闲隧道的线程数与连接数无关。
+"""
+
+import collections
+import concurrent.futures
+import logging
+import selectors
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from services.ws_protocol import ws_parse_frame, ws_send_close, cleanup_socket_state
+
+logger = logging.getLogger(__name__)
+
+# 单次 recv 的缓冲大小
+RECV_CHUNK = 65536
+
+# 读超时检查间隔（秒）
+SWEEP_INTERVAL = 1.0
+
+
+class TunnelConnection:
+    """一条由 reactor 管理的隧道连接
+
+    on_frame / on_close 之外的业务状态（request_id、是否 pending 等）由 ws_handler 挂在本对象上。
+    """
+
+    def __init__(self, sock: socket.socket, owner_id: str, client_ip: str,
+                 read_timeout: float, on_frame: Callable, on_close: Callable):
+        self.sock = sock
+        self.owner_id = owner_id
+        self.client_ip = client_ip
+        # 距上次收到数据的最长允许时间（秒），业务层可在认证前后调整
+        self.read_timeout = read_timeout
+        self.on_frame = on_frame    # (conn, opcode, payload) -> bool，返回 False 表示关闭连接
+        self.on_close = on_close    # (conn, reason) -> None，在 reactor 线程中调用
+        self.last_recv = time.time()
+        self.buf = bytearray()
+        self.inbox = collections.deque()
+        self.scheduled = False
+        self.closed = False
+
+        # 业务状态（ws_handler 使用）
+        self.registered = False
+        self.is_pending = False
+        self.request_id = ''
+
+
+class WSTunnelReactor:
+    """WebSocket 隧道 reactor（单例）"""
+
+    _instance = None  # type: Optional[WSTunnelReactor]
+    _lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 16):
+        """初始化 reactor
+
+        Args:
+            max_workers: 帧处理线程池大小
+        """
+        self._selector = selectors.DefaultSelector()
+        self._conns = {}  # type: Dict[int, TunnelConnection]  # id(sock) -> conn
+        self._conns_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._max_workers = max_workers
+
+        # 其他线程 → reactor 线程的命令队列（只有 reactor 线程操作 selector）
+        self._commands = collections.deque()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+        self._thread = threading.Thread(target=self._loop, name='ws-reactor', daemon=True)
+        self._thread.start()
+        logger.info("[ws_reactor] Started with max_workers=%d", max_workers)
+
+    @classmethod
+    def initialize(cls, max_workers: int = 16) -> 'WSTunnelReactor':
+        """初始化单例"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(max_workers)
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional['WSTunnelReactor']:
+        return cls._instance
+
+    # =========================================================================
+    # 对外接口（任意线程）
+    # =========================================================================
+
+    def add_tunnel(self, sock: socket.socket, owner_id: str, client_ip: str,
+                   read_timeout: float, on_frame: Callable, on_close: Callable) -> TunnelConnection:
+        """接管一条已完成握手的隧道连接
+
+        Args:
+            sock: 已完成握手的 socket（应已从 HTTP handler 上摘下）
+            owner_id: 飞书用户 ID
+            client_ip: 客户端 IP
+            read_timeout: 初始读超时（秒）
+            on_frame: 帧处理回调，在线程池中按连接串行调用
+            on_close: 关闭回调，在 reactor 线程中调用
+
+        Returns:
+            TunnelConnection 对象
+        """
+        conn = TunnelConnection(sock, owner_id, client_ip, read_timeout, on_frame, on_close)
+        with self._conns_lock:
+            self._conns[id(sock)] = conn
+        self._post('add', conn, '')
+        return conn
+
+    def manages(self, sock: socket.socket) -> bool:
+        """sock 是否由 reactor 管理（尚未关闭）"""
+        with self._conns_lock:
+            return id(sock) in self._conns
+
+    def close_tunnel(self, sock: socket.socket, code: Optional[int] = None, reason: str = '') -> bool:
+        """请求关闭一条隧道（任意线程可调用）
+
+        Args:
+            sock: 隧道 socket
+            code: 关闭前发送的 close frame 关闭码，None 表示不发送
+            reason: close frame 中的原因
+
+        Returns:
+            False 表示该 socket 不由 reactor 管理（调用方自行关闭）
+        """
+        with self._conns_lock:
+            conn = self._conns.get(id(sock))
+        if conn is None:
+            return False
+        if code is not None:
+            try:
+                ws_send_close(sock, code, reason)
+            except Exception as e:
+                logger.debug("[ws_reactor] Failed to send close frame to %s: %s", conn.owner_id, e)
+        self._post('close', conn, 'closed by server')
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取 reactor 状态（用于 /status 端点）"""
+        with self._conns_lock:
+            conns = list(self._conns.values())
+        return {
+            'tunnels': len(conns),
+            'max_workers': self._max_workers,
+            'queued_frames': sum(len(c.inbox) for c in conns),
+        }
+
+    # =========================================================================
+    # reactor 线程
+    # =========================================================================
+
+    def _post(self, op: str, conn: TunnelConnection, reason: str) -> None:
+        self._commands.append((op, conn, reason))
+        try:
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass  # 唤醒缓冲已满，reactor 必然会被唤醒
+
+    def _loop(self) -> None:
+        next_sweep = time.time() + SWEEP_INTERVAL
+        while True:
+            try:
+                events = self._selector.select(max(0.0, next_sweep - time.time()))
+            except InterruptedError:
+                continue
+            except Exception as e:
+                logger.error("[ws_reactor] select failed: %s", e, exc_info=True)
+                time.sleep(0.1)
+                continue
+
+            for key, _ in events:
+                if key.data is None:
+                    self._drain_wakeup()
+                else:
+                    self._on_readable(key.data)
+
+            self._run_commands()
+
+            now = time.time()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _run_commands(self) -> None:
+        while self._commands:
+            op, conn, reason = self._commands.popleft()
+            if op == 'add':
+                if conn.closed:
+                    continue
+                try:
+                    self._selector.register(conn.sock, selectors.EVENT_READ, conn)
+                except (ValueError, OSError) as e:
+                    # 移交前对端已关闭等情况
+                    logger.info("[ws_reactor] Failed to register tunnel for %s: %s", conn.owner_id, e)
+                    self._close(conn, 'register failed')
+            else:
+                self._close(conn, reason)
+
+    def _on_readable(self, conn: TunnelConnection) -> None:
+        try:
+            chunk = conn.sock.recv(RECV_CHUNK)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return
+        except OSError as e:
+            self._close(conn, 'connection error: %s' % e)
+            return
+        if not chunk:
+            self._close(conn, 'connection closed by peer')
+            return
+
+        conn.last_recv = time.time()
+        conn.buf += chunk
+
+        frames = []
+        try:
+            while True:
+                frame = ws_parse_frame(conn.buf, conn.sock)
+                if frame is None:
+                    break
+                opcode, payload, consumed = frame
+                del conn.buf[:consumed]
+                frames.append((opcode, payload))
+        except ValueError as e:
+            # 协议错误（如帧过大）
+            logger.warning("[ws_reactor] Protocol error for %s: %s", conn.owner_id, e)
+            self._close(conn, 'protocol error')
+            return
+
+        if frames:
+            self._dispatch(conn, frames)
+
+    def _dispatch(self, conn: TunnelConnection, frames) -> None:
+        with self._conns_lock:
+            conn.inbox.extend(frames)
+            if conn.scheduled:
+                return
+            conn.scheduled = True
+        self._executor.submit(self._process, conn)
+
+    def _sweep(self, now: float) -> None:
+        with self._conns_lock:
+            conns = list(self._conns.values())
+        for conn in conns:
+            if not conn.closed and now - conn.last_recv > conn.read_timeout:
+                self._close(conn, 'timeout')
+
+    def _close(self, conn: TunnelConnection, reason: str) -> None:
+        """关闭连接（仅 reactor 线程调用）"""
+        if conn.closed:
+            return
+        conn.closed = True
+        with self._conns_lock:
+            self._conns.pop(id(conn.sock), None)
+            conn.inbox.clear()
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+
+        try:
+            conn.on_close(conn, reason)
+        except Exception as e:
+            logger.error("[ws_reactor] on_close error for %s: %s", conn.owner_id, e, exc_info=True)
+
+        cleanup_socket_state(conn.sock)
+        try:
+            conn.sock.close()
+        except Exception:
+            pass
+
+    # =========================================================================
+    # 线程池
+    # =========================================================================
+
+    def _process(self, conn: TunnelConnection) -> None:
+        """串行处理一条连接已到达的帧（线程池中运行）"""
+        while True:
+            with self._conns_lock:
+                if conn.closed or not conn.inbox:
+                    conn.scheduled = False
+                    return
+                opcode, payload = conn.inbox.popleft()
+            try:
+                keep_open = conn.on_frame(conn, opcode, payload)
+            except Exception as e:
+                # 业务层未捕获的异常：连接状态已不可信，直接关闭
+                logger.error("[ws_reactor] Frame handling error for %s: %s", conn.owner_id, e, exc_info=True)
+                keep_open = False
+            if not keep_open:
+                with self._conns_lock:
+                    conn.inbox.clear()
+                    conn.scheduled = False
+                self._post('close', conn, 'closed by handler')
+                return
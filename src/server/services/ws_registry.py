@@ -3,20 +3,28 @@
 管理 WebSocket 长连接的生命周期：
 - pending 连接：等待用户授权的连接
 - 已认证连接：完成授权，可参与请求路由
-- 请求-响应匹配：同步等待响应
+- 请求-响应匹配：send_request_async() 返回 Future，同一隧道可有多个在途请求
+  （每个 owner 最多 max_inflight_per_owner 个，超出的排队等待窗口），
+  send_request() 在其上同步等待；gather() 用于向多个 owner 并发请求
 
 超时与清理机制详见 handlers/ws_handler.py 模块文档。
 """
 
+import collections
+import concurrent.futures
+import heapq
+import itertools
 import json
 import logging
 import socket
 import threading
 import time
 import uuid
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from services.ws_protocol import ws_send_text, ws_close
+from services import tunnel_codec
+from services.ws_protocol import (ws_send_text, ws_send_binary, ws_close, get_deflate_stats,
+                                  get_subprotocol, CLOSE_NORMAL)
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +42,26 @@ WS_CARD_COOLDOWN = 60
 WS_MAX_PENDING_PER_OWNER = 5
 
 
+class _WSRequest:
+    """一个隧道请求：排队（等待 owner 窗口）→ 在途（已发送，等待响应）→ 完成"""
+
+    __slots__ = ('request_id', 'owner_id', 'path', 'message', 'future', 'deadline', 'state', 'conn')
+
+    QUEUED = 0
+    INFLIGHT = 1
+    DONE = 2
+
+    def __init__(self, owner_id: str, path: str, message: Dict[str, Any], deadline: float):
+        self.request_id = message['id']
+        self.owner_id = owner_id
+        self.path = path
+        self.message = message
+        self.future = concurrent.futures.Future()
+        self.deadline = deadline
+        self.state = self.QUEUED
+        self.conn = None  # type: Optional[socket.socket]
+
+
 class WebSocketRegistry:
     """WebSocket 连接注册表（单例）
 
@@ -45,7 +73,11 @@ class WebSocketRegistry:
     _instance: Optional['WebSocketRegistry'] = None
     _lock = threading.Lock()
 
-    def __init__(self) -> None:
+    def __init__(self, max_inflight_per_owner: int = 8) -> None:
+        """
+        Args:
+            max_inflight_per_owner: 每个 owner 隧道上同时在途的请求数上限
+        """
         # 已认证连接：owner_id -> (ws_conn, auth_token)
         self._connections: Dict[str, Tuple[socket.socket, str]] = {}
         self._connections_lock = threading.Lock()
@@ -63,10 +95,25 @@ class WebSocketRegistry:
         # 格式：owner_id -> {request_id: binding_params}
         self._pending_binding_params: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
-        # 请求-响应匹配
-        self._pending_requests: Dict[str, threading.Event] = {}
-        self._responses: Dict[str, Dict[str, Any]] = {}
+        # 请求-响应匹配：request_id -> 在途请求；owner_id -> 等待窗口的请求队列 / 在途数
+        self._pending_requests: Dict[int, _WSRequest] = {}
+        self._queued: Dict[str, collections.deque] = {}
+        self._inflight: Dict[str, int] = {}
+        self._max_inflight = max_inflight_per_owner
         self._request_lock = threading.Lock()
+        # 超时检查：最小堆 (deadline, seq, request)，由单个后台线程处理，不再每个请求阻塞一个线程
+        self._request_cond = threading.Condition(self._request_lock)
+        self._deadlines: List[Tuple[float, int, _WSRequest]] = []
+        self._seq = itertools.count()
+        self._request_ids = itertools.count()
+        self._timeout_thread: Optional[threading.Thread] = None
+        self._request_stats = {
+            'sent': 0,
+            'completed': 0,
+            'timeouts': 0,
+            'failed': 0,
+            'queued_total': 0,
+        }
 
         # 授权卡片冷却：owner_id -> 上次发卡时间戳
         self._card_cooldown: Dict[str, float] = {}
@@ -76,12 +123,12 @@ class WebSocketRegistry:
         return cls._instance
 
     @classmethod
-    def initialize(cls) -> 'WebSocketRegistry':
+    def initialize(cls, max_inflight_per_owner: int = 8) -> 'WebSocketRegistry':
         """初始化单例"""
         with cls._lock:
             if cls._instance is None:
-                cls._instance = cls()
-                logger.info("[ws_registry] Initialized")
+                cls._instance = cls(max_inflight_per_owner)
+                logger.info("[ws_registry] Initialized (max_inflight_per_owner=%d)", max_inflight_per_owner)
             return cls._instance
 
     # =========================================================================
@@ -318,6 +365,9 @@ class WebSocketRegistry:
             owner_id: 飞书用户 ID
             ws_conn: 要清理的具体连接
         """
+        # 该连接上的在途请求不会再有响应（含已被新连接替换的旧连接），立即失败，不必等到超时
+        self._fail_requests_on(ws_conn)
+
         # 尝试从 authenticated 移除
         with self._connections_lock:
             if owner_id in self._connections:
@@ -574,7 +624,7 @@ class WebSocketRegistry:
     def send_request(self, owner_id: str, path: str, body: Dict[str, Any],
                      headers: Optional[Dict[str, str]] = None,
                      timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
-        """发送请求并同步等待响应
+        """发送请求并同步等待响应（基于 send_request_async）
 
         Args:
             owner_id: 飞书用户 ID
@@ -588,16 +638,43 @@ class WebSocketRegistry:
         """
         if timeout is None:
             timeout = WS_REQUEST_TIMEOUT
-
-        ws_conn = self.get(owner_id)
-        if ws_conn is None:
-            logger.debug("[ws_registry] No connection for %s", owner_id)
+        future = self.send_request_async(owner_id, path, body, headers, timeout)
+        try:
+            # 超时由后台线程结束 future，这里多留 1 秒余量只作兜底
+            return future.result(timeout + 1)
+        except concurrent.futures.TimeoutError:
             return None
 
-        # 生成请求 ID
-        request_id = str(uuid.uuid4())
+    def send_request_async(self, owner_id: str, path: str, body: Dict[str, Any],
+                           headers: Optional[Dict[str, str]] = None,
+                           timeout: Optional[float] = None) -> concurrent.futures.Future:
+        """发送请求，不等待响应
+
+        owner 的在途请求未达窗口上限时立即发送，否则排队，待前面的请求完成后按提交顺序发送。
+        超时从提交时算起（含排队时间）。
 
-        # 构造请求消息
+        Args:
+            owner_id: 飞书用户 ID
+            path: 请求路径（如 /cb/decision）
+            body: 请求体
+            headers: 额外的请求头
+            timeout: 超时（秒），默认 WS_REQUEST_TIMEOUT
+
+        Returns:
+            Future，结果为响应数据；超时、连接不存在或发送失败时结果为 None（不会抛异常）。
+            可用 add_done_callback() 注册回调（在完成请求的线程中调用，不应阻塞）
+        """
+        if timeout is None:
+            timeout = WS_REQUEST_TIMEOUT
+
+        if not self.is_authenticated(owner_id):
+            logger.debug("[ws_registry] No connection for %s", owner_id)
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+
+        # 整数请求 ID（1 ~ 2^32-1 循环）：二进制信封按 u32 编码，JSON 格式下对端原样回传
+        request_id = next(self._request_ids) % 0xFFFFFFFF + 1
         request_msg = {
             'type': 'request',
             'id': request_id,
@@ -606,33 +683,39 @@ class WebSocketRegistry:
             'headers': headers or {},
             'body': body
         }
+        req = _WSRequest(owner_id, path, request_msg, time.time() + timeout)
+
+        with self._request_cond:
+            self._ensure_timeout_thread()
+            heapq.heappush(self._deadlines, (req.deadline, next(self._seq), req))
+            self._request_cond.notify()
+            if self._inflight.get(owner_id, 0) < self._max_inflight:
+                self._start_locked(req)
+                send_now = True
+            else:
+                self._queued.setdefault(owner_id, collections.deque()).append(req)
+                self._request_stats['queued_total'] += 1
+                send_now = False
 
-        # 准备等待
-        event = threading.Event()
-        with self._request_lock:
-            self._pending_requests[request_id] = event
+        if send_now:
+            self._transmit(req)
+        return req.future
 
-        try:
-            # 发送请求（ws_protocol 层已内置 per-socket 发送锁，无需额外加锁）
-            ws_send_text(ws_conn, json.dumps(request_msg))
-            logger.debug("[ws_registry] Sent request %s to %s: %s", request_id, owner_id, path)
-
-            # 等待响应
-            if event.wait(timeout=timeout):
-                with self._request_lock:
-                    response = self._responses.pop(request_id, None)
-                return response
-            else:
-                logger.warning("[ws_registry] Request %s timed out (%.1fs)", request_id, timeout)
-                return None
+    @staticmethod
+    def gather(futures: Iterable[concurrent.futures.Future],
+               timeout: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """等待一组 send_request_async() 的结果
 
-        except Exception as e:
-            logger.error("[ws_registry] Failed to send request: %s", e)
-            return None
-        finally:
-            with self._request_lock:
-                self._pending_requests.pop(request_id, None)
-                self._responses.pop(request_id, None)
+        Args:
+            futures: Future 列表
+            timeout: 最长等待时间（秒），None 表示等到每个请求各自完成或超时
+
+        Returns:
+            与 futures 顺序一致的响应列表，未完成的位置为 None
+        """
+        futures = list(futures)
+        concurrent.futures.wait(futures, timeout=timeout)
+        return [f.result() if f.done() else None for f in futures]
 
     def handle_response(self, response: Dict[str, Any]) -> None:
         """处理收到的响应消息
@@ -646,13 +729,142 @@ class WebSocketRegistry:
             return
 
         with self._request_lock:
-            event = self._pending_requests.get(request_id)
-            if event:
-                self._responses[request_id] = response
-                event.set()
-                logger.debug("[ws_registry] Matched response for request %s", request_id)
+            req = self._pending_requests.get(request_id)
+        if req is None:
+            logger.warning("[ws_registry] No pending request for response %s", request_id)
+            return
+        logger.debug("[ws_registry] Matched response for request %s", request_id)
+        self._finish(req, response)
+
+    def get_request_stats(self) -> Dict[str, Any]:
+        """获取隧道请求统计（用于 /status 端点）"""
+        with self._request_lock:
+            stats = dict(self._request_stats)
+            stats['max_inflight_per_owner'] = self._max_inflight
+            stats['inflight'] = len(self._pending_requests)
+            stats['queued'] = sum(len(q) for q in self._queued.values())
+        return stats
+
+    # -------------------------------------------------------------------------
+    # 请求调度（内部）
+    # -------------------------------------------------------------------------
+
+    def _start_locked(self, req: _WSRequest) -> None:
+        """占用 owner 窗口并登记为在途（持有 _request_lock 时调用）"""
+        req.state = _WSRequest.INFLIGHT
+        self._inflight[req.owner_id] = self._inflight.get(req.owner_id, 0) + 1
+        self._pending_requests[req.request_id] = req
+        self._request_stats['sent'] += 1
+
+    def _transmit(self, req: _WSRequest) -> None:
+        """发送在途请求（锁外调用；响应可能在发送返回前就已到达）"""
+        ws_conn = self.get(req.owner_id)
+        if ws_conn is None:
+            logger.debug("[ws_registry] No connection for %s", req.owner_id)
+            self._finish(req, None, failed=True)
+            return
+        req.conn = ws_conn
+        try:
+            # 发送请求（ws_protocol 层已内置 per-socket 发送锁，无需额外加锁）
+            # 握手协商了二进制信封的连接用 binary frame，否则 JSON text frame
+            data = None
+            if get_subprotocol(ws_conn) == tunnel_codec.SUBPROTOCOL:
+                data = tunnel_codec.encode(req.message)
+            if data is not None:
+                ws_send_binary(ws_conn, data)
+            else:
+                ws_send_text(ws_conn, json.dumps(req.message))
+            logger.debug("[ws_registry] Sent request %s to %s: %s", req.request_id, req.owner_id, req.path)
+        except Exception as e:
+            logger.error("[ws_registry] Failed to send request: %s", e)
+            self._finish(req, None, failed=True)
+
+    def _finish(self, req: _WSRequest, response: Optional[Dict[str, Any]],
+                failed: bool = False, timed_out: bool = False) -> None:
+        """结束请求：释放窗口、设置 future 结果，并发送该 owner 排队中的下一个请求"""
+        next_req = None
+        with self._request_lock:
+            if req.state == _WSRequest.DONE:
+                return
+            if req.state == _WSRequest.INFLIGHT:
+                self._pending_requests.pop(req.request_id, None)
+                remaining = self._inflight.get(req.owner_id, 1) - 1
+                if remaining > 0:
+                    self._inflight[req.owner_id] = remaining
+                else:
+                    self._inflight.pop(req.owner_id, None)
+                next_req = self._dequeue_locked(req.owner_id)
             else:
-                logger.warning("[ws_registry] No pending request for response %s", request_id)
+                queue = self._queued.get(req.owner_id)
+                if queue is not None:
+                    queue.remove(req)
+                    if not queue:
+                        self._queued.pop(req.owner_id, None)
+            req.state = _WSRequest.DONE
+            if timed_out:
+                self._request_stats['timeouts'] += 1
+            elif failed:
+                self._request_stats['failed'] += 1
+            else:
+                self._request_stats['completed'] += 1
+
+        req.future.set_result(response)
+        if next_req is not None:
+            self._transmit(next_req)
+
+    def _dequeue_locked(self, owner_id: str) -> Optional[_WSRequest]:
+        """取出 owner 的下一个排队请求并占用窗口（持有 _request_lock 时调用）"""
+        queue = self._queued.get(owner_id)
+        if not queue:
+            return None
+        req = queue.popleft()
+        if not queue:
+            self._queued.pop(owner_id, None)
+        self._start_locked(req)
+        return req
+
+    def _fail_requests_on(self, ws_conn: socket.socket) -> None:
+        """连接已关闭：结束在该连接上发出的在途请求"""
+        with self._request_lock:
+            doomed = [req for req in self._pending_requests.values() if req.conn is ws_conn]
+        for req in doomed:
+            self._finish(req, None, failed=True)
+        if doomed:
+            logger.info("[ws_registry] Failed %d in-flight request(s) on closed connection", len(doomed))
+
+    def _ensure_timeout_thread(self) -> None:
+        """按需启动超时检查线程（持有 _request_lock 时调用）"""
+        if self._timeout_thread is None:
+            self._timeout_thread = threading.Thread(target=self._timeout_loop,
+                                                    name='ws-request-timeout', daemon=True)
+            self._timeout_thread.start()
+
+    def _timeout_loop(self) -> None:
+        while True:
+            expired = []
+            with self._request_cond:
+                while not expired:
+                    if not self._deadlines:
+                        self._request_cond.wait()
+                        continue
+                    deadline, _, req = self._deadlines[0]
+                    if req.state == _WSRequest.DONE:
+                        heapq.heappop(self._deadlines)
+                        continue
+                    now = time.time()
+                    if deadline > now:
+                        self._request_cond.wait(deadline - now)
+                        continue
+                    # 相差不足 10ms 的到期一并处理（同一批提交的请求通常同时到期）
+                    while self._deadlines and self._deadlines[0][0] <= now + 0.01:
+                        expired.append(heapq.heappop(self._deadlines)[2])
+            # 先结束排队中的请求：否则在途请求超时释放窗口时会把同样已过期的排队请求发出去
+            expired.sort(key=lambda r: r.state)
+            for req in expired:
+                if req.state != _WSRequest.DONE:
+                    logger.warning("[ws_registry] Request %s timed out (%s, %s)",
+                                   req.request_id, req.owner_id, req.path)
+                    self._finish(req, None, timed_out=True)
 
     # =========================================================================
     # 辅助方法
@@ -668,7 +880,15 @@ class WebSocketRegistry:
             logger.debug("[ws_registry] Failed to send replaced notification: %s", e)
 
     def _close_connection(self, ws_conn: socket.socket) -> None:
-        """关闭连接"""
+        """关闭连接
+
+        隧道连接由 WSTunnelReactor 管理时交给 reactor 线程关闭（发送 close frame 后注销并关闭），
+        不在此处读取对端的 close 回复，避免与 reactor 争抢接收。
+        """
+        from services.ws_reactor import WSTunnelReactor
+        reactor = WSTunnelReactor.get_instance()
+        if reactor and reactor.close_tunnel(ws_conn, CLOSE_NORMAL):
+            return
         try:
             ws_close(ws_conn)
         except Exception as e:
@@ -688,7 +908,17 @@ class WebSocketRegistry:
         now = time.time()
 
         with self._connections_lock:
-            authenticated_ids = list(self._connections.keys())
+            authenticated = [(owner_id, conn) for owner_id, (conn, _) in self._connections.items()]
+        authenticated_ids = [owner_id for owner_id, _ in authenticated]
+        # 各隧道的 permessage-deflate 统计（未协商压缩的连接不列出）
+        compression = {}
+        for owner_id, conn in authenticated:
+            stats = get_deflate_stats(conn)
+            if stats is not None:
+                compression[owner_id] = stats
+        # 协商了 RPC 二进制信封的隧道（其余为 JSON）
+        binary_envelope = [owner_id for owner_id, conn in authenticated
+                           if get_subprotocol(conn) == tunnel_codec.SUBPROTOCOL]
 
         with self._pending_lock:
             pending_info = []
@@ -705,7 +935,10 @@ class WebSocketRegistry:
             'authenticated_count': len(authenticated_ids),
             'authenticated_owner_ids': authenticated_ids,
             'pending_count': len(pending_info),
-            'pending': pending_info
+            'pending': pending_info,
+            'compression': compression,
+            'binary_envelope_owner_ids': binary_envelope,
+            'requests': self.get_request_stats()
         }
 
     def cleanup_expired_pending(self) -> int:
@@ -13,10 +13,11 @@ import threading
 import time
 from typing import Any, Dict, List, Optional
 
+from services import tunnel_codec
 from services.ws_protocol import (
-    ws_client_connect, ws_send_text, ws_recv, ws_send_ping,
-    ws_send_pong, ws_send_close, ws_close, cleanup_socket_state,
-    OPCODE_TEXT, OPCODE_PING, OPCODE_CLOSE
+    ws_client_connect, ws_send_text, ws_send_binary, ws_recv, ws_send_ping,
+    ws_send_pong, ws_send_close, ws_close, cleanup_socket_state, get_subprotocol,
+    OPCODE_TEXT, OPCODE_BINARY, OPCODE_PING, OPCODE_CLOSE
 )
 from services.auth_token_store import AuthTokenStore
 
@@ -33,8 +34,77 @@ RECONNECT_INITIAL_DELAY = 1.0  # 初始延迟
 RECONNECT_MAX_DELAY = 60.0  # 最大延迟
 RECONNECT_BACKOFF_FACTOR = 2.0  # 指数退避因子
 
-# 请求处理并发数上限
-MAX_REQUEST_WORKERS = 8
+# 网关请求分级处理：每级独立的有界线程池，慢请求占满本级线程也不会挡住其他级别
+#   - interactive: 权限决策与 session 查询，用户正在等待（飞书卡片点击）
+#   - normal: 其他 session / 目录记录类请求（含未列出的路径）
+#   - slow: 启动 Claude 进程、浏览目录（可能耗时数秒）
+REQUEST_CLASS_WORKERS = {
+    'interactive': 4,
+    'normal': 2,
+    'slow': 4,
+}
+_REQUEST_CLASS_BY_PATH = {
+    '/cb/decision': 'interactive',
+    '/cb/check-owner': 'interactive',
+    '/cb/session/get-chat-id': 'interactive',
+    '/cb/session/get-last-message-id': 'interactive',
+    '/cb/session/check-skip-user-prompt': 'interactive',
+    '/cb/session/get-info': 'interactive',
+    '/cb/claude/new': 'slow',
+    '/cb/claude/continue': 'slow',
+    '/cb/claude/browse-dirs': 'slow',
+}
+
+
+class _RequestLane:
+    """一个请求级别的线程池与排队统计"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='ws-client-' + name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def submit(self, fn, *args) -> None:
+        enqueued_at = time.time()
+        with self._lock:
+            self.queued += 1
+        self.executor.submit(self._run, enqueued_at, fn, args)
+
+    def _run(self, enqueued_at: float, fn, args) -> None:
+        waited = time.time() - enqueued_at
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+        if waited > 1:
+            logger.info("[ws_client] %s request waited %.1fs in queue", self.name, waited)
+        try:
+            fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                'workers': self.max_workers,
+                'queued': self.queued,
+                'active': self.active,
+                'completed': self.completed,
+                'avg_wait_ms': round(self.wait_total * 1000 / started, 1) if started else 0,
+                'max_wait_ms': round(self.wait_max * 1000, 1),
+            }
 
 
 class WSTunnelClient:
@@ -54,7 +124,8 @@ class WSTunnelClient:
                  default_chat_dir: str = '',
                  default_chat_follow_thread: bool = True,
                  group_name_prefix: Optional[str] = None,
-                 group_dissolve_days: Optional[int] = None) -> None:
+                 group_dissolve_days: Optional[int] = None,
+                 binary_envelope: bool = True) -> None:
         """
         Args:
             gateway_url: 网关 HTTP base URL（如 http://gateway:8080）
@@ -67,6 +138,7 @@ class WSTunnelClient:
             default_chat_follow_thread: 默认聊天目录是否跟随全局话题模式
             group_name_prefix: 群聊名称前缀（传递给 gateway BindingStore）
             group_dissolve_days: 群聊自动解散天数（传递给 gateway BindingStore）
+            binary_envelope: 握手时是否提议 RPC 二进制信封（网关不支持时回退 JSON）
         """
         self.gateway_url = gateway_url
         self.owner_id = owner_id
@@ -78,6 +150,7 @@ class WSTunnelClient:
         self.default_chat_follow_thread = default_chat_follow_thread
         self.group_name_prefix = group_name_prefix
         self.group_dissolve_days = group_dissolve_days
+        self.binary_envelope = binary_envelope
         self.sock: Optional[socket.socket] = None
         self.running = False
         self.authenticated = False
@@ -88,8 +161,9 @@ class WSTunnelClient:
         self._thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
 
-        # 请求处理线程池：限制并发处理的请求数，防止大量请求耗尽线程资源
-        self._request_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_REQUEST_WORKERS)
+        # 请求处理线程池（按级别分开）：限制并发处理的请求数，防止大量请求耗尽线程资源
+        self._request_lanes = {name: _RequestLane(name, workers)
+                               for name, workers in REQUEST_CLASS_WORKERS.items()}
 
     def start(self) -> None:
         """启动客户端（在后台线程中运行）"""
@@ -119,7 +193,8 @@ class WSTunnelClient:
             self._thread.join(timeout=5)
 
         # 关闭线程池（不等待进行中的任务，避免阻塞）
-        self._request_executor.shutdown(wait=False)
+        for lane in self._request_lanes.values():
+            lane.executor.shutdown(wait=False)
 
         logger.info("[ws_client] Stopped")
 
@@ -172,7 +247,8 @@ class WSTunnelClient:
 
         # 建立 WebSocket 连接
         try:
-            self.sock = ws_client_connect(url)
+            subprotocols = [tunnel_codec.SUBPROTOCOL] if self.binary_envelope else None
+            self.sock = ws_client_connect(url, subprotocols=subprotocols)
             logger.info("[ws_client] Connected to gateway")
         except (ConnectionError, socket.error, OSError) as e:
             logger.warning("[ws_client] Failed to connect: %s", e)
@@ -250,6 +326,15 @@ class WSTunnelClient:
                         # 消息处理错误不应断开连接，仅记录
                         logger.error("[ws_client] Message handling error: %s", e, exc_info=True)
 
+                elif opcode == OPCODE_BINARY and get_subprotocol(self.sock) == tunnel_codec.SUBPROTOCOL:
+                    # 二进制信封的 RPC 请求，解码后与 JSON 消息同样处理
+                    try:
+                        self._handle_message(tunnel_codec.decode(payload))
+                    except ValueError as e:
+                        logger.warning("[ws_client] Invalid binary envelope: %s", e)
+                    except Exception as e:
+                        logger.error("[ws_client] Message handling error: %s", e, exc_info=True)
+
                 elif opcode == OPCODE_PING:
                     ws_send_pong(self.sock, payload)
 
@@ -375,8 +460,13 @@ class WSTunnelClient:
         # 服务端发完 auth_error 后会关闭 socket，消息循环收到异常后退出并重连
 
     def _handle_request(self, msg: Dict[str, Any]) -> None:
-        """处理来自网关的请求（在线程池中执行，避免阻塞消息循环）"""
-        self._request_executor.submit(self._process_request, msg)
+        """处理来自网关的请求（按路径分级，在对应线程池中执行，避免阻塞消息循环）"""
+        request_class = _REQUEST_CLASS_BY_PATH.get(msg.get('path', ''), 'normal')
+        self._request_lanes[request_class].submit(self._process_request, msg)
+
+    def get_request_stats(self) -> Dict[str, Any]:
+        """获取各级请求线程池的排队统计（用于 /status 端点）"""
+        return {name: lane.get_stats() for name, lane in self._request_lanes.items()}
 
     def _process_request(self, msg: Dict[str, Any]) -> None:
         """实际处理请求（在独立线程中运行）
@@ -420,10 +510,17 @@ class WSTunnelClient:
             }
 
         # 发送响应（ws_protocol 层已内置 per-socket 发送锁，无需额外加锁）
+        # 握手协商了二进制信封时用 binary frame，否则 JSON text frame
         sock = self.sock
         if sock:
             try:
-                ws_send_text(sock, json.dumps(response_msg))
+                data = None
+                if get_subprotocol(sock) == tunnel_codec.SUBPROTOCOL:
+                    data = tunnel_codec.encode(response_msg)
+                if data is not None:
+                    ws_send_binary(sock, data)
+                else:
+                    ws_send_text(sock, json.dumps(response_msg))
             except Exception as e:
                 logger.error("[ws_client] Failed to send response: %s", e)
 
@@ -463,7 +560,8 @@ def start_ws_tunnel_client(gateway_url: str, owner_id: str,
                            default_chat_dir: str = '',
                            default_chat_follow_thread: bool = True,
                            group_name_prefix: Optional[str] = None,
-                           group_dissolve_days: Optional[int] = None) -> WSTunnelClient:
+                           group_dissolve_days: Optional[int] = None,
+                           binary_envelope: bool = True) -> WSTunnelClient:
     """启动 WebSocket 隧道客户端
 
     Args:
@@ -477,6 +575,7 @@ def start_ws_tunnel_client(gateway_url: str, owner_id: str,
         default_chat_follow_thread: 默认聊天目录是否跟随全局话题模式
         group_name_prefix: 群聊名称前缀（传递给 gateway BindingStore）
         group_dissolve_days: 群聊自动解散天数（传递给 gateway BindingStore）
+        binary_envelope: 握手时是否提议 RPC 二进制信封
 
     Returns:
         客户端实例
@@ -496,7 +595,8 @@ def start_ws_tunnel_client(gateway_url: str, owner_id: str,
         default_chat_dir=default_chat_dir,
         default_chat_follow_thread=default_chat_follow_thread,
         group_name_prefix=group_name_prefix,
-        group_dissolve_days=group_dissolve_days
+        group_dissolve_days=group_dissolve_days,
+        binary_envelope=binary_envelope
     )
     _client_instance.start()
     return _client_instance
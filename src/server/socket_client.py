@@ -10,7 +10,10 @@ Socket 客户端 - 替代 socat 实现可靠的双向通信
 
 通信协议详见: shared/protocol.md
     - 发送：原始 JSON 字符串（UTF-8 编码）
-    - 接收：4 字节长度前缀 + JSON 数据（大端序）
+    - 接收：确认响应为原始 JSON，决策响应为 4 字节长度前缀 + JSON 数据（大端序）
+
+    服务端也接受长度前缀请求，但客户端保持发送原始 JSON：
+    升级后尚未重启的服务端只解析原始 JSON，客户端不能先于服务端切换格式。
 
 优势：
     - 避免 socat 的 half-close 问题
@@ -37,6 +40,26 @@ logger.info("Logging to: %s (daily rotating)", logger.handlers[0].baseFilename)
 logger.info("Client timeout: %ss (server: %ss + buffer: %ss)", CLIENT_TIMEOUT, PERMISSION_REQUEST_TIMEOUT, CLIENT_TIMEOUT_BUFFER)
 
 
+def _recv_json_ack(sock):
+    """读取原始 JSON 确认响应（无长度前缀），连接提前关闭返回 None
+
+    仅在收到的数据以 '}' 结尾时尝试解析，避免每个分片都重新解析整个缓冲区。
+    """
+    data = b''
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return None
+        data += chunk
+        if not data.rstrip().endswith(b'}'):
+            continue
+        try:
+            json.loads(data.decode('utf-8'))
+            return data
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+
 def main():
     """Socket 客户端主流程
 
@@ -45,7 +68,7 @@ def main():
         2. 连接到 Unix Socket
         3. 发送请求数据
         4. 等待服务器响应（超时 = 服务端超时 + 30 秒缓冲）
-        5. 解析长度前缀协议的响应
+        5. 解析确认响应与长度前缀协议的决策响应
         6. 输出响应到 stdout
     """
     start_time = time.time()
@@ -71,32 +94,33 @@ def main():
         sock.settimeout(CLIENT_TIMEOUT)
         logger.debug(f"Connected, fileno={sock.fileno()}, timeout={CLIENT_TIMEOUT}s")
 
-        # 发送请求（不关闭写端，保持连接双向可用）
-        sock.sendall(request_data.encode('utf-8'))
-        logger.debug(f"Request sent ({len(request_data)} bytes), waiting for response (timeout={CLIENT_TIMEOUT}s)...")
-
-        # 先读取并丢弃服务器的确认响应（不带长度前缀的 JSON）
-        # main.py:178-179 发送: {"success": true, "message": "Request registered"}
-        ack_data = b''
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                logger.error("Connection closed while reading ack")
-                print(json.dumps({
-                    'success': False,
-                    'error': 'ack_read_failed',
-                    'decision': {'behavior': 'deny', 'message': '读取确认响应失败'}
-                }))
-                return
-            ack_data += chunk
-            # 检查是否收到完整的 JSON
-            try:
-                json.loads(ack_data.decode('utf-8'))
-                logger.debug(f"Received ack: {ack_data.decode('utf-8')}")
-                break
-            except json.JSONDecodeError:
-                # JSON 不完整，继续读取
-                continue
+        # 发送请求（原始 JSON，新旧服务端均可解析；不关闭写端，保持连接双向可用）
+        request_bytes = request_data.encode('utf-8')
+        sock.sendall(request_bytes)
+        logger.debug(f"Request sent ({len(request_bytes)} bytes), waiting for response (timeout={CLIENT_TIMEOUT}s)...")
+
+        # 先读取服务器的确认响应（原始 JSON 请求对应原始 JSON 确认）
+        # services/permission_socket.py 发送: {"success": true, "message": "Request registered"}
+        ack_data = _recv_json_ack(sock)
+        if ack_data is None:
+            logger.error("Connection closed while reading ack")
+            print(json.dumps({
+                'success': False,
+                'error': 'ack_read_failed',
+                'decision': {'behavior': 'deny', 'message': '读取确认响应失败'}
+            }))
+            return
+        logger.debug(f"Received ack: {ack_data.decode('utf-8')}")
+        ack = json.loads(ack_data.decode('utf-8'))
+        if not ack.get('success'):
+            # 注册失败（请求非法 / 缺少 request_id 等），不会再有决策响应
+            logger.error(f"Request rejected: {ack.get('error')}")
+            print(json.dumps({
+                'success': False,
+                'error': ack.get('error', 'register_failed'),
+                'decision': {'behavior': 'deny', 'message': f"请求注册失败: {ack.get('error')}"}
+            }))
+            return
 
         # 等待并读取决策响应（带长度前缀协议，无限等待）
         wait_start = time.time()
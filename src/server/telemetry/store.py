@@ -8,17 +8,17 @@
 - IP 速率限制（同一 IP 每 10 分钟最多 10 次请求）
 - 统计在线用户数、版本分布
 - 定期清理过期数据（7 天未活跃视为离线）
-- 持久化到 JSON 文件（原子写入，重启不丢数据）
+- 持久化到 runtime 存储后端（json / sqlite，见 services/storage_backend.py），
+  按间隔只写入变更的客户端，重启不丢数据
 """
 
-import json
 import logging
 import os
-import tempfile
 import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Set, Tuple
 
+from services.storage_backend import open_backend
 from telemetry.utils import get_project_root
 
 logger = logging.getLogger(__name__)
@@ -42,10 +42,8 @@ CLEANUP_INTERVAL = 3600  # 1 小时
 # 持久化刷盘间隔（秒），避免每次心跳都写磁盘
 SAVE_INTERVAL = 60  # 1 分钟
 
-# 运行时目录
+# 运行时目录（json 后端落盘为 telemetry_clients.json）
 _RUNTIME_DIR = os.path.join(get_project_root(), 'runtime')
-# 持久化文件路径
-_DATA_FILE = os.path.join(_RUNTIME_DIR, 'telemetry_clients.json')
 
 
 class TelemetryStore:
@@ -75,12 +73,15 @@ class TelemetryStore:
             # 文件操作锁
             self._file_lock = threading.Lock()
 
-            # 脏标记 + 上次刷盘时间（用于延迟批量写入）
-            self._dirty = False
+            # 待刷盘的 client_id / 已清理待删除的 client_id + 上次刷盘时间（用于延迟批量写入）
+            self._dirty_keys: Set[str] = set()
+            self._deleted_keys: Set[str] = set()
             self._last_save_time = 0
 
-            # 客户端数据：client_id -> {last_seen, version, os, repo_url, first_seen}（持久化到文件）
-            self._clients = self._load()
+            # 客户端数据：client_id -> {last_seen, version, os, repo_url, first_seen}（持久化到存储后端）
+            self._backend = open_backend(_RUNTIME_DIR, 'telemetry_clients', ts_field='last_seen',
+                                         log_tag='telemetry')
+            self._clients = self._backend.load_all()
 
             # 清理线程控制
             self._stop_event = threading.Event()
@@ -100,49 +101,24 @@ class TelemetryStore:
             self._cleanup_thread.join(timeout=5)
         # 退出前刷盘
         with self._file_lock:
-            if self._dirty:
-                self._save()
-                self._dirty = False
+            self._save()
+        self._backend.close()
         logger.debug("[telemetry] Store stopped")
 
-    def _load(self) -> Dict[str, Dict[str, Any]]:
-        """从文件加载客户端数据"""
-        if not os.path.exists(_DATA_FILE):
-            return {}
-
-        try:
-            with open(_DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-                logger.warning("[telemetry] Invalid store data format, starting fresh")
-                return {}
-        except json.JSONDecodeError:
-            logger.warning("[telemetry] Invalid JSON in store file, starting fresh")
-            return {}
-        except (IOError, OSError) as e:
-            logger.error("[telemetry] Failed to load store file: %s", e)
-            return {}
-
     def _save(self) -> bool:
-        """原子写入客户端数据到文件"""
-        tmp_path = None
-        try:
-            os.makedirs(_RUNTIME_DIR, exist_ok=True)
-            tmp_fd, tmp_path = tempfile.mkstemp(dir=_RUNTIME_DIR, suffix='.tmp')
-            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
-                json.dump(self._clients, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, _DATA_FILE)
+        """将变更的客户端写入存储后端（调用方需持有 _file_lock）
+
+        只写入自上次刷盘以来变更 / 删除的 client_id；写入失败时保留脏标记，下次重试。
+        """
+        if not self._dirty_keys and not self._deleted_keys:
             return True
-        except (IOError, OSError) as e:
-            logger.error("[telemetry] Failed to save store file: %s", e)
-            # 清理临时文件
-            if tmp_path:
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
+        puts = {cid: self._clients[cid] for cid in self._dirty_keys if cid in self._clients}
+        if not self._backend.write_batch(puts=puts, deletes=self._deleted_keys):
+            logger.error("[telemetry] Failed to save %d clients", len(puts))
             return False
+        self._dirty_keys.clear()
+        self._deleted_keys.clear()
+        return True
 
     def record_heartbeat(
         self,
@@ -223,10 +199,10 @@ class TelemetryStore:
             }
 
             # 标记脏数据，按间隔刷盘（避免每次心跳都写磁盘）
-            self._dirty = True
+            self._dirty_keys.add(client_id)
+            self._deleted_keys.discard(client_id)
             if now - self._last_save_time >= SAVE_INTERVAL:
                 self._save()
-                self._dirty = False
                 self._last_save_time = now
 
             logger.debug(
@@ -291,7 +267,6 @@ class TelemetryStore:
         """清理过期数据"""
         with self._file_lock:
             now = int(time.time())
-            clients_expired = False
 
             # 清理过期客户端
             expired_clients = [
@@ -301,9 +276,10 @@ class TelemetryStore:
 
             for client_id in expired_clients:
                 del self._clients[client_id]
+                self._dirty_keys.discard(client_id)
+                self._deleted_keys.add(client_id)
 
             if expired_clients:
-                clients_expired = True
                 logger.info(
                     "[telemetry] Cleaned up %d expired clients",
                     len(expired_clients)
@@ -325,7 +301,6 @@ class TelemetryStore:
                 )
 
             # 有数据变更（清理过期 或 未刷盘的心跳）则持久化
-            if clients_expired or self._dirty:
+            if self._dirty_keys or self._deleted_keys:
                 self._save()
-                self._dirty = False
                 self._last_save_time = int(time.time())
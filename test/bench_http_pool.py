@@ -0,0 +1,148 @@
+"""飞书 API HTTP 连接池基准：单次调用延迟
+
+对比：
+    - legacy: 原 _http_request()，每次调用新建 urllib opener（新 TCP + TLS 握手）
+    - pool:   当前 HTTPConnectionPool（keep-alive 连接复用）
+
+本地 TLS 替身服务器（ThreadingHTTPServer + HTTP/1.1 keep-alive，自签证书）模拟
+open.feishu.cn，返回与飞书 API 相同形状的小 JSON。分别测量顺序调用的单次延迟与
+多线程并发调用的总耗时。自签证书由 openssl 命令行生成。
+
+运行（仓库根目录）:
+    python test/bench_http_pool.py
+    python test/bench_http_pool.py --calls 500 --threads 8 --calls-per-thread 50
+"""
+
+import argparse
+import http.server
+import json
+import logging
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import HTTPSHandler, ProxyHandler, Request, build_opener
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services.http_pool import HTTPConnectionPool  # noqa: E402
+
+_RESPONSE = json.dumps({'code': 0, 'msg': 'success', 'data': {'message_id': 'om_bench'}}).encode('utf-8')
+
+
+class _FeishuStandIn(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，不关 Nagle 会与客户端的延迟 ACK 叠加出 40ms 停顿
+    # （线上 HTTP 服务器默认开启 TCP_NODELAY）
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _make_cert(cert_dir):
+    cert = os.path.join(cert_dir, 'cert.pem')
+    key = os.path.join(cert_dir, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost',
+                    '-keyout', key, '-out', cert],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def _start_server(cert, key):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FeishuStandIn)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _legacy_call(url, body, headers, context):
+    """原 _http_request：每次新建 opener（飞书 API 直连不走代理）"""
+    req = Request(url, data=body, headers=headers, method='POST')
+    opener = build_opener(ProxyHandler({}), HTTPSHandler(context=context))
+    with opener.open(req, timeout=10) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+
+def _pool_call(pool, url, body, headers):
+    _, _, data = pool.request('POST', url, body=body, headers=headers, timeout=10)
+    return json.loads(data.decode('utf-8'))
+
+
+def _sequential_ms(call, calls):
+    call()  # 预热（pool 建立首个连接）
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def _concurrent_s(call, threads, calls_per_thread):
+    def worker():
+        for _ in range(calls_per_thread):
+            call()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--calls', type=int, default=200, help='顺序调用次数')
+    parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+    parser.add_argument('--calls-per-thread', type=int, default=50, help='每个线程的调用次数')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    cert_dir = tempfile.mkdtemp(prefix='bench-http-')
+    try:
+        cert, key = _make_cert(cert_dir)
+        server = _start_server(cert, key)
+        url = 'https://localhost:%d/open-apis/im/v1/messages?receive_id_type=chat_id' % server.server_address[1]
+        body = json.dumps({'receive_id': 'oc_bench', 'msg_type': 'interactive',
+                           'content': json.dumps({'elements': []})}).encode('utf-8')
+        headers = {'Content-Type': 'application/json; charset=utf-8', 'Authorization': 'Bearer t-bench'}
+
+        client_context = ssl.create_default_context(cafile=cert)
+        pool = HTTPConnectionPool(ssl_context=client_context)
+        impls = [
+            ('legacy', lambda: _legacy_call(url, body, headers, client_context)),
+            ('pool', lambda: _pool_call(pool, url, body, headers)),
+        ]
+
+        print('%-8s %16s %24s' % ('impl', 'sequential ms/call',
+                                  '%d threads x %d calls s' % (args.threads, args.calls_per_thread)))
+        for name, call in impls:
+            sequential = _sequential_ms(call, args.calls)
+            concurrent = _concurrent_s(call, args.threads, args.calls_per_thread)
+            print('%-8s %16.3f %24.3f' % (name, sequential, concurrent))
+        print('pool stats: %s' % pool.get_stats())
+        pool.close()
+        server.shutdown()
+    finally:
+        shutil.rmtree(cert_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""markdown 表格转代码块基准：~1MB 含大量代码块与表格的响应
+
+对比：
+    - legacy:  原 _convert_tables_to_codeblocks()：_MD_TABLE_RE 逐个匹配表格，
+               每次匹配对全部代码块范围线性扫描一次 _in_code_block（O(表格数 x 代码块数)）
+    - current: 当前 _convert_tables_to_codeblocks()（单次逐行扫描）
+
+文档由段落、代码块（部分代码块内含表格，不应转换）、表格（含空行分隔的相邻表格）
+循环拼接到 --size-kb 大小。两种实现的输出须完全一致。
+
+运行（仓库根目录）:
+    python test/bench_markdown_tables.py
+    python test/bench_markdown_tables.py --size-kb 1024 --repeat 5
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Any, List, Tuple
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services.feishu_api import _convert_tables_to_codeblocks  # noqa: E402
+
+
+# ----------------------------------------------------------------------
+# 原实现（仅用于对比）
+# ----------------------------------------------------------------------
+
+_MD_TABLE_RE = re.compile(
+    r'(?:^|\n)'
+    r'('
+    r'\|[^\n]+\|\s*\n'
+    r'\|[\s:|\-]+\|\s*\n'
+    r'(?:\|[^\n]+\|\s*(?:\n|$))*'
+    r')'
+)
+
+
+def _legacy_table_to_codeblock(match: Any) -> str:
+    table_text = match.group(1).strip()
+    prefix = '\n' if match.group(0).startswith('\n') else ''
+    return prefix + '```\n' + table_text + '\n```\n'
+
+
+def _legacy_convert(text: str) -> str:
+    code_block_ranges = []  # type: List[Tuple[int, int]]
+    for m in re.finditer(r'```[\s\S]*?```', text):
+        code_block_ranges.append((m.start(), m.end()))
+
+    def _in_code_block(pos: int) -> bool:
+        for start, end in code_block_ranges:
+            if start <= pos < end:
+                return True
+        return False
+
+    def _safe_replace(match: Any) -> str:
+        if _in_code_block(match.start()):
+            return match.group(0)
+        return _legacy_table_to_codeblock(match)
+
+    return _MD_TABLE_RE.sub(_safe_replace, text)
+
+
+# ----------------------------------------------------------------------
+# 测试文档
+# ----------------------------------------------------------------------
+
+def _table(i: int, rows: int) -> str:
+    lines = ['| 文件 | 改动 | 行数 |', '|:-----|:----:|-----:|']
+    for r in range(rows):
+        lines.append('| src/module_%d_%d.py | 重构第 %d 处 | %d |' % (i, r, r, i * 7 + r))
+    return '\n'.join(lines)
+
+
+def _section(i: int) -> str:
+    """一个段落单元：说明文字 + 代码块 + 表格（循环变换形态）"""
+    parts = ['### 第 %d 步\n\n本步骤修改了若干文件，详见下表与代码片段。' % i]
+    parts.append('```python\ndef step_%d(items):\n    return [x * %d for x in items]\n```' % (i, i))
+    if i % 3 == 0:
+        # 代码块中的表格：必须保持原样
+        parts.append('```\n' + _table(i, 2) + '\n```')
+    parts.append(_table(i, 3 + i % 4))
+    if i % 2 == 0:
+        # 空行分隔的相邻表格
+        parts.append(_table(i + 1, 2))
+    parts.append('以上为第 %d 步的全部改动。' % i)
+    return '\n\n'.join(parts)
+
+
+def build_document(size: int) -> str:
+    sections = []
+    total = 0
+    i = 0
+    while total < size:
+        section = _section(i)
+        sections.append(section)
+        total += len(section.encode('utf-8')) + 2
+        i += 1
+    return '\n\n'.join(sections)
+
+
+def _best_ms(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size-kb', type=int, default=1024, help='文档大小（KB，UTF-8）')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现的运行次数（取最好一次）')
+    args = parser.parse_args()
+
+    text = build_document(args.size_kb * 1024)
+    legacy_out = _legacy_convert(text)
+    current_out = _convert_tables_to_codeblocks(text)
+    assert current_out == legacy_out, 'output differs from the previous implementation'
+
+    fences = text.count('```') // 2
+    tables = len(re.findall(r'^\|[\s:|\-]+\|\s*$', text, re.M))
+    print('document: %.2f MB, %d fenced blocks, %d tables, outputs identical' % (
+        len(text.encode('utf-8')) / 1024 / 1024, fences, tables))
+    print('%-8s %10s' % ('impl', 'best ms'))
+    for name, func in (('legacy', _legacy_convert), ('current', _convert_tables_to_codeblocks)):
+        print('%-8s %10.1f' % (name, _best_ms(func, text, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""MessageSessionStore save / get 延迟基准
+
+对比：
+    - legacy: 原实现（每次 save / get 整文件读取 + indent=2 整文件重写 message_sessions.json）
+    - json:   当前实现，journal 模式（内存读源 + 追加 message_sessions.journal）
+    - sqlite: 当前实现，STORAGE_BACKEND=sqlite
+
+每种实现先预置 N 条映射，再测 save（新 key）与 get（已有 key）的单次延迟。
+
+运行（仓库根目录）:
+    python test/bench_message_session_store.py
+    python test/bench_message_session_store.py --sizes 10000 100000 --ops 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+import config  # noqa: E402
+from services.message_session_store import MessageSessionStore  # noqa: E402
+
+# legacy 实现每次调用都是 O(N) 文件读写，操作数单独限制
+LEGACY_MAX_OPS = 20
+
+
+class _LegacyStore(object):
+    """原 MessageSessionStore 的 save / get（整文件读写），仅用于对比"""
+
+    def __init__(self, data_dir):
+        self._data_dir = data_dir
+        self._file_path = os.path.join(data_dir, 'message_sessions.json')
+        self._file_lock = threading.Lock()
+
+    def save(self, message_id, session_id, project_dir):
+        with self._file_lock:
+            data = self._load()
+            data[message_id] = {'session_id': session_id, 'project_dir': project_dir,
+                                'created_at': int(time.time())}
+            return self._save(data)
+
+    def get(self, message_id):
+        with self._file_lock:
+            return self._load().get(message_id)
+
+    def close(self):
+        pass
+
+    def _load(self):
+        if not os.path.exists(self._file_path):
+            return {}
+        with open(self._file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, data):
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self._data_dir, suffix='.tmp')
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._file_path)
+        return True
+
+
+def _entry(i, now):
+    return {'session_id': 'session-%08d' % i, 'project_dir': '/home/user/project-%d' % (i % 50),
+            'created_at': now}
+
+
+def _open(kind, data_dir, size):
+    """预置 size 条映射后打开对应实现"""
+    now = int(time.time())
+    seed = {'om_%08d' % i: _entry(i, now) for i in range(size)}
+    if kind == 'legacy':
+        with open(os.path.join(data_dir, 'message_sessions.json'), 'w', encoding='utf-8') as f:
+            json.dump(seed, f, ensure_ascii=False, indent=2)
+        return _LegacyStore(data_dir)
+
+    config.STORAGE_BACKEND = kind
+    store = MessageSessionStore(data_dir)
+    store._backend.put_many(seed)
+    return store
+
+
+def _time_ops(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1000
+
+
+def bench(kind, size, ops):
+    if kind == 'legacy':
+        ops = min(ops, LEGACY_MAX_OPS)
+    data_dir = tempfile.mkdtemp(prefix='bench-mss-')
+    try:
+        store = _open(kind, data_dir, size)
+        save_ms = _time_ops(lambda k: store.save(k, 'session-new', '/home/user/new'),
+                            ['om_new_%08d' % i for i in range(ops)])
+        get_ms = _time_ops(store.get, ['om_%08d' % (i * 7919 % size) for i in range(ops)])
+        store.close()
+        return save_ms, get_ms
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--ops', type=int, default=1000, help='每种实现的 save / get 次数')
+    parser.add_argument('--kinds', nargs='+', default=['legacy', 'json', 'sqlite'])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print('%-8s %8s %14s %14s' % ('impl', 'entries', 'save ms/op', 'get ms/op'))
+    for size in args.sizes:
+        for kind in args.kinds:
+            save_ms, get_ms = bench(kind, size, args.ops)
+            print('%-8s %8d %14.4f %14.4f' % (kind, size, save_ms, get_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""权限请求 Unix Socket 服务器基准：线程数 / RSS / 大请求接收耗时
+
+对比：
+    - legacy:    原 run_socket_server()：listen(10)，每个连接一个线程，
+                 每收到 4KB 对整个缓冲区重新 json.loads
+    - selectors: 当前 PermissionSocketServer（单线程事件循环）
+
+服务器在子进程中运行（含 RequestManager），父进程读取子进程的 /proc/<pid>/status：
+    1. idle:      启动后
+    2. in-flight: N 个连接各发出半个请求（hook 正在发送，连接尚未完成接收）
+    3. pending:   N 个请求全部发完并收到确认（等待用户决策）
+最后单独发送一个含 --large-kb 大小 raw_input_encoded 的请求，测量从开始发送到收到确认的耗时。
+客户端与 socket_client.py 一致，发送原始 JSON。仅支持 Linux（依赖 /proc）。
+
+运行（仓库根目录）:
+    python test/bench_permission_socket.py
+    python test/bench_permission_socket.py --connections 1000 --large-kb 1024
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+
+# ----------------------------------------------------------------------
+# 子进程：服务器
+# ----------------------------------------------------------------------
+
+def _legacy_handle(conn):
+    """原 handle_socket_client 的接收 / 注册流程（省略日志与 ping）"""
+    from services.request_manager import RequestManager
+    conn.settimeout(5.0)
+    data = b''
+    while True:
+        try:
+            chunk = conn.recv(4096)
+        except OSError:
+            conn.close()
+            return
+        if not chunk:
+            conn.close()
+            return
+        data += chunk
+        try:
+            json.loads(data.decode('utf-8'))
+            break
+        except json.JSONDecodeError:
+            continue
+    conn.settimeout(None)
+    request = json.loads(data.decode('utf-8'))
+    raw_input = json.loads(base64.b64decode(request['raw_input_encoded']).decode('utf-8'))
+    request['session_id'] = raw_input.get('session_id', 'unknown')
+    RequestManager.get_instance().register(request['request_id'], conn, request)
+    conn.sendall(json.dumps({'success': True, 'message': 'Request registered',
+                             'session_id': request['session_id']}).encode())
+
+
+def _serve_legacy(socket_path):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(10)
+    while True:
+        conn, _ = server.accept()
+        thread = threading.Thread(target=_legacy_handle, args=(conn,))
+        thread.daemon = True
+        thread.start()
+
+
+def _serve(kind, socket_path):
+    logging.disable(logging.CRITICAL)
+    from services.request_manager import RequestManager
+    RequestManager.initialize()
+    if kind == 'legacy':
+        _serve_legacy(socket_path)
+    else:
+        from services.permission_socket import PermissionSocketServer
+        PermissionSocketServer(socket_path, backlog=1024).serve_forever()
+
+
+# ----------------------------------------------------------------------
+# 父进程：客户端与采样
+# ----------------------------------------------------------------------
+
+def _proc_status(pid):
+    """返回 (线程数, RSS KB)"""
+    threads = rss = 0
+    with open('/proc/%d/status' % pid) as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                threads = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+    return threads, rss
+
+
+def _request_bytes(request_id, payload_size=0):
+    raw_input = {'session_id': 'bench-session', 'tool_name': 'Write',
+                 'tool_input': {'file_path': '/tmp/bench.txt', 'content': 'x' * payload_size}}
+    return json.dumps({
+        'request_id': request_id,
+        'hook_pid': os.getpid(),
+        'raw_input_encoded': base64.b64encode(json.dumps(raw_input).encode('utf-8')).decode('ascii'),
+    }).encode('utf-8')
+
+
+def _read_ack(sock):
+    data = b''
+    while not data.rstrip().endswith(b'}'):
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError('server closed before ack')
+        data += chunk
+    return json.loads(data.decode('utf-8'))
+
+
+def _wait_for_socket(socket_path, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                return
+            except OSError:
+                pass
+            finally:
+                probe.close()
+        time.sleep(0.05)
+    raise RuntimeError('server did not start: %s' % socket_path)
+
+
+def bench(kind, connections, large_kb):
+    tmp_dir = tempfile.mkdtemp(prefix='bench-sock-')
+    socket_path = os.path.join(tmp_dir, 'permission.sock')
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', kind, socket_path],
+                            cwd=os.path.join(_ROOT, 'src', 'server'))
+    clients = []
+    try:
+        _wait_for_socket(socket_path)
+        time.sleep(0.2)
+        result = {'idle': _proc_status(proc.pid)}
+
+        requests = [_request_bytes('bench-%s-%d' % (kind, i)) for i in range(connections)]
+        for data in requests:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(socket_path)
+            sock.sendall(data[:len(data) // 2])
+            clients.append(sock)
+        time.sleep(0.5)
+        result['in-flight'] = _proc_status(proc.pid)
+
+        for sock, data in zip(clients, requests):
+            sock.sendall(data[len(data) // 2:])
+        for sock in clients:
+            if not _read_ack(sock).get('success'):
+                raise RuntimeError('request rejected')
+        time.sleep(0.2)
+        result['pending'] = _proc_status(proc.pid)
+
+        large = _request_bytes('bench-%s-large' % kind, large_kb * 1024)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        clients.append(sock)
+        sock.connect(socket_path)
+        start = time.perf_counter()
+        sock.sendall(large)
+        _read_ack(sock)
+        result['large_ms'] = (time.perf_counter() - start) * 1000
+        result['large_bytes'] = len(large)
+        return result
+    finally:
+        for sock in clients:
+            sock.close()
+        proc.kill()
+        proc.wait()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--connections', type=int, default=1000, help='并发 pending 连接数')
+    parser.add_argument('--large-kb', type=int, default=1024, help='大请求 tool_input 内容大小（KB）')
+    parser.add_argument('--kinds', nargs='+', default=['legacy', 'selectors'])
+    parser.add_argument('--serve', nargs=2, metavar=('KIND', 'SOCKET_PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        _serve(*args.serve)
+        return
+
+    print('%-10s %-10s %8s %10s' % ('server', 'phase', 'threads', 'rss MB'))
+    for kind in args.kinds:
+        result = bench(kind, args.connections, args.large_kb)
+        for phase in ('idle', 'in-flight', 'pending'):
+            threads, rss = result[phase]
+            print('%-10s %-10s %8d %10.1f' % (kind, phase, threads, rss / 1024))
+        print('%-10s %-10s %.1f ms for %.1f MB request' % (
+            kind, 'large', result['large_ms'], result['large_bytes'] / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""WS 隧道 RPC 信封基准：每条消息字节数与编解码 CPU
+
+对比：
+    - json-uuid: 原格式，json.dumps 整个信封，id 为 36 字符 UUID（ensure_ascii 转义中文）
+    - json-int:  当前 JSON 回退格式（整数 id，未协商二进制信封时使用）
+    - binary:    tunnel_codec 二进制信封（协商 claude-notify.tunnel.bin1 时使用）
+
+样例消息覆盖隧道上的典型 RPC：权限决策请求、带中文提示词的 claude/new 请求、
+browse-dirs 目录列表响应、错误响应。字节数为 WS 帧负载长度（不含帧头）。
+
+运行（仓库根目录）:
+    python test/bench_tunnel_codec.py
+    python test/bench_tunnel_codec.py --iterations 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services import tunnel_codec  # noqa: E402
+
+_TOKEN = 'a3f1c9e2' * 8
+
+
+def _samples():
+    prompt = ('请帮我重构 services/storage_backend.py 中的 journal 压缩逻辑，'
+              '保证压缩期间的写入不会丢失，并补充对应的崩溃恢复说明。') * 6
+    return [
+        ('decision request', {
+            'type': 'request', 'id': 1024, 'method': 'POST', 'path': '/cb/decision',
+            'headers': {'X-Auth-Token': _TOKEN},
+            'body': {'action': 'allow', 'request_id': '1706745600123-8f3a2c1d',
+                     'project_dir': '/home/user/projects/claude-notify'},
+        }),
+        ('claude/new request', {
+            'type': 'request', 'id': 1025, 'method': 'POST', 'path': '/cb/claude/new',
+            'headers': {'X-Auth-Token': _TOKEN},
+            'body': {'prompt': prompt, 'chat_id': 'oc_5ad11d72b830411d72b836c20',
+                     'message_id': 'om_dc13264520392913993dd051dba21dcf',
+                     'project_dir': '/home/user/projects/claude-notify'},
+        }),
+        ('browse-dirs response', {
+            'type': 'response', 'id': 1026, 'status': 200,
+            'body': {'current': '/home/user/projects', 'parent': '/home/user',
+                     'dirs': ['/home/user/projects/%s' % name for name in (
+                         'claude-notify', 'feishu-bot', 'gateway', 'infra-terraform', 'web-console',
+                         'mobile-app', 'data-pipeline', 'ml-experiments', 'docs-site', 'scripts',
+                         'dotfiles', 'playground', 'benchmarks', 'design-system', 'api-server',
+                         'auth-service', 'billing', 'notifications', 'search', 'analytics',
+                         'monitoring', 'legacy-importer', 'sdk-python', 'sdk-go', 'cli-tools')]},
+        }),
+        ('error response', {
+            'type': 'error', 'id': 1027, 'code': 'not_found',
+            'message': 'Unknown path: /cb/session/unknown',
+        }),
+    ]
+
+
+def _with_uuid(msg):
+    legacy = dict(msg)
+    legacy['id'] = str(uuid.uuid4())
+    return legacy
+
+
+def _time_us(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print('%-22s %-10s %7s %11s %11s' % ('message', 'format', 'bytes', 'encode us', 'decode us'))
+    for name, msg in _samples():
+        legacy = _with_uuid(msg)
+        legacy_text = json.dumps(legacy).encode('utf-8')
+        text = json.dumps(msg).encode('utf-8')
+        binary = tunnel_codec.encode(msg)
+        assert tunnel_codec.decode(binary) == msg
+
+        # 编码含 UTF-8 编码（发送 text frame 前 ws_send_text 的 encode），解码含 UTF-8 解码
+        rows = [
+            ('json-uuid', legacy_text,
+             lambda: json.dumps(legacy).encode('utf-8'),
+             lambda: json.loads(legacy_text.decode('utf-8'))),
+            ('json-int', text,
+             lambda: json.dumps(msg).encode('utf-8'),
+             lambda: json.loads(text.decode('utf-8'))),
+            ('binary', binary,
+             lambda: tunnel_codec.encode(msg),
+             lambda: tunnel_codec.decode(binary)),
+        ]
+        for fmt, payload, encode, decode in rows:
+            print('%-22s %-10s %7d %11.2f %11.2f' % (
+                name, fmt, len(payload), _time_us(encode, args.iterations), _time_us(decode, args.iterations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""WebSocket 帧收发吞吐基准：1KB / 64KB / 1MB payload
+
+对比：
+    - legacy:  原 ws_protocol：逐字节 XOR 掩码、bytes 拼接接收、帧头与 payload 拼接后 sendall
+    - current: 当前 ws_protocol：整段整数 XOR 掩码、recv_into 预分配缓冲、sendmsg 分散写
+
+每个 payload 大小分别测量：
+    - mask:  单独一次掩码的耗时
+    - frame: socketpair 上一帧客户端 → 服务端（加掩码发送 + 接收解掩码）的耗时与吞吐
+
+运行（仓库根目录）:
+    python test/bench_ws_frames.py
+    python test/bench_ws_frames.py --sizes 1024 65536 1048576 --budget 2
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services import ws_protocol  # noqa: E402
+from services.ws_protocol import OPCODE_BINARY  # noqa: E402
+
+
+# ----------------------------------------------------------------------
+# 原实现（仅用于对比）
+# ----------------------------------------------------------------------
+
+def _legacy_mask(data, mask_key):
+    result = bytearray(len(data))
+    for i in range(len(data)):
+        result[i] = data[i] ^ mask_key[i % 4]
+    return bytes(result)
+
+
+def _legacy_recv_exact(sock, length):
+    data = b''
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed')
+        data += chunk
+    return data
+
+
+def _legacy_send(sock, opcode, payload):
+    payload_len = len(payload)
+    first_byte = 0x80 | opcode
+    if payload_len <= 125:
+        header = bytes([first_byte, payload_len])
+    elif payload_len <= 65535:
+        header = bytes([first_byte, 126]) + struct.pack('!H', payload_len)
+    else:
+        header = bytes([first_byte, 127]) + struct.pack('!Q', payload_len)
+    mask_key = os.urandom(4)
+    payload = _legacy_mask(payload, mask_key)
+    header = bytes([header[0], header[1] | 0x80]) + header[2:] + mask_key
+    sock.sendall(header + payload)
+
+
+def _legacy_recv(sock):
+    first_two = _legacy_recv_exact(sock, 2)
+    opcode = first_two[0] & 0x0F
+    masked = first_two[1] & 0x80
+    payload_len = first_two[1] & 0x7F
+    if payload_len == 126:
+        payload_len = struct.unpack('!H', _legacy_recv_exact(sock, 2))[0]
+    elif payload_len == 127:
+        payload_len = struct.unpack('!Q', _legacy_recv_exact(sock, 8))[0]
+    mask_key = _legacy_recv_exact(sock, 4) if masked else b''
+    payload = _legacy_recv_exact(sock, payload_len)
+    if masked:
+        payload = _legacy_mask(payload, mask_key)
+    return opcode, payload
+
+
+def _current_send(sock, opcode, payload):
+    # 未知 socket 按客户端处理（加掩码），与隧道客户端发送路径一致
+    ws_protocol._send_frame(sock, opcode, payload)
+
+
+IMPLS = {
+    'legacy': (_legacy_mask, _legacy_send, _legacy_recv),
+    'current': (ws_protocol._mask_data, _current_send, ws_protocol.ws_recv),
+}
+
+
+# ----------------------------------------------------------------------
+# 测量
+# ----------------------------------------------------------------------
+
+def _iterations(run_once, budget):
+    """按单次耗时估算在 budget 秒内的迭代次数（至少 3 次）"""
+    start = time.perf_counter()
+    run_once()
+    elapsed = time.perf_counter() - start
+    return max(3, min(10000, int(budget / max(elapsed, 1e-6))))
+
+
+def bench_mask(mask, payload, budget):
+    mask_key = os.urandom(4)
+    n = _iterations(lambda: mask(payload, mask_key), budget)
+    start = time.perf_counter()
+    for _ in range(n):
+        mask(payload, mask_key)
+    return (time.perf_counter() - start) / n
+
+
+def bench_frame(send, recv, payload, budget):
+    sender, receiver = socket.socketpair()
+    try:
+        def send_all(count):
+            for _ in range(count):
+                send(sender, OPCODE_BINARY, payload)
+
+        def transfer(count):
+            thread = threading.Thread(target=send_all, args=(count,))
+            thread.start()
+            for _ in range(count):
+                opcode, data = recv(receiver)
+                assert len(data) == len(payload)
+            thread.join()
+
+        n = _iterations(lambda: transfer(1), budget)
+        start = time.perf_counter()
+        transfer(n)
+        return (time.perf_counter() - start) / n
+    finally:
+        ws_protocol.cleanup_socket_state(sender)
+        ws_protocol.cleanup_socket_state(receiver)
+        sender.close()
+        receiver.close()
+
+
+def _format_size(size):
+    if size >= 1024 * 1024:
+        return '%dMB' % (size // (1024 * 1024))
+    if size >= 1024:
+        return '%dKB' % (size // 1024)
+    return '%dB' % size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 64 * 1024, 1024 * 1024])
+    parser.add_argument('--budget', type=float, default=1.0, help='每项测量的目标耗时（秒）')
+    parser.add_argument('--kinds', nargs='+', default=['legacy', 'current'])
+    args = parser.parse_args()
+
+    print('%-8s %6s %12s %14s %12s' % ('impl', 'size', 'mask ms', 'frame ms', 'frame MB/s'))
+    for size in args.sizes:
+        payload = os.urandom(size)
+        for kind in args.kinds:
+            mask, send, recv = IMPLS[kind]
+            mask_s = bench_mask(mask, payload, args.budget)
+            frame_s = bench_frame(send, recv, payload, args.budget)
+            print('%-8s %6s %12.4f %14.4f %12.1f' % (
+                kind, _format_size(size), mask_s * 1000, frame_s * 1000, size / frame_s / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
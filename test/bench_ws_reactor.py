@@ -0,0 +1,166 @@
+"""WebSocket 隧道基准：空闲隧道的线程数 / RSS 与请求往返延迟
+
+对比：
+    - legacy:  原方式，每条隧道占一个线程阻塞在 ws_recv（对应原先被占住的 HTTP 工作线程）
+    - reactor: 当前 WSTunnelReactor（单个 selectors 线程 + 有界帧处理线程池）
+
+服务端在子进程中运行（127.0.0.1 TCP），收到文本帧原样回发；父进程建立 N 条隧道后
+读取子进程 /proc/<pid>/status 的线程数与 RSS，再在一条隧道上测量文本帧往返延迟。
+只测传输层：不经过 HTTP 握手与 register 认证（两种方式在这两步上相同）。
+仅支持 Linux（依赖 /proc）。
+
+运行（仓库根目录）:
+    python test/bench_ws_reactor.py
+    python test/bench_ws_reactor.py --tunnels 500 --round-trips 500
+"""
+
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services import ws_protocol  # noqa: E402
+from services.ws_protocol import OPCODE_TEXT, ws_recv, ws_send_text  # noqa: E402
+
+# 与 WS_READ_TIMEOUT 默认值一致
+READ_TIMEOUT = 90
+
+
+# ----------------------------------------------------------------------
+# 子进程：服务端
+# ----------------------------------------------------------------------
+
+def _as_server_socket(sock):
+    # 等同 ws_server_handshake 完成后的状态：服务端发送不加 mask
+    with ws_protocol._WS_CLIENT_MODE_LOCK:
+        ws_protocol._WS_CLIENT_MODE_MAP[id(sock)] = False
+
+
+def _legacy_tunnel(sock):
+    try:
+        while True:
+            opcode, payload = ws_recv(sock, timeout=READ_TIMEOUT)
+            if opcode == OPCODE_TEXT:
+                ws_send_text(sock, payload.decode('utf-8'))
+    except Exception:
+        sock.close()
+
+
+def _reactor_frame(conn, opcode, payload):
+    if opcode == OPCODE_TEXT:
+        ws_send_text(conn.sock, payload.decode('utf-8'))
+    return True
+
+
+def _serve(kind):
+    logging.disable(logging.CRITICAL)
+    reactor = None
+    if kind == 'reactor':
+        from services.ws_reactor import WSTunnelReactor
+        reactor = WSTunnelReactor(max_workers=16)
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1024)
+    print(server.getsockname()[1], flush=True)
+
+    count = 0
+    while True:
+        sock, addr = server.accept()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        _as_server_socket(sock)
+        count += 1
+        if reactor is not None:
+            reactor.add_tunnel(sock, 'owner-%d' % count, addr[0], READ_TIMEOUT,
+                               _reactor_frame, lambda conn, reason: None)
+        else:
+            thread = threading.Thread(target=_legacy_tunnel, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+
+# ----------------------------------------------------------------------
+# 父进程：客户端与采样
+# ----------------------------------------------------------------------
+
+def _proc_status(pid):
+    """返回 (线程数, RSS KB)"""
+    threads = rss = 0
+    with open('/proc/%d/status' % pid) as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                threads = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+    return threads, rss
+
+
+def bench(kind, tunnels, round_trips):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', kind],
+                            cwd=os.path.join(_ROOT, 'src', 'server'), stdout=subprocess.PIPE)
+    clients = []
+    try:
+        port = int(proc.stdout.readline())
+        time.sleep(0.2)
+        result = {'idle': _proc_status(proc.pid)}
+
+        for _ in range(tunnels):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            clients.append(sock)
+        # 确认最后一条隧道已被服务端接管
+        ws_send_text(clients[-1], 'ready')
+        ws_recv(clients[-1], timeout=10)
+        time.sleep(0.5)
+        result['tunnels'] = _proc_status(proc.pid)
+
+        samples = []
+        message = '{"type": "request", "id": "bench", "method": "POST", "path": "/cb/decision"}'
+        for _ in range(round_trips):
+            start = time.perf_counter()
+            ws_send_text(clients[0], message)
+            ws_recv(clients[0], timeout=10)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        result['rtt_p50_ms'] = samples[len(samples) // 2] * 1000
+        result['rtt_p99_ms'] = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+        return result
+    finally:
+        for sock in clients:
+            ws_protocol.cleanup_socket_state(sock)
+            sock.close()
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tunnels', type=int, default=500, help='空闲隧道数')
+    parser.add_argument('--round-trips', type=int, default=500, help='往返延迟采样次数')
+    parser.add_argument('--kinds', nargs='+', default=['legacy', 'reactor'])
+    parser.add_argument('--serve', metavar='KIND', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    print('%-8s %8s %10s %12s %12s' % ('server', 'threads', 'rss MB', 'rtt p50 ms', 'rtt p99 ms'))
+    for kind in args.kinds:
+        result = bench(kind, args.tunnels, args.round_trips)
+        idle_threads, idle_rss = result['idle']
+        threads, rss = result['tunnels']
+        print('%-8s %8d %10.1f %12.3f %12.3f   (idle: %d threads, %.1f MB)' % (
+            kind, threads, rss / 1024, result['rtt_p50_ms'], result['rtt_p99_ms'],
+            idle_threads, idle_rss / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""FeishuRateLimiter 频率限制退避测试
+
+qps=10，先耗尽令牌桶，再 report_rate_limited()（退避 1s），随后排队 15 个请求。
+退避结束后令牌桶应从空桶开始按 1/qps 匀速补充：放行时间依次约为
+退避结束 + 0.1s、+ 0.2s ……，而不是退避结束时一次放行 qps 个。
+
+运行: python -m pytest -q test/test_rate_limiter.py
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services.rate_limiter import BACKOFF_INITIAL, FeishuRateLimiter  # noqa: E402
+
+QPS = 10
+REQUESTS = 15
+# 调度线程唤醒的时间误差容忍（秒）
+TOLERANCE = 0.04
+
+
+class RateLimiterBackoffTest(unittest.TestCase):
+
+    def test_grants_after_backoff_are_paced(self):
+        limiter = FeishuRateLimiter(qps=QPS)
+        for _ in range(QPS):
+            self.assertTrue(limiter.acquire('a', timeout=5))
+
+        backoff = limiter.report_rate_limited()
+        self.assertEqual(backoff, BACKOFF_INITIAL)
+        backoff_end = time.time() + backoff
+        self.assertEqual(limiter.get_stats()['tokens'], 0)
+
+        granted_at = []
+        granted_lock = threading.Lock()
+
+        def request():
+            self.assertTrue(limiter.acquire('a', timeout=10))
+            with granted_lock:
+                granted_at.append(time.time())
+
+        threads = [threading.Thread(target=request) for _ in range(REQUESTS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(15)
+
+        self.assertEqual(len(granted_at), REQUESTS)
+        granted_at.sort()
+        interval = 1.0 / QPS
+        # 第 i 个放行不早于退避结束后 (i + 1) 个补充间隔
+        for i, at in enumerate(granted_at):
+            self.assertGreaterEqual(at, backoff_end + (i + 1) * interval - TOLERANCE,
+                                    'grant %d at +%.3fs after backoff' % (i, at - backoff_end))
+        # 相邻放行间隔约为 1/qps，没有退避结束时的突发
+        gaps = [b - a for a, b in zip(granted_at, granted_at[1:])]
+        self.assertGreater(min(gaps), interval - TOLERANCE, 'gaps: %s' % gaps)
+
+
+if __name__ == '__main__':
+    unittest.main()
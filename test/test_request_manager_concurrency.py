@@ -0,0 +1,100 @@
+"""RequestManager.resolve 并发测试
+
+200 个请求分别注册在 socketpair 上，200 个线程同时 resolve；
+hook 端限速读取（读完一个决策约需 HOOK_READ_TIME 秒），且决策远大于 socket 缓冲区，
+每次发送都要等对应 hook 慢慢读完才能返回。
+
+决策在全局锁外发送时，总耗时应接近一次慢发送（~HOOK_READ_TIME）；
+若发送仍在锁内串行，总耗时约为 REQUESTS * HOOK_READ_TIME。
+
+运行: python -m pytest -q test/test_request_manager_concurrency.py
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'src', 'server'), os.path.join(_ROOT, 'src', 'shared')]
+
+from services.request_manager import RequestManager  # noqa: E402
+
+REQUESTS = 200
+# hook 端读完一个决策所需的时间（秒）
+HOOK_READ_TIME = 0.5
+# 决策中的大字段，保证单次发送远超 socket 缓冲区
+PAYLOAD_SIZE = 256 * 1024
+# hook 端读取速率（字节/秒）
+HOOK_READ_RATE = PAYLOAD_SIZE / HOOK_READ_TIME
+
+
+def _recv_exact_slowly(sock, size):
+    """按 HOOK_READ_RATE 限速读取 size 字节"""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 8192))
+        if not chunk:
+            raise ConnectionError('peer closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+        time.sleep(len(chunk) / HOOK_READ_RATE)
+    return b''.join(chunks)
+
+
+class RequestManagerConcurrencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = RequestManager(request_timeout=60)
+        self.manager._start_watcher()
+        self.pairs = []
+
+    def tearDown(self):
+        for server_side, hook_side in self.pairs:
+            for sock in (server_side, hook_side):
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+
+    def test_slow_hooks_do_not_serialize_resolve(self):
+        for i in range(REQUESTS):
+            server_side, hook_side = socket.socketpair()
+            server_side.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            hook_side.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            self.pairs.append((server_side, hook_side))
+            self.manager.register('req-%d' % i, server_side, {'session_id': 'sess-%d' % i})
+
+        received = [None] * REQUESTS
+        results = [None] * REQUESTS
+        decision = {'behavior': 'allow', 'message': 'x' * PAYLOAD_SIZE}
+
+        def hook(i):
+            sock = self.pairs[i][1]
+            length = int.from_bytes(_recv_exact_slowly(sock, 4), 'big')
+            received[i] = len(_recv_exact_slowly(sock, length))
+
+        def approve(i):
+            results[i] = self.manager.resolve('req-%d' % i, decision)
+
+        threads = [threading.Thread(target=hook, args=(i,)) for i in range(REQUESTS)]
+        threads += [threading.Thread(target=approve, args=(i,)) for i in range(REQUESTS)]
+        start = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+        elapsed = time.time() - start
+
+        self.assertEqual(results, [(True, '', '')] * REQUESTS)
+        self.assertTrue(all(n and n > PAYLOAD_SIZE for n in received))
+        self.assertEqual(self.manager.get_request_status('req-0'), RequestManager.STATUS_RESOLVED)
+        # 串行发送约需 REQUESTS * HOOK_READ_TIME = 100s；并发发送应接近一次慢发送
+        self.assertLess(elapsed, HOOK_READ_TIME * 10,
+                        'resolve took %.1fs for %d slow hooks' % (elapsed, REQUESTS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""WriteBehindBackend 崩溃恢复测试（json / sqlite 后端）
+
+子进程通过 open_backend(flush_interval>0) 打开 write-behind 存储：
+    1. 写入一批 key（含覆盖与删除），flush(sync=True)
+    2. 再写入一批不 flush 的脏 key（新增、覆盖、删除已落盘的 key）
+    3. os._exit 模拟进程被杀（不执行 close / atexit），或正常 close()
+
+父进程重新打开同一目录，检查：
+    - 崩溃后读到的恰好是 flush(sync=True) 时的状态，未 flush 的变更全部丢失且数据可正常读取
+    - close() 后全部变更都已持久化
+    - 崩溃后的数据可继续写入并正常关闭
+
+运行: python -m pytest -q test/test_write_behind_recovery.py
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SERVER_DIR = os.path.join(_ROOT, 'src', 'server')
+_SHARED_DIR = os.path.join(_ROOT, 'src', 'shared')
+sys.path[:0] = [_SERVER_DIR, _SHARED_DIR]
+
+from services.storage_backend import (  # noqa: E402
+    BACKEND_JSON, BACKEND_SQLITE, SQLITE_FILE_NAME, open_backend, sqlite3,
+)
+
+STORE_NAME = 'wb_recovery'
+
+# 子进程：flush 间隔足够长、脏 key 上限足够大，保证后台线程不会自行写入
+_CHILD = '''
+import os, sys
+sys.path[:0] = [%(server)r, %(shared)r]
+from services.storage_backend import open_backend
+
+store = open_backend(%(data_dir)r, %(name)r, ts_field='ts', backend=%(backend)r,
+                     flush_interval=3600, max_dirty=10 ** 6)
+store.put_many({'k%%d' %% i: {'ts': i, 'v': 'flushed'} for i in range(50)})
+store.put('k0', {'ts': 0, 'v': 'flushed-overwrite'})
+store.delete('k1')
+if not store.flush(sync=True):
+    os._exit(2)
+
+store.put_many({'d%%d' %% i: {'ts': i, 'v': 'dirty'} for i in range(50)})
+store.put('k2', {'ts': 2, 'v': 'dirty-overwrite'})
+store.delete('k3')
+
+if %(mode)r == 'crash':
+    os._exit(0)
+store.close()
+'''
+
+
+def _flushed_state():
+    state = {'k%d' % i: {'ts': i, 'v': 'flushed'} for i in range(50)}
+    state['k0'] = {'ts': 0, 'v': 'flushed-overwrite'}
+    del state['k1']
+    return state
+
+
+def _closed_state():
+    state = _flushed_state()
+    state.update({'d%d' % i: {'ts': i, 'v': 'dirty'} for i in range(50)})
+    state['k2'] = {'ts': 2, 'v': 'dirty-overwrite'}
+    del state['k3']
+    return state
+
+
+class _WriteBehindRecoveryMixin(object):
+    backend = None  # type: str
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix='wb-recovery-')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _run_child(self, mode):
+        code = _CHILD % {'server': _SERVER_DIR, 'shared': _SHARED_DIR, 'data_dir': self.data_dir,
+                         'name': STORE_NAME, 'backend': self.backend, 'mode': mode}
+        proc = subprocess.run([sys.executable, '-c', code], cwd=_SERVER_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+        self.assertEqual(proc.returncode, 0, proc.stderr.decode('utf-8', 'replace'))
+
+    def _load(self):
+        store = open_backend(self.data_dir, STORE_NAME, ts_field='ts', backend=self.backend)
+        try:
+            return store.load_all()
+        finally:
+            store.close()
+
+    def _assert_not_corrupted(self):
+        """落盘文件本身可直接解析（不依赖后端的容错读取）"""
+        if self.backend == BACKEND_SQLITE:
+            conn = sqlite3.connect(os.path.join(self.data_dir, SQLITE_FILE_NAME))
+            try:
+                self.assertEqual(conn.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+            finally:
+                conn.close()
+        else:
+            with open(os.path.join(self.data_dir, STORE_NAME + '.json'), encoding='utf-8') as f:
+                self.assertIsInstance(json.load(f), dict)
+            leftovers = [n for n in os.listdir(self.data_dir) if n.endswith('.tmp')]
+            self.assertEqual(leftovers, [])
+
+    def test_crash_after_flush_restores_flushed_state(self):
+        self._run_child('crash')
+        self._assert_not_corrupted()
+        self.assertEqual(self._load(), _flushed_state())
+
+    def test_close_persists_everything(self):
+        self._run_child('close')
+        self._assert_not_corrupted()
+        self.assertEqual(self._load(), _closed_state())
+
+    def test_write_after_crash_recovery(self):
+        self._run_child('crash')
+        store = open_backend(self.data_dir, STORE_NAME, ts_field='ts', backend=self.backend,
+                             flush_interval=3600, max_dirty=10 ** 6)
+        self.assertEqual(store.load_all(), _flushed_state())
+        store.put('after', {'ts': 1, 'v': 'after-crash'})
+        store.close()
+
+        expected = _flushed_state()
+        expected['after'] = {'ts': 1, 'v': 'after-crash'}
+        self._assert_not_corrupted()
+        self.assertEqual(self._load(), expected)
+
+
+class JsonWriteBehindRecoveryTest(_WriteBehindRecoveryMixin, unittest.TestCase):
+    backend = BACKEND_JSON
+
+
+@unittest.skipIf(sqlite3 is None, 'sqlite3 module unavailable')
+class SqliteWriteBehindRecoveryTest(_WriteBehindRecoveryMixin, unittest.TestCase):
+    backend = BACKEND_SQLITE
+
+
+if __name__ == '__main__':
+    unittest.main()